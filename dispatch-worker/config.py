@@ -21,6 +21,14 @@ HEARTBEAT_INTERVAL = int(os.environ.get("HEARTBEAT_INTERVAL", "15"))
 # 任务执行
 TASK_TIMEOUT = int(os.environ.get("TASK_TIMEOUT", "600"))  # 默认 10 分钟
 CLEANUP_TIMEOUT = int(os.environ.get("CLEANUP_TIMEOUT", "30"))  # 清理超时
+KILL_GRACE = float(os.environ.get("KILL_GRACE", "1"))  # SIGTERM 到 SIGKILL 的宽限期
+
+# 任务输出落盘
+SPOOL_DIR = os.environ.get("SPOOL_DIR", "/tmp/dispatch-worker/spool")
+SPOOL_SEGMENT_BYTES = int(os.environ.get("SPOOL_SEGMENT_BYTES", str(16 << 20)))  # 每段 16MB
+SPOOL_MAX_SEGMENTS = int(os.environ.get("SPOOL_MAX_SEGMENTS", "8"))  # 每个流最多保留段数
+SPOOL_KEEP_TASKS = int(os.environ.get("SPOOL_KEEP_TASKS", "100"))  # 保留已结束任务的日志数
+OUTPUT_TAIL_BYTES = int(os.environ.get("OUTPUT_TAIL_BYTES", str(64 << 10)))  # 内存尾部大小
 
 # Worker HTTP 服务
 WORKER_HOST = os.environ.get("WORKER_HOST", "0.0.0.0")
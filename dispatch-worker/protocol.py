@@ -174,3 +174,65 @@ def parse_task_output(stdout: str, stderr: str, task_id: str,
     # No exit code info either — parse_error
     error_msg = stderr.strip() if stderr.strip() else "Output is not valid JSON"
     return TaskResult.parse_error(task_id, stdout + "\n" + stderr)
+
+
+class ResultLineDetector:
+    """
+    增量检测 JSON Protocol 结果行
+    输出按块喂入，按行切分，只保留最后一个含 "ok" 的 JSON 对象；
+    超过 max_line_bytes 的行直接跳过，不会为超长行无限缓冲
+    """
+
+    def __init__(self, max_line_bytes: int = 1 << 20):
+        self.max_line_bytes = max_line_bytes
+        self.result: dict | None = None
+        self._partial = bytearray()
+        self._overflow = False
+
+    def feed(self, data: bytes):
+        """喂入一块原始输出"""
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end == -1:
+                self._append(data[start:])
+                return
+            self._append(data[start:end])
+            self._end_line()
+            start = end + 1
+
+    def close(self):
+        """输出结束：处理没有换行符结尾的最后一行"""
+        self._end_line()
+
+    def _append(self, chunk: bytes):
+        if self._overflow or not chunk:
+            return
+        if len(self._partial) + len(chunk) > self.max_line_bytes:
+            self._overflow = True
+            self._partial.clear()
+            return
+        self._partial += chunk
+
+    def _end_line(self):
+        line = self._partial.strip()
+        if not self._overflow and line.startswith(b"{"):
+            try:
+                data = json.loads(line)
+                if isinstance(data, dict) and "ok" in data:
+                    self.result = data
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                pass
+        self._partial.clear()
+        self._overflow = False
+
+
+def parse_streamed_output(detected: dict | None, stdout_tail: str, stderr_tail: str,
+                          task_id: str, exit_code: int = None) -> TaskResult:
+    """
+    解析流式捕获的任务输出
+    detected 是 ResultLineDetector 找到的结果行；没有则在有界尾部上走 parse_task_output 的兜底逻辑
+    """
+    if detected is not None:
+        return TaskResult(**detected)
+    return parse_task_output(stdout_tail, stderr_tail, task_id, exit_code=exit_code)
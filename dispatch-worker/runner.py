@@ -1,5 +1,7 @@
 """
 任务执行器 - setsid + killpg + timeout
+基于 asyncio 子进程：完成事件驱动、输出流式读取、kill 路径不阻塞事件循环
+输出流式写入每个任务的 spool 文件，内存里只保留有界尾部
 """
 
 import os
@@ -9,12 +11,14 @@ import time
 import signal
 import asyncio
 import logging
-import subprocess
 from typing import Optional
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 
 import protocol
+from spool import TaskOutput
 
 logger = logging.getLogger(__name__)
 
@@ -24,20 +28,39 @@ class RunningTask:
     """运行中的任务"""
 
     task_id: str
-    process: subprocess.Popen
+    process: asyncio.subprocess.Process
     start_time: float
     timeout: int
     lease_owner: str
 
 
 class TaskRunner:
-    """任务执行器 - 负责 setsid + killpg + timeout"""
+    """任务执行器 - 负责 setsid + killpg + timeout (全部基于 asyncio，不阻塞事件循环)"""
 
-    def __init__(self, task_timeout: int = 600, cleanup_timeout: int = 30):
+    def __init__(
+        self,
+        task_timeout: int = 600,
+        cleanup_timeout: int = 30,
+        kill_grace: float = 1.0,
+        spool_dir: str = "/tmp/dispatch-worker/spool",
+        spool_segment_bytes: int = 16 << 20,
+        spool_max_segments: int = 8,
+        spool_keep_tasks: int = 100,
+        tail_bytes: int = 64 << 10,
+    ):
         self.task_timeout = task_timeout
         self.cleanup_timeout = cleanup_timeout
+        self.kill_grace = kill_grace
         self.running_tasks: dict[str, RunningTask] = {}
 
+        # 输出捕获（运行中 + 最近结束的任务，供 /v1/tasks/{id}/log 读取）
+        self.spool_dir = Path(spool_dir)
+        self.spool_segment_bytes = spool_segment_bytes
+        self.spool_max_segments = spool_max_segments
+        self.spool_keep_tasks = spool_keep_tasks
+        self.tail_bytes = tail_bytes
+        self.outputs: OrderedDict[str, TaskOutput] = OrderedDict()
+
     async def execute(
         self,
         task_id: str,
@@ -49,8 +72,10 @@ class TaskRunner:
     ) -> protocol.TaskResult:
         """
         执行任务
-        - 使用 setsid 创建新进程组
-        - 超时后使用 killpg 杀死整个进程组
+        - 使用 start_new_session (setsid) 创建新进程组
+        - stdout/stderr 由 reader 协程流式写入 spool 文件，结果行增量检测
+        - 进程退出由 asyncio 子进程回调通知（无轮询）
+        - 超时后 SIGTERM → 宽限期 → SIGKILL 整个进程组
         - 返回标准化 JSON 结果
         """
         timeout = timeout or self.task_timeout
@@ -63,19 +88,18 @@ class TaskRunner:
         if env:
             exec_env.update(env)
 
+        output = self._new_output(task_id)
+
         try:
-            # 使用 setsid 创建新进程组
-            # - setsid: 创建新会话，成为新进程组的leader
-            # - stdout/stderr: 重定向到 pipe
-            process = subprocess.Popen(
-                f"setsid {command}",
-                shell=True,
+            # start_new_session=True: 子进程调用 setsid，成为新进程组的 leader，
+            # killpg 可以覆盖它的所有子孙进程
+            process = await asyncio.create_subprocess_shell(
+                command,
                 cwd=cwd,
                 env=exec_env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                preexec_fn=os.setsid,  # 关键：创建新进程组
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
             )
 
             # 注册到运行任务
@@ -88,27 +112,43 @@ class TaskRunner:
             )
             self.running_tasks[task_id] = running
 
-            # 等待完成或超时
+            # 流式读取输出
+            readers = [
+                asyncio.create_task(self._read_stream(process.stdout, output.feed_stdout)),
+                asyncio.create_task(self._read_stream(process.stderr, output.feed_stderr)),
+            ]
+
+            # 等待完成或超时（process.wait() 在进程退出且管道关闭后返回）
             try:
-                stdout, stderr = await self._wait_with_timeout(process, timeout)
+                await asyncio.wait_for(process.wait(), timeout=timeout)
             except asyncio.TimeoutError:
-                # 超时，杀死进程组
-                logger.warning(f"[{task_id}] Task timeout, killing process group")
-                self._kill_process_group(process)
-                stdout, stderr = process.communicate()  # 收集剩余输出
+                if process.returncode is None:
+                    # 超时，杀死进程组
+                    logger.warning(f"[{task_id}] Task timeout, killing process group")
+                    await self._kill_process_group(process)
+                    await self._drain_readers(task_id, readers)  # 收集剩余输出
 
-                elapsed = time.time() - start_time
-                return protocol.TaskResult.timeout(task_id, {"elapsed": elapsed})
+                    elapsed = time.time() - start_time
+                    return protocol.TaskResult.timeout(task_id, {"elapsed": elapsed})
+
+                # 主进程已退出，只是后台子孙进程还占着输出管道：清理它们，按正常完成处理
+                logger.warning(
+                    f"[{task_id}] Leftover processes hold output pipes, killing process group"
+                )
+                await self._kill_process_group(process)
+
+            await self._drain_readers(task_id, readers)
+            output.finish()
 
             # 任务完成
             elapsed = time.time() - start_time
 
             # 解析输出 (pass exit_code for fallback when no JSON protocol)
-            result = protocol.parse_task_output(
-                stdout, stderr, task_id, exit_code=process.returncode
-            )
+            result = output.parse_result(process.returncode)
             result.metrics["elapsed"] = elapsed
             result.metrics["exit_code"] = process.returncode
+            result.metrics["stdout_bytes"] = output.stdout.size
+            result.metrics["stderr_bytes"] = output.stderr.size
 
             logger.info(
                 f"[{task_id}] Task completed: {result.status}, elapsed={elapsed:.1f}s"
@@ -124,45 +164,70 @@ class TaskRunner:
 
         finally:
             # 清理
+            output.finish()
             self.running_tasks.pop(task_id, None)
 
-    async def _wait_with_timeout(self, process: subprocess.Popen, timeout: int):
-        """等待进程完成，支持超时"""
-        loop = asyncio.get_event_loop()
-
-        # 轮询检查进程状态
-        start = time.time()
+    def _new_output(self, task_id: str) -> TaskOutput:
+        """为任务创建输出捕获，超出保留数量的已结束任务日志被删除"""
+        previous = self.outputs.pop(task_id, None)
+        if previous is not None:
+            previous.remove()
+
+        output = TaskOutput(
+            task_id,
+            self.spool_dir,
+            segment_bytes=self.spool_segment_bytes,
+            max_segments=self.spool_max_segments,
+            tail_bytes=self.tail_bytes,
+        )
+        self.outputs[task_id] = output
+
+        finished = [tid for tid, out in self.outputs.items() if out.finished]
+        for tid in finished[: max(0, len(finished) - self.spool_keep_tasks)]:
+            self.outputs.pop(tid).remove()
+        return output
+
+    def get_output(self, task_id: str) -> Optional[TaskOutput]:
+        """获取任务的输出捕获（运行中或最近结束）"""
+        return self.outputs.get(task_id)
+
+    async def _read_stream(self, stream: asyncio.StreamReader, sink):
+        """持续读取管道直到 EOF，每块交给 sink"""
         while True:
-            # 检查是否完成
-            if process.poll() is not None:
-                # 收集输出
-                stdout, stderr = process.communicate()
-                return stdout, stderr
-
-            # 检查超时
-            if time.time() - start > timeout:
-                raise asyncio.TimeoutError()
+            chunk = await stream.read(65536)
+            if not chunk:
+                return
+            sink(chunk)
 
-            # 短暂休眠
-            await asyncio.sleep(0.5)
+    async def _drain_readers(self, task_id: str, readers: list[asyncio.Task]):
+        """
+        等待 reader 读到 EOF
+        后台化的子孙进程可能一直持有管道，最多等 cleanup_timeout 秒
+        """
+        done, pending = await asyncio.wait(readers, timeout=self.cleanup_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"[{task_id}] Output pipes still open after exit, stopped reading")
 
-    def _kill_process_group(self, process: subprocess.Popen):
+    async def _kill_process_group(self, process: asyncio.subprocess.Process):
         """
         杀死整个进程组（进程 + 子进程 + 孙进程）
+        SIGTERM → 等待 kill_grace 秒 → SIGKILL，等待期间不阻塞事件循环
         """
+        # start_new_session 保证 pgid == pid
+        pgid = process.pid
         try:
-            # 获取进程组 ID
-            pgid = os.getpgid(process.pid)
             logger.info(f"[{process.pid}] Killing process group {pgid}")
 
             # 发送 SIGTERM 到整个进程组
             os.killpg(pgid, signal.SIGTERM)
 
-            # 等待一下让进程优雅退出
-            time.sleep(1)
-
-            # 如果还在运行，强制杀死
-            if process.poll() is None:
+            # 等待一下让进程优雅退出（wait() 同时等待管道关闭，即整个进程组退出）
+            try:
+                await asyncio.wait_for(process.wait(), timeout=self.kill_grace)
+            except asyncio.TimeoutError:
+                # 如果还在运行，强制杀死
                 os.killpg(pgid, signal.SIGKILL)
                 logger.warning(f"[{process.pid}] Force killed process group {pgid}")
 
@@ -172,7 +237,7 @@ class TaskRunner:
         except Exception as e:
             logger.error(f"[{process.pid}] Failed to kill process group: {e}")
 
-    def kill_task(self, task_id: str) -> bool:
+    async def kill_task(self, task_id: str) -> bool:
         """强制终止指定任务"""
         running = self.running_tasks.get(task_id)
         if not running:
@@ -180,7 +245,7 @@ class TaskRunner:
             return False
 
         logger.info(f"[{task_id}] Killing task on request")
-        self._kill_process_group(running.process)
+        await self._kill_process_group(running.process)
         return True
 
     def get_running_tasks(self) -> list[dict]:
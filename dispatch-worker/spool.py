@@ -0,0 +1,187 @@
+"""
+任务输出落盘 - 分段轮转 spool 文件 + 有界内存尾部
+长时间运行的 agent 可能输出几百 MB，输出只落盘，内存里只保留尾部用于结果解析
+"""
+
+import re
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+
+import protocol
+
+logger = logging.getLogger(__name__)
+
+
+class OutputSpool:
+    """
+    单个输出流 (stdout/stderr) 的 spool
+    - 按 segment_bytes 切分段文件，最多保留 max_segments 段，旧段直接删除
+    - offset 是该流从头开始的字节偏移，跨段连续
+    - 写入无缓冲，其他线程随时可以读到已写入的数据
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str,
+        segment_bytes: int = 16 << 20,
+        max_segments: int = 8,
+        tail_bytes: int = 64 << 10,
+    ):
+        self.directory = directory
+        self.name = name
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.tail_bytes = tail_bytes
+
+        self.size = 0  # 已写入的总字节数
+        self.segments: list[tuple[int, Path]] = []  # (起始 offset, 段文件)
+        self.tail = bytearray()
+        self._file = None
+        self._segment_written = 0
+
+    @property
+    def first_offset(self) -> int:
+        """仍保留在磁盘上的最早 offset"""
+        return self.segments[0][0] if self.segments else 0
+
+    def write(self, data: bytes):
+        """追加一块输出"""
+        view = memoryview(data)
+        while view:
+            if self._file is None or self._segment_written >= self.segment_bytes:
+                self._rotate()
+            n = min(len(view), self.segment_bytes - self._segment_written)
+            self._file.write(view[:n])
+            self._segment_written += n
+            self.size += n
+            view = view[n:]
+
+        self.tail += data
+        if len(self.tail) > self.tail_bytes:
+            del self.tail[: len(self.tail) - self.tail_bytes]
+
+    def _rotate(self):
+        """开新段，超出保留数量的旧段删除"""
+        if self._file is not None:
+            self._file.close()
+        path = self.directory / f"{self.name}.{self.size:012d}.log"
+        self._file = open(path, "wb", buffering=0)
+        self._segment_written = 0
+        self.segments.append((self.size, path))
+
+        while len(self.segments) > self.max_segments:
+            _, old = self.segments.pop(0)
+            old.unlink(missing_ok=True)
+
+    def read(self, offset: int, max_bytes: int) -> tuple[int, bytes]:
+        """
+        从 offset 开始读取最多 max_bytes 字节（阻塞 IO，调用方放到线程里）
+        返回: (实际起始 offset, 数据)；offset 早于已轮转掉的段时从最早保留的段开始
+        """
+        segments = list(self.segments)
+        size = self.size
+        if not segments:
+            return 0, b""
+
+        offset = min(max(offset, segments[0][0]), size)
+        out = bytearray()
+        for i, (start, path) in enumerate(segments):
+            end = segments[i + 1][0] if i + 1 < len(segments) else size
+            if end <= offset:
+                continue
+            pos = max(offset + len(out), start)
+            try:
+                with open(path, "rb") as f:
+                    f.seek(pos - start)
+                    out += f.read(min(end - pos, max_bytes - len(out)))
+            except FileNotFoundError:
+                # 读的过程中被轮转删除，跳到下一段
+                continue
+            if len(out) >= max_bytes:
+                break
+        return offset, bytes(out)
+
+    def tail_text(self) -> str:
+        """内存尾部（解码为文本）"""
+        return self.tail.decode("utf-8", errors="replace")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TaskOutput:
+    """单个任务的输出捕获：stdout/stderr spool + 增量结果行检测 + 新数据通知"""
+
+    def __init__(
+        self,
+        task_id: str,
+        spool_root: Path,
+        segment_bytes: int = 16 << 20,
+        max_segments: int = 8,
+        tail_bytes: int = 64 << 10,
+    ):
+        self.task_id = task_id
+        self.directory = Path(spool_root) / re.sub(r"[^A-Za-z0-9_.-]", "_", task_id)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.stdout = OutputSpool(self.directory, "stdout", segment_bytes, max_segments, tail_bytes)
+        self.stderr = OutputSpool(self.directory, "stderr", segment_bytes, max_segments, tail_bytes)
+        self.detector = protocol.ResultLineDetector()
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def feed_stdout(self, data: bytes):
+        self.stdout.write(data)
+        self.detector.feed(data)
+        self._notify()
+
+    def feed_stderr(self, data: bytes):
+        self.stderr.write(data)
+        self._notify()
+
+    def stream(self, name: str) -> OutputSpool:
+        return self.stdout if name == "stdout" else self.stderr
+
+    def _notify(self):
+        # 唤醒当前所有等待者，后来的等待者等下一次写入
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_output(self, timeout: float) -> bool:
+        """等待新输出或任务结束，超时返回 False"""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def finish(self):
+        """输出结束：关闭段文件，处理最后一行"""
+        if self.finished:
+            return
+        self.detector.close()
+        self.stdout.close()
+        self.stderr.close()
+        self.finished = True
+        self._notify()
+
+    def parse_result(self, exit_code: int | None) -> protocol.TaskResult:
+        """从检测到的结果行 + 有界尾部解析任务结果"""
+        return protocol.parse_streamed_output(
+            self.detector.result,
+            self.stdout.tail_text(),
+            self.stderr.tail_text(),
+            self.task_id,
+            exit_code=exit_code,
+        )
+
+    def remove(self):
+        """删除 spool 文件"""
+        self.finish()
+        shutil.rmtree(self.directory, ignore_errors=True)
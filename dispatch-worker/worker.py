@@ -9,7 +9,6 @@ import json
 import time
 import asyncio
 import logging
-import subprocess
 import traceback
 from pathlib import Path
 from datetime import datetime
@@ -51,7 +50,14 @@ class WorkerDaemon:
 
         # 组件
         self.runner = TaskRunner(
-            task_timeout=config.TASK_TIMEOUT, cleanup_timeout=config.CLEANUP_TIMEOUT
+            task_timeout=config.TASK_TIMEOUT,
+            cleanup_timeout=config.CLEANUP_TIMEOUT,
+            kill_grace=config.KILL_GRACE,
+            spool_dir=config.SPOOL_DIR,
+            spool_segment_bytes=config.SPOOL_SEGMENT_BYTES,
+            spool_max_segments=config.SPOOL_MAX_SEGMENTS,
+            spool_keep_tasks=config.SPOOL_KEEP_TASKS,
+            tail_bytes=config.OUTPUT_TAIL_BYTES,
         )
 
         # 状态
@@ -137,13 +143,21 @@ class WorkerDaemon:
         # Expand ~ in cwd
         cwd = os.path.expanduser(cwd)
 
-        # Run setup commands (mkdir, etc.)
+        # Run setup commands (mkdir, etc.) without blocking the event loop
         for setup_cmd in setup_commands:
             try:
                 expanded = os.path.expanduser(setup_cmd)
-                subprocess.run(expanded, shell=True, check=True, timeout=10)
+                proc = await asyncio.create_subprocess_shell(expanded)
+                try:
+                    returncode = await asyncio.wait_for(proc.wait(), timeout=10)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+                    raise
+                if returncode != 0:
+                    raise RuntimeError(f"exit code {returncode}")
             except Exception as e:
-                logger.warning(f"[{task_id}] Setup command failed: {setup_cmd} -> {e}")
+                logger.warning(f"[{task_id}] Setup command failed: {setup_cmd} -> {e!r}")
 
         # Write spec_content to cwd/spec.md
         if spec_content:
@@ -282,7 +296,7 @@ class WorkerDaemon:
         if not task_id:
             return web.json_response({"error": "task_id required"}, status=400)
 
-        killed = self.runner.kill_task(task_id)
+        killed = await self.runner.kill_task(task_id)
 
         if killed:
             self.slots_free += 1
@@ -290,14 +304,70 @@ class WorkerDaemon:
 
         return web.json_response({"task_id": task_id, "killed": killed})
 
+    async def handle_task_log(self, request: web.Request) -> web.StreamResponse:
+        """
+        GET /v1/tasks/{task_id}/log?offset=0&stream=stdout&follow=0&limit=1048576
+        读取任务输出（运行中或最近结束的任务）
+        - 返回 offset 开始的原始输出，X-Log-Offset 是实际起始位置（早于已轮转的段时会前移），
+          X-Log-Next-Offset 是下次请求用的 offset
+        - follow=1: chunked 流式返回，直到任务结束或客户端断开
+        """
+        task_id = request.match_info["task_id"]
+        output = self.runner.get_output(task_id)
+        if output is None:
+            return web.json_response({"error": "Task log not found"}, status=404)
+
+        stream_name = request.query.get("stream", "stdout")
+        if stream_name not in ("stdout", "stderr"):
+            return web.json_response({"error": "stream must be stdout or stderr"}, status=400)
+        try:
+            offset = max(0, int(request.query.get("offset", "0")))
+            limit = max(1, int(request.query.get("limit", str(1 << 20))))
+        except ValueError:
+            return web.json_response({"error": "offset/limit must be integers"}, status=400)
+        follow = request.query.get("follow", "0").lower() in ("1", "true", "yes")
+
+        spool = output.stream(stream_name)
+
+        if not follow:
+            start, data = await asyncio.to_thread(spool.read, offset, limit)
+            return web.Response(
+                body=data,
+                content_type="text/plain",
+                charset="utf-8",
+                headers={
+                    "X-Log-Offset": str(start),
+                    "X-Log-Next-Offset": str(start + len(data)),
+                    "X-Task-Finished": "1" if output.finished else "0",
+                },
+            )
+
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/plain; charset=utf-8"}
+        )
+        await response.prepare(request)
+        while True:
+            start, data = await asyncio.to_thread(spool.read, offset, limit)
+            if data:
+                await response.write(data)
+                offset = start + len(data)
+                continue
+            if output.finished:
+                break
+            if spool.size > offset:
+                continue  # 读取期间又有新输出
+            await output.wait_for_output(timeout=config.HEARTBEAT_INTERVAL)
+        await response.write_eof()
+        return response
+
     def _actual_running_count(self) -> int:
         """Ground truth: count actual live processes in runner, not the in-memory counter.
         This prevents slot leaks when processes exit without hitting the finally block."""
-        # runner.running_tasks only contains tasks with live Popen handles
+        # runner.running_tasks only contains tasks with live process handles
         # Also prune any entries whose process has already exited
         dead = [
             tid for tid, rt in self.runner.running_tasks.items()
-            if rt.process.poll() is not None
+            if rt.process.returncode is not None
         ]
         for tid in dead:
             self.runner.running_tasks.pop(tid, None)
@@ -434,7 +504,7 @@ worker_running_tasks {len(self.runner.running_tasks)}
         """
         import platform
 
-        cpu = psutil.cpu_percent(interval=0.1)
+        cpu = await asyncio.to_thread(psutil.cpu_percent, 0.1)
         mem = psutil.virtual_memory()
         disk = psutil.disk_usage("/")
         load1, load5, load15 = os.getloadavg() if hasattr(os, "getloadavg") else (0, 0, 0)
@@ -452,12 +522,19 @@ worker_running_tasks {len(self.runner.running_tasks)}
         tailscale_status = "unknown"
         tailscale_ip = ""
         try:
-            ts_result = subprocess.run(
-                ["tailscale", "status", "--json"],
-                capture_output=True, text=True, timeout=5,
+            ts_proc = await asyncio.create_subprocess_exec(
+                "tailscale", "status", "--json",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
             )
-            if ts_result.returncode == 0:
-                ts_data = json.loads(ts_result.stdout)
+            try:
+                ts_stdout, _ = await asyncio.wait_for(ts_proc.communicate(), timeout=5)
+            except asyncio.TimeoutError:
+                ts_proc.kill()
+                await ts_proc.wait()
+                raise
+            if ts_proc.returncode == 0:
+                ts_data = json.loads(ts_stdout)
                 tailscale_status = ts_data.get("BackendState", "unknown")
                 # Get our Tailscale IP
                 self_node = ts_data.get("Self", {})
@@ -589,6 +666,7 @@ worker_running_tasks {len(self.runner.running_tasks)}
         app.router.add_post("/v1/execute", self.handle_execute)
         app.router.add_post("/v1/heartbeat", self.handle_heartbeat)
         app.router.add_post("/v1/kill", self.handle_kill)
+        app.router.add_get("/v1/tasks/{task_id}/log", self.handle_task_log)
         app.router.add_get("/v1/status", self.handle_status)
         app.router.add_get("/v1/metrics", self.handle_metrics)
         app.router.add_get("/v1/health", self.handle_health)
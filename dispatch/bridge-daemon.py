@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Bridge Daemon - Opus<->OpenCode 双向可靠通讯
-每 2 秒轮询 bridge.db，收到消息自动执行
+阻塞在 bridge.py 的门铃上，有消息写入 bridge.db 立刻唤醒并自动执行
 """
 
 import os
@@ -15,11 +15,14 @@ from pathlib import Path
 from datetime import datetime
 import threading
 
+from bridge import open_doorbell, ring
+
 # 配置
 BRIDGE_DB = Path.home() / "Downloads" / "dispatch" / "bridge.db"
 LOG_FILE = Path.home() / "Downloads" / "dispatch" / "bridge-daemon.log"
 PID_FILE = Path.home() / "Downloads" / "dispatch" / "bridge-daemon.pid"
-POLL_INTERVAL = 1  # 1 second for faster response
+POLL_INTERVAL = 1  # 没有门铃时的轮询间隔
+FALLBACK_POLL = 5  # 有门铃时的兜底重查间隔
 
 
 def log(msg: str):
@@ -30,10 +33,17 @@ def log(msg: str):
         f.write(line + "\n")
 
 
+_conn = None
+
+
 def get_db():
-    conn = sqlite3.connect(BRIDGE_DB, timeout=10.0)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """daemon 单线程，整个进程复用一条连接"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(BRIDGE_DB, timeout=10.0)
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.row_factory = sqlite3.Row
+    return _conn
 
 
 def recv(identity: str):
@@ -56,11 +66,10 @@ def recv(identity: str):
             )
             conn.commit()
 
-        conn.close()
         return dict(msg) if msg else None
     except Exception as e:
         log(f"Recv error: {e}")
-        conn.close()
+        conn.rollback()
         return None
 
 
@@ -78,11 +87,11 @@ def send(
             (sender, recipient, msg_type, json.dumps(payload), reply_to),
         )
         conn.commit()
-        conn.close()
+        ring(str(BRIDGE_DB), recipient)
         return True
     except Exception as e:
         log(f"Send error: {e}")
-        conn.close()
+        conn.rollback()
         return False
 
 
@@ -188,7 +197,19 @@ def main_loop():
     identity = "opencode"
     processed_ids = set()  # Track processed message IDs to prevent loops
 
-    log(f"Bridge daemon started, identity={identity}, poll_interval={POLL_INTERVAL}s")
+    # 先绑定门铃再开始查库，之后写入的消息一定能唤醒
+    bell = open_doorbell(str(BRIDGE_DB), identity)
+
+    def wait():
+        if bell is None:
+            time.sleep(POLL_INTERVAL)
+        else:
+            bell.wait(FALLBACK_POLL)
+
+    log(
+        f"Bridge daemon started, identity={identity}, "
+        + (f"doorbell={bell.path}" if bell else f"poll_interval={POLL_INTERVAL}s")
+    )
 
     while RUNNING:
         try:
@@ -213,11 +234,14 @@ def main_loop():
                 # Add timeout to message handling
                 dispatch_message(msg)
             else:
-                time.sleep(POLL_INTERVAL)
+                wait()
         except Exception as e:
             log(f"Main loop error: {e}")
             time.sleep(POLL_INTERVAL)
 
+    if bell is not None:
+        bell.close()
+
 
 def signal_handler(signum, frame):
     global RUNNING
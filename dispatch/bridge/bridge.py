@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Opus <-> OpenCode 实时消息桥梁
-SQLite 消息队列，双向轮询。
+SQLite 消息队列 + Unix socket 门铃：send 提交后敲收件人的门铃，等待方被唤醒再查库。
 
 用法:
   # Python API
@@ -9,6 +9,8 @@ SQLite 消息队列，双向轮询。
   b = Bridge("opus")
   b.send("opencode", "chat", {"text": "帮我检查状态"})
   msgs = b.recv()
+  for msg in b.listen():  # 阻塞，有消息就产出
+      ...
 
   # CLI
   BRIDGE_IDENTITY=opus python3 bridge.py send opencode chat '{"text":"hello"}'
@@ -20,142 +22,264 @@ SQLite 消息队列，双向轮询。
 import sqlite3
 import json
 import os
+import re
+import select
+import socket
 import sys
 import time
+import itertools
 
 DEFAULT_DB_PATH = os.path.expanduser("~/Downloads/dispatch/bridge.db")
-POLL_INTERVAL = 0.5
+POLL_INTERVAL = 0.5  # 没有 AF_UNIX 时退回轮询
+FALLBACK_POLL = 5.0  # 有门铃时的兜底重查间隔（门铃丢失、别的机器写库）
+
+_bell_seq = itertools.count(1)
+
+
+def bell_dir(db_path: str) -> str:
+    """门铃 socket 目录，和 bridge.db 放在一起"""
+    return db_path + ".bell"
+
+
+def _bell_prefix(identity: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", identity) + "."
+
+
+class Doorbell:
+    """identity 的门铃：绑定 <bell_dir>/<identity>.<pid>.<n>.sock 的 datagram socket
+
+    先绑定再查库，查询之后提交的消息一定会留下唤醒，不会丢。
+    """
+
+    def __init__(self, db_path: str, identity: str):
+        directory = bell_dir(db_path)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(
+            directory, f"{_bell_prefix(identity)}{os.getpid()}.{next(_bell_seq)}.sock"
+        )
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self.sock.bind(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.setblocking(False)
+
+    def wait(self, timeout: float) -> bool:
+        """等门铃，超时返回 False；唤醒后清空积压的铃声"""
+        readable, _, _ = select.select([self.sock], [], [], max(timeout, 0))
+        if not readable:
+            return False
+        try:
+            while self.sock.recv(64):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        return True
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def open_doorbell(db_path: str, identity: str) -> "Doorbell | None":
+    """平台不支持 AF_UNIX 或路径过长时返回 None（调用方退回轮询）"""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        return Doorbell(db_path, identity)
+    except OSError:
+        return None
+
+
+_ring_sock = None
+
+
+def ring(db_path: str, recipient: str):
+    """敲 recipient 所有在等的门铃；进程已退出的残留 socket 顺手删掉"""
+    global _ring_sock
+    directory = bell_dir(db_path)
+    prefix = _bell_prefix(recipient)
+    try:
+        names = [n for n in os.listdir(directory) if n.startswith(prefix) and n.endswith(".sock")]
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    if not names:
+        return
+    if _ring_sock is None:
+        _ring_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _ring_sock.setblocking(False)
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            _ring_sock.sendto(b"\x01", path)
+        except BlockingIOError:
+            pass  # 对方缓冲区满 = 已经有没处理的铃声
+        except ConnectionRefusedError:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        except OSError:
+            pass
 
 
 class Bridge:
     def __init__(self, identity: str, db_path: str = DEFAULT_DB_PATH):
         self.identity = identity
         self.db_path = db_path
+        self._conn = None
+        self._bell = None
+        self._bell_opened = False
         self._ensure_db()
 
     def _get_conn(self):
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.row_factory = sqlite3.Row
-        return conn
+        """每个 Bridge 一条持久连接"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL 下提交不再每次 fsync，往返延迟主要就在这
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+        return self._conn
+
+    def _doorbell(self):
+        """懒绑定自己的门铃（只试一次，失败就一直轮询）"""
+        if not self._bell_opened:
+            self._bell_opened = True
+            self._bell = open_doorbell(self.db_path, self.identity)
+        return self._bell
+
+    def _wait(self, deadline: float) -> bool:
+        """等到被唤醒或 deadline，deadline 已过返回 False"""
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        bell = self._doorbell()
+        if bell is None:
+            time.sleep(min(POLL_INTERVAL, remaining))
+        else:
+            bell.wait(min(FALLBACK_POLL, remaining))
+        return True
+
+    def close(self):
+        if self._bell is not None:
+            self._bell.close()
+            self._bell = None
+            self._bell_opened = False
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
 
     def _ensure_db(self):
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         conn = self._get_conn()
-        try:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ts REAL NOT NULL DEFAULT (strftime('%s','now')),
-                    sender TEXT NOT NULL,
-                    recipient TEXT NOT NULL,
-                    msg_type TEXT NOT NULL,
-                    payload TEXT NOT NULL,
-                    read_at REAL,
-                    reply_to INTEGER
-                )
-            """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_unread ON messages(recipient, read_at)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_reply ON messages(reply_to)")
-            conn.commit()
-        finally:
-            conn.close()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL DEFAULT (strftime('%s','now')),
+                sender TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                msg_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                read_at REAL,
+                reply_to INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_unread ON messages(recipient, read_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reply ON messages(reply_to)")
+        conn.commit()
 
     def send(self, recipient: str, msg_type: str, payload: dict, reply_to: int = None) -> int:
         conn = self._get_conn()
-        try:
-            cur = conn.execute(
-                "INSERT INTO messages (sender, recipient, msg_type, payload, reply_to) VALUES (?,?,?,?,?)",
-                (self.identity, recipient, msg_type, json.dumps(payload, ensure_ascii=False), reply_to)
-            )
-            conn.commit()
-            return cur.lastrowid
-        finally:
-            conn.close()
+        cur = conn.execute(
+            "INSERT INTO messages (sender, recipient, msg_type, payload, reply_to) VALUES (?,?,?,?,?)",
+            (self.identity, recipient, msg_type, json.dumps(payload, ensure_ascii=False), reply_to)
+        )
+        conn.commit()
+        ring(self.db_path, recipient)
+        return cur.lastrowid
 
     def recv(self, timeout: float = 0, mark_read: bool = True) -> list[dict]:
-        start = time.time()
+        deadline = time.time() + timeout
+        if timeout > 0:
+            self._doorbell()  # 先绑定门铃再查库
+        conn = self._get_conn()
         while True:
-            conn = self._get_conn()
-            try:
-                rows = conn.execute(
-                    "SELECT * FROM messages WHERE recipient=? AND read_at IS NULL ORDER BY ts ASC",
-                    (self.identity,)
-                ).fetchall()
-                messages = []
-                for r in rows:
-                    m = dict(r)
-                    m['payload'] = json.loads(m['payload'])
-                    messages.append(m)
-                if mark_read and messages:
-                    ids = [m['id'] for m in messages]
-                    conn.execute(
-                        f"UPDATE messages SET read_at=strftime('%s','now') WHERE id IN ({','.join('?'*len(ids))})",
-                        ids
-                    )
-                    conn.commit()
-                if messages or timeout <= 0:
-                    return messages
-            finally:
-                conn.close()
-            if time.time() - start >= timeout:
+            rows = conn.execute(
+                "SELECT * FROM messages WHERE recipient=? AND read_at IS NULL ORDER BY ts ASC",
+                (self.identity,)
+            ).fetchall()
+            messages = []
+            for r in rows:
+                m = dict(r)
+                m['payload'] = json.loads(m['payload'])
+                messages.append(m)
+            if mark_read and messages:
+                ids = [m['id'] for m in messages]
+                conn.execute(
+                    f"UPDATE messages SET read_at=strftime('%s','now') WHERE id IN ({','.join('?'*len(ids))})",
+                    ids
+                )
+                conn.commit()
+            if messages or timeout <= 0:
+                return messages
+            if not self._wait(deadline):
                 return []
-            time.sleep(POLL_INTERVAL)
 
     def recv_one(self, timeout: float = 30) -> dict | None:
         msgs = self.recv(timeout=timeout, mark_read=True)
         return msgs[0] if msgs else None
 
+    def listen(self, mark_read: bool = True):
+        """持续产出发给自己的消息，没有消息时阻塞在门铃上"""
+        while True:
+            yield from self.recv(timeout=FALLBACK_POLL, mark_read=mark_read)
+
     def request(self, recipient: str, msg_type: str, payload: dict, timeout: float = 60) -> dict | None:
+        deadline = time.time() + timeout
+        self._doorbell()  # 回复会敲自己的门铃，发送前绑定
         msg_id = self.send(recipient, msg_type, payload)
-        start = time.time()
+        conn = self._get_conn()
         while True:
-            conn = self._get_conn()
-            try:
-                row = conn.execute(
-                    "SELECT * FROM messages WHERE sender=? AND reply_to=? ORDER BY ts ASC LIMIT 1",
-                    (recipient, msg_id)
-                ).fetchone()
-                if row:
-                    m = dict(row)
-                    m['payload'] = json.loads(m['payload'])
-                    # mark read
-                    conn.execute("UPDATE messages SET read_at=strftime('%s','now') WHERE id=?", (m['id'],))
-                    conn.commit()
-                    return m
-            finally:
-                conn.close()
-            if time.time() - start >= timeout:
+            row = conn.execute(
+                "SELECT * FROM messages WHERE sender=? AND reply_to=? ORDER BY ts ASC LIMIT 1",
+                (recipient, msg_id)
+            ).fetchone()
+            if row:
+                m = dict(row)
+                m['payload'] = json.loads(m['payload'])
+                # mark read
+                conn.execute("UPDATE messages SET read_at=strftime('%s','now') WHERE id=?", (m['id'],))
+                conn.commit()
+                return m
+            if not self._wait(deadline):
                 return None
-            time.sleep(POLL_INTERVAL)
 
     def ping(self, recipient: str, timeout: float = 5) -> bool:
+        deadline = time.time() + timeout
+        self._doorbell()
         msg_id = self.send(recipient, 'ping', {})
-        start = time.time()
+        conn = self._get_conn()
         while True:
-            conn = self._get_conn()
-            try:
-                row = conn.execute(
-                    "SELECT id FROM messages WHERE sender=? AND reply_to=?",
-                    (recipient, msg_id)
-                ).fetchone()
-                if row:
-                    return True
-            finally:
-                conn.close()
-            if time.time() - start >= timeout:
+            row = conn.execute(
+                "SELECT id FROM messages WHERE sender=? AND reply_to=?",
+                (recipient, msg_id)
+            ).fetchone()
+            if row:
+                return True
+            if not self._wait(deadline):
                 return False
-            time.sleep(POLL_INTERVAL)
 
     def cleanup(self, days: int = 7) -> int:
         conn = self._get_conn()
-        try:
-            cutoff = time.time() - days * 86400
-            cur = conn.execute("DELETE FROM messages WHERE ts < ?", (cutoff,))
-            conn.commit()
-            return cur.rowcount
-        finally:
-            conn.close()
+        cutoff = time.time() - days * 86400
+        cur = conn.execute("DELETE FROM messages WHERE ts < ?", (cutoff,))
+        conn.commit()
+        return cur.rowcount
 
 
 def main():
@@ -194,12 +318,13 @@ def main():
     elif cmd == 'listen':
         print(f"[{identity}] Listening... (Ctrl+C to stop)")
         try:
-            while True:
-                for msg in bridge.recv(timeout=1):
-                    ts = time.strftime('%H:%M:%S', time.localtime(msg['ts']))
-                    print(f"[{ts}] {msg['sender']} -> {msg['msg_type']}: {json.dumps(msg['payload'], ensure_ascii=False)}")
+            for msg in bridge.listen():
+                ts = time.strftime('%H:%M:%S', time.localtime(msg['ts']))
+                print(f"[{ts}] {msg['sender']} -> {msg['msg_type']}: {json.dumps(msg['payload'], ensure_ascii=False)}")
         except KeyboardInterrupt:
             print("\nStopped")
+        finally:
+            bridge.close()
 
     elif cmd == 'cleanup':
         d = int(sys.argv[2]) if len(sys.argv) > 2 else 7
@@ -5,6 +5,13 @@ This runs as a lightweight poller:
 - Reads dispatch SQLite state (dispatch.db)
 - Mirrors tasks into a Mission Control board (by slug)
 
+Only changed rows are pushed: the bridge installs an append-only change log
+(`task_changes`, filled by triggers on `tasks`) into dispatch.db and keeps a
+sync cursor (the last change log seq it mirrored) plus the Mission Control
+task ids it knows about in a small state file. Full passes read a backup-API
+snapshot of dispatch.db and list the board; they run on start-up and
+periodically to catch drift and clean up stale tasks.
+
 It avoids committing secrets by:
 - Reading the Mission Control local auth token from env first
 - Falling back to parsing openclaw-mission-control/.env locally
@@ -17,12 +24,13 @@ import json
 import os
 import sqlite3
 import time
-import shutil
+import hashlib
 import urllib.parse
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
@@ -36,6 +44,26 @@ _LOGGED_HTTP_ERRORS: set[str] = set()
 # Cache board id lookups to avoid extra API calls.
 _BOARD_ID_CACHE: dict[str, str] = {}
 
+# Append-only change log inside dispatch.db; its seq is the sync watermark.
+CHANGE_LOG_TABLE = "task_changes"
+
+# Columns mirrored into Mission Control (changes to anything else are ignored).
+_TASK_COLUMNS = (
+    "id",
+    "project",
+    "spec_file",
+    "status",
+    "node",
+    "pid",
+    "attempt",
+    "started_at",
+    "completed_at",
+    "error",
+)
+
+# dispatch.db paths whose change log triggers are known to be installed.
+_CHANGE_LOG_READY: set[str] = set()
+
 
 @dataclass(frozen=True)
 class DispatchTaskRow:
@@ -250,224 +278,451 @@ def _mc_list_tasks(*, token: str, board_id: str) -> list[dict[str, Any]]:
     return all_items
 
 
-def _dispatch_list_tasks(db_path: Path) -> list[DispatchTaskRow]:
+def _connect_dispatch_ro(db_path: Path) -> sqlite3.Connection:
+    """Open dispatch.db read-only, retrying short open windows.
+
+    dispatch.db is WAL-backed and actively written; readers over virtiofs can
+    occasionally hit short open windows, so opening is retried a few times.
+    """
     if not db_path.exists():
         raise RuntimeError(f"dispatch db not found: {db_path}")
 
-    # Open read-only via a local snapshot.
-    #
-    # Rationale:
-    # - dispatch.db is WAL-backed + actively written.
-    # - readers over virtiofs can occasionally hit short open windows.
-    #
-    # Taking a best-effort snapshot into /tmp avoids most reader flakiness.
-
-    def _connect_ro(path: Path) -> sqlite3.Connection:
-        return sqlite3.connect(
-            f"file:{path.as_posix()}?mode=ro&immutable=1",
-            uri=True,
-            timeout=2.0,
-        )
-
-    snap_dir = Path("/tmp") / "dispatch-snapshot"
-    snap_dir.mkdir(parents=True, exist_ok=True)
-    snap = snap_dir / "dispatch.db"
-    snap_wal = snap_dir / "dispatch.db-wal"
-    snap_shm = snap_dir / "dispatch.db-shm"
-
-    wal = Path(str(db_path) + "-wal")
-    shm = Path(str(db_path) + "-shm")
-
     last_exc: Exception | None = None
-    conn: sqlite3.Connection | None = None
     for attempt in range(12):
+        conn: sqlite3.Connection | None = None
         try:
-            tmp = snap.with_name(snap.name + f".tmp.{os.getpid()}")
-            shutil.copyfile(db_path, tmp)
-            os.replace(tmp, snap)
-
-            if wal.exists():
-                tmp_wal = snap_wal.with_name(snap_wal.name + f".tmp.{os.getpid()}")
-                shutil.copyfile(wal, tmp_wal)
-                os.replace(tmp_wal, snap_wal)
-            else:
-                try:
-                    snap_wal.unlink()
-                except FileNotFoundError:
-                    pass
-
-            if shm.exists():
-                tmp_shm = snap_shm.with_name(snap_shm.name + f".tmp.{os.getpid()}")
-                shutil.copyfile(shm, tmp_shm)
-                os.replace(tmp_shm, snap_shm)
-            else:
-                try:
-                    snap_shm.unlink()
-                except FileNotFoundError:
-                    pass
-
-            conn = _connect_ro(snap)
-            break
-        except (OSError, sqlite3.OperationalError) as exc:
+            conn = sqlite3.connect(
+                f"file:{db_path.as_posix()}?mode=ro", uri=True, timeout=2.0
+            )
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            conn.row_factory = sqlite3.Row
+            return conn
+        except sqlite3.OperationalError as exc:
             last_exc = exc
+            if conn is not None:
+                conn.close()
             time.sleep(min(1.0, 0.1 * (attempt + 1)))
 
-    if conn is None:
+    raise sqlite3.OperationalError(
+        str(last_exc) if last_exc else "unable to open database file"
+    )
+
+
+def _snapshot_dispatch(db_path: Path) -> sqlite3.Connection:
+    """Take a consistent in-memory snapshot of dispatch.db.
+
+    Uses the SQLite online backup API from a read-only connection, so the copy
+    is taken under a single read transaction instead of copying db/wal/shm
+    files separately and hoping they line up.
+    """
+    src = _connect_dispatch_ro(db_path)
+    try:
+        last_exc: Exception | None = None
+        for attempt in range(12):
+            snap = sqlite3.connect(":memory:")
+            try:
+                src.backup(snap)
+                snap.row_factory = sqlite3.Row
+                return snap
+            except sqlite3.OperationalError as exc:
+                last_exc = exc
+                snap.close()
+                time.sleep(min(1.0, 0.1 * (attempt + 1)))
         raise sqlite3.OperationalError(
-            str(last_exc) if last_exc else "unable to open database file"
+            str(last_exc) if last_exc else "unable to snapshot database"
         )
+    finally:
+        src.close()
+
+
+def _change_log_ddl() -> str:
+    changed = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in _TASK_COLUMNS)
+    return f"""
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG_TABLE}_insert AFTER INSERT ON tasks
+BEGIN
+    INSERT INTO {CHANGE_LOG_TABLE} (task_id, op) VALUES (NEW.id, 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG_TABLE}_update
+AFTER UPDATE OF {", ".join(_TASK_COLUMNS)} ON tasks
+WHEN {changed}
+BEGIN
+    INSERT INTO {CHANGE_LOG_TABLE} (task_id, op)
+    SELECT OLD.id, 'delete' WHERE OLD.id IS NOT NEW.id;
+    INSERT INTO {CHANGE_LOG_TABLE} (task_id, op) VALUES (NEW.id, 'update');
+END;
+CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG_TABLE}_delete AFTER DELETE ON tasks
+BEGIN
+    INSERT INTO {CHANGE_LOG_TABLE} (task_id, op) VALUES (OLD.id, 'delete');
+END;
+COMMIT;
+"""
+
+
+def _ensure_change_log(db_path: Path) -> bool:
+    """Install the change log table + triggers into dispatch.db (idempotent).
+
+    This is the only write the bridge does against dispatch.db. If it fails
+    (read-only mount, no tasks table yet, ...) the caller falls back to full
+    snapshot passes.
+    """
+    key = str(db_path)
+    if key in _CHANGE_LOG_READY:
+        return True
+    if not db_path.exists():
+        return False
+    try:
+        conn = sqlite3.connect(str(db_path), timeout=5.0)
+        try:
+            conn.executescript(_change_log_ddl())
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        err_key = f"change_log:{key}"
+        if err_key not in _LOGGED_HTTP_ERRORS:
+            _LOGGED_HTTP_ERRORS.add(err_key)
+            print(
+                f"dispatch->mc change_log_unavailable db={key} error={exc}",
+                flush=True,
+            )
+        return False
+    _CHANGE_LOG_READY.add(key)
+    return True
+
+
+def _prune_change_log(db_path: Path, upto: int) -> None:
+    """Drop change log entries the bridge has already synced."""
+    try:
+        conn = sqlite3.connect(str(db_path), timeout=5.0)
+        try:
+            with conn:
+                conn.execute(f"DELETE FROM {CHANGE_LOG_TABLE} WHERE seq <= ?", (upto,))
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        print(f"dispatch->mc change_log_prune_failed error={exc}", flush=True)
 
-    conn.row_factory = sqlite3.Row
+
+def _change_log_head(conn: sqlite3.Connection) -> int | None:
+    """Latest change log seq, or None when the change log is not installed."""
     try:
-        rows = conn.execute(
-            """
-            SELECT id, project, spec_file, status, node, pid, attempt, started_at, completed_at, error
-            FROM tasks
-            ORDER BY created_at DESC
-            """.strip(),
-        ).fetchall()
-        out: list[DispatchTaskRow] = []
-        for r in rows:
-            out.append(
-                DispatchTaskRow(
-                    id=str(r["id"]),
-                    project=str(r["project"]),
-                    spec_file=str(r["spec_file"]),
-                    status=str(r["status"]),
-                    node=r["node"],
-                    pid=r["pid"],
-                    attempt=r["attempt"],
-                    started_at=r["started_at"],
-                    completed_at=r["completed_at"],
-                    error=r["error"],
+        head = conn.execute(f"SELECT MAX(seq) FROM {CHANGE_LOG_TABLE}").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    if head is None:
+        # Empty log (fresh or fully pruned): the watermark is the last seq handed out.
+        row = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (CHANGE_LOG_TABLE,)
+        ).fetchone()
+        head = row[0] if row else 0
+    return int(head)
+
+
+def _row_from_sql(r: sqlite3.Row) -> DispatchTaskRow:
+    return DispatchTaskRow(
+        id=str(r["id"]),
+        project=str(r["project"]),
+        spec_file=str(r["spec_file"]),
+        status=str(r["status"]),
+        node=r["node"],
+        pid=r["pid"],
+        attempt=r["attempt"],
+        started_at=r["started_at"],
+        completed_at=r["completed_at"],
+        error=r["error"],
+    )
+
+
+def _read_all_tasks(conn: sqlite3.Connection) -> list[DispatchTaskRow]:
+    rows = conn.execute(
+        f"SELECT {', '.join(_TASK_COLUMNS)} FROM tasks ORDER BY created_at DESC"
+    ).fetchall()
+    return [_row_from_sql(r) for r in rows]
+
+
+def _dispatch_list_tasks(db_path: Path) -> list[DispatchTaskRow]:
+    snap = _snapshot_dispatch(db_path)
+    try:
+        return _read_all_tasks(snap)
+    finally:
+        snap.close()
+
+
+@dataclass(frozen=True)
+class DispatchChanges:
+    rows: list[DispatchTaskRow]
+    deleted: list[str]
+    head: int
+
+
+def _dispatch_changes_since(
+    db_path: Path, cursor: int, extra_ids: list[str] | None = None
+) -> DispatchChanges | None:
+    """Rows changed after `cursor` (plus `extra_ids`), read in one transaction.
+
+    Returns None when the change log can't serve this cursor (not installed,
+    or entries after the cursor were pruned), meaning a full resync is needed.
+    """
+    conn = _connect_dispatch_ro(db_path)
+    try:
+        conn.execute("BEGIN")
+        head = _change_log_head(conn)
+        if head is None or head < cursor:
+            return None
+        oldest = conn.execute(f"SELECT MIN(seq) FROM {CHANGE_LOG_TABLE}").fetchone()[0]
+        if cursor < head and (oldest is None or oldest > cursor + 1):
+            return None
+
+        ids = [
+            str(r[0])
+            for r in conn.execute(
+                f"SELECT DISTINCT task_id FROM {CHANGE_LOG_TABLE} WHERE seq > ? AND seq <= ?",
+                (cursor, head),
+            )
+        ]
+        ids = list(dict.fromkeys(ids + list(extra_ids or [])))
+
+        rows: list[DispatchTaskRow] = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            marks = ", ".join("?" for _ in chunk)
+            rows.extend(
+                _row_from_sql(r)
+                for r in conn.execute(
+                    f"SELECT {', '.join(_TASK_COLUMNS)} FROM tasks WHERE id IN ({marks})",
+                    chunk,
                 )
             )
-        return out
+        found = {r.id for r in rows}
+        return DispatchChanges(
+            rows=rows, deleted=[i for i in ids if i not in found], head=head
+        )
     finally:
         conn.close()
 
 
-def sync_once(*, limit: int | None = None) -> tuple[int, int, int]:
-    token = _load_mc_token()
-    board_slug = (
-        os.environ.get("MC_DISPATCH_BOARD_SLUG") or DEFAULT_BOARD_SLUG
-    ).strip()
+def _env_int(name: str, default: int) -> int:
+    raw = (os.environ.get(name) or "").strip()
+    try:
+        return int(raw) if raw else default
+    except ValueError:
+        return default
 
-    board_id = _mc_find_board_id(token=token, slug=board_slug)
-    existing = _mc_list_tasks(token=token, board_id=board_id)
 
-    existing_by_title: dict[str, dict[str, Any]] = {}
-    for it in existing:
-        title = it.get("title")
-        if isinstance(title, str) and title:
-            existing_by_title[title] = it
+def _state_path(board_slug: str) -> Path:
+    configured = (os.environ.get("MC_SYNC_STATE") or "").strip()
+    if configured:
+        return Path(configured)
+    return Path.home() / ".cache" / "dispatch-mc-bridge" / f"{board_slug}.json"
 
-    rows = _dispatch_list_tasks(_dispatch_db_path())
-    if isinstance(limit, int) and limit > 0:
-        rows = rows[:limit]
 
-    created = 0
-    updated = 0
-    unchanged = 0
+def _load_state(path: Path) -> dict[str, Any]:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
 
-    desired_titles = {_title(r) for r in rows}
 
-    for row in rows:
-        title = _title(row)
-        desired_status = _dispatch_status_to_mc(row.status)
-        desired_desc = _description(row)
+def _save_state(path: Path, state: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".tmp.{os.getpid()}")
+    tmp.write_text(json.dumps(state, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
 
-        existing_task = existing_by_title.get(title)
-        if existing_task is None:
-            try:
-                _mc_request(
-                    "POST",
-                    f"/boards/{board_id}/tasks",
-                    token=token,
-                    json_body={
-                        "title": title,
-                        "description": desired_desc,
-                        "status": desired_status,
-                        "priority": "medium",
-                    },
-                )
-                created += 1
-            except urllib.error.HTTPError as exc:
-                key = f"{exc.code}:create:{title}"
-                if key not in _LOGGED_HTTP_ERRORS:
-                    _LOGGED_HTTP_ERRORS.add(key)
-                    try:
-                        body = exc.read().decode("utf-8", errors="ignore").strip()
-                    except Exception:
-                        body = ""
-                    if len(body) > 1200:
-                        body = body[:1200] + "..."
-                    print(
-                        "dispatch->mc create_failed "
-                        + f"status_code={exc.code} title={title!r} desired_status={desired_status} "
-                        + f"body={body!r}",
-                        flush=True,
-                    )
-            continue
 
-        task_id = existing_task.get("id")
-        if not isinstance(task_id, str) or not task_id:
-            continue
-        current_status = existing_task.get("status")
-        current_desc = existing_task.get("description")
-        if not isinstance(current_desc, str):
-            current_desc = ""
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
-        if current_status == desired_status and current_desc == desired_desc:
-            unchanged += 1
-            continue
 
-        patch: dict[str, Any] = {}
-        if current_status != desired_status:
-            patch["status"] = desired_status
-            if desired_status == "review":
-                patch["comment"] = _review_comment(row)
-        if current_desc != desired_desc:
-            patch["description"] = desired_desc
-        if not patch:
-            unchanged += 1
-            continue
+def _mirror_entry(task: dict[str, Any]) -> dict[str, Any] | None:
+    """What the bridge remembers about a Mission Control task between passes."""
+    task_id = task.get("id")
+    if not isinstance(task_id, str) or not task_id:
+        return None
+    desc = task.get("description")
+    return {
+        "id": task_id,
+        "status": task.get("status"),
+        "desc": _digest(desc if isinstance(desc, str) else ""),
+    }
 
+
+def _log_http_error_once(key: str, exc: urllib.error.HTTPError, message: str) -> None:
+    if key in _LOGGED_HTTP_ERRORS:
+        return
+    _LOGGED_HTTP_ERRORS.add(key)
+    try:
+        body = exc.read().decode("utf-8", errors="ignore").strip()
+    except Exception:
+        body = ""
+    if len(body) > 1200:
+        body = body[:1200] + "..."
+    print(f"{message} body={body!r}", flush=True)
+
+
+def _push_row(
+    row: DispatchTaskRow,
+    mirrored: dict[str, Any] | None,
+    *,
+    token: str,
+    board_id: str,
+) -> tuple[str, dict[str, Any] | None]:
+    """Create or patch the Mission Control task for one dispatch row.
+
+    Returns (outcome, mirror entry after the push); outcome is one of
+    created / updated / unchanged / failed.
+    """
+    title = _title(row)
+    desired_status = _dispatch_status_to_mc(row.status)
+    desired_desc = _description(row)
+    desired_digest = _digest(desired_desc)
+    pushed = {"status": desired_status, "desc": desired_digest}
+
+    if mirrored is None:
         try:
-            _mc_request(
-                "PATCH",
-                f"/boards/{board_id}/tasks/{task_id}",
+            resp = _mc_request(
+                "POST",
+                f"/boards/{board_id}/tasks",
                 token=token,
-                json_body=patch,
+                json_body={
+                    "title": title,
+                    "description": desired_desc,
+                    "status": desired_status,
+                    "priority": "medium",
+                },
             )
-            updated += 1
         except urllib.error.HTTPError as exc:
-            key = f"{exc.code}:{task_id}"
-            if key not in _LOGGED_HTTP_ERRORS:
-                _LOGGED_HTTP_ERRORS.add(key)
-                try:
-                    body = exc.read().decode("utf-8", errors="ignore").strip()
-                except Exception:
-                    body = ""
-                if len(body) > 1200:
-                    body = body[:1200] + "..."
-                print(
-                    "dispatch->mc patch_failed "
-                    + f"status_code={exc.code} task_id={task_id} title={title!r} "
-                    + f"desired_status={desired_status} body={body!r}",
-                    flush=True,
-                )
-            # Continue syncing other tasks.
-            continue
+            _log_http_error_once(
+                f"{exc.code}:create:{title}",
+                exc,
+                "dispatch->mc create_failed "
+                + f"status_code={exc.code} title={title!r} desired_status={desired_status}",
+            )
+            return "failed", None
+        task_id = resp.get("id")
+        if not isinstance(task_id, str) or not task_id:
+            return "created", None
+        return "created", {"id": task_id, **pushed}
+
+    task_id = mirrored["id"]
+    current_status = mirrored.get("status")
+    patch: dict[str, Any] = {}
+    if current_status != desired_status:
+        patch["status"] = desired_status
+        if desired_status == "review":
+            patch["comment"] = _review_comment(row)
+    if mirrored.get("desc") != desired_digest:
+        patch["description"] = desired_desc
+    if not patch:
+        return "unchanged", mirrored
 
-    # Cleanup: tasks that exist in Mission Control but no longer exist in dispatch.db
-    # (e.g., DB reset or project switched). Mark them done so the dashboard doesn't
-    # show phantom "running" work.
-    cleanup_limit_raw = (os.environ.get("MC_STALE_CLEANUP_LIMIT") or "200").strip()
     try:
-        cleanup_limit = int(cleanup_limit_raw) if cleanup_limit_raw else 200
-    except Exception:
-        cleanup_limit = 200
+        _mc_request(
+            "PATCH",
+            f"/boards/{board_id}/tasks/{task_id}",
+            token=token,
+            json_body=patch,
+        )
+    except urllib.error.HTTPError as exc:
+        _log_http_error_once(
+            f"{exc.code}:{task_id}",
+            exc,
+            "dispatch->mc patch_failed "
+            + f"status_code={exc.code} task_id={task_id} title={title!r} "
+            + f"desired_status={desired_status}",
+        )
+        return "failed", mirrored
+    return "updated", {"id": task_id, **pushed}
+
+
+@dataclass
+class PushStats:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    retry: list[str] = field(default_factory=list)
+    untracked: int = 0  # created, but the response carried no task id
+
+
+def _push_rows(
+    rows: list[DispatchTaskRow],
+    mirror: dict[str, dict[str, Any]],
+    *,
+    token: str,
+    board_id: str,
+) -> PushStats:
+    """Push a batch of rows concurrently, updating `mirror` in place.
+
+    Rows that fail (HTTP errors, or never attempted because Mission Control
+    became unreachable) are returned in `retry` for the next pass.
+    """
+    stats = PushStats()
+    if not rows:
+        return stats
+
+    workers = max(1, _env_int("MC_PUSH_CONCURRENCY", 8))
+    fatal: Exception | None = None
+    with ThreadPoolExecutor(max_workers=min(workers, len(rows))) as pool:
+        futures = {
+            pool.submit(
+                _push_row, row, mirror.get(_title(row)), token=token, board_id=board_id
+            ): row
+            for row in rows
+        }
+        for fut in as_completed(futures):
+            row = futures[fut]
+            if fut.cancelled():
+                stats.retry.append(row.id)
+                continue
+            try:
+                outcome, entry = fut.result()
+            except Exception as exc:
+                # Mission Control unreachable: stop issuing requests.
+                stats.retry.append(row.id)
+                if fatal is None:
+                    fatal = exc
+                    for other in futures:
+                        other.cancel()
+                continue
+            if entry is not None:
+                mirror[_title(row)] = entry
+            if outcome == "created":
+                stats.created += 1
+                if entry is None:
+                    stats.untracked += 1
+            elif outcome == "updated":
+                stats.updated += 1
+            elif outcome == "unchanged":
+                stats.unchanged += 1
+            else:
+                stats.retry.append(row.id)
+
+    if fatal is not None:
+        raise fatal
+    return stats
+
+
+def _archive_stale(
+    existing_by_title: dict[str, dict[str, Any]],
+    desired_titles: set[str],
+    mirror: dict[str, dict[str, Any]],
+    *,
+    token: str,
+    board_id: str,
+) -> int:
+    """Mark Mission Control tasks that no longer exist in dispatch.db as done.
+
+    Covers DB resets and project switches, so the dashboard doesn't show
+    phantom "running" work. Returns the number of tasks patched.
+    """
+    cleanup_limit = _env_int("MC_STALE_CLEANUP_LIMIT", 200)
 
     archived_marker = "archived_by_dispatch_bridge: true"
     archived_at = datetime.now(timezone.utc).isoformat()
@@ -502,9 +757,7 @@ def sync_once(*, limit: int | None = None) -> tuple[int, int, int]:
     for _rank, title, task in stale:
         if cleanup_limit > 0 and cleaned >= cleanup_limit:
             break
-        task_id = task.get("id")
-        if not isinstance(task_id, str) or not task_id:
-            continue
+        task_id = task["id"]
         current_desc = task.get("description")
         if not isinstance(current_desc, str):
             current_desc = ""
@@ -533,26 +786,117 @@ def sync_once(*, limit: int | None = None) -> tuple[int, int, int]:
                     "description": new_desc,
                 },
             )
-            updated += 1
             cleaned += 1
+            mirror[title] = {"id": task_id, "status": "done", "desc": _digest(new_desc)}
         except urllib.error.HTTPError as exc:
-            key = f"{exc.code}:stale:{task_id}"
-            if key not in _LOGGED_HTTP_ERRORS:
-                _LOGGED_HTTP_ERRORS.add(key)
-                try:
-                    body = exc.read().decode("utf-8", errors="ignore").strip()
-                except Exception:
-                    body = ""
-                if len(body) > 1200:
-                    body = body[:1200] + "..."
-                print(
-                    "dispatch->mc stale_cleanup_failed "
-                    + f"status_code={exc.code} task_id={task_id} title={title!r} "
-                    + f"body={body!r}",
-                    flush=True,
-                )
+            _log_http_error_once(
+                f"{exc.code}:stale:{task_id}",
+                exc,
+                "dispatch->mc stale_cleanup_failed "
+                + f"status_code={exc.code} task_id={task_id} title={title!r}",
+            )
+
+    return cleaned
+
+
+def sync_once(*, limit: int | None = None) -> tuple[int, int, int]:
+    """One sync pass; returns (created, updated, unchanged).
+
+    Normal passes read only the dispatch rows recorded in the change log after
+    the persisted cursor and push just those, using the remembered Mission
+    Control task ids instead of listing the board. A full pass (board listing,
+    backup-API snapshot of every row, stale cleanup) runs on first start,
+    every MC_FULL_RESYNC_S seconds, when the change log can't be used, and
+    whenever --limit is given.
+    """
+    token = _load_mc_token()
+    board_slug = (
+        os.environ.get("MC_DISPATCH_BOARD_SLUG") or DEFAULT_BOARD_SLUG
+    ).strip()
+
+    board_id = _mc_find_board_id(token=token, slug=board_slug)
+    db_path = _dispatch_db_path()
+
+    state_path = _state_path(board_slug)
+    state = _load_state(state_path)
+    if state.get("db_path") != str(db_path) or state.get("board_id") != board_id:
+        state = {"db_path": str(db_path), "board_id": board_id}
+
+    has_log = _ensure_change_log(db_path)
+    limited = isinstance(limit, int) and limit > 0
+    now = time.time()
+    full_resync_s = _env_int("MC_FULL_RESYNC_S", 3600)
+
+    changes: DispatchChanges | None = None
+    if (
+        has_log
+        and not limited
+        and not state.get("needs_full")
+        and isinstance(state.get("cursor"), int)
+        and isinstance(state.get("mirror"), dict)
+        and now - float(state.get("full_sync_at") or 0) < full_resync_s
+    ):
+        changes = _dispatch_changes_since(
+            db_path, state["cursor"], state.get("retry") or []
+        )
+        if changes is not None and changes.deleted:
+            # Deleted rows need the board listing for stale cleanup.
+            changes = None
+
+    try:
+        if changes is not None:
+            mirror = state["mirror"]
+            stats = _push_rows(changes.rows, mirror, token=token, board_id=board_id)
+            head = changes.head
+            cleaned = 0
+        else:
+            snap = _snapshot_dispatch(db_path)
+            try:
+                rows = _read_all_tasks(snap)
+                head = _change_log_head(snap) or 0
+            finally:
+                snap.close()
+            if limited:
+                rows = rows[:limit]
+
+            existing_by_title: dict[str, dict[str, Any]] = {}
+            for it in _mc_list_tasks(token=token, board_id=board_id):
+                title = it.get("title")
+                if isinstance(title, str) and title:
+                    existing_by_title[title] = it
+
+            mirror = {}
+            for title, task in existing_by_title.items():
+                entry = _mirror_entry(task)
+                if title.startswith("[dispatch] ") and entry is not None:
+                    mirror[title] = entry
+            state["mirror"] = mirror
+            state.pop("cursor", None)
+
+            stats = _push_rows(rows, mirror, token=token, board_id=board_id)
+            cleaned = _archive_stale(
+                existing_by_title,
+                {_title(r) for r in rows},
+                mirror,
+                token=token,
+                board_id=board_id,
+            )
+            state["full_sync_at"] = now
+
+        state["cursor"] = head
+        state["retry"] = stats.retry
+        # A limited pass only mirrors part of dispatch.db; an untracked create
+        # would be re-posted by an incremental pass. Both need a board listing.
+        state["needs_full"] = limited or stats.untracked > 0
+    finally:
+        _save_state(state_path, state)
+
+    if has_log and now - float(state.get("pruned_at") or 0) >= 3600:
+        _prune_change_log(db_path, head)
+        state["pruned_at"] = now
+        _save_state(state_path, state)
 
-    return created, updated, unchanged
+    return stats.created, stats.updated + cleaned, stats.unchanged
 
 
 def main() -> None:
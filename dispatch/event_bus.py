@@ -10,13 +10,16 @@ subscribe to events they're interested in.
 import json
 import logging
 import queue
+import sqlite3
 import threading
+import heapq
+import itertools
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 
 
 # Configure logging
@@ -43,36 +46,559 @@ def _get_memory_store():
     return _memory_store
 
 
-def _index_event_to_memory(event_type: str, data: Dict[str, Any], source: str):
-    """Automatically index event to memory store"""
-    store = _get_memory_store()
-    if store is None:
-        return
+def _event_memory_entry(
+    event_type: str, data: Dict[str, Any], source: str
+) -> Tuple[str, str, Dict[str, Any]]:
+    """Build the (content, memory_type, metadata) entry indexed for an event"""
+    # Create searchable content from event
+    content_parts = [f"Event: {event_type}"]
 
-    try:
-        # Create searchable content from event
-        content_parts = [f"Event: {event_type}"]
+    # Add relevant data fields
+    for key in ["task_id", "error", "summary", "project", "status", "message"]:
+        if key in data:
+            content_parts.append(f"{key}: {data[key]}")
 
-        # Add relevant data fields
-        for key in ["task_id", "error", "summary", "project", "status", "message"]:
-            if key in data:
-                content_parts.append(f"{key}: {data[key]}")
+    content = " | ".join(content_parts)
 
-        content = " | ".join(content_parts)
+    # Determine memory type
+    if "error" in event_type or "fail" in str(data):
+        mem_type = "error"
+    elif "task" in event_type:
+        mem_type = "task"
+    else:
+        mem_type = "event"
 
-        # Determine memory type
-        if "error" in event_type or "fail" in str(data):
-            mem_type = "error"
-        elif "task" in event_type:
-            mem_type = "task"
-        else:
-            mem_type = "event"
+    return content, mem_type, {"source": source, "event_type": event_type}
+
+
+class EventLog:
+    """
+    Durable, append-only event log with monotonically increasing offsets
+
+    Backed by an SQLite table in WAL mode, so appends are cheap and readers
+    never block the writer. Offsets are assigned by SQLite inside the append
+    transaction, so several processes can share one log file. Consumer
+    groups store a committed offset and resume reading right after it, which
+    lets a restarted process catch up on everything it missed.
+
+    Example:
+        log = EventLog("events.db")
+        events = log.read(log.committed("orchestrator"), limit=100)
+        ...
+        log.commit("orchestrator", events[-1]["offset"])
+    """
+
+    def __init__(self, path: str, retention: Optional[int] = None):
+        """
+        Initialize EventLog
+
+        Args:
+            path: Path to the SQLite database file
+            retention: Keep at most this many events (optional, unbounded if None)
+        """
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                offset INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                source TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_type ON events(type, offset);
+            CREATE TABLE IF NOT EXISTS consumer_offsets (
+                group_id TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            """
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection (WAL lets readers and the writer overlap)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def last_offset(self) -> int:
+        """Highest offset written so far (0 if the log is empty)"""
+        row = self._conn().execute("SELECT COALESCE(MAX(offset), 0) FROM events").fetchone()
+        return row[0]
+
+    def append_many(self, events: List[Dict[str, Any]]) -> List[int]:
+        """
+        Append events in one transaction and set their "offset"
+
+        Offsets come from SQLite (under BEGIN IMMEDIATE), so concurrent
+        writers on the same file never hand out the same offset.
+
+        Returns:
+            The assigned offsets, in order
+        """
+        conn = self._conn()
+        offsets = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for e in events:
+                cursor = conn.execute(
+                    "INSERT INTO events (event_id, type, data, timestamp, source) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        e["id"],
+                        e["type"],
+                        json.dumps(e["data"], default=str),
+                        e["timestamp"],
+                        e["source"],
+                    ),
+                )
+                offsets.append(cursor.lastrowid)
+            if self.retention and offsets:
+                conn.execute(
+                    "DELETE FROM events WHERE offset <= ?",
+                    (offsets[-1] - self.retention,),
+                )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        for e, offset in zip(events, offsets):
+            e["offset"] = offset
+        return offsets
+
+    def read(
+        self,
+        after_offset: int = 0,
+        limit: int = 1000,
+        event_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Read events with offset greater than after_offset, oldest first
+
+        Args:
+            after_offset: Exclusive lower bound
+            limit: Maximum number of events
+            event_type: Filter by event type (optional)
+
+        Returns:
+            List of event dictionaries
+        """
+        sql = "SELECT offset, event_id, type, data, timestamp, source FROM events WHERE offset > ?"
+        params: List[Any] = [after_offset]
+        if event_type:
+            sql += " AND type = ?"
+            params.append(event_type)
+        sql += " ORDER BY offset LIMIT ?"
+        params.append(limit)
+
+        return [
+            {
+                "offset": offset,
+                "id": event_id,
+                "type": etype,
+                "data": json.loads(data),
+                "timestamp": timestamp,
+                "source": source,
+            }
+            for offset, event_id, etype, data, timestamp, source in self._conn().execute(
+                sql, params
+            )
+        ]
+
+    def committed(self, group_id: str) -> int:
+        """Committed offset of a consumer group (0 if it never committed)"""
+        row = self._conn().execute(
+            "SELECT offset FROM consumer_offsets WHERE group_id = ?", (group_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def commit(self, group_id: str, offset: int) -> None:
+        """Record that a consumer group has processed everything up to offset"""
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO consumer_offsets (group_id, offset, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(group_id) DO UPDATE SET offset = excluded.offset, "
+            "updated_at = excluded.updated_at",
+            (group_id, offset, datetime.now().isoformat()),
+        )
+        conn.commit()
+
+
+class _EventSink:
+    """
+    Background writer for the side effects of publishing an event
+
+    Memory indexing (embedding + SQLite insert) and the JSONL event log used
+    to run on the publisher's thread. The sink takes events through a bounded
+    queue instead, indexes them in micro-batches with MemoryStore.add_many
+    and appends to a log file that stays open and is flushed periodically.
+    submit() never blocks: when the queue is full the side effects are
+    dropped and counted. The durable EventLog is written by _EventWriter.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        index_events: bool = True,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        log_flush_interval: float = 1.0,
+    ):
+        self.log_path = log_path
+        self.index_events = index_events
+        self.batch_size = batch_size
+        self.log_flush_interval = log_flush_interval
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+
+        self._log_file = None
+        self._last_log_flush = time.monotonic()
+        self.stats = {
+            "submitted": 0,
+            "dropped": 0,
+            "indexed": 0,
+            "index_batches": 0,
+            "index_errors": 0,
+            "logged": 0,
+            "log_errors": 0,
+            "high_water": 0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="EventBus-Sink"
+        )
+        self._thread.start()
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Queue an event without blocking
+
+        Returns:
+            False if the event's side effects were dropped (queue full or
+            sink stopped)
+        """
+        if not self.index_events and not self.log_path:
+            return True
+        try:
+            if not self._thread.is_alive():
+                raise queue.Full
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["submitted"] += 1
+        depth = self.queue.qsize()
+        if depth > self.stats["high_water"]:
+            self.stats["high_water"] = depth
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written"""
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout=timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drain the queue, close the log file and stop the thread"""
+        if self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join(timeout=timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self.queue.get(timeout=self.log_flush_interval)
+            except queue.Empty:
+                self._flush_log()
+                continue
+
+            # Micro-batch whatever else is already waiting
+            batch: List[Any] = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = [e for e in batch if isinstance(e, dict)]
+            if events:
+                self._write_log(events)
+                self._index(events)
+
+            markers = [e for e in batch if not isinstance(e, dict)]
+            if markers:
+                self._flush_log()
+            for marker in markers:
+                if marker is self._STOP:
+                    self._close_log()
+                    return
+                marker.set()
+
+            if time.monotonic() - self._last_log_flush >= self.log_flush_interval:
+                self._flush_log()
+
+    def _index(self, events: List[Dict[str, Any]]) -> None:
+        if not self.index_events:
+            return
+        store = _get_memory_store()
+        if store is None:
+            return
+        try:
+            store.add_many(
+                [_event_memory_entry(e["type"], e["data"], e["source"]) for e in events]
+            )
+            self.stats["indexed"] += len(events)
+            self.stats["index_batches"] += 1
+            logger.debug(f"Indexed {len(events)} events to memory")
+        except Exception as e:
+            self.stats["index_errors"] += 1
+            logger.warning(f"Failed to index events to memory: {e}")
+
+    def _write_log(self, events: List[Dict[str, Any]]) -> None:
+        if not self.log_path:
+            return
+        try:
+            if self._log_file is None:
+                log_file = Path(self.log_path)
+                log_file.parent.mkdir(parents=True, exist_ok=True)
+                self._log_file = open(log_file, "a")
+            self._log_file.write(
+                "".join(json.dumps(e, default=str) + "\n" for e in events)
+            )
+            self.stats["logged"] += len(events)
+        except Exception as e:
+            self.stats["log_errors"] += 1
+            logger.error(f"Failed to log event: {e}")
+            self._close_log()
+
+    def _flush_log(self) -> None:
+        if self._log_file is None:
+            return
+        try:
+            self._log_file.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush event log: {e}")
+            self._close_log()
+        self._last_log_flush = time.monotonic()
+
+    def _close_log(self) -> None:
+        if self._log_file is None:
+            return
+        try:
+            self._log_file.close()
+        except Exception:
+            pass
+        self._log_file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters (backpressure metrics)"""
+        return {
+            **self.stats,
+            "queue_size": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+        }
+
+
+class _EventWriter:
+    """
+    Background batched appender for the durable EventLog
+
+    publish() only queues the event; this thread appends whatever has
+    accumulated in one EventLog transaction (so offsets still come from
+    SQLite and stay unique across processes) and then hands the batch,
+    now carrying offsets, to on_persisted for history and delivery.
+    submit() never blocks; a full queue rejects the event.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        store: EventLog,
+        on_persisted: Callable[[List[Dict[str, Any]]], None],
+        queue_size: int = 10000,
+        batch_size: int = 256,
+    ):
+        self.store = store
+        self.on_persisted = on_persisted
+        self.batch_size = batch_size
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            "persisted": 0,
+            "batches": 0,
+            "rejected": 0,
+            "store_errors": 0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="EventBus-Writer"
+        )
+        self._thread.start()
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Queue an event for the durable log without blocking
+
+        Returns:
+            False if the event was rejected (queue full or writer stopped)
+        """
+        try:
+            if not self._thread.is_alive():
+                raise queue.Full
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.stats["rejected"] += 1
+            return False
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is in the log"""
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout=timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write out the queue and stop the thread"""
+        if self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join(timeout=timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Any] = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = [e for e in batch if isinstance(e, dict)]
+            if events:
+                try:
+                    self.store.append_many(events)
+                except sqlite3.Error as e:
+                    self.stats["store_errors"] += len(events)
+                    logger.error(f"Failed to append {len(events)} events to event log: {e}")
+                else:
+                    self.stats["persisted"] += len(events)
+                    self.stats["batches"] += 1
+                    try:
+                        self.on_persisted(events)
+                    except Exception as e:
+                        logger.error(f"Event dispatch after append failed: {e}", exc_info=True)
+
+            for marker in batch:
+                if marker is self._STOP:
+                    return
+                if not isinstance(marker, dict):
+                    marker.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_size": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+        }
+
+
+def _is_pattern(event_type: str) -> bool:
+    """True if an event type contains wildcard segments"""
+    return "*" in event_type or "#" in event_type
+
+
+def topic_matches(pattern: str, event_type: str) -> bool:
+    """
+    Check an event type against a subscription pattern
+
+    Patterns are dot-separated; "*" matches exactly one segment and "#"
+    matches zero or more segments ("task.*", "*.failed", "error.#").
+
+    Args:
+        pattern: Subscription pattern or exact event type
+        event_type: Concrete event type
 
-        # Add to memory
-        store.add(content, mem_type, {"source": source, "event_type": event_type})
-        logger.debug(f"Indexed event to memory: {event_type}")
-    except Exception as e:
-        logger.warning(f"Failed to index event to memory: {e}")
+    Returns:
+        True if the pattern matches
+    """
+    return _segments_match(pattern.split("."), event_type.split("."))
+
+
+def _segments_match(pattern: List[str], parts: List[str]) -> bool:
+    if not pattern:
+        return not parts
+    head = pattern[0]
+    if head == "#":
+        return any(_segments_match(pattern[1:], parts[i:]) for i in range(len(parts) + 1))
+    if not parts:
+        return False
+    return (head == "*" or head == parts[0]) and _segments_match(pattern[1:], parts[1:])
+
+
+class _TopicTrie:
+    """
+    Trie of subscription patterns keyed by dot-separated segment
+
+    Matching walks one branch per segment plus any "*" / "#" branches, so
+    routing cost depends on the depth of the event type, not on how many
+    event types or patterns exist.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.root: Dict[str, Any] = {}
+        for pattern in patterns:
+            node = self.root
+            for segment in pattern.split("."):
+                node = node.setdefault(segment, {})
+            node.setdefault(None, []).append(pattern)
+
+    def match(self, event_type: str) -> List[str]:
+        """Return every pattern that matches event_type"""
+        parts = event_type.split(".")
+        found: Dict[str, None] = {}
+
+        def walk(node: Dict[str, Any], i: int) -> None:
+            hash_node = node.get("#")
+            if hash_node is not None:
+                for j in range(i, len(parts) + 1):
+                    walk(hash_node, j)
+            if i == len(parts):
+                for pattern in node.get(None, ()):
+                    found[pattern] = None
+                return
+            for key in (parts[i], "*"):
+                child = node.get(key)
+                if child is not None:
+                    walk(child, i + 1)
+
+        walk(self.root, 0)
+        return list(found)
 
 
 @dataclass
@@ -102,9 +628,29 @@ class EventBus:
 
     Provides publish-subscribe pattern for decoupled communication:
     - Publish: Send events to all subscribers
-    - Subscribe: Register callback for specific event types
+    - Subscribe: Register callback for specific event types or patterns
+      ("task.*", "*.failed", "error.#")
     - Unsubscribe: Remove callbacks
 
+    Routing: subscription patterns are compiled into a topic trie, and the
+    resulting subscriber list for each concrete event type is cached until
+    the next subscribe/unsubscribe.
+
+    Delivery: a dispatcher thread fans each event out to per-subscriber
+    queues, and a pool of worker threads drains them. A subscriber is only
+    ever run by one worker at a time, and a slow or failing subscriber never
+    holds up the others. Failed deliveries
+    are retried from a delayed-retry heap with exponential backoff instead
+    of sleeping, and land in a bounded dead-letter queue once retries are
+    exhausted.
+
+    History: every event gets a monotonically increasing offset. Recent
+    events are kept in a ring buffer indexed by type. With event_store_path
+    set, publish() hands events to a background writer that appends them to
+    a durable EventLog in batches (the log assigns the offset); an event
+    enters history and is delivered once it is in the log, so consumers can
+    replay() from an offset or consume()/commit() as a named group.
+
     Event Types:
     - task.started: Task execution started
     - task.completed: Task execution completed successfully
@@ -138,7 +684,26 @@ class EventBus:
                 - async_mode (bool): Enable async event processing (default: True)
                 - retry_failed (bool): Retry failed event delivery (default: True)
                 - max_retries (int): Maximum retry attempts (default: 3)
+                - retry_delay (float): First retry delay in seconds, doubled per
+                  attempt (default: 2.0)
+                - workers (int): Delivery worker threads (default: 4)
+                - subscriber_queue_size (int): Pending events per subscriber
+                  before new ones are dead-lettered (default: 1000)
+                - dead_letter_size (int): Dead letters kept (default: 1000)
                 - event_log_path (str): Path to event log file (optional)
+                - event_store_path (str): Path to durable SQLite EventLog used
+                  for offsets, replay and consumer groups (optional)
+                - event_store_retention (int): Events kept in the EventLog
+                  (default: unbounded)
+                - history_size (int): Events kept in the in-memory ring buffer
+                  (default: 1000)
+                - index_events (bool): Index events to the memory store (default: True)
+                - store_queue_size (int): Events waiting for the EventLog
+                  writer before publish() rejects new ones (default: 10000)
+                - store_batch_size (int): Max events per EventLog append (default: 256)
+                - index_queue_size (int): Side-effect queue bound (default: 10000)
+                - index_batch_size (int): Max events per memory write (default: 256)
+                - log_flush_interval (float): Seconds between log flushes (default: 1.0)
         """
         self.config = config or {}
         self.subscribers: Dict[str, List[Callable]] = defaultdict(list)
@@ -146,22 +711,76 @@ class EventBus:
         self.async_mode = self.config.get("async_mode", True)
         self.retry_failed = self.config.get("retry_failed", True)
         self.max_retries = self.config.get("max_retries", 3)
+        self.retry_delay = self.config.get("retry_delay", 2.0)
+        self.num_workers = max(1, self.config.get("workers", 4))
+        self.subscriber_queue_size = self.config.get("subscriber_queue_size", 1000)
         self.event_log_path = self.config.get("event_log_path")
+        self._subscription_ids = itertools.count()
+
+        # Compiled routing: topic trie + per-event-type subscriber lists
+        self._routes_lock = threading.Lock()
+        self._route_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._trie: Optional[_TopicTrie] = None
 
         # Event counter for unique IDs
         self._event_counter = 0
         self._counter_lock = threading.Lock()
 
-        # Event history for debugging
-        self.event_history: List[Dict[str, Any]] = []
+        # Durable event log (optional)
+        store_path = self.config.get("event_store_path")
+        self.event_store: Optional[EventLog] = (
+            EventLog(store_path, retention=self.config.get("event_store_retention"))
+            if store_path
+            else None
+        )
+
+        # Recent events: ring buffer plus a per-type index, each event tagged
+        # with its offset. Offsets continue from the durable log if present.
+        self._max_history = self.config.get("history_size", 1000)
+        self.event_history: deque = deque(maxlen=self._max_history)
+        self._history_by_type: Dict[str, deque] = defaultdict(
+            lambda: deque(maxlen=self._max_history)
+        )
         self._history_lock = threading.Lock()
-        self._max_history = 1000
+        self._history_cond = threading.Condition(self._history_lock)
+        self._last_offset = self.event_store.last_offset() if self.event_store else 0
 
         # Statistics
-        self.stats = {"published": 0, "delivered": 0, "failed": 0, "retried": 0}
+        self.stats = {
+            "published": 0,
+            "delivered": 0,
+            "failed": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "store_errors": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+        # Per-subscriber delivery state: subscriptions with a non-empty
+        # mailbox are put on the ready queue for the worker pool
+        self._delivery_lock = threading.Lock()
+        self._idle = threading.Condition(self._delivery_lock)
+        self._pending = 0
+        self._ready: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+
+        # Delayed retries: heap of (due, seq, subscription, event, attempts)
+        self._retry_heap: List[tuple] = []
+        self._retry_seq = itertools.count()
+        self._retry_cond = threading.Condition()
+        self._timer_thread: Optional[threading.Thread] = None
+
+        self.dead_letters: deque = deque(maxlen=self.config.get("dead_letter_size", 1000))
+
+        # Durable appends, memory indexing and the event log run off the
+        # publisher's thread (recreated by start() after stop())
+        self._writer: Optional[_EventWriter] = None
+        self._sink: Optional[_EventSink] = None
+        self._start_background()
 
         # Background thread for async processing
         self._running = False
+        self._stopping = False
         self._worker_thread: Optional[threading.Thread] = None
 
         if self.async_mode:
@@ -169,6 +788,26 @@ class EventBus:
 
         logger.info(f"EventBus initialized (async={self.async_mode})")
 
+    def _start_background(self) -> None:
+        """Create the EventLog writer and side-effect sink if not running"""
+        if self._sink is None or not self._sink.is_alive():
+            self._sink = _EventSink(
+                log_path=self.event_log_path,
+                index_events=self.config.get("index_events", True),
+                queue_size=self.config.get("index_queue_size", 10000),
+                batch_size=self.config.get("index_batch_size", 256),
+                log_flush_interval=self.config.get("log_flush_interval", 1.0),
+            )
+        if self.event_store is not None and (
+            self._writer is None or not self._writer.is_alive()
+        ):
+            self._writer = _EventWriter(
+                self.event_store,
+                self._accept_many,
+                queue_size=self.config.get("store_queue_size", 10000),
+                batch_size=self.config.get("store_batch_size", 256),
+            )
+
     def _generate_event_id(self) -> str:
         """Generate unique event ID"""
         with self._counter_lock:
@@ -179,10 +818,11 @@ class EventBus:
         self, event_type: str, callback: Callable[[Dict[str, Any]], None]
     ) -> str:
         """
-        Subscribe to an event type
+        Subscribe to an event type or pattern
 
         Args:
-            event_type: Event type to subscribe to
+            event_type: Event type or pattern ("*" = one segment, "#" = any
+                number of segments) to subscribe to
             callback: Function to call when event is published
 
         Returns:
@@ -192,20 +832,28 @@ class EventBus:
             def on_task_started(data):
                 print(f"Task {data['task_id']} started")
             bus.subscribe("task.started", on_task_started)
+            bus.subscribe("task.*", on_any_task_event)
         """
         if not callable(callback):
             raise ValueError("Callback must be callable")
 
-        subscription_id = f"sub-{event_type}-{len(self.subscribers[event_type])}"
-
-        # Store callback with metadata
-        self.subscribers[event_type].append(
-            {
-                "id": subscription_id,
-                "callback": callback,
-                "subscribed_at": datetime.now().isoformat(),
-            }
-        )
+        seq = next(self._subscription_ids)
+        subscription_id = f"sub-{event_type}-{seq}"
+
+        # Store callback with metadata and its delivery mailbox
+        with self._routes_lock:
+            self.subscribers[event_type].append(
+                {
+                    "id": subscription_id,
+                    "seq": seq,
+                    "callback": callback,
+                    "subscribed_at": datetime.now().isoformat(),
+                    "mailbox": deque(),
+                    "scheduled": False,
+                    "active": True,
+                }
+            )
+            self._invalidate_routes()
 
         logger.info(f"Subscribed {subscription_id} to {event_type}")
         return subscription_id
@@ -221,9 +869,18 @@ class EventBus:
         Returns:
             True if unsubscribed successfully, False otherwise
         """
-        for i, sub in enumerate(self.subscribers[event_type]):
+        for i, sub in enumerate(self.subscribers.get(event_type, [])):
             if sub["id"] == subscription_id:
-                del self.subscribers[event_type][i]
+                with self._routes_lock:
+                    del self.subscribers[event_type][i]
+                    if not self.subscribers[event_type]:
+                        del self.subscribers[event_type]
+                    self._invalidate_routes()
+                with self._delivery_lock:
+                    sub["active"] = False
+                    self._pending -= len(sub["mailbox"])
+                    sub["mailbox"].clear()
+                    self._idle.notify_all()
                 logger.info(f"Unsubscribed {subscription_id} from {event_type}")
                 return True
         return False
@@ -240,7 +897,8 @@ class EventBus:
             source: Source of the event (module/component name)
 
         Returns:
-            Event ID if published successfully, None if queue is full
+            Event ID if the event was accepted, None if the EventLog writer
+            or the delivery queue is full (or the sync-mode append failed)
 
         Example:
             bus.publish("task.started", {
@@ -260,58 +918,115 @@ class EventBus:
             "source": source,
         }
 
-        # Add to history
-        with self._history_lock:
-            self.event_history.append(event)
-            if len(self.event_history) > self._max_history:
-                self.event_history.pop(0)
+        if self.event_store is None:
+            return event_id if self._accept(event) else None
+
+        if self.async_mode:
+            # The writer appends in batches and then calls _accept_many
+            if not self._writer.submit(event):
+                self._bump("store_errors")
+                logger.error(f"Event log writer queue full, dropping {event_type}")
+                return None
+            return event_id
+
+        # Sync mode: append on the caller's thread (outside the history lock)
+        try:
+            self.event_store.append_many([event])
+        except sqlite3.Error as e:
+            self._bump("store_errors")
+            logger.error(f"Failed to append {event_type} to event log: {e}")
+            return None
+        self._accept(event)
+        return event_id
+
+    def _accept_many(self, events: List[Dict[str, Any]]) -> None:
+        """EventLog writer callback: a batch now has offsets"""
+        for event in events:
+            self._accept(event)
 
-        # Log event
-        self._log_event(event)
+    def _accept(self, event: Dict[str, Any]) -> bool:
+        """Add an event to history, queue its side effects and deliver it
 
-        # Index event to memory store for semantic search
-        _index_event_to_memory(event_type, data, source)
+        Without an EventLog the offset comes from an in-memory counter.
 
-        # Update stats
-        self.stats["published"] += 1
+        Returns:
+            False if the delivery queue was full
+        """
+        event_type = event["type"]
+        with self._history_cond:
+            if "offset" in event:
+                self._last_offset = max(self._last_offset, event["offset"])
+            else:
+                self._last_offset += 1
+                event["offset"] = self._last_offset
+            self.event_history.append(event)
+            self._history_by_type[event_type].append(event)
+            self._history_cond.notify_all()
+
+        # Log and index to memory store in the background
+        self._sink.submit(event)
+
+        self._bump("published")
 
         if self.async_mode:
             # Add to queue for async processing
             try:
                 self.event_queue.put(event, block=False)
-                logger.debug(f"Published {event_type} (id={event_id}) to queue")
-                return event_id
+                logger.debug(f"Published {event_type} (id={event['id']}) to queue")
+                return True
             except queue.Full:
                 logger.error(f"Event queue full, dropping {event_type}")
-                return None
+                return False
         else:
             # Process synchronously
             self._process_event(event)
-            return event_id
+            return True
 
-    def _log_event(self, event: Dict[str, Any]) -> None:
-        """Log event to file if configured"""
-        if self.event_log_path:
-            try:
-                log_file = Path(self.event_log_path)
-                log_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(log_file, "a") as f:
-                    f.write(json.dumps(event) + "\n")
-            except Exception as e:
-                logger.error(f"Failed to log event: {e}")
+    def _invalidate_routes(self) -> None:
+        """Drop compiled routes (caller holds _routes_lock)"""
+        self._route_cache = {}
+        self._trie = None
+
+    def _route(self, event_type: str) -> List[Dict[str, Any]]:
+        """
+        Subscribers for a concrete event type, in subscription order
+
+        Resolved through the topic trie on first use and cached until the
+        subscriptions change.
+        """
+        with self._routes_lock:
+            subs = self._route_cache.get(event_type)
+            if subs is not None:
+                return subs
+
+            if self._trie is None:
+                self._trie = _TopicTrie(list(self.subscribers))
+            subs = [
+                sub
+                for pattern in self._trie.match(event_type)
+                for sub in self.subscribers.get(pattern, ())
+            ]
+            subs.sort(key=lambda sub: sub["seq"])
+
+            if len(self._route_cache) >= 4096:
+                self._route_cache = {}
+            self._route_cache[event_type] = subs
+            return subs
 
     def _process_event(self, event: Dict[str, Any]) -> None:
         """
         Process a single event by notifying all subscribers
 
+        With the worker pool running, the event is queued on each
+        subscriber's mailbox; otherwise it is delivered inline.
+
         Args:
             event: Event dictionary with id, type, data, timestamp, source
         """
         event_type = event["type"]
-        data = event["data"]
 
-        # Get subscribers for this event type
-        subscribers = self.subscribers.get(event_type, [])
+        # Get subscribers for this event type (exact and pattern matches)
+        subscribers = self._route(event_type)
 
         if not subscribers:
             logger.debug(f"No subscribers for {event_type}")
@@ -319,50 +1034,220 @@ class EventBus:
 
         # Notify each subscriber
         for sub in subscribers:
-            callback = sub["callback"]
+            if self._workers:
+                self._enqueue_delivery(sub, event, attempts=0)
+            else:
+                self._deliver(sub, event, attempts=0)
+
+    def _bump(self, key: str, amount: int = 1) -> None:
+        """Increment a statistics counter from any thread"""
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _enqueue_delivery(
+        self, subscriber: Dict[str, Any], event: Dict[str, Any], attempts: int
+    ) -> None:
+        """Put an event on a subscriber's mailbox and schedule the subscriber"""
+        with self._delivery_lock:
+            if not subscriber["active"]:
+                return
+            if len(subscriber["mailbox"]) >= self.subscriber_queue_size:
+                overflow = True
+            else:
+                overflow = False
+                subscriber["mailbox"].append((event, attempts))
+                self._pending += 1
+                schedule = not subscriber["scheduled"]
+                subscriber["scheduled"] = True
+
+        if overflow:
+            logger.error(f"Subscriber {subscriber['id']} queue full, dead-lettering")
+            self._dead_letter(subscriber, event, attempts, "subscriber queue full")
+        elif schedule:
+            self._ready.put(subscriber)
+
+    def _drain_subscriber(self, subscriber: Dict[str, Any], max_events: int = 32) -> None:
+        """
+        Deliver up to max_events from one subscriber's mailbox
+
+        The subscriber is re-queued (rather than drained completely) so a
+        busy subscriber cannot monopolize a worker.
+        """
+        for _ in range(max_events):
+            with self._delivery_lock:
+                if not subscriber["mailbox"]:
+                    subscriber["scheduled"] = False
+                    return
+                event, attempts = subscriber["mailbox"].popleft()
+
             try:
-                callback(data.copy())  # Copy to prevent mutations
-                self.stats["delivered"] += 1
-            except Exception as e:
-                self.stats["failed"] += 1
-                logger.error(f"Subscriber {sub['id']} failed: {e}", exc_info=True)
+                self._deliver(subscriber, event, attempts)
+            finally:
+                with self._delivery_lock:
+                    self._pending -= 1
+                    if self._pending <= 0:
+                        self._idle.notify_all()
+
+        with self._delivery_lock:
+            if not subscriber["mailbox"]:
+                subscriber["scheduled"] = False
+                return
+        self._ready.put(subscriber)
+
+    def _deliver(
+        self, subscriber: Dict[str, Any], event: Dict[str, Any], attempts: int
+    ) -> None:
+        """
+        Run one subscriber callback; schedule a retry or dead-letter on failure
 
-                # Retry if configured
+        Args:
+            subscriber: Subscriber dictionary
+            event: Event to deliver
+            attempts: Number of retries already made (0 for first delivery)
+        """
+        try:
+            subscriber["callback"](event["data"].copy())  # Copy to prevent mutations
+        except Exception as e:
+            if attempts == 0:
+                self._bump("failed")
+                logger.error(f"Subscriber {subscriber['id']} failed: {e}", exc_info=True)
+            else:
+                logger.error(f"Retry {attempts} failed for {subscriber['id']}: {e}")
+
+            if self.retry_failed and attempts < self.max_retries:
+                self._schedule_retry(subscriber, event, attempts + 1)
+            else:
                 if self.retry_failed:
-                    self._retry_event(event, sub, attempts=1)
+                    logger.error(f"Max retries reached for {subscriber['id']}")
+                self._dead_letter(subscriber, event, attempts, str(e))
+            return
+
+        self._bump("delivered")
+        if attempts:
+            self._bump("retried")
+            logger.info(f"Retry successful for {subscriber['id']} (attempt {attempts})")
 
-    def _retry_event(
-        self, event: Dict[str, Any], subscriber: Dict[str, Any], attempts: int = 1
+    def _schedule_retry(
+        self, subscriber: Dict[str, Any], event: Dict[str, Any], attempts: int
     ) -> None:
         """
-        Retry delivering event to a subscriber
+        Queue a delayed retry (exponential backoff) on the retry heap
 
         Args:
-            event: Event to retry
             subscriber: Subscriber dictionary
-            attempts: Current attempt number
+            event: Event to retry
+            attempts: Attempt number of the retry
         """
-        if attempts > self.max_retries:
-            logger.error(f"Max retries reached for {subscriber['id']}")
-            return
+        due = time.monotonic() + self.retry_delay * 2 ** (attempts - 1)
+        with self._retry_cond:
+            heapq.heappush(
+                self._retry_heap,
+                (due, next(self._retry_seq), subscriber, event, attempts),
+            )
+            self._retry_cond.notify()
+        self._ensure_timer()
+
+    def _ensure_timer(self) -> None:
+        """Start the retry timer thread on first use"""
+        with self._retry_cond:
+            if self._timer_thread is not None and self._timer_thread.is_alive():
+                return
+            self._timer_thread = threading.Thread(
+                target=self._timer_loop, daemon=True, name="EventBus-Retry"
+            )
+            self._timer_thread.start()
+
+    def _timer_loop(self) -> None:
+        """Release retries from the heap once they are due"""
+        while True:
+            with self._retry_cond:
+                while True:
+                    if self._stopping:
+                        self._timer_thread = None
+                        return
+                    if not self._retry_heap:
+                        if not self._workers:
+                            # Sync mode: exit when idle, restarted on next retry
+                            self._timer_thread = None
+                            return
+                        self._retry_cond.wait(timeout=1.0)
+                        continue
+                    delay = self._retry_heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._retry_cond.wait(timeout=delay)
+
+                due = []
+                now = time.monotonic()
+                while self._retry_heap and self._retry_heap[0][0] <= now:
+                    due.append(heapq.heappop(self._retry_heap))
+
+            for _, _, subscriber, event, attempts in due:
+                if self._workers:
+                    self._enqueue_delivery(subscriber, event, attempts)
+                elif subscriber["active"]:
+                    self._deliver(subscriber, event, attempts)
+
+    def _dead_letter(
+        self,
+        subscriber: Dict[str, Any],
+        event: Dict[str, Any],
+        attempts: int,
+        error: str,
+    ) -> None:
+        """Record an event that could not be delivered to a subscriber"""
+        self._bump("dead_lettered")
+        self.dead_letters.append(
+            {
+                "event": event,
+                "subscription_id": subscriber["id"],
+                "subscriber": subscriber,
+                "attempts": attempts,
+                "error": error,
+                "failed_at": datetime.now().isoformat(),
+            }
+        )
 
-        try:
-            # Wait before retry (exponential backoff)
-            wait_time = 2**attempts
-            time.sleep(wait_time)
+    def get_dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get events that exhausted their retries
 
-            subscriber["callback"](event["data"].copy())
-            self.stats["delivered"] += 1
-            self.stats["retried"] += 1
-            logger.info(f"Retry successful for {subscriber['id']} (attempt {attempts})")
+        Args:
+            limit: Maximum number of dead letters to return
 
-        except Exception as e:
-            logger.error(f"Retry {attempts} failed for {subscriber['id']}: {e}")
-            self._retry_event(event, subscriber, attempts + 1)
+        Returns:
+            List of dead-letter dictionaries (most recent last)
+        """
+        letters = list(self.dead_letters)[-limit:]
+        return [
+            {k: v for k, v in letter.items() if k != "subscriber"} for letter in letters
+        ]
+
+    def redeliver_dead_letters(self) -> int:
+        """
+        Re-queue dead letters to their (still subscribed) subscribers
+
+        Returns:
+            Number of events re-queued
+        """
+        letters = list(self.dead_letters)
+        self.dead_letters.clear()
+
+        requeued = 0
+        for letter in letters:
+            subscriber = letter["subscriber"]
+            if not subscriber["active"]:
+                continue
+            if self._workers:
+                self._enqueue_delivery(subscriber, letter["event"], attempts=0)
+            else:
+                self._deliver(subscriber, letter["event"], attempts=0)
+            requeued += 1
+        return requeued
 
     def _worker_loop(self) -> None:
         """
-        Worker thread loop for processing events asynchronously
+        Dispatcher loop: fan events from the publish queue out to subscribers
         """
         logger.info("EventBus worker thread started")
 
@@ -371,11 +1256,11 @@ class EventBus:
                 # Get event from queue with timeout
                 event = self.event_queue.get(timeout=1.0)
 
-                # Process event
-                self._process_event(event)
-
-                # Mark task as done
-                self.event_queue.task_done()
+                try:
+                    self._process_event(event)
+                finally:
+                    # Mark task as done
+                    self.event_queue.task_done()
 
             except queue.Empty:
                 # Timeout is normal, continue loop
@@ -385,18 +1270,55 @@ class EventBus:
 
         logger.info("EventBus worker thread stopped")
 
+    def _delivery_loop(self) -> None:
+        """Delivery worker loop: drain mailboxes of scheduled subscribers"""
+        while True:
+            subscriber = self._ready.get()
+            if subscriber is None:
+                return
+            try:
+                self._drain_subscriber(subscriber)
+            except Exception as e:
+                logger.error(f"Delivery worker error: {e}", exc_info=True)
+
     def start(self) -> None:
-        """Start the background worker thread"""
+        """Start the dispatcher and delivery worker threads"""
         if self._running:
             logger.warning("EventBus worker already running")
             return
 
         self._running = True
+        self._stopping = False
+        self._start_background()
+        self._workers = [
+            threading.Thread(
+                target=self._delivery_loop, daemon=True, name=f"EventBus-Worker-{i}"
+            )
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
         self._worker_thread = threading.Thread(
-            target=self._worker_loop, daemon=True, name="EventBus-Worker"
+            target=self._worker_loop, daemon=True, name="EventBus-Dispatcher"
         )
         self._worker_thread.start()
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until queued events are in the EventLog, logged and indexed
+        to memory
+
+        Args:
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            True if everything was written within the timeout
+        """
+        if self._writer is not None and not self._writer.flush(timeout=timeout):
+            return False
+        return self._sink.flush(timeout=timeout)
+
     def stop(self, timeout: float = 5.0) -> None:
         """
         Stop the background worker thread
@@ -404,20 +1326,36 @@ class EventBus:
         Args:
             timeout: Maximum time to wait for thread to finish
         """
+        # The writer hands its last batch to the sink and the delivery queue
+        if self._writer is not None:
+            self._writer.stop(timeout=timeout)
+        self._sink.stop(timeout=timeout)
+
         if not self._running:
             return
 
         logger.info("Stopping EventBus worker thread...")
-        self._running = False
 
-        # Wait for queue to empty
+        # Wait for queue to empty and for in-flight deliveries to finish
+        # (retries still waiting on the retry heap are abandoned)
         self.event_queue.join()
+        with self._idle:
+            self._idle.wait_for(lambda: self._pending <= 0, timeout=timeout)
 
-        # Wait for thread to finish
-        if self._worker_thread:
-            self._worker_thread.join(timeout=timeout)
-            if self._worker_thread.is_alive():
-                logger.warning("Worker thread did not stop gracefully")
+        self._running = False
+        self._stopping = True
+        for _ in self._workers:
+            self._ready.put(None)
+        with self._retry_cond:
+            self._retry_cond.notify_all()
+
+        # Wait for threads to finish
+        for thread in [self._worker_thread, *self._workers]:
+            if thread:
+                thread.join(timeout=timeout)
+                if thread.is_alive():
+                    logger.warning(f"{thread.name} did not stop gracefully")
+        self._workers = []
 
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -430,9 +1368,22 @@ class EventBus:
             **self.stats,
             "queue_size": self.event_queue.qsize(),
             "subscribers_by_type": {
-                evt_type: len(subs) for evt_type, subs in self.subscribers.items()
+                evt_type: len(subs) for evt_type, subs in list(self.subscribers.items())
             },
             "history_size": len(self.event_history),
+            "last_offset": self._last_offset,
+            "workers": len(self._workers),
+            "pending_deliveries": self._pending,
+            "subscriber_backlog": {
+                sub["id"]: len(sub["mailbox"])
+                for subs in list(self.subscribers.values())
+                for sub in subs
+                if sub["mailbox"]
+            },
+            "retry_pending": len(self._retry_heap),
+            "dead_letters": len(self.dead_letters),
+            "sink": self._sink.get_stats(),
+            "writer": self._writer.get_stats() if self._writer is not None else None,
         }
 
     def get_history(
@@ -442,64 +1393,163 @@ class EventBus:
         Get event history
 
         Args:
-            event_type: Filter by event type (optional)
+            event_type: Filter by event type or pattern (optional)
             limit: Maximum number of events to return
 
         Returns:
             List of event dictionaries
         """
         with self._history_lock:
-            events = self.event_history.copy()
-
-        # Filter by event type if specified
-        if event_type:
-            events = [e for e in events if e["type"] == event_type]
-
-        # Return most recent events
-        return events[-limit:]
+            if event_type and _is_pattern(event_type):
+                matched = [
+                    e for e in reversed(self.event_history)
+                    if topic_matches(event_type, e["type"])
+                ][:limit]
+                matched.reverse()
+                return matched
+            if event_type:
+                events = self._history_by_type.get(event_type, ())
+            else:
+                events = self.event_history
+            start = max(0, len(events) - limit)
+            return list(itertools.islice(events, start, None))
 
     def clear_history(self) -> None:
         """Clear event history"""
         with self._history_lock:
             self.event_history.clear()
+            self._history_by_type.clear()
         logger.info("Event history cleared")
 
+    @property
+    def last_offset(self) -> int:
+        """Offset of the most recently published event"""
+        return self._last_offset
+
+    def replay(
+        self,
+        after_offset: int = 0,
+        event_type: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Read published events after an offset, oldest first
+
+        Served from the durable event log when configured (after waiting
+        for this bus's pending appends), otherwise from the in-memory ring
+        buffer.
+
+        Args:
+            after_offset: Exclusive lower bound
+            event_type: Filter by event type (optional)
+            limit: Maximum number of events
+
+        Returns:
+            List of event dictionaries (each with its "offset")
+        """
+        if self.event_store is not None:
+            # Read-your-writes: include events this bus has queued but not appended yet
+            if self._writer is not None:
+                self._writer.flush()
+            return self.event_store.read(after_offset, limit=limit, event_type=event_type)
+
+        with self._history_lock:
+            events = self._history_by_type.get(event_type, ()) if event_type else self.event_history
+            newer = [e for e in reversed(events) if e["offset"] > after_offset]
+        newer.reverse()
+        return newer[:limit]
+
+    def consume(
+        self, group_id: str, event_type: Optional[str] = None, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Read the next events for a consumer group (after its committed offset)
+
+        Call commit() with the offset of the last processed event; until then
+        the same events are returned again (at-least-once delivery).
+
+        Args:
+            group_id: Consumer group name
+            event_type: Filter by event type (optional)
+            limit: Maximum number of events
+
+        Returns:
+            List of event dictionaries
+        """
+        if self.event_store is None:
+            raise RuntimeError("Consumer groups require event_store_path")
+        return self.replay(self.event_store.committed(group_id), event_type, limit)
+
+    def commit(self, group_id: str, offset: int) -> None:
+        """
+        Commit a consumer group's offset
+
+        Args:
+            group_id: Consumer group name
+            offset: Offset of the last processed event
+        """
+        if self.event_store is None:
+            raise RuntimeError("Consumer groups require event_store_path")
+        self.event_store.commit(group_id, offset)
+
     def wait_for_event(
         self,
         event_type: str,
         timeout: float = 10.0,
         condition: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        since_offset: Optional[int] = None,
     ) -> Optional[Dict[str, Any]]:
         """
         Wait for a specific event to be published
 
+        Watches the ring buffer rather than subscribing, so it does not
+        depend on delivery workers. Pass since_offset to also match events
+        that were published before the call.
+
         Args:
-            event_type: Event type to wait for
+            event_type: Event type or pattern to wait for
             timeout: Maximum time to wait in seconds
             condition: Optional function to test event data
+            since_offset: Match events after this offset (default: only new events)
 
         Returns:
             Event data if event found, None if timeout
         """
-        event_found = threading.Event()
-        event_data: Optional[Dict[str, Any]] = None
-
-        def handler(data: Dict[str, Any]) -> None:
-            nonlocal event_data
-            if condition is None or condition(data):
-                event_data = data
-                event_found.set()
+        deadline = time.monotonic() + timeout
 
-        # Subscribe
-        subscription_id = self.subscribe(event_type, handler)
-
-        # Wait
-        event_found.wait(timeout=timeout)
-
-        # Unsubscribe
-        self.unsubscribe(event_type, subscription_id)
-
-        return event_data
+        with self._history_lock:
+            cursor = self._last_offset if since_offset is None else since_offset
+
+        while True:
+            with self._history_cond:
+                candidates = []
+                if _is_pattern(event_type):
+                    source = self.event_history
+                else:
+                    source = self._history_by_type.get(event_type, ())
+                for event in reversed(source):
+                    if event["offset"] <= cursor:
+                        break
+                    if source is self.event_history and not topic_matches(
+                        event_type, event["type"]
+                    ):
+                        continue
+                    candidates.append(event)
+                if candidates:
+                    cursor = candidates[0]["offset"]
+                elif source and source[-1]["offset"] > cursor:
+                    cursor = source[-1]["offset"]
+                    continue
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._history_cond.wait(timeout=remaining)
+                    continue
+
+            for event in reversed(candidates):
+                if condition is None or condition(event["data"]):
+                    return event["data"].copy()
 
 
 def create_event_bus(config: Optional[Dict[str, Any]] = None) -> EventBus:
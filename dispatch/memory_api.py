@@ -127,7 +127,7 @@ class MemoryHandler(BaseHTTPRequestHandler):
                 ).fetchall()
                 conn.close()
 
-                learned = 0
+                entries = []
                 for task in tasks:
                     content = f"Task {task['id']}: status={task['status']}"
                     if task["duration_seconds"]:
@@ -136,12 +136,16 @@ class MemoryHandler(BaseHTTPRequestHandler):
                         content += f", error={task['error'][:100]}"
 
                     mem_type = "task" if task["status"] == "completed" else "error"
-                    self.store.add(
-                        content,
-                        mem_type,
-                        {"task_id": task["id"], "status": task["status"]},
+                    entries.append(
+                        (
+                            content,
+                            mem_type,
+                            {"task_id": task["id"], "status": task["status"]},
+                        )
                     )
-                    learned += 1
+
+                self.store.add_many(entries)
+                learned = len(entries)
 
                 self.send_json({"status": "ok", "learned": learned})
             except Exception as e:
@@ -17,7 +17,7 @@ from pathlib import Path
 # Add dispatch to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from memory_store import MemoryStore
+from memory_store import EMBEDDING_FORMATS, MemoryStore, migrate_embeddings
 
 
 def learn_from_recent_tasks(db_path: str, hours: int = 24):
@@ -43,7 +43,7 @@ def learn_from_recent_tasks(db_path: str, hours: int = 24):
 
     conn.close()
 
-    learned = 0
+    entries = []
 
     for task in tasks:
         # Extract key info
@@ -61,22 +61,24 @@ def learn_from_recent_tasks(db_path: str, hours: int = 24):
         # Determine memory type
         mem_type = "task" if task["status"] == "completed" else "error"
 
-        # Add to memory
-        store.add(
-            content,
-            mem_type,
-            {
-                "task_id": task["id"],
-                "status": task["status"],
-                "node": task["node"],
-                "error": task["error"],
-                "learned_at": datetime.now().isoformat(),
-            },
+        entries.append(
+            (
+                content,
+                mem_type,
+                {
+                    "task_id": task["id"],
+                    "status": task["status"],
+                    "node": task["node"],
+                    "error": task["error"],
+                    "learned_at": datetime.now().isoformat(),
+                },
+            )
         )
 
-        learned += 1
+    # Add to memory in one transaction (already-learned tasks are de-duplicated)
+    store.add_many(entries)
 
-    return learned
+    return len(entries)
 
 
 def get_memory_recommendations(problem: str, limit: int = 3):
@@ -107,6 +109,16 @@ def main():
     parser.add_argument("--hours", type=int, default=24, help="Hours to look back")
     parser.add_argument("--recommend", type=str, help="Get recommendations for problem")
     parser.add_argument("--stats", action="store_true", help="Show memory stats")
+    parser.add_argument(
+        "--migrate", action="store_true", help="Rewrite embeddings in the compact binary format"
+    )
+    parser.add_argument(
+        "--format", choices=EMBEDDING_FORMATS, default="float32", help="Target format for --migrate"
+    )
+    parser.add_argument(
+        "--reembed", action="store_true", help="Recompute all embeddings with the current embedder"
+    )
+    parser.add_argument("--memory-db", type=str, help="Memory store DB (default: ./memory_store.db)")
 
     args = parser.parse_args()
 
@@ -120,10 +132,19 @@ def main():
         print(json.dumps(recommendations, indent=2))
 
     elif args.stats:
-        store = MemoryStore()
+        store = MemoryStore(db_path=args.memory_db)
         stats = store.get_stats()
         print(json.dumps(stats, indent=2))
 
+    elif args.migrate:
+        store = MemoryStore(db_path=args.memory_db)
+        result = migrate_embeddings(store.db_path, args.format)
+        print(json.dumps(result, indent=2))
+
+    elif args.reembed:
+        store = MemoryStore(db_path=args.memory_db)
+        print(f"Re-embedded {store.reembed()} memories")
+
     else:
         parser.print_help()
 
@@ -5,6 +5,10 @@ Memory Store - Embedded vector store adapter for semantic memory
 This module provides long-term memory capabilities for the Dispatch system
 using an embedded vector store, enabling semantic search over events, specs,
 and flight_rules without external dependencies.
+
+Search is served from an in-memory vector index kept in sync with the
+database. NumPy is used for it when installed (with an optional IVF
+approximate index); otherwise a pure Python fallback is used.
 """
 
 import json
@@ -12,11 +16,25 @@ import os
 import pickle
 import hashlib
 import sqlite3
+import struct
+import sys
+from array import array
 from pathlib import Path
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Tuple, Sequence, Iterable
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import math
+import heapq
+import functools
+import threading
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
 
 
 @dataclass
@@ -46,22 +64,44 @@ class MemoryEntry:
         return {k: v for k, v in result.items() if v is not None}
 
 
+@functools.lru_cache(maxsize=1 << 16)
+def _feature_index(token: str, vector_dim: int) -> int:
+    """
+    Map a token to a feature index with a stable hash
+
+    Python's built-in ``hash()`` is salted per process, so vectors written by
+    one process would not match queries from another. BLAKE2b is stable and
+    the LRU cache keeps the hot vocabulary from being rehashed.
+    """
+    digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % vector_dim
+
+
 class SimpleEmbedder:
     """
     Simple character-level and word-level embedding generator.
 
-    Creates vectors based on character n-grams and word patterns.
-    This is a pure Python implementation that works without external ML libraries.
+    Creates vectors based on character n-grams and word patterns using
+    deterministic feature hashing, so every process produces the same vector
+    for the same text. Works without external ML libraries; ``embed_batch``
+    uses NumPy when it is installed. Recent ``embed`` results are kept in an
+    LRU cache so repeated queries are nearly free.
     """
 
-    def __init__(self, vector_dim: int = 256):
+    def __init__(self, vector_dim: int = 256, cache_size: int = 4096):
         """
         Initialize embedder
 
         Args:
             vector_dim: Dimension of output vectors
+            cache_size: Number of recent embeddings to cache (0 disables)
         """
         self.vector_dim = vector_dim
+        self.cache_size = cache_size
+        if cache_size > 0:
+            self._embed_cached = functools.lru_cache(maxsize=cache_size)(self._embed_tuple)
+        else:
+            self._embed_cached = self._embed_tuple
 
     def _text_to_features(self, text: str) -> Dict[int, float]:
         """
@@ -82,7 +122,7 @@ class SimpleEmbedder:
         # Word-based features (uni-grams)
         for word in words:
             # Hash word to feature index
-            idx = hash(f"word_{word}") % self.vector_dim
+            idx = _feature_index(f"word_{word}", self.vector_dim)
             features[idx] = features.get(idx, 0) + 1
 
         # Character n-gram features (3-grams)
@@ -90,7 +130,7 @@ class SimpleEmbedder:
         for i in range(len(text) - 2):
             trigram = text[i:i+3]
             if len(trigram) == 3:
-                idx = hash(f"trigram_{trigram}") % self.vector_dim
+                idx = _feature_index(f"trigram_{trigram}", self.vector_dim)
                 features[idx] = features.get(idx, 0) + 0.5
 
         return features
@@ -118,6 +158,10 @@ class SimpleEmbedder:
 
         return vector
 
+    def _embed_tuple(self, text: str) -> Tuple[float, ...]:
+        """Uncached embedding as an immutable tuple (safe to share from the cache)"""
+        return tuple(self._features_to_vector(self._text_to_features(text)))
+
     def embed(self, text: str) -> List[float]:
         """
         Generate embedding for text
@@ -128,20 +172,537 @@ class SimpleEmbedder:
         Returns:
             Vector representation as list of floats
         """
-        features = self._text_to_features(text)
-        return self._features_to_vector(features)
+        return list(self._embed_cached(text))
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    def embed_batch(self, texts: List[str]) -> List[Sequence[float]]:
         """
         Generate embeddings for multiple texts
 
+        With NumPy the feature counts of the whole batch are accumulated into
+        one matrix and normalized row-wise; the batch bypasses the query cache.
+
         Args:
             texts: List of input texts
 
         Returns:
-            List of vectors
+            List of vectors (float32 NumPy rows when NumPy is available)
         """
-        return [self.embed(text) for text in texts]
+        if not NUMPY_AVAILABLE:
+            return [self.embed(text) for text in texts]
+        if not texts:
+            return []
+
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for row, text in enumerate(texts):
+            for idx, val in self._text_to_features(text).items():
+                rows.append(row)
+                cols.append(idx)
+                vals.append(val)
+
+        flat = np.bincount(
+            np.asarray(rows, dtype=np.int64) * self.vector_dim + np.asarray(cols, dtype=np.int64),
+            weights=np.asarray(vals, dtype=np.float64),
+            minlength=len(texts) * self.vector_dim,
+        )
+        matrix = flat.reshape(len(texts), self.vector_dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return list(matrix.astype(np.float32))
+
+
+# Embedding blob format (v1):
+#   magic "ME" | version u8 | dtype u8 | dim u32      (8 bytes, little-endian)
+#   float32: dim * f32
+#   int8:    scale f32 | dim * i8   (value = q * scale)
+# Rows written before the format existed are pickled lists and start with
+# the pickle protocol byte (0x80), so they can never collide with the magic.
+EMBEDDING_FORMATS = ("float32", "int8")
+_BLOB_MAGIC = b"ME"
+_BLOB_VERSION = 1
+_BLOB_DTYPES = {"float32": 0, "int8": 1}
+_BLOB_HEADER = struct.Struct("<2sBBI")
+
+
+def encode_embedding(embedding: Sequence[float], embedding_format: str = "float32") -> bytes:
+    """
+    Encode an embedding into the versioned binary blob format
+
+    Args:
+        embedding: Vector to encode
+        embedding_format: "float32" or "int8" (symmetric quantization)
+
+    Returns:
+        Blob bytes
+    """
+    if embedding_format not in _BLOB_DTYPES:
+        raise ValueError(f"Unknown embedding format: {embedding_format}")
+
+    header = _BLOB_HEADER.pack(_BLOB_MAGIC, _BLOB_VERSION,
+                               _BLOB_DTYPES[embedding_format], len(embedding))
+
+    if embedding_format == "float32":
+        if NUMPY_AVAILABLE:
+            return header + np.asarray(embedding, dtype="<f4").tobytes()
+        values = array("f", embedding)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return header + values.tobytes()
+
+    peak = max((abs(v) for v in embedding), default=0.0)
+    scale = peak / 127.0 if peak > 0 else 1.0
+    quantized = array("b", (int(round(v / scale)) for v in embedding))
+    return header + struct.pack("<f", scale) + quantized.tobytes()
+
+
+def decode_embedding(data: bytes) -> Sequence[float]:
+    """
+    Decode an embedding blob (binary format or legacy pickle)
+
+    With NumPy, float32 blobs are returned as a read-only view over ``data``
+    without copying.
+
+    Args:
+        data: Blob bytes as stored in the memories table
+
+    Returns:
+        Vector as a NumPy array (if available) or a sequence of floats
+    """
+    if data[:2] != _BLOB_MAGIC:
+        return pickle.loads(data)
+
+    _, version, dtype, dim = _BLOB_HEADER.unpack_from(data)
+    if version != _BLOB_VERSION:
+        raise ValueError(f"Unsupported embedding blob version: {version}")
+
+    offset = _BLOB_HEADER.size
+    if dtype == _BLOB_DTYPES["float32"]:
+        if NUMPY_AVAILABLE:
+            return np.frombuffer(data, dtype="<f4", count=dim, offset=offset)
+        values = array("f")
+        values.frombytes(data[offset:offset + 4 * dim])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    if dtype == _BLOB_DTYPES["int8"]:
+        (scale,) = struct.unpack_from("<f", data, offset)
+        offset += 4
+        if NUMPY_AVAILABLE:
+            return np.frombuffer(data, dtype=np.int8, count=dim, offset=offset) * np.float32(scale)
+        return [q * scale for q in array("b", data[offset:offset + dim])]
+
+    raise ValueError(f"Unknown embedding blob dtype: {dtype}")
+
+
+def migrate_embeddings(db_path: str, embedding_format: str = "float32",
+                       batch_size: int = 1000, vacuum: bool = True) -> Dict[str, int]:
+    """
+    Rewrite every embedding in a memory_store.db in place
+
+    Converts legacy pickled rows (and rows in another binary format) to
+    ``embedding_format`` inside a single transaction, then VACUUMs the file
+    to give the freed pages back. Safe to re-run: rows already in the
+    target format are skipped.
+
+    Args:
+        db_path: Path to the memory store database
+        embedding_format: Target format ("float32" or "int8")
+        batch_size: Rows rewritten per executemany batch
+        vacuum: Compact the database file afterwards
+
+    Returns:
+        Dictionary with migrated/skipped counts and file sizes
+
+    Example:
+        migrate_embeddings("memory_store.db", "int8")
+    """
+    if embedding_format not in _BLOB_DTYPES:
+        raise ValueError(f"Unknown embedding format: {embedding_format}")
+
+    target = _BLOB_DTYPES[embedding_format]
+    size_before = os.path.getsize(db_path)
+    migrated = 0
+    skipped = 0
+
+    conn = sqlite3.connect(db_path)
+    try:
+        read_cursor = conn.cursor()
+        write_cursor = conn.cursor()
+        read_cursor.execute("BEGIN IMMEDIATE")
+        read_cursor.execute("SELECT rowid, embedding FROM memories")
+
+        while True:
+            rows = read_cursor.fetchmany(batch_size)
+            if not rows:
+                break
+
+            updates = []
+            for rowid, blob in rows:
+                if (blob[:2] == _BLOB_MAGIC and blob[2] == _BLOB_VERSION
+                        and blob[3] == target):
+                    skipped += 1
+                    continue
+                vector = decode_embedding(blob)
+                updates.append((encode_embedding(vector, embedding_format), rowid))
+
+            if updates:
+                write_cursor.executemany(
+                    "UPDATE memories SET embedding = ? WHERE rowid = ?", updates
+                )
+                migrated += len(updates)
+
+        conn.commit()
+        if vacuum and migrated:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    return {
+        "migrated": migrated,
+        "skipped": skipped,
+        "db_size_before": size_before,
+        "db_size_after": os.path.getsize(db_path),
+    }
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    """L2-normalize a vector (zero vectors are returned unchanged)"""
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        return list(vector)
+    return [v / norm for v in vector]
+
+
+class _IVFIndex:
+    """
+    Inverted-file (IVF) approximate index for a single partition
+
+    Rows are assigned to the nearest of ``nlist`` centroids trained with
+    spherical k-means. A query only scores the rows that belong to its
+    ``nprobe`` closest centroids instead of the whole partition.
+    """
+
+    def __init__(self, matrix: "np.ndarray", nlist: int, iterations: int = 10,
+                 seed: int = 0):
+        """
+        Train centroids and assign every row
+
+        Args:
+            matrix: Normalized row matrix of the partition (n x dim)
+            nlist: Number of centroids / inverted lists
+            iterations: k-means iterations
+            seed: RNG seed for centroid initialization
+        """
+        rng = np.random.default_rng(seed)
+        n = matrix.shape[0]
+        nlist = max(1, min(nlist, n))
+
+        # Train on a bounded sample so rebuilds stay cheap on large partitions
+        sample_size = min(n, nlist * 64)
+        sample = matrix[rng.choice(n, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members) == 0:
+                    continue
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm > 0:
+                    centroids[c] = centroid / norm
+
+        self.centroids = centroids.astype(np.float32)
+        self.trained_size = n
+        self.assignments = np.empty(max(n, 16), dtype=np.int32)
+        self.assignments[:n] = self.assign(matrix)
+
+    def assign(self, vectors: "np.ndarray") -> "np.ndarray":
+        """Return the nearest centroid for each row of ``vectors``"""
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def candidates(self, query: "np.ndarray", size: int, nprobe: int) -> "np.ndarray":
+        """Return row positions of the ``nprobe`` lists closest to ``query``"""
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.nonzero(np.isin(self.assignments[:size], probes))[0]
+
+
+class _Partition:
+    """
+    Vectors of one memory_type
+
+    With NumPy the vectors live in a growable float32 matrix; deletes move
+    the last row into the freed slot so the matrix stays dense. Without
+    NumPy the same layout is kept as a list of lists.
+    """
+
+    def __init__(self, vector_dim: int):
+        self.vector_dim = vector_dim
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.ivf: Optional[_IVFIndex] = None
+        if NUMPY_AVAILABLE:
+            self.matrix = np.zeros((16, vector_dim), dtype=np.float32)
+        else:
+            self.matrix = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, memory_id: str, vector: List[float]) -> None:
+        """Append (or overwrite) the vector for ``memory_id``"""
+        if memory_id in self.positions:
+            pos = self.positions[memory_id]
+        else:
+            pos = len(self.ids)
+            self.ids.append(memory_id)
+            self.positions[memory_id] = pos
+
+        if NUMPY_AVAILABLE:
+            if pos >= self.matrix.shape[0]:
+                grown = np.zeros((self.matrix.shape[0] * 2, self.vector_dim),
+                                 dtype=np.float32)
+                grown[:pos] = self.matrix[:pos]
+                self.matrix = grown
+            row = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(row)
+            self.matrix[pos] = row / norm if norm > 0 else row
+            if self.ivf is not None:
+                if pos >= len(self.ivf.assignments):
+                    grown = np.empty(len(self.ivf.assignments) * 2, dtype=np.int32)
+                    grown[:pos] = self.ivf.assignments[:pos]
+                    self.ivf.assignments = grown
+                self.ivf.assignments[pos] = self.ivf.assign(self.matrix[pos:pos + 1])[0]
+        else:
+            row = _normalize(vector)
+            if pos == len(self.matrix):
+                self.matrix.append(row)
+            else:
+                self.matrix[pos] = row
+
+    def remove(self, memory_id: str) -> bool:
+        """Remove ``memory_id``, moving the last row into its slot"""
+        pos = self.positions.pop(memory_id, None)
+        if pos is None:
+            return False
+
+        last = len(self.ids) - 1
+        if pos != last:
+            moved_id = self.ids[last]
+            self.ids[pos] = moved_id
+            self.positions[moved_id] = pos
+            self.matrix[pos] = self.matrix[last]
+            if self.ivf is not None:
+                self.ivf.assignments[pos] = self.ivf.assignments[last]
+        self.ids.pop()
+        if not NUMPY_AVAILABLE:
+            self.matrix.pop()
+        return True
+
+    def build_ivf(self, nlist: Optional[int] = None) -> None:
+        """(Re)train the IVF index over the current rows"""
+        size = len(self.ids)
+        if not NUMPY_AVAILABLE or size == 0:
+            self.ivf = None
+            return
+        nlist = nlist or max(1, int(math.sqrt(size)))
+        self.ivf = _IVFIndex(self.matrix[:size], nlist)
+
+    def search(self, query: Any, limit: int, min_score: float,
+               approximate: bool = False, nprobe: int = 8) -> List[Tuple[float, str]]:
+        """Return up to ``limit`` (score, memory_id) pairs, best first"""
+        size = len(self.ids)
+        if size == 0 or limit <= 0:
+            return []
+
+        if not NUMPY_AVAILABLE:
+            scored = (
+                (sum(q * v for q, v in zip(query, row)), self.ids[pos])
+                for pos, row in enumerate(self.matrix)
+            )
+            return heapq.nlargest(
+                limit, (item for item in scored if item[0] >= min_score),
+                key=lambda item: item[0]
+            )
+
+        if approximate and self.ivf is not None:
+            rows = self.ivf.candidates(query, size, nprobe)
+            scores = self.matrix[rows] @ query
+        else:
+            rows = None
+            scores = self.matrix[:size] @ query
+
+        keep = np.nonzero(scores >= min_score)[0]
+        if len(keep) > limit:
+            keep = keep[np.argpartition(-scores[keep], limit - 1)[:limit]]
+        keep = keep[np.argsort(-scores[keep], kind="stable")]
+
+        positions = rows[keep] if rows is not None else keep
+        return [(float(scores[k]), self.ids[p]) for k, p in zip(keep, positions)]
+
+
+class VectorIndex:
+    """
+    In-memory index of normalized embeddings, partitioned by memory_type
+
+    Each memory_type gets its own partition, so a filtered search only
+    scores its own slice. Exact search is one matrix-vector product per
+    partition; partitions with at least ``ann_threshold`` rows also build an
+    IVF index that ``search(approximate=True)`` uses.
+
+    Example:
+        index = VectorIndex(vector_dim=256)
+        index.add("mem-1", "task", embedding)
+        hits = index.search(query_embedding, memory_type="task", limit=5)
+    """
+
+    def __init__(self, vector_dim: int = 256, ann_threshold: int = 4096,
+                 nprobe: int = 8):
+        """
+        Initialize VectorIndex
+
+        Args:
+            vector_dim: Dimension of vectors
+            ann_threshold: Minimum partition size before an IVF index is built
+            nprobe: Number of IVF lists scanned per approximate query
+        """
+        self.vector_dim = vector_dim
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.partitions: Dict[str, _Partition] = {}
+        self._types: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._types
+
+    def add(self, memory_id: str, memory_type: str, embedding: List[float]) -> None:
+        """Add or replace the embedding of a memory"""
+        previous_type = self._types.get(memory_id)
+        if previous_type is not None and previous_type != memory_type:
+            self.remove(memory_id)
+
+        partition = self.partitions.get(memory_type)
+        if partition is None:
+            partition = self.partitions[memory_type] = _Partition(self.vector_dim)
+        partition.add(memory_id, embedding)
+        self._types[memory_id] = memory_type
+        self._maybe_rebuild_ivf(partition)
+
+    def add_many(self, entries: List[Tuple[str, str, Sequence[float]]]) -> None:
+        """
+        Add (memory_id, memory_type, embedding) entries in bulk
+
+        IVF indexes are (re)trained once at the end instead of every time a
+        partition crosses a size threshold during the load.
+        """
+        touched = set()
+        for memory_id, memory_type, embedding in entries:
+            previous_type = self._types.get(memory_id)
+            if previous_type is not None and previous_type != memory_type:
+                self.remove(memory_id)
+
+            partition = self.partitions.get(memory_type)
+            if partition is None:
+                partition = self.partitions[memory_type] = _Partition(self.vector_dim)
+            partition.add(memory_id, embedding)
+            self._types[memory_id] = memory_type
+            touched.add(memory_type)
+
+        for memory_type in touched:
+            self._maybe_rebuild_ivf(self.partitions[memory_type])
+
+    def remove(self, memory_id: str) -> bool:
+        """Remove a memory; returns False if it was not indexed"""
+        memory_type = self._types.pop(memory_id, None)
+        if memory_type is None:
+            return False
+        partition = self.partitions[memory_type]
+        partition.remove(memory_id)
+        if len(partition) == 0:
+            del self.partitions[memory_type]
+        else:
+            self._maybe_rebuild_ivf(partition)
+        return True
+
+    def clear(self, memory_type: Optional[str] = None) -> None:
+        """Drop one partition, or everything if memory_type is None"""
+        if memory_type is None:
+            self.partitions.clear()
+            self._types.clear()
+            return
+        partition = self.partitions.pop(memory_type, None)
+        if partition is not None:
+            for memory_id in partition.ids:
+                self._types.pop(memory_id, None)
+
+    def _maybe_rebuild_ivf(self, partition: _Partition) -> None:
+        """Train the IVF index once a partition is large enough, retrain after 2x drift"""
+        if not NUMPY_AVAILABLE:
+            return
+        size = len(partition)
+        if size < self.ann_threshold:
+            partition.ivf = None
+            return
+        ivf = partition.ivf
+        if ivf is None or size >= ivf.trained_size * 2 or size * 2 <= ivf.trained_size:
+            partition.build_ivf()
+
+    def search(self, query_embedding: List[float], memory_type: Optional[str] = None,
+               limit: int = 10, min_score: float = 0.0,
+               approximate: bool = False) -> List[Tuple[float, str]]:
+        """
+        Find the most similar memories
+
+        Args:
+            query_embedding: Query vector (normalized internally)
+            memory_type: Restrict to one partition (optional)
+            limit: Maximum number of results
+            min_score: Minimum cosine similarity
+            approximate: Use IVF indexes where available
+
+        Returns:
+            List of (score, memory_id) tuples, best first
+        """
+        if memory_type is not None:
+            partitions = [self.partitions[memory_type]] if memory_type in self.partitions else []
+        else:
+            partitions = list(self.partitions.values())
+        if not partitions:
+            return []
+
+        if NUMPY_AVAILABLE:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm > 0:
+                query = query / norm
+        else:
+            query = _normalize(query_embedding)
+
+        hits: List[Tuple[float, str]] = []
+        for partition in partitions:
+            hits.extend(partition.search(query, limit, min_score,
+                                         approximate=approximate, nprobe=self.nprobe))
+        if len(partitions) == 1:
+            return hits
+        return heapq.nlargest(limit, hits, key=lambda item: item[0])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return partition sizes and ANN state"""
+        return {
+            "backend": "numpy" if NUMPY_AVAILABLE else "python",
+            "size": len(self),
+            "partitions": {
+                name: {"size": len(p), "ivf_lists": len(p.ivf.centroids) if p.ivf is not None else 0}
+                for name, p in self.partitions.items()
+            },
+        }
 
 
 class MemoryStore:
@@ -159,7 +720,11 @@ class MemoryStore:
 
     def __init__(self, db_path: Optional[str] = None,
                  vector_dim: int = 256,
-                 embedder: Optional[Any] = None):
+                 embedder: Optional[Any] = None,
+                 embedding_format: str = "float32",
+                 approximate: bool = False,
+                 ann_threshold: int = 4096,
+                 ann_nprobe: int = 8):
         """
         Initialize MemoryStore
 
@@ -167,13 +732,29 @@ class MemoryStore:
             db_path: Path to SQLite database (default: ./memory_store.db)
             vector_dim: Dimension of vectors (default: 256)
             embedder: Custom embedder instance (default: SimpleEmbedder)
+            embedding_format: Blob format for new rows ("float32" or "int8")
+            approximate: Use the IVF index for searches by default
+            ann_threshold: Partition size at which the IVF index is built
+            ann_nprobe: Number of IVF lists scanned per approximate search
         """
         if db_path is None:
             db_path = os.path.join(os.getcwd(), "memory_store.db")
+        if embedding_format not in EMBEDDING_FORMATS:
+            raise ValueError(f"Unknown embedding format: {embedding_format}")
 
         self.db_path = db_path
+        self.embedding_format = embedding_format
         self.vector_dim = vector_dim
         self.embedder = embedder or SimpleEmbedder(vector_dim=vector_dim)
+        self.approximate = approximate
+
+        # In-memory vector index, loaded lazily on first search
+        self._index = VectorIndex(vector_dim=vector_dim,
+                                  ann_threshold=ann_threshold,
+                                  nprobe=ann_nprobe)
+        self._index_lock = threading.RLock()
+        # memory_meta version the index was loaded at (None = not loaded)
+        self._index_marker: Optional[int] = None
 
         # Initialize database
         self._init_db()
@@ -207,22 +788,65 @@ class MemoryStore:
             ON memories(created_at)
         """)
 
+        # Content hash column for bulk-ingest de-duplication (added later,
+        # so older databases are upgraded and backfilled in place)
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(memories)")}
+        if "content_hash" not in columns:
+            cursor.execute("ALTER TABLE memories ADD COLUMN content_hash TEXT")
+            rows = cursor.execute("SELECT rowid, content FROM memories").fetchall()
+            cursor.executemany(
+                "UPDATE memories SET content_hash = ? WHERE rowid = ?",
+                [(self._content_hash(content), rowid) for rowid, content in rows]
+            )
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_hash
+            ON memories(content_hash, memory_type)
+        """)
+
+        # Version counter bumped by triggers on every row change, so any
+        # process (or raw SQL) writing the file invalidates loaded indexes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS memory_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        cursor.execute(
+            "INSERT OR IGNORE INTO memory_meta (key, value) VALUES ('version', 0)"
+        )
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS memories_version_{event.lower()}
+                AFTER {event} ON memories
+                BEGIN
+                    UPDATE memory_meta SET value = value + 1 WHERE key = 'version';
+                END
+            """)
+
         conn.commit()
         conn.close()
 
-    def _generate_id(self, content: str) -> str:
-        """Generate unique memory ID from content hash"""
+    @staticmethod
+    def _content_hash(content: str) -> str:
+        """Full SHA-256 of the content, used for de-duplication"""
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _generate_id(self, content: str, memory_type: Optional[str] = None) -> str:
+        """Generate unique memory ID from content hash (optionally salted by type)"""
+        if memory_type is not None:
+            content = f"{memory_type}\0{content}"
         content_hash = hashlib.sha256(content.encode()).hexdigest()[:16]
         timestamp = datetime.now().isoformat(timespec='seconds')
         return f"mem-{content_hash}-{timestamp.replace(':', '-')}"
 
     def _serialize_embedding(self, embedding: List[float]) -> bytes:
         """Serialize embedding to bytes for storage"""
-        return pickle.dumps(embedding)
+        return encode_embedding(embedding, self.embedding_format)
 
-    def _deserialize_embedding(self, data: bytes) -> List[float]:
-        """Deserialize embedding from storage"""
-        return pickle.loads(data)
+    def _deserialize_embedding(self, data: bytes) -> Sequence[float]:
+        """Deserialize embedding from storage (binary or legacy pickle)"""
+        return decode_embedding(data)
 
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """
@@ -244,8 +868,47 @@ class MemoryStore:
 
         return dot_product / (norm1 * norm2)
 
+    def _read_version(self, cursor: sqlite3.Cursor) -> int:
+        """Persisted change counter of the memories table (see _init_db)"""
+        cursor.execute("SELECT value FROM memory_meta WHERE key = 'version'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def _ensure_index(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Make sure the in-memory index mirrors the database
+
+        Writes made through this instance update the index directly. If the
+        stored version moved underneath us (another process, or any write
+        this instance did not apply to the index), the index is reloaded
+        from scratch.
+        """
+        marker = self._read_version(cursor)
+        if marker == self._index_marker:
+            return
+
+        self._index.clear()
+        cursor.execute("SELECT memory_id, memory_type, embedding FROM memories")
+        self._index.add_many([
+            (memory_id, mem_type, self._deserialize_embedding(embedding_blob))
+            for memory_id, mem_type, embedding_blob in cursor.fetchall()
+        ])
+        self._index_marker = marker
+
+    def _bump_marker(self, before: int, after: int) -> None:
+        """
+        Track our own writes so they don't trigger a full reload
+
+        ``before``/``after`` are the versions read inside the write
+        transaction. If the index was not current at ``before``, someone
+        else wrote in between and the marker is left stale on purpose.
+        """
+        if self._index_marker is not None and self._index_marker == before:
+            self._index_marker = after
+
     def add(self, content: str, memory_type: str,
-            metadata: Optional[Dict[str, Any]] = None) -> str:
+            metadata: Optional[Dict[str, Any]] = None,
+            dedup: bool = False) -> str:
         """
         Add a memory entry
 
@@ -253,56 +916,144 @@ class MemoryStore:
             content: The memory content to store
             memory_type: Type of memory (event, spec, rule, task, error)
             metadata: Additional metadata to attach
+            dedup: If True, return the existing memory instead of inserting
+                when the same content is already stored for memory_type
+                (its metadata is kept, the new metadata is dropped)
 
         Returns:
-            Memory ID if successful
+            Memory ID of the new entry (or of the existing one with dedup)
 
         Example:
             store.add("Task S01 completed successfully", "task")
         """
-        # Generate embedding
-        embedding = self.embedder.embed(content)
+        return self.add_many([(content, memory_type, metadata)], dedup=dedup)[0]
+
+    def add_many(self, entries: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+                 batch_size: int = 256, dedup: bool = True) -> List[str]:
+        """
+        Add many memory entries in one transaction
+
+        Embeddings are computed with ``embedder.embed_batch`` and rows are
+        inserted with ``executemany`` under a single commit. With ``dedup``,
+        entries whose content (per memory_type) already exists, in the
+        database or earlier in the same call, are not inserted again.
+
+        Args:
+            entries: Iterable of (content, memory_type, metadata) tuples
+            batch_size: Number of texts embedded per embed_batch call
+            dedup: Skip entries whose content is already stored
+
+        Returns:
+            Memory IDs aligned with ``entries``; with dedup, duplicates map to
+            the ID of the existing memory
 
-        # Generate ID
-        memory_id = self._generate_id(content)
-        created_at = datetime.now().isoformat()
+        Example:
+            store.add_many([("Task S01 completed", "task", None),
+                            ("Import error fixed", "error", {"task_id": "S02"})])
+        """
+        entries = list(entries)
+        if not entries:
+            return []
 
-        # Serialize metadata
-        metadata_json = json.dumps(metadata) if metadata else None
+        hashes = [self._content_hash(content) for content, _, _ in entries]
+        memory_ids: List[Optional[str]] = [None] * len(entries)
 
-        # Store in database
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
         try:
-            cursor.execute("""
+            cursor.execute("BEGIN IMMEDIATE")
+            version = self._read_version(cursor)
+
+            # Look up hashes that are already stored (chunked to stay under
+            # SQLite's bound-parameter limit)
+            known: Dict[Tuple[str, str], str] = {}
+            unique_hashes = list(set(hashes)) if dedup else []
+            for start in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f"""
+                    SELECT content_hash, memory_type, memory_id
+                    FROM memories WHERE content_hash IN ({placeholders})
+                """, chunk)
+                for content_hash, mem_type, memory_id in cursor.fetchall():
+                    known.setdefault((content_hash, mem_type), memory_id)
+
+            pending = []
+            for i, (content, memory_type, _) in enumerate(entries):
+                key = (hashes[i], memory_type)
+                if dedup and key in known:
+                    memory_ids[i] = known[key]
+                    continue
+                known[key] = memory_ids[i] = self._generate_id(content, memory_type)
+                pending.append(i)
+
+            rows = []
+            indexed = []
+            created_at = datetime.now().isoformat()
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                embeddings = self.embedder.embed_batch([entries[i][0] for i in batch])
+                for i, embedding in zip(batch, embeddings):
+                    content, memory_type, metadata = entries[i]
+                    rows.append((
+                        memory_ids[i],
+                        content,
+                        memory_type,
+                        self._serialize_embedding(embedding),
+                        json.dumps(metadata) if metadata else None,
+                        created_at,
+                        hashes[i]
+                    ))
+                    indexed.append((memory_ids[i], memory_type, embedding))
+
+            cursor.executemany("""
                 INSERT INTO memories
-                (memory_id, content, memory_type, embedding, metadata, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                memory_id,
-                content,
-                memory_type,
-                self._serialize_embedding(embedding),
-                metadata_json,
-                created_at
-            ))
+                (memory_id, content, memory_type, embedding, metadata, created_at,
+                 content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            new_version = self._read_version(cursor)
             conn.commit()
+
+            with self._index_lock:
+                if self._index_marker is not None and indexed:
+                    self._index.add_many(indexed)
+                    self._bump_marker(version, new_version)
+        except Exception:
+            conn.rollback()
+            raise
         finally:
             conn.close()
 
-        return memory_id
+        return memory_ids
+
+    def bulk_writer(self, batch_size: int = 1000) -> "BulkWriter":
+        """
+        Context manager that buffers adds and flushes them via add_many
+
+        Example:
+            with store.bulk_writer() as writer:
+                for event in events:
+                    writer.add(event.text, "event", {"id": event.id})
+        """
+        return BulkWriter(self, batch_size=batch_size)
 
     def search(self, query: str, memory_type: Optional[str] = None,
-               limit: int = 10, min_score: float = 0.0) -> List[Dict[str, Any]]:
+               limit: int = 10, min_score: float = 0.0,
+               approximate: Optional[bool] = None) -> List[Dict[str, Any]]:
         """
         Search memory entries by semantic similarity
 
+        Scores come from the in-memory vector index; only the winning rows
+        are read back from SQLite.
+
         Args:
             query: Search query string
             memory_type: Filter by memory type (optional)
             limit: Maximum number of results (default: 10)
             min_score: Minimum similarity score (default: 0.0)
+            approximate: Use the IVF index (default: store setting)
 
         Returns:
             List of memory entries with similarity scores
@@ -310,53 +1061,49 @@ class MemoryStore:
         Example:
             results = store.search("task completion patterns", "task", limit=5)
         """
+        if approximate is None:
+            approximate = self.approximate
+
         # Generate query embedding
         query_embedding = self.embedder.embed(query)
 
-        results = []
-
-        # Query database
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
         try:
-            # Build query
-            sql = "SELECT memory_id, content, memory_type, embedding, metadata, created_at FROM memories"
-            params = []
-
-            if memory_type:
-                sql += " WHERE memory_type = ?"
-                params.append(memory_type)
-
-            cursor.execute(sql, params)
-
-            # Calculate similarity for each result
-            for row in cursor.fetchall():
-                memory_id, content, mem_type, embedding_blob, metadata_json, created_at = row
-                embedding = self._deserialize_embedding(embedding_blob)
-
-                # Calculate similarity
-                score = self._cosine_similarity(query_embedding, embedding)
-
-                if score >= min_score:
-                    # Parse metadata
-                    metadata = json.loads(metadata_json) if metadata_json else None
-
-                    results.append({
-                        "memory_id": memory_id,
-                        "content": content,
-                        "memory_type": mem_type,
-                        "score": score,
-                        "metadata": metadata,
-                        "created_at": created_at
-                    })
-
+            with self._index_lock:
+                self._ensure_index(cursor)
+                hits = self._index.search(query_embedding, memory_type,
+                                          limit=limit, min_score=min_score,
+                                          approximate=approximate)
+            if not hits:
+                return []
+
+            placeholders = ",".join("?" * len(hits))
+            cursor.execute(f"""
+                SELECT memory_id, content, memory_type, metadata, created_at
+                FROM memories WHERE memory_id IN ({placeholders})
+            """, [memory_id for _, memory_id in hits])
+            rows = {row[0]: row for row in cursor.fetchall()}
         finally:
             conn.close()
 
-        # Sort by similarity score (descending) and limit
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:limit]
+        results = []
+        for score, memory_id in hits:
+            row = rows.get(memory_id)
+            if row is None:
+                continue
+            _, content, mem_type, metadata_json, created_at = row
+            results.append({
+                "memory_id": memory_id,
+                "content": content,
+                "memory_type": mem_type,
+                "score": score,
+                "metadata": json.loads(metadata_json) if metadata_json else None,
+                "created_at": created_at
+            })
+
+        return results
 
     def delete(self, memory_id: str) -> bool:
         """
@@ -375,9 +1122,18 @@ class MemoryStore:
         cursor = conn.cursor()
 
         try:
+            cursor.execute("BEGIN IMMEDIATE")
+            version = self._read_version(cursor)
             cursor.execute("DELETE FROM memories WHERE memory_id = ?", (memory_id,))
+            deleted = cursor.rowcount > 0
+            new_version = self._read_version(cursor)
             conn.commit()
-            return cursor.rowcount > 0
+
+            with self._index_lock:
+                if deleted and self._index_marker is not None:
+                    self._index.remove(memory_id)
+                    self._bump_marker(version, new_version)
+            return deleted
         finally:
             conn.close()
 
@@ -521,7 +1277,8 @@ class MemoryStore:
                 "vector_dim": self.vector_dim,
                 "db_path": self.db_path,
                 "db_size_bytes": db_size,
-                "db_size_mb": db_size / (1024 * 1024)
+                "db_size_mb": db_size / (1024 * 1024),
+                "index": self._index.get_stats()
             }
         finally:
             conn.close()
@@ -540,18 +1297,65 @@ class MemoryStore:
         cursor = conn.cursor()
 
         try:
+            cursor.execute("BEGIN IMMEDIATE")
+            version = self._read_version(cursor)
             if memory_type:
                 cursor.execute("DELETE FROM memories WHERE memory_type = ?", (memory_type,))
             else:
                 cursor.execute("DELETE FROM memories")
+            deleted = cursor.rowcount
+            new_version = self._read_version(cursor)
+            conn.commit()
+
+            with self._index_lock:
+                if self._index_marker is not None:
+                    self._index.clear(memory_type)
+                    self._bump_marker(version, new_version)
+            return deleted
+        finally:
+            conn.close()
+
+    def reembed(self, batch_size: int = 500) -> int:
+        """
+        Recompute every stored embedding with the current embedder
+
+        Needed once for rows written by the old salted-hash embedder, whose
+        vectors differ from process to process.
 
+        Args:
+            batch_size: Rows embedded and written per batch
+
+        Returns:
+            Number of rows re-embedded
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        updated = 0
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            rows = cursor.execute("SELECT rowid, content FROM memories").fetchall()
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                embeddings = self.embedder.embed_batch([content for _, content in batch])
+                cursor.executemany(
+                    "UPDATE memories SET embedding = ? WHERE rowid = ?",
+                    [(self._serialize_embedding(embedding), rowid)
+                     for (rowid, _), embedding in zip(batch, embeddings)]
+                )
+                updated += len(batch)
             conn.commit()
-            return cursor.rowcount
         finally:
             conn.close()
 
+        with self._index_lock:
+            self._index.clear()
+            self._index_marker = None
+
+        return updated
+
     def rebuild_indexes(self) -> None:
-        """Rebuild database indexes"""
+        """Rebuild database indexes and force a reload of the vector index"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
@@ -561,6 +1365,50 @@ class MemoryStore:
         finally:
             conn.close()
 
+        with self._index_lock:
+            self._index.clear()
+            self._index_marker = None
+
+
+class BulkWriter:
+    """
+    Buffered writer for MemoryStore bulk ingest
+
+    Entries are collected in memory and written with ``MemoryStore.add_many``
+    every ``batch_size`` entries and on exit, so a backfill pays one
+    transaction per batch instead of one per memory. Entries still buffered
+    when the ``with`` block raises are flushed before the exception
+    propagates.
+    """
+
+    def __init__(self, store: MemoryStore, batch_size: int = 1000):
+        self.store = store
+        self.batch_size = batch_size
+        self.memory_ids: List[str] = []
+        self._buffer: List[Tuple[str, str, Optional[Dict[str, Any]]]] = []
+
+    def add(self, content: str, memory_type: str,
+            metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Queue a memory entry; flushes when the buffer is full"""
+        self._buffer.append((content, memory_type, metadata))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered entries"""
+        if not self._buffer:
+            return
+        buffer, self._buffer = self._buffer, []
+        self.memory_ids.extend(self.store.add_many(buffer))
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Flush even when the block raised; the original exception still
+        # propagates (a failing flush raises with it as __context__)
+        self.flush()
+
 
 def create_memory_store(db_path: Optional[str] = None,
                         vector_dim: int = 256) -> MemoryStore:
@@ -638,6 +1486,35 @@ class DispatchMemory:
 
         return self._store.add(data, new_type, metadata)
 
+    def add_many(self, entries: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+                 user_id: str = "dispatch") -> List[str]:
+        """
+        Add many memory entries in one transaction (see MemoryStore.add_many)
+
+        Args:
+            entries: Iterable of (data, memory_type, metadata) tuples
+            user_id: User/agent identifier stored in metadata
+
+        Returns:
+            Memory IDs aligned with ``entries`` (empty if disabled)
+        """
+        if not self._check_available():
+            return []
+
+        type_mapping = {
+            "task": "task",
+            "error": "error",
+            "user": "task",
+            "system": "task"
+        }
+        mapped = []
+        for data, memory_type, metadata in entries:
+            metadata = dict(metadata or {})
+            metadata["user_id"] = user_id
+            mapped.append((data, type_mapping.get(memory_type, memory_type), metadata))
+
+        return self._store.add_many(mapped)
+
     def search(self, query: str, user_id: str = "dispatch",
                limit: int = 5, memory_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""EventBus tests: durable offsets, consumer groups, retries and backpressure"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from event_bus import EventBus, EventLog, _EventSink
+
+
+def make_bus(store_path, **config):
+    return EventBus(
+        {"event_store_path": str(store_path), "index_events": False, **config}
+    )
+
+
+def test_offsets_resume_after_restart():
+    """A new bus on the same store continues the offsets, no gaps"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Path(tmp) / "events.db"
+        bus = make_bus(store)
+        for i in range(3):
+            bus.publish("task.started", {"n": i})
+        bus.stop()
+        assert bus.last_offset == 3
+
+        bus = make_bus(store)
+        bus.publish("task.completed", {"n": 3})
+        bus.stop()
+
+        events = bus.replay(0)
+        assert [e["offset"] for e in events] == [1, 2, 3, 4]
+        assert [e["data"]["n"] for e in events] == [0, 1, 2, 3]
+        print("PASS: offsets resume after restart")
+
+
+def test_shared_store_unique_offsets():
+    """Two writers on one store never hand out the same offset"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Path(tmp) / "events.db"
+        a, b = make_bus(store), make_bus(store)
+
+        def publish(bus, name):
+            for i in range(50):
+                bus.publish("task.started", {"writer": name, "n": i})
+
+        threads = [
+            threading.Thread(target=publish, args=(a, "a")),
+            threading.Thread(target=publish, args=(b, "b")),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        a.stop()
+        b.stop()
+
+        events = EventLog(str(store)).read(0, limit=1000)
+        assert [e["offset"] for e in events] == list(range(1, 101))
+        assert sum(1 for e in events if e["data"]["writer"] == "a") == 50
+        print("PASS: shared store unique offsets")
+
+
+def test_consumer_group_commit_replay():
+    """Uncommitted events are returned again; a restarted consumer resumes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Path(tmp) / "events.db"
+        bus = make_bus(store)
+        for i in range(5):
+            bus.publish("task.started" if i % 2 else "task.failed", {"n": i})
+
+        batch = bus.consume("orchestrator", limit=2)
+        assert [e["data"]["n"] for e in batch] == [0, 1]
+        assert bus.consume("orchestrator", limit=2) == batch  # not committed yet
+        bus.commit("orchestrator", batch[-1]["offset"])
+        bus.stop()
+
+        bus = make_bus(store)
+        rest = bus.consume("orchestrator")
+        assert [e["data"]["n"] for e in rest] == [2, 3, 4]
+        failed = bus.consume("auditor", event_type="task.failed")
+        assert [e["data"]["n"] for e in failed] == [0, 2, 4]
+        bus.stop()
+        print("PASS: consumer group commit/replay")
+
+
+def test_retry_then_dead_letter():
+    """A subscriber that keeps failing is retried, then dead-lettered"""
+    bus = EventBus(
+        {"index_events": False, "max_retries": 2, "retry_delay": 0.01, "workers": 2}
+    )
+    calls = []
+    done = threading.Event()
+
+    def flaky(data):
+        calls.append(data["n"])
+        if len(calls) == 3:
+            done.set()
+        raise RuntimeError("boom")
+
+    bus.subscribe("task.*", flaky)
+    bus.publish("task.failed", {"n": 1})
+    assert done.wait(5)
+
+    for _ in range(100):
+        if bus.get_dead_letters():
+            break
+        threading.Event().wait(0.02)
+    bus.stop()
+
+    letters = bus.get_dead_letters()
+    assert calls == [1, 1, 1]  # first delivery + 2 retries
+    assert len(letters) == 1
+    assert letters[0]["attempts"] == 2
+    assert letters[0]["error"] == "boom"
+    assert bus.get_stats()["dead_lettered"] == 1
+    print("PASS: retry then dead letter")
+
+
+def test_backpressure():
+    """A full side-effect queue drops without blocking; the durable log does not"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = _EventSink(
+            log_path=str(Path(tmp) / "events.jsonl"),
+            index_events=False,
+            queue_size=2,
+        )
+        release = threading.Event()
+        # Stall the writer thread so the queue fills up
+        original = sink._write_log
+        sink._write_log = lambda events: (release.wait(5), original(events))
+
+        results = [sink.submit({"id": i, "type": "t", "data": {}}) for i in range(6)]
+        assert not all(results)
+        assert sink.get_stats()["dropped"] == results.count(False)
+        release.set()
+        sink.stop()
+
+        store = Path(tmp) / "events.db"
+        bus = make_bus(
+            store,
+            event_log_path=str(Path(tmp) / "bus.jsonl"),
+            index_queue_size=1,
+        )
+        bus._sink._write_log = lambda events: release.wait(5)
+        release.clear()
+        for i in range(20):
+            bus.publish("task.started", {"n": i})
+        release.set()
+        bus.stop()
+        assert bus.get_stats()["sink"]["dropped"] > 0
+        assert len(EventLog(str(store)).read(0, limit=100)) == 20
+        print("PASS: backpressure")
+
+
+def test_publish_does_not_wait_for_store():
+    """A stalled EventLog append does not block publish(); events land after"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Path(tmp) / "events.db"
+        bus = make_bus(store)
+        release = threading.Event()
+        original = bus.event_store.append_many
+        bus.event_store.append_many = lambda events: (release.wait(5), original(events))
+
+        received = []
+        bus.subscribe("task.*", lambda data: received.append(data["n"]))
+        t0 = time.monotonic()
+        ids = [bus.publish("task.started", {"n": i}) for i in range(50)]
+        assert time.monotonic() - t0 < 1.0
+        assert all(ids)
+
+        release.set()
+        assert bus.flush(timeout=5)
+        bus.stop()
+        assert sorted(received) == list(range(50))
+        assert [e["data"]["n"] for e in bus.replay(0, limit=100)] == list(range(50))
+        assert bus.get_stats()["writer"]["batches"] < 50
+        print("PASS: publish does not wait for store")
+
+
+def test_restart_keeps_persisting():
+    """start() after stop() brings the writer and sink back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Path(tmp) / "events.db"
+        log = Path(tmp) / "bus.jsonl"
+        bus = make_bus(store, event_log_path=str(log))
+        bus.start()
+        bus.publish("task.started", {"n": 0})
+        bus.stop()
+
+        bus.start()
+        bus.publish("task.started", {"n": 1})
+        bus.stop()
+
+        assert [e["data"]["n"] for e in EventLog(str(store)).read(0)] == [0, 1]
+        assert len(log.read_text().splitlines()) == 2
+        print("PASS: restart keeps persisting")
+
+
+if __name__ == "__main__":
+    test_offsets_resume_after_restart()
+    test_shared_store_unique_offsets()
+    test_consumer_group_commit_replay()
+    test_retry_then_dead_letter()
+    test_backpressure()
+    test_publish_does_not_wait_for_store()
+    test_restart_keeps_persisting()
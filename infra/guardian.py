@@ -8,9 +8,13 @@ import os
 import sys
 import json
 import time
+import asyncio
+import tempfile
+import threading
 import subprocess
 import sqlite3
 import hashlib
+import shlex
 import shutil
 from datetime import datetime
 from pathlib import Path
@@ -25,6 +29,54 @@ ALERT_DIR = DISPATCH_DIR / "guardian_alerts"
 # 节点列表
 NODES = ["codex-node-1", "glm-node-2", "glm-node-3", "glm-node-4", "howard-mac2"]
 
+# SSH 连接复用：每个节点一个持久 ControlMaster，所有探测命令走这条连接
+SSH_CONTROL_PATH = "/tmp/guardian-ssh-%C"
+SSH_CONTROL_PERSIST = 600  # 比检查间隔长，下一轮直接复用
+SSH_OPTS = [
+    "-o",
+    "ConnectTimeout=10",
+    "-o",
+    "ServerAliveInterval=5",
+    "-o",
+    "ServerAliveCountMax=3",
+    "-o",
+    f"ControlPath={SSH_CONTROL_PATH}",
+]
+
+# 单个节点一轮检查的总时限（秒），超时后该节点剩余的探测直接返回失败
+NODE_DEADLINE_SECONDS = 90
+# 每个节点同时进行的探测数（sshd MaxSessions 默认 10）
+PROBE_CONCURRENCY = 4
+
+# 水位回退量（秒）：粗粒度 mtime 的文件系统上同一秒内的后续写入也能被扫到，重复应用是幂等的
+SYNC_WATERMARK_OVERLAP = 2.0
+
+# 节点端 manifest 脚本：列出 mtime 超过水位的所有 status.json，每行一个紧凑 JSON
+SYNC_MANIFEST_SCRIPT = """
+import glob, json, os, sys
+since = float(sys.argv[1])
+for path in glob.glob(os.path.expanduser("~/dispatch/*/tasks/*/status.json")):
+    try:
+        mtime = os.stat(path).st_mtime
+        if mtime <= since:
+            continue
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        continue
+    if not isinstance(data, dict):
+        data = {}
+    parts = path.split(os.sep)
+    print(json.dumps({
+        "task_id": parts[-2],
+        "project": parts[-4],
+        "mtime": mtime,
+        "status": data.get("status"),
+        "completed_at": data.get("completed_at"),
+        "error": data.get("error"),
+    }, separators=(",", ":")))
+"""
+
 
 def load_nodes():
     """Load node configuration from nodes.json"""
@@ -54,6 +106,8 @@ DEFAULT_CONFIG = {
     "alert_dir": str(ALERT_DIR),
     "minimax_timeout": 30,
     "minimax_fallback": "rules",
+    "node_deadline_seconds": NODE_DEADLINE_SECONDS,
+    "probe_concurrency": PROBE_CONCURRENCY,
     "checks": {
         "db_schema": True,
         "wrapper_version": True,
@@ -64,13 +118,17 @@ DEFAULT_CONFIG = {
 }
 
 
+_log_lock = threading.Lock()
+
+
 def log(msg: str, level: str = "INFO"):
-    """写日志"""
+    """写日志（检查并发执行，加锁保证一行一条）"""
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{ts}] [{level}] {msg}"
-    print(line)
-    with open(LOG_FILE, "a") as f:
-        f.write(line + "\n")
+    with _log_lock:
+        print(line)
+        with open(LOG_FILE, "a") as f:
+            f.write(line + "\n")
 
 
 def send_alert(alert_type: str, message: str, severity: int):
@@ -111,7 +169,7 @@ def ensure_alert_dir():
 
 
 def init_db():
-    """初始化 guardian_events 表"""
+    """初始化 guardian_events / guardian_sync_watermarks 表"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute("""
@@ -127,10 +185,115 @@ def init_db():
             node TEXT
         )
     """)
+    # 每个节点的状态同步水位（节点时钟下 status.json 的最大 mtime）
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS guardian_sync_watermarks (
+            node TEXT PRIMARY KEY,
+            mtime REAL NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT (datetime('now'))
+        )
+    """)
     conn.commit()
+    migrate_task_deps(conn)
     conn.close()
 
 
+def migrate_task_deps(conn: sqlite3.Connection):
+    """task_deps 边表 + tasks 覆盖索引
+
+    depends_on JSON 展开成 (task_id, dep_id) 边，DAG 检查可以直接 JOIN；
+    写 tasks 的是 dispatch.py，边表由触发器跟着 depends_on 维护。
+    第一次创建表时在同一事务里从现有 depends_on 回填
+    """
+    c = conn.cursor()
+    if not c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'"
+    ).fetchone():
+        return
+
+    # 非法 JSON（空串等）按 [] 处理，触发器不能让 dispatch.py 的写入失败
+    deps_json = "CASE WHEN json_valid({col}) THEN {col} ELSE '[]' END"
+
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        migrated = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_deps'"
+        ).fetchone()
+
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS task_deps (
+                task_id TEXT NOT NULL,
+                dep_id TEXT NOT NULL,
+                PRIMARY KEY (task_id, dep_id)
+            ) WITHOUT ROWID
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_task_deps_dep ON task_deps(dep_id)")
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_status_started ON tasks(status, started_at)"
+        )
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_status_node ON tasks(status, node)"
+        )
+
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS task_deps_insert AFTER INSERT ON tasks
+            BEGIN
+                INSERT OR IGNORE INTO task_deps (task_id, dep_id)
+                SELECT NEW.id, value
+                FROM json_each({deps_json.format(col="NEW.depends_on")})
+                WHERE type = 'text';
+            END
+        """)
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS task_deps_update AFTER UPDATE OF depends_on ON tasks
+            BEGIN
+                DELETE FROM task_deps WHERE task_id = OLD.id;
+                INSERT OR IGNORE INTO task_deps (task_id, dep_id)
+                SELECT NEW.id, value
+                FROM json_each({deps_json.format(col="NEW.depends_on")})
+                WHERE type = 'text';
+            END
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS task_deps_delete AFTER DELETE ON tasks
+            BEGIN
+                DELETE FROM task_deps WHERE task_id = OLD.id;
+            END
+        """)
+
+        if not migrated:
+            c.execute(f"""
+                INSERT OR IGNORE INTO task_deps (task_id, dep_id)
+                SELECT t.id, j.value
+                FROM tasks t, json_each({deps_json.format(col="t.depends_on")}) j
+                WHERE j.type = 'text'
+            """)
+            log(f"Migrated depends_on into task_deps ({c.rowcount} edges)")
+
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+
+
+def record_events(c: sqlite3.Cursor, events: list):
+    """在调用方的事务里批量写事件
+
+    Args:
+        events: (check_type, issue_key, severity, status, details, node) 列表
+    """
+    c.executemany(
+        """
+        INSERT INTO guardian_events (check_type, issue_key, severity, status, details, node)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+        [
+            (check_type, issue_key, severity, status, json.dumps(details), node)
+            for check_type, issue_key, severity, status, details, node in events
+        ],
+    )
+
+
 def record_event(
     check_type: str,
     issue_key: str,
@@ -169,15 +332,8 @@ def run_cmd(cmd: list, timeout: int = 30) -> tuple:
 
 def ssh_cmd(node: str, cmd: str, timeout: int = 30) -> tuple:
     """SSH 到节点执行命令，带超时和重试"""
-    # Add connection timeout and retry
-    ssh_opts = [
-        "-o",
-        "ConnectTimeout=10",
-        "-o",
-        "ServerAliveInterval=5",
-        "-o",
-        "ServerAliveCountMax=3",
-    ]
+    # 有 ControlMaster 时复用，没有时直接连（不在这里建 master）
+    ssh_opts = SSH_OPTS + ["-o", "ControlMaster=no"]
 
     # Retry up to 2 times
     for attempt in range(2):
@@ -203,6 +359,154 @@ def ssh_cmd(node: str, cmd: str, timeout: int = 30) -> tuple:
     return -1, "", "Unknown error"
 
 
+async def arun_cmd(cmd: list, timeout: float = 30, detached: bool = False) -> tuple:
+    """异步版 run_cmd，超时 kill 子进程，返回 (returncode, stdout, stderr)
+
+    detached: 命令会留下后台进程（ControlMaster）时使用。输出不走管道，
+    否则要等后台进程退出、管道关闭才能返回
+    """
+    errfile = tempfile.TemporaryFile() if detached else None
+    try:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL if detached else subprocess.PIPE,
+                stderr=errfile if detached else subprocess.PIPE,
+            )
+        except Exception as e:
+            return -1, "", str(e)
+
+        try:
+            if detached:
+                await asyncio.wait_for(proc.wait(), timeout)
+                errfile.seek(0)
+                out, err = b"", errfile.read()
+            else:
+                out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return -1, "", "Timeout"
+    finally:
+        if errfile is not None:
+            errfile.close()
+
+    return (
+        proc.returncode,
+        out.decode(errors="replace"),
+        err.decode(errors="replace"),
+    )
+
+
+class NodeProber:
+    """并发节点探测引擎
+
+    - 每个节点一个持久 ControlMaster，同一节点的探测复用一条 SSH 连接
+    - 每个节点独立的 deadline 和并发上限，慢节点/死节点不拖慢其他节点
+    - 建连失败的节点记入 unreachable，本轮后续探测直接短路
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: float = NODE_DEADLINE_SECONDS,
+        concurrency: int = PROBE_CONCURRENCY,
+    ):
+        self.deadline_seconds = deadline_seconds
+        self.concurrency = concurrency
+        self.unreachable = {}  # host -> 错误信息
+        self._deadlines = {}  # host -> loop 时间
+        self._semaphores = {}
+        self._masters = {}  # host -> 建连 Task
+
+    def _remaining(self, host: str) -> float:
+        """host 本轮剩余时间（第一次探测时开始计时）"""
+        now = asyncio.get_running_loop().time()
+        deadline = self._deadlines.setdefault(host, now + self.deadline_seconds)
+        return deadline - now
+
+    async def connect(self, host: str) -> bool:
+        """确保 host 的 ControlMaster 可用，同一 host 并发调用只建连一次"""
+        master = self._masters.get(host)
+        if master is None:
+            master = self._masters[host] = asyncio.ensure_future(
+                self._open_master(host)
+            )
+        # shield: 某个等待者被取消不影响其他等待者
+        return await asyncio.shield(master)
+
+    async def _open_master(self, host: str) -> bool:
+        if self._remaining(host) <= 0:
+            self.unreachable[host] = "Deadline exceeded"
+            return False
+
+        code, _, _ = await arun_cmd(
+            ["ssh"] + SSH_OPTS + ["-O", "check", host], min(10, self._remaining(host))
+        )
+        if code == 0:
+            return True
+
+        timeout = min(15, self._remaining(host))
+        if timeout <= 0:
+            self.unreachable[host] = "Deadline exceeded"
+            return False
+
+        code, _, err = await arun_cmd(
+            ["ssh"]
+            + SSH_OPTS
+            + [
+                "-o",
+                "ControlMaster=yes",
+                "-o",
+                f"ControlPersist={SSH_CONTROL_PERSIST}",
+                "-N",
+                host,
+            ],
+            timeout,
+            detached=True,
+        )
+        if code != 0:
+            self.unreachable[host] = err.strip() or f"ssh exited {code}"
+            return False
+        return True
+
+    async def reconnect(self, host: str) -> bool:
+        """关掉旧的 ControlMaster 重新建连"""
+        await arun_cmd(
+            ["ssh"] + SSH_OPTS + ["-O", "exit", host],
+            max(0.1, min(10, self._remaining(host))),
+        )
+        self._masters.pop(host, None)
+        self.unreachable.pop(host, None)
+        return await self.connect(host)
+
+    async def run(self, host: str, cmd: str, timeout: float = 30) -> tuple:
+        """在 host 上执行命令，返回 (returncode, stdout, stderr)"""
+        if not await self.connect(host):
+            return -1, "", f"Unreachable: {self.unreachable.get(host, '')}"
+
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+
+        async with semaphore:
+            for attempt in range(2):
+                remaining = self._remaining(host)
+                if remaining <= 0:
+                    return -1, "", "Deadline exceeded"
+
+                code, out, err = await arun_cmd(
+                    ["ssh"] + SSH_OPTS + ["-o", "ControlMaster=no", host, cmd],
+                    min(timeout, remaining),
+                )
+                # 255 是 ssh 自身的连接错误，重试一次；命令失败和超时不重试
+                if code != 255 or attempt == 1:
+                    return code, out, err
+                await asyncio.sleep(1)
+
+        return -1, "", "Unknown error"
+
+
 # ============ C1: DB Schema 同步 ============
 
 
@@ -285,7 +589,7 @@ def fix_db_schema(config: dict) -> bool:
 # ============ C2: Wrapper 版本 ============
 
 
-def check_wrapper_version():
+async def check_wrapper_version(prober: NodeProber):
     """C2: 检测 wrapper 版本"""
     log("=== C2: Checking Wrapper Version ===")
 
@@ -297,12 +601,18 @@ def check_wrapper_version():
     code, local_md5, _ = run_cmd(["md5sum", str(local_path)])
     local_hash = local_md5.split()[0] if code == 0 else None
 
-    issues = []
-    for node in NODES:
-        code, remote_md5, _ = ssh_cmd(
-            node,
-            "md5sum ~/Downloads/dispatch/task-wrapper.sh 2>/dev/null || md5sum ~/task-wrapper.sh 2>/dev/null",
+    outputs = await asyncio.gather(
+        *(
+            prober.run(
+                node,
+                "md5sum ~/Downloads/dispatch/task-wrapper.sh 2>/dev/null || md5sum ~/task-wrapper.sh 2>/dev/null",
+            )
+            for node in NODES
         )
+    )
+
+    issues = []
+    for node, (code, remote_md5, _) in zip(NODES, outputs):
         if code != 0:
             issues.append({"node": node, "status": "not_found", "severity": 4})
             continue
@@ -354,15 +664,23 @@ def fix_wrapper_version(config: dict) -> bool:
 # ============ C3: SSH ControlMaster ============
 
 
-def check_ssh_connection():
-    """C3: 检测 SSH ControlMaster"""
+async def check_ssh_connection(prober: NodeProber):
+    """C3: 检测 SSH ControlMaster（没有时顺便建立）"""
     log("=== C3: Checking SSH Connection ===")
 
+    alive = await asyncio.gather(*(prober.connect(node) for node in NODES))
+
     issues = []
-    for node in NODES:
-        code, out, err = run_cmd(["ssh", "-O", "check", node])
-        if code != 0:
-            issues.append({"node": node, "status": "dead", "error": err, "severity": 4})
+    for node, ok in zip(NODES, alive):
+        if not ok:
+            issues.append(
+                {
+                    "node": node,
+                    "status": "dead",
+                    "error": prober.unreachable.get(node, ""),
+                    "severity": 4,
+                }
+            )
 
     if issues:
         log(f"SSH Connection: {len(issues)} nodes unreachable", "WARN")
@@ -372,24 +690,18 @@ def check_ssh_connection():
     return {"status": "ok", "severity": 0}
 
 
-def fix_ssh_connection(config: dict) -> bool:
-    """修复 SSH ControlMaster"""
+async def fix_ssh_connection(config: dict, prober: NodeProber) -> bool:
+    """修复 SSH ControlMaster：杀掉死连接后重建"""
     log("Fixing SSH Connection...")
 
-    for node in NODES:
-        # 检查连接状态
-        code, _, _ = run_cmd(["ssh", "-O", "check", node])
-        if code != 0:
-            # 杀掉可能存在的死连接
-            run_cmd(["ssh", "-O", "exit", node])
-
-            # 重建连接 (后台)
-            code, _, err = run_cmd(["ssh", "-N", "-f", node])
-            if code != 0:
-                log(f"Failed to reconnect {node}: {err}", "ERROR")
-                continue
+    dead = [node for node in NODES if node in prober.unreachable]
+    reconnected = await asyncio.gather(*(prober.reconnect(node) for node in dead))
 
-            log(f"Reconnected {node}")
+    for node, ok in zip(dead, reconnected):
+        if not ok:
+            log(f"Failed to reconnect {node}: {prober.unreachable.get(node)}", "ERROR")
+            continue
+        log(f"Reconnected {node}")
 
     return True
 
@@ -397,24 +709,34 @@ def fix_ssh_connection(config: dict) -> bool:
 # ============ C4: 节点可用性 ============
 
 
-def check_node_availability():
+async def check_node_availability(prober: NodeProber):
     """C4: 检测节点工具可用性"""
     log("=== C4: Checking Node Availability ===")
 
-    issues = []
-    for node in NODES:
+    async def probe(node):
         # 检查基本命令
-        code, out, err = ssh_cmd(node, "which python3 && which git && echo OK")
+        code, out, err = await prober.run(node, "which python3 && which git && echo OK")
         if code != 0 or "OK" not in out:
-            issues.append(
-                {"node": node, "status": "missing_tools", "error": err, "severity": 3}
-            )
-            continue
+            return {
+                "node": node,
+                "status": "missing_tools",
+                "error": err,
+                "severity": 3,
+            }
 
         # 检查 dispatch 目录
-        code, _, _ = ssh_cmd(node, "ls ~/Downloads/dispatch 2>/dev/null | head -1")
+        code, _, _ = await prober.run(
+            node, "ls ~/Downloads/dispatch 2>/dev/null | head -1"
+        )
         if code != 0:
-            issues.append({"node": node, "status": "no_dispatch_dir", "severity": 4})
+            return {"node": node, "status": "no_dispatch_dir", "severity": 4}
+        return None
+
+    issues = [
+        issue
+        for issue in await asyncio.gather(*(probe(node) for node in NODES))
+        if issue
+    ]
 
     if issues:
         log(f"Node Availability: {len(issues)} nodes have issues", "WARN")
@@ -427,7 +749,7 @@ def check_node_availability():
 # ============ C4b: Task Watcher 监控 ============
 
 
-def check_task_watcher():
+async def check_task_watcher(prober: NodeProber):
     """C4b: 检测 task-watcher 进程，死了自动重启"""
     log("=== C4b: Checking Task Watcher ===")
 
@@ -437,12 +759,9 @@ def check_task_watcher():
         ("glm-node-4", "/home/howardli/dispatch"),
     ]
 
-    issues = []
-    fixed = 0
-
-    for node, dispatch_dir in watcher_nodes:
+    async def probe(node, dispatch_dir):
         # 检查 task-watcher 是否在运行
-        code, out, _ = ssh_cmd(node, "pgrep -f '[t]ask-watcher.py' | head -1")
+        code, out, _ = await prober.run(node, "pgrep -f '[t]ask-watcher.py' | head -1")
 
         if code != 0 or not out.strip():
             # 没运行，需要启动
@@ -450,13 +769,22 @@ def check_task_watcher():
 
             # 启动 watcher
             start_cmd = f"cd ~ && DISPATCH_DIR={dispatch_dir} nohup python3 {dispatch_dir}/task-watcher.py {node} 8 > /tmp/watcher.log 2>&1 &"
-            ssh_cmd(node, start_cmd)
+            await prober.run(node, start_cmd)
 
-            issues.append({"node": node, "status": "restarted", "severity": 2})
-            fixed += 1
             log(f"Restarted task-watcher on {node}")
-        else:
-            log(f"Task watcher running on {node} (PID: {out.strip()})")
+            return {"node": node, "status": "restarted", "severity": 2}
+
+        log(f"Task watcher running on {node} (PID: {out.strip()})")
+        return None
+
+    issues = [
+        issue
+        for issue in await asyncio.gather(
+            *(probe(node, dispatch_dir) for node, dispatch_dir in watcher_nodes)
+        )
+        if issue
+    ]
+    fixed = len(issues)
 
     if issues:
         return {"status": "restarted", "issues": issues, "fixed": fixed, "severity": 2}
@@ -492,35 +820,37 @@ def check_param_alignment():
 # ============ C6: 代码同步检查 ============
 
 
-def check_code_sync():
+async def check_code_sync(prober: NodeProber):
     """C6: 检测节点代码同步状态"""
     log("=== C6: Checking Code Sync ===")
 
     # 要检查的项目
     projects = ["clawmarketing", "gem-platform"]
     nodes = ["glm-node-3", "glm-node-4"]
+    pairs = [(node, project) for node in nodes for project in projects]
 
-    issues = []
-
-    for node in nodes:
-        for project in projects:
-            local_path = Path.home() / "Downloads" / project
-            remote_path = f"~/dispatch/{project}"
-
-            # 检查远程目录是否存在
-            check_cmd = f"test -d {remote_path} && echo exists || echo missing"
-            code, out, _ = ssh_cmd(node, check_cmd)
+    # 检查远程目录是否存在
+    outputs = await asyncio.gather(
+        *(
+            prober.run(
+                node, f"test -d ~/dispatch/{project} && echo exists || echo missing"
+            )
+            for node, project in pairs
+        )
+    )
 
-            if "missing" in out or code != 0:
-                issues.append(
-                    {
-                        "node": node,
-                        "project": project,
-                        "status": "missing",
-                        "severity": 4,
-                    }
-                )
-                log(f"Code missing: {project} on {node}")
+    issues = []
+    for (node, project), (code, out, _) in zip(pairs, outputs):
+        if "missing" in out or code != 0:
+            issues.append(
+                {
+                    "node": node,
+                    "project": project,
+                    "status": "missing",
+                    "severity": 4,
+                }
+            )
+            log(f"Code missing: {project} on {node}")
 
     if issues:
         log(f"Code Sync: {len(issues)} projects missing", "WARN")
@@ -600,61 +930,60 @@ def check_task_stuck():
 
     four_hours_ago = datetime.now() - timedelta(hours=4)
 
-    fixed = 0
+    events = []
 
-    # 运行超过 4 小时的任务 → 自动标记失败
+    # 运行超过 4 小时的任务 → 自动标记失败（走 idx_tasks_status_started）
     long_running = c.execute(
         """
-        SELECT id, project, node
-        FROM tasks
+        UPDATE tasks
+        SET status = 'failed', error = 'Guardian: running >4h, auto-failed'
         WHERE status = 'running' AND started_at < ?
+        RETURNING id, node
     """,
         (four_hours_ago.isoformat(),),
     ).fetchall()
 
     for task in long_running:
-        c.execute(
-            "UPDATE tasks SET status = 'failed', error = 'Guardian: running >4h, auto-failed' WHERE id = ?",
-            (task["id"],),
-        )
         log(f"Auto-fixed: {task['id']} marked failed (>4h)")
-        record_event(
-            "T1",
-            f"long_running_{task['id']}",
-            2,
-            "fixed",
-            {"task_id": task["id"], "action": "marked_failed"},
-            task["node"],
+        events.append(
+            (
+                "T1",
+                f"long_running_{task['id']}",
+                2,
+                "fixed",
+                {"task_id": task["id"], "action": "marked_failed"},
+                task["node"],
+            )
         )
-        fixed += 1
 
     # 无心跳 + 无 PID 的可疑任务 → 自动标记失败
     suspicious = c.execute("""
-        SELECT id, project, node
-        FROM tasks
-        WHERE status = 'running' 
+        UPDATE tasks
+        SET status = 'failed', error = 'Guardian: no heartbeat/PID, auto-failed'
+        WHERE status = 'running'
         AND (heartbeat_at IS NULL OR pid IS NULL OR pid = 0)
+        RETURNING id, node
     """).fetchall()
 
     for task in suspicious:
-        c.execute(
-            "UPDATE tasks SET status = 'failed', error = 'Guardian: no heartbeat/PID, auto-failed' WHERE id = ?",
-            (task["id"],),
-        )
         log(f"Auto-fixed: {task['id']} marked failed (no heartbeat)")
-        record_event(
-            "T1",
-            f"no_heartbeat_{task['id']}",
-            3,
-            "fixed",
-            {"task_id": task["id"], "action": "marked_failed"},
-            task["node"],
+        events.append(
+            (
+                "T1",
+                f"no_heartbeat_{task['id']}",
+                3,
+                "fixed",
+                {"task_id": task["id"], "action": "marked_failed"},
+                task["node"],
+            )
         )
-        fixed += 1
 
+    # 事件和状态更新同一个事务提交
+    record_events(c, events)
     conn.commit()
     conn.close()
 
+    fixed = len(events)
     if fixed > 0:
         log(f"Auto-fixed {fixed} stuck tasks")
         return {"status": "fixed", "fixed": fixed, "severity": 2}
@@ -663,62 +992,87 @@ def check_task_stuck():
     return {"status": "ok", "severity": 0}
 
 
-def sync_task_status_from_nodes():
-    """Sync task completion status from remote nodes to central DB"""
-    log("=== Sync: Checking node status files ===")
+async def fetch_status_manifest(prober: NodeProber, ssh_host: str, since: float):
+    """一次往返拿到节点上 since 之后变化的全部 status.json
 
-    import json
-    from pathlib import Path
+    Returns:
+        manifest 条目列表；SSH 失败返回 None（水位不推进）
+    """
+    cmd = (
+        f"python3 -c {shlex.quote(SYNC_MANIFEST_SCRIPT)} "
+        f"{max(0.0, since - SYNC_WATERMARK_OVERLAP)}"
+    )
+    code, out, err = await prober.run(ssh_host, cmd, timeout=30)
+    if code != 0:
+        log(f"Sync: manifest from {ssh_host} failed: {err.strip()[:100]}", "WARN")
+        return None
 
-    # Get all running and failed tasks
-    conn = sqlite3.connect(DB_PATH)
+    entries = []
+    for line in out.splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(entry, dict) and entry.get("task_id"):
+            entries.append(entry)
+    return entries
+
+
+async def sync_task_status_from_nodes(prober: NodeProber):
+    """Sync task completion status from remote nodes to central DB
+
+    每个节点一次往返返回增量 manifest（按节点 mtime 水位），
+    所有节点的变化和新水位在同一个事务里写回。
+    水位只推进到第一个没能写进中心库的条目之前（比如中心库里任务还是 pending），
+    这些条目下一轮重新拉取
+    """
+    log("=== Sync: Checking node status files ===")
+
+    conn = sqlite3.connect(DB_PATH, timeout=10.0)
     conn.row_factory = sqlite3.Row
-    c = conn.cursor()
 
-    # Also check failed tasks that might have actually completed on node
-    all_tasks = c.execute("""
-        SELECT id, project, node, status
-        FROM tasks
-        WHERE status IN ('running', 'failed')
-    """).fetchall()
+    # 只同步还有 running/failed 任务的节点（failed 的可能在节点上其实完成了）
+    active_nodes = {row["node"] for row in conn.execute("""
+            SELECT DISTINCT node
+            FROM tasks
+            WHERE status IN ('running', 'failed')
+        """)}
+    watermarks = {
+        row["node"]: row["mtime"]
+        for row in conn.execute("SELECT node, mtime FROM guardian_sync_watermarks")
+    }
+    conn.close()
 
-    if not all_tasks:
+    if not active_nodes:
         log("No tasks to sync")
-        conn.close()
         return {"status": "ok", "synced": 0}
 
     # Get node info
     nodes = load_nodes()
     node_map = {n["name"]: n["ssh_host"] for n in nodes}
+    targets = [node for node in sorted(active_nodes) if node in node_map]
 
-    synced = 0
-
-    for task in all_tasks:
-        task_id = task["id"]
-        project = task["project"]
-        node = task["node"]
-
-        if node not in node_map:
-            continue
-
-        ssh_host = node_map[node]
-        remote_status_file = f"~/dispatch/{project}/tasks/{task_id}/status.json"
-
-        # Try to read status from node
-        cmd = f"cat {remote_status_file} 2>/dev/null"
-        result = subprocess.run(
-            ["ssh", "-o", "ConnectTimeout=5", ssh_host, cmd],
-            capture_output=True,
-            text=True,
-            timeout=10,
+    manifests = await asyncio.gather(
+        *(
+            fetch_status_manifest(prober, node_map[node], watermarks.get(node, 0.0))
+            for node in targets
         )
+    )
+
+    conn = sqlite3.connect(DB_PATH, timeout=10.0)
+    c = conn.cursor()
+    synced = 0
+    scanned = 0
 
-        if result.returncode != 0:
+    for node, entries in zip(targets, manifests):
+        if entries is None:
             continue
+        scanned += len(entries)
+        unapplied_mtime = None  # 没能写进中心库的条目里最早的 mtime
 
-        try:
-            remote_status = json.loads(result.stdout)
-            status = remote_status.get("status", "")
+        for entry in entries:
+            status = entry.get("status")
+            completed_at = entry.get("completed_at") or datetime.now().isoformat()
 
             # Update DB if task completed or failed on node
             if status == "completed":
@@ -728,15 +1082,10 @@ def sync_task_status_from_nodes():
                     SET status = 'completed', 
                         completed_at = ?,
                         error = NULL
-                    WHERE id = ?
+                    WHERE id = ? AND node = ? AND status IN ('running', 'failed')
                 """,
-                    (
-                        remote_status.get("completed_at", datetime.now().isoformat()),
-                        task_id,
-                    ),
+                    (completed_at, entry["task_id"], node),
                 )
-                log(f"Sync: {task_id} marked completed (from {node})")
-                synced += 1
             elif status == "failed":
                 c.execute(
                     """
@@ -744,29 +1093,69 @@ def sync_task_status_from_nodes():
                     SET status = 'failed', 
                         completed_at = ?,
                         error = ?
-                    WHERE id = ?
+                    WHERE id = ? AND node = ? AND status = 'running'
                 """,
                     (
-                        remote_status.get("completed_at", datetime.now().isoformat()),
-                        remote_status.get("error", "Task failed on node"),
-                        task_id,
+                        completed_at,
+                        entry.get("error") or "Task failed on node",
+                        entry["task_id"],
+                        node,
                     ),
                 )
-                log(f"Sync: {task_id} marked failed (from {node})")
+            else:
+                continue
+
+            if c.rowcount:
+                log(f"Sync: {entry['task_id']} marked {status} (from {node})")
                 synced += 1
-        except json.JSONDecodeError:
-            continue
+            elif not _sync_entry_settled(c, entry, node):
+                mtime = entry.get("mtime", 0.0)
+                if unapplied_mtime is None or mtime < unapplied_mtime:
+                    unapplied_mtime = mtime
+
+        settled = [
+            entry.get("mtime", 0.0)
+            for entry in entries
+            if unapplied_mtime is None or entry.get("mtime", 0.0) < unapplied_mtime
+        ]
+        if settled:
+            c.execute(
+                """
+                INSERT INTO guardian_sync_watermarks (node, mtime, updated_at)
+                VALUES (?, ?, datetime('now'))
+                ON CONFLICT(node) DO UPDATE SET
+                    mtime = MAX(mtime, excluded.mtime),
+                    updated_at = excluded.updated_at
+            """,
+                (node, max(settled)),
+            )
 
     conn.commit()
     conn.close()
 
     if synced > 0:
-        log(f"Synced {synced} task statuses from nodes")
+        log(f"Synced {synced} task statuses from nodes ({scanned} manifest entries)")
         return {"status": "synced", "synced": synced, "severity": 1}
 
     return {"status": "ok", "synced": 0}
 
 
+def _sync_entry_settled(c: sqlite3.Cursor, entry: dict, node: str) -> bool:
+    """UPDATE 没匹配到行的 manifest 条目是否不用再同步
+
+    中心库里没有这个任务（或已经换了节点）、已经 completed，或者节点上报 failed
+    而中心库也已是 failed 时不用再同步；其他情况（典型的是中心库还没把任务标成
+    running）下一轮还要重试
+    """
+    row = c.execute(
+        "SELECT status FROM tasks WHERE id = ? AND node = ?",
+        (entry["task_id"], node),
+    ).fetchone()
+    if row is None or row[0] == "completed":
+        return True
+    return entry.get("status") == "failed" and row[0] == "failed"
+
+
 def fix_task_stuck(config: dict) -> bool:
     """修复卡死任务 - 只记录告警，不自动处理（wrapper 不发心跳）"""
     log("Task stuck check is informational only - no auto-fix")
@@ -837,74 +1226,96 @@ def check_dag_stuck():
     """T4: 检测 DAG 卡住 - 自动修复依赖失败"""
     log("=== T4: Checking DAG Stuck ===")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=10.0)
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
-
-    fixed_count = 0
-
-    # 找 pending 且有依赖的任务
-    pending_with_deps = c.execute("""
-        SELECT id, project, depends_on
-        FROM tasks
-        WHERE status = 'pending' AND depends_on != '[]' AND depends_on != ''
+    c.execute("BEGIN IMMEDIATE")
+
+    # 有失败依赖的 pending 任务，沿 task_deps 传递到所有 pending 下游（一条递归查询）
+    # CROSS JOIN 固定连接顺序：从 pending 出发按主键查边和依赖，避免 pending × failed 的笛卡尔积
+    dep_failed = c.execute("""
+        WITH RECURSIVE doomed(id) AS (
+            SELECT d.task_id
+            FROM tasks t
+            CROSS JOIN task_deps d ON d.task_id = t.id
+            CROSS JOIN tasks dt ON dt.id = d.dep_id
+            WHERE t.status = 'pending' AND dt.status = 'failed'
+            UNION
+            SELECT d.task_id
+            FROM doomed
+            CROSS JOIN task_deps d ON d.dep_id = doomed.id
+            CROSS JOIN tasks t ON t.id = d.task_id
+            WHERE t.status = 'pending'
+        )
+        SELECT d.task_id, json_group_array(d.dep_id) AS failed_deps
+        FROM doomed
+        CROSS JOIN task_deps d ON d.task_id = doomed.id
+        CROSS JOIN tasks dt ON dt.id = d.dep_id
+        WHERE dt.status = 'failed' OR d.dep_id IN doomed
+        GROUP BY d.task_id
     """).fetchall()
 
-    for task in pending_with_deps:
-        depends_on = json.loads(task["depends_on"] or "[]")
-        if not depends_on:
-            continue
-
-        # 检查依赖状态
-        deps = c.execute(
-            f"""
-            SELECT id, status FROM tasks WHERE id IN ({",".join("?" * len(depends_on))})
-        """,
-            depends_on,
-        ).fetchall()
-
-        dep_statuses = {d["id"]: d["status"] for d in deps}
-
-        # 检查是否有失败的依赖
-        failed_deps = [
-            d_id for d_id, status in dep_statuses.items() if status == "failed"
-        ]
-        if failed_deps:
-            # 依赖失败了，标记这个任务也失败
-            c.execute(
-                "UPDATE tasks SET status = 'failed', error = ? WHERE id = ?",
-                (f"Guardian: dependency failed: {', '.join(failed_deps)}", task["id"]),
-            )
-            log(
-                f"Auto-fixed: Marked {task['id']} as failed (dependency failed: {failed_deps})"
-            )
-            record_event(
+    events = []
+    updates = []
+    for task in dep_failed:
+        failed_deps = json.loads(task["failed_deps"])
+        # 依赖失败了，标记这个任务也失败
+        updates.append(
+            (f"Guardian: dependency failed: {', '.join(failed_deps)}", task["task_id"])
+        )
+        log(
+            f"Auto-fixed: Marked {task['task_id']} as failed (dependency failed: {failed_deps})"
+        )
+        events.append(
+            (
                 "T4",
-                f"dep_failed_{task['id']}",
+                f"dep_failed_{task['task_id']}",
                 3,
                 "fixed",
-                {"task_id": task["id"], "failed_deps": failed_deps},
+                {"task_id": task["task_id"], "failed_deps": failed_deps},
+                None,
             )
-            fixed_count += 1
-            continue
+        )
+
+    c.executemany(
+        "UPDATE tasks SET status = 'failed', error = ? WHERE id = ? AND status = 'pending'",
+        updates,
+    )
+
+    # 依赖都完成了但还是 pending，这是不应该的
+    # 可能需要重新调度，但 Guardian 不做调度决策，只记录
+    ready = c.execute("""
+        SELECT t.id, json_group_array(d.dep_id) AS depends_on
+        FROM tasks t
+        CROSS JOIN task_deps d ON d.task_id = t.id
+        WHERE t.status = 'pending'
+        AND NOT EXISTS (
+            SELECT 1
+            FROM task_deps nd
+            CROSS JOIN tasks dt ON dt.id = nd.dep_id
+            WHERE nd.task_id = t.id AND dt.status != 'completed'
+        )
+        GROUP BY t.id
+    """).fetchall()
 
-        # 检查依赖是否都完成
-        all_done = all(status == "completed" for status in dep_statuses.values())
-        if all_done:
-            # 依赖都完成了但还是 pending，这是不应该的
-            # 可能需要重新调度，但 Guardian 不做调度决策，只记录
-            log(f"Task {task['id']} ready but not scheduled (informational)")
-            record_event(
+    for task in ready:
+        log(f"Task {task['id']} ready but not scheduled (informational)")
+        events.append(
+            (
                 "T4",
                 f"ready_not_scheduled_{task['id']}",
                 1,
                 "detected",
-                {"task_id": task["id"], "depends_on": depends_on},
+                {"task_id": task["id"], "depends_on": json.loads(task["depends_on"])},
+                None,
             )
+        )
 
+    record_events(c, events)
     conn.commit()
     conn.close()
 
+    fixed_count = len(updates)
     if fixed_count > 0:
         log(f"Auto-fixed {fixed_count} tasks with failed dependencies")
         return {"status": "fixed", "fixed": fixed_count, "severity": 2}
@@ -924,7 +1335,7 @@ def check_node_overload():
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
 
-    # 统计每个节点 running 任务数
+    # 统计每个节点 running 任务数（只扫 idx_tasks_status_node 的 running 段）
     running_by_node = c.execute("""
         SELECT node, COUNT(*) as running_count
         FROM tasks
@@ -971,10 +1382,10 @@ def check_node_overload():
 # ============ T6: SSH 断联检测 ============
 
 
-def check_ssh_disconnect():
+async def check_ssh_disconnect(prober: NodeProber):
     """T6: 检测 SSH 断联"""
     # 这个和 C3 SSH 合并了
-    return check_ssh_connection()
+    return await check_ssh_connection(prober)
 
 
 # ============ C7: 任务执行监控 ============
@@ -1027,104 +1438,147 @@ def check_task_execution():
 # ============ 主循环 ============
 
 
+# 结果按原来的检查顺序返回
+CHECK_ORDER = [
+    "C1",
+    "C2",
+    "C3",
+    "C4",
+    "C4b",
+    "C5",
+    "C6",
+    "C7",
+    "T1",
+    "SYNC",
+    "T2",
+    "T3",
+    "T4",
+    "T5",
+]
+
+
 def run_cycle(config: dict):
     """执行一轮检查"""
+    return asyncio.run(run_cycle_async(config))
+
+
+async def run_cycle_async(config: dict):
+    """执行一轮检查
+
+    远程检查（C2/C3/C4/C4b/C6）互相独立，全部并发，节点之间互不阻塞；
+    本地 DB 检查有先后依赖（C1 修 schema，SYNC 更新状态后 T3-T5 才准确），
+    按原顺序串行，放到线程里跑，和远程检查同时进行
+    """
     checks = config.get("checks", {})
+    prober = NodeProber(
+        deadline_seconds=config.get("node_deadline_seconds", NODE_DEADLINE_SECONDS),
+        concurrency=config.get("probe_concurrency", PROBE_CONCURRENCY),
+    )
+    results = {}
+
+    async def run_check(code, check, fix=None, issue_key=None, status="fixed"):
+        result = await check()
+        results[code] = result
+        if issue_key and result.get("severity", 0) > 0:
+            if fix is not None:
+                await fix()
+            await asyncio.to_thread(
+                record_event, code, issue_key, result["severity"], status, result
+            )
 
-    results = []
-
-    # C1: DB Schema
-    if checks.get("db_schema"):
-        result = check_db_schema()
-        results.append(("C1", result))
-        if result.get("severity", 0) > 0:
-            fix_db_schema(config)
-            record_event("C1", "db_schema", result["severity"], "fixed", result)
-
-    # C2: Wrapper Version
-    if checks.get("wrapper_version"):
-        result = check_wrapper_version()
-        results.append(("C2", result))
-        if result.get("severity", 0) > 0:
-            fix_wrapper_version(config)
-            record_event("C2", "wrapper_version", result["severity"], "fixed", result)
-
-    # C3: SSH Connection
-    if checks.get("ssh_connection"):
-        result = check_ssh_connection()
-        results.append(("C3", result))
-        if result.get("severity", 0) > 0:
-            fix_ssh_connection(config)
-            record_event("C3", "ssh_connection", result["severity"], "fixed", result)
-
-    # C4: Node Availability
-    if checks.get("node_availability"):
-        result = check_node_availability()
-        results.append(("C4", result))
-        if result.get("severity", 0) > 0:
-            record_event(
-                "C4", "node_availability", result["severity"], "failed", result
+    def local(func, *args):
+        return lambda: asyncio.to_thread(func, *args)
+
+    async def remote_checks():
+        steps = []
+        # C2: Wrapper Version
+        if checks.get("wrapper_version"):
+            steps.append(
+                run_check(
+                    "C2",
+                    lambda: check_wrapper_version(prober),
+                    local(fix_wrapper_version, config),
+                    "wrapper_version",
+                )
+            )
+        # C3: SSH Connection
+        if checks.get("ssh_connection"):
+            steps.append(
+                run_check(
+                    "C3",
+                    lambda: check_ssh_connection(prober),
+                    lambda: fix_ssh_connection(config, prober),
+                    "ssh_connection",
+                )
+            )
+        # C4: Node Availability
+        if checks.get("node_availability"):
+            steps.append(
+                run_check(
+                    "C4",
+                    lambda: check_node_availability(prober),
+                    issue_key="node_availability",
+                    status="failed",
+                )
+            )
+        # C4b: Task Watcher
+        if checks.get("task_watcher"):
+            steps.append(run_check("C4b", lambda: check_task_watcher(prober)))
+        # C6: Code Sync
+        if checks.get("code_sync"):
+            steps.append(
+                run_check(
+                    "C6",
+                    lambda: check_code_sync(prober),
+                    local(fix_code_sync, config),
+                    "code_sync",
+                )
             )
+        await asyncio.gather(*steps)
 
-    # C4b: Task Watcher
-    if checks.get("task_watcher"):
-        result = check_task_watcher()
-        results.append(("C4b", result))
-
-    # C5: Param Alignment
-    if checks.get("param_alignment"):
-        result = check_param_alignment()
-        results.append(("C5", result))
-
-    # C6: Code Sync
-    if checks.get("code_sync"):
-        result = check_code_sync()
-        results.append(("C6", result))
-        if result.get("severity", 0) > 0:
-            fix_code_sync(config)
-            record_event("C6", "code_sync", result["severity"], "fixed", result)
-
-    # C7: Task Execution
-    if checks.get("task_execution"):
-        result = check_task_execution()
-        results.append(("C7", result))
-
-    # T1: Stuck Tasks
-    if checks.get("task_stuck"):
-        result = check_task_stuck()
-        results.append(("T1", result))
-        if result.get("severity", 0) > 0:
-            fix_task_stuck(config)
-            record_event("T1", "task_stuck", result["severity"], "fixed", result)
-
-    # Sync task status from nodes
-    sync_result = sync_task_status_from_nodes()
-    results.append(("SYNC", sync_result))
-
-    # T2: Dead Processes
-    if checks.get("process_dead"):
-        result = check_process_dead()
-        results.append(("T2", result))
-        if result.get("severity", 0) > 0:
-            fix_process_dead(config)
-            record_event("T2", "process_dead", result["severity"], "fixed", result)
-
-    # T3: Wrapper Crashes
-    if checks.get("wrapper_crash"):
-        result = check_wrapper_crash()
-        results.append(("T3", result))
-
-    # T4: DAG Stuck
-    if checks.get("dag_stuck"):
-        result = check_dag_stuck()
-        results.append(("T4", result))
-
-    # T5: Node Overload
-    if checks.get("node_overload"):
-        result = check_node_overload()
-        results.append(("T5", result))
-
-    return results
+    async def local_checks():
+        # C1: DB Schema
+        if checks.get("db_schema"):
+            await run_check(
+                "C1", local(check_db_schema), local(fix_db_schema, config), "db_schema"
+            )
+        # C5: Param Alignment
+        if checks.get("param_alignment"):
+            await run_check("C5", local(check_param_alignment))
+        # C7: Task Execution
+        if checks.get("task_execution"):
+            await run_check("C7", local(check_task_execution))
+        # T1: Stuck Tasks
+        if checks.get("task_stuck"):
+            await run_check(
+                "T1",
+                local(check_task_stuck),
+                local(fix_task_stuck, config),
+                "task_stuck",
+            )
+        # Sync task status from nodes
+        await run_check("SYNC", lambda: sync_task_status_from_nodes(prober))
+        # T2: Dead Processes
+        if checks.get("process_dead"):
+            await run_check(
+                "T2",
+                local(check_process_dead),
+                local(fix_process_dead, config),
+                "process_dead",
+            )
+        # T3: Wrapper Crashes
+        if checks.get("wrapper_crash"):
+            await run_check("T3", local(check_wrapper_crash))
+        # T4: DAG Stuck
+        if checks.get("dag_stuck"):
+            await run_check("T4", local(check_dag_stuck))
+        # T5: Node Overload
+        if checks.get("node_overload"):
+            await run_check("T5", local(check_node_overload))
+
+    await asyncio.gather(remote_checks(), local_checks())
+
+    return [(code, results[code]) for code in CHECK_ORDER if code in results]
 
 
 def main():
@@ -10,10 +10,13 @@ Fixes (2026-02-22):
 - TOP-LEVEL workflows (not children) so every task visible in Temporal UI
 - depends_on validation: check if external deps are merged before dispatch
 - max_retries reduced from 10 to 4 (size diff early kill handles the rest)
-- Layer-level gate: if >90% of a layer fails, skip subsequent layers
 - Blocked tasks tracked separately from failures
+- Ready-queue scheduling: each task starts as soon as its last dependency
+  completes (no layer barriers); a failure blocks only its own downstream
+  subtree instead of a >90% layer gate
 """
 
+from collections import deque
 from datetime import timedelta
 from typing import List, Optional
 import asyncio
@@ -25,6 +28,10 @@ with workflow.unsafe.imports_passed_through():
     from dataclasses import dataclass, field
 
 
+# Max TaskWorkflows one BatchWorkflow keeps running at the same time
+MAX_IN_FLIGHT_TASKS = 32
+
+
 # -- Data Models --
 
 
@@ -198,209 +205,102 @@ class BatchWorkflow:
 
     @workflow.run
     async def run(self, specs: List[TaskSpec]) -> dict:
-        layers = self._build_layers(specs)
-
-        results = []
-        completed_task_ids = set()
+        """
+        Dependency-counting scheduler: every spec tracks the internal deps it
+        still waits on, and is started the moment that set becomes empty
+        (at most MAX_IN_FLIGHT_TASKS in flight). A failed task blocks its
+        transitive dependents only; unrelated branches keep running.
+        """
         project = specs[0].project if specs else ""
+        spec_map = {s.task_id: s for s in specs}
 
-        for layer_idx, layer in enumerate(layers):
-            workflow.logger.info(f"Layer {layer_idx}: {len(layer)} tasks")
-
-            # First pass: check dependencies
-            spec_deps_map = {}
-            external_deps_to_check = set()
-
-            for spec in layer:
-                internal_unmet = []
-                external_unchecked = []
-                for dep in spec.depends_on:
-                    if dep in completed_task_ids:
-                        continue
-                    if dep in {s.task_id for s in specs}:
-                        internal_unmet.append(dep)
-                    else:
-                        external_unchecked.append(dep)
-
-                spec_deps_map[spec.task_id] = {
-                    "spec": spec,
-                    "blocked_by": internal_unmet.copy(),
-                    "external_unchecked": external_unchecked,
-                }
-                external_deps_to_check.update(external_unchecked)
-
-            # Check external deps
-            if external_deps_to_check:
-                check_futures = []
-                ordered_checks = list(external_deps_to_check)
-                for ext_dep in ordered_checks:
-                    check_req = DepCheckRequest(project=project, dep_task_id=ext_dep)
-                    fut = workflow.execute_activity(
-                        "check_dependency_merged",
-                        check_req,
-                        result_type=DepCheckResult,
-                        start_to_close_timeout=timedelta(minutes=2),
-                        retry_policy=RetryPolicy(
-                            initial_interval=timedelta(seconds=5),
-                            maximum_attempts=3,
-                        ),
-                    )
-                    check_futures.append(fut)
+        waiting_on = {tid: set() for tid in spec_map}
+        dependents = {tid: [] for tid in spec_map}
+        external_deps = {}
+        for tid, spec in spec_map.items():
+            for dep in spec.depends_on:
+                if dep not in spec_map:
+                    external_deps.setdefault(tid, []).append(dep)
+                elif dep not in waiting_on[tid]:
+                    waiting_on[tid].add(dep)
+                    dependents[dep].append(tid)
 
-                check_results = await asyncio.gather(
-                    *check_futures, return_exceptions=True
-                )
-                ext_results_map = {}
-                for idx, res in enumerate(check_results):
-                    dep_id = ordered_checks[idx]
-                    if isinstance(res, Exception):
-                        workflow.logger.warning(f"Error checking dep {dep_id}: {res}")
-                        ext_results_map[dep_id] = False
-                    else:
-                        ext_results_map[dep_id] = res.is_merged
-
-                for task_id, data in spec_deps_map.items():
-                    for ext_dep in data["external_unchecked"]:
-                        if not ext_results_map.get(ext_dep, False):
-                            data["blocked_by"].append(f"{ext_dep} (external, unmerged)")
-
-            # Separate runnable vs blocked
-            runnable = []
-            for task_id, data in spec_deps_map.items():
-                blocked_deps = data["blocked_by"]
-                spec = data["spec"]
-                if blocked_deps:
-                    workflow.logger.warning(
-                        f"{task_id} BLOCKED: deps not met: {blocked_deps}"
-                    )
-                    results.append(
-                        {
-                            "task_id": task_id,
-                            "status": "blocked",
-                            "error": f"Blocked by unmet dependencies: {blocked_deps}",
-                            "loc_added": 0,
-                            "loc_removed": 0,
-                            "files_changed": 0,
-                            "duration_seconds": 0,
-                            "output": "",
-                        }
-                    )
-                else:
-                    runnable.append(spec)
-
-            if not runnable:
-                workflow.logger.warning(
-                    f"Layer {layer_idx}: all tasks blocked, skipping"
-                )
-                continue
-
-            # Dispatch each spec as an INDEPENDENT top-level workflow (visible in Temporal UI)
-            batch_run_id = workflow.info().run_id[:8]
-            start_futures = []
-            workflow_ids = []
-            for spec in runnable:
-                wf_id = f"spec-{project}-{spec.task_id}-{batch_run_id}"
-                workflow_ids.append(wf_id)
-                req = StartWorkflowRequest(workflow_id=wf_id, spec=spec)
-                fut = workflow.execute_activity(
-                    "start_task_workflow",
-                    req,
-                    start_to_close_timeout=timedelta(minutes=2),
-                    retry_policy=RetryPolicy(maximum_attempts=3),
+        results = []
+        settled = set()
+
+        def block(task_id: str, error: str):
+            results.append(_result_dict(task_id, "blocked", error=error))
+            settled.add(task_id)
+
+        def block_subtree(root: str, error: str):
+            stack = list(dependents[root])
+            while stack:
+                task_id = stack.pop()
+                if task_id in settled:
+                    continue
+                block(task_id, error)
+                stack.extend(dependents[task_id])
+
+        # External deps: check every distinct one once, in parallel
+        merged = await self._check_external_deps(
+            project, sorted({d for deps in external_deps.values() for d in deps})
+        )
+        for task_id, deps in external_deps.items():
+            unmet = [f"{dep} (external, unmerged)" for dep in deps if not merged[dep]]
+            if unmet and task_id not in settled:
+                workflow.logger.warning(f"{task_id} BLOCKED: deps not met: {unmet}")
+                block(task_id, f"Blocked by unmet dependencies: {unmet}")
+                block_subtree(task_id, f"Blocked: dependency {task_id} blocked")
+
+        ready = deque(
+            tid for tid in spec_map if tid not in settled and not waiting_on[tid]
+        )
+        finished = []  # (task_id, result) in completion order
+        running = set()
+        tasks = []  # keep references to the per-spec coroutines
+        batch_run_id = workflow.info().run_id[:8]
+
+        async def run_one(spec: TaskSpec):
+            wf_id = f"spec-{project}-{spec.task_id}-{batch_run_id}"
+            finished.append((spec.task_id, await self._run_task(wf_id, spec)))
+
+        while ready or running:
+            while ready and len(running) < MAX_IN_FLIGHT_TASKS:
+                task_id = ready.popleft()
+                running.add(task_id)
+                tasks.append(asyncio.create_task(run_one(spec_map[task_id])))
+                workflow.logger.info(
+                    f"Started {task_id} ({len(running)} in flight, {len(ready)} ready)"
                 )
-                start_futures.append(fut)
-
-            # Start all workflows in parallel
-            await asyncio.gather(*start_futures, return_exceptions=True)
 
-            # Wait for all workflows to complete
-            wait_futures = []
-            for i, spec in enumerate(runnable):
-                req = WaitWorkflowRequest(
-                    workflow_id=workflow_ids[i],
-                    timeout_minutes=max(spec.estimated_minutes * 4, 120),
-                )
-                fut = workflow.execute_activity(
-                    "wait_for_task_workflow",
-                    req,
-                    result_type=TaskResult,
-                    start_to_close_timeout=timedelta(
-                        minutes=max(spec.estimated_minutes * 4, 120) + 5
-                    ),
-                    heartbeat_timeout=timedelta(minutes=10),
-                    retry_policy=RetryPolicy(maximum_attempts=2),
-                )
-                wait_futures.append(fut)
-
-            layer_results = await asyncio.gather(*wait_futures, return_exceptions=True)
-
-            layer_completed = 0
-            layer_failed = 0
-
-            for i, result in enumerate(layer_results):
-                if isinstance(result, Exception):
-                    layer_failed += 1
-                    results.append(
-                        {
-                            "task_id": runnable[i].task_id,
-                            "status": "failed",
-                            "error": str(result),
-                            "loc_added": 0,
-                            "loc_removed": 0,
-                            "files_changed": 0,
-                            "duration_seconds": 0,
-                            "output": "",
-                        }
-                    )
+            await workflow.wait_condition(lambda: bool(finished))
+
+            while finished:
+                task_id, result = finished.pop(0)
+                running.discard(task_id)
+                settled.add(task_id)
+                results.append(result)
+
+                status = result["status"]
+                if status in ("completed", "already_completed"):
+                    for child in dependents[task_id]:
+                        if child in settled:
+                            continue
+                        waiting_on[child].discard(task_id)
+                        if not waiting_on[child]:
+                            ready.append(child)
                 else:
-                    results.append(
-                        {
-                            "task_id": result.task_id,
-                            "status": result.status,
-                            "output": result.output,
-                            "error": result.error,
-                            "duration_seconds": result.duration_seconds,
-                            "loc_added": result.loc_added,
-                            "loc_removed": result.loc_removed,
-                            "files_changed": result.files_changed,
-                        }
-                    )
-                    if result.status in ("completed", "already_completed"):
-                        layer_completed += 1
-                        completed_task_ids.add(result.task_id)
-                    elif result.status == "needs_repair":
-                        layer_failed += 1
-                    else:
-                        layer_failed += 1
-
-            workflow.logger.info(
-                f"Layer {layer_idx} complete. Completed: {layer_completed}, Failed: {layer_failed}"
-            )
-
-            # Layer gate: if >90% failed, skip remaining layers
-            total_in_layer = layer_completed + layer_failed
-            if total_in_layer > 0 and layer_failed / total_in_layer > 0.9:
-                remaining_count = sum(len(l) for l in layers[layer_idx + 1 :])
-                if remaining_count > 0:
                     workflow.logger.warning(
-                        f"Layer {layer_idx}: {layer_failed}/{total_in_layer} failed (>90%), "
-                        f"skipping {remaining_count} remaining tasks"
+                        f"{task_id} {status}, blocking its downstream tasks"
                     )
-                    for future_layer in layers[layer_idx + 1 :]:
-                        for spec in future_layer:
-                            results.append(
-                                {
-                                    "task_id": spec.task_id,
-                                    "status": "blocked",
-                                    "error": f"Blocked: previous layer {layer_idx} had >90% failure rate",
-                                    "loc_added": 0,
-                                    "loc_removed": 0,
-                                    "files_changed": 0,
-                                    "duration_seconds": 0,
-                                    "output": "",
-                                }
-                            )
-                    break
+                    block_subtree(task_id, f"Blocked: dependency {task_id} {status}")
+
+        # Whatever is left waits on a dependency cycle
+        for task_id in spec_map:
+            if task_id not in settled:
+                unmet = sorted(waiting_on[task_id])
+                workflow.logger.warning(f"{task_id} BLOCKED: deps not met: {unmet}")
+                block(task_id, f"Blocked by unmet dependencies: {unmet}")
 
         completed = sum(1 for r in results if r["status"] == "completed")
         failed = sum(1 for r in results if r["status"] == "failed")
@@ -415,30 +315,95 @@ class BatchWorkflow:
             "results": results,
         }
 
-    def _build_layers(self, specs: List[TaskSpec]) -> List[List[TaskSpec]]:
-        """Topological sort specs into dependency layers."""
-        spec_map = {s.task_id: s for s in specs}
-        completed = set()
-        layers = []
-
-        remaining = set(spec_map.keys())
-        while remaining:
-            ready = [
-                tid
-                for tid in remaining
-                if all(
-                    dep in completed or dep not in spec_map
-                    for dep in spec_map[tid].depends_on
+    async def _check_external_deps(self, project: str, dep_ids: List[str]) -> dict:
+        """Check whether external dependency branches are merged -> {dep_id: bool}."""
+        check_results = await asyncio.gather(
+            *(
+                workflow.execute_activity(
+                    "check_dependency_merged",
+                    DepCheckRequest(project=project, dep_task_id=dep_id),
+                    result_type=DepCheckResult,
+                    start_to_close_timeout=timedelta(minutes=2),
+                    retry_policy=RetryPolicy(
+                        initial_interval=timedelta(seconds=5),
+                        maximum_attempts=3,
+                    ),
                 )
-            ]
-            if not ready:
-                ready = list(remaining)
-
-            layers.append([spec_map[tid] for tid in ready])
-            completed.update(ready)
-            remaining -= set(ready)
+                for dep_id in dep_ids
+            ),
+            return_exceptions=True,
+        )
+
+        merged = {}
+        for dep_id, res in zip(dep_ids, check_results):
+            if isinstance(res, Exception):
+                workflow.logger.warning(f"Error checking dep {dep_id}: {res}")
+                merged[dep_id] = False
+            else:
+                merged[dep_id] = res.is_merged
+        return merged
+
+    async def _run_task(self, workflow_id: str, spec: TaskSpec) -> dict:
+        """Start one INDEPENDENT top-level TaskWorkflow and wait for its result."""
+        try:
+            await workflow.execute_activity(
+                "start_task_workflow",
+                StartWorkflowRequest(workflow_id=workflow_id, spec=spec),
+                start_to_close_timeout=timedelta(minutes=2),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )
+        except Exception as e:
+            # Already-started workflows are fine; the wait below reports real failures
+            workflow.logger.warning(f"Starting {workflow_id} failed: {e}")
 
-        return layers
+        timeout_minutes = max(spec.estimated_minutes * 4, 120)
+        try:
+            result = await workflow.execute_activity(
+                "wait_for_task_workflow",
+                WaitWorkflowRequest(
+                    workflow_id=workflow_id, timeout_minutes=timeout_minutes
+                ),
+                result_type=TaskResult,
+                start_to_close_timeout=timedelta(minutes=timeout_minutes + 5),
+                heartbeat_timeout=timedelta(minutes=10),
+                retry_policy=RetryPolicy(maximum_attempts=2),
+            )
+        except Exception as e:
+            return _result_dict(spec.task_id, "failed", error=str(e))
+
+        return _result_dict(
+            result.task_id,
+            result.status,
+            output=result.output,
+            error=result.error,
+            duration_seconds=result.duration_seconds,
+            loc_added=result.loc_added,
+            loc_removed=result.loc_removed,
+            files_changed=result.files_changed,
+        )
+
+
+def _result_dict(
+    task_id: str,
+    status: str,
+    output: str = "",
+    error: str = "",
+    duration_seconds: float = 0,
+    loc_added: int = 0,
+    loc_removed: int = 0,
+    files_changed: int = 0,
+) -> dict:
+    """Per-task entry of the BatchWorkflow result."""
+    return {
+        "task_id": task_id,
+        "status": status,
+        "output": output,
+        "error": error,
+        "duration_seconds": duration_seconds,
+        "loc_added": loc_added,
+        "loc_removed": loc_removed,
+        "files_changed": files_changed,
+    }
 
 
 # Keep backward compat: ProjectWorkflow as alias
@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""CI Watcher - 多个 PR 共用的 CI 状态轮询服务
+
+PRBot.wait_for_ci 原来每个 PR 自己 sleep 轮询，每次 fork 一个 gh api 子进程；
+夜班同时盯几十个 PR 时子进程和 API 配额都按 PR 数线性增长。这里改为一个后台线程统一轮询：
+- 同一 repo 的所有 PR 共用一次 GraphQL 请求（每个 PR 一个别名），
+  取 head commit 的 statusCheckRollup：Actions、第三方 check run 和 commit status 都在里面
+- 复用一个 keep-alive HTTP 连接
+- 每个 PR 自适应退避：状态没变化就逐步拉长间隔，有变化回到最短间隔
+- 调用方按 PR 拿到一个 Future，可以 result(timeout) 阻塞，也可以 asyncio.wrap_future 后 await
+"""
+
+import os
+import json
+import time
+import threading
+import subprocess
+import http.client
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+if __package__:
+    from pipeline.pr_bot import CIResult, CIStatus, summarize_check_runs
+else:
+    from pr_bot import CIResult, CIStatus, summarize_check_runs
+
+DEFAULT_API_URL = "https://api.github.com"
+
+# 每个 PR 一次取回的检查数量（check run + commit status）
+CHECKS_PAGE_SIZE = 100
+
+# 每个 PR 的别名查询 %(alias)s: pullRequest(number: N) { ...rollup }
+ROLLUP_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+%s
+  }
+}
+
+fragment rollup on PullRequest {
+  commits(last: 1) {
+    nodes {
+      commit {
+        oid
+        statusCheckRollup {
+          contexts(first: %d) {
+            nodes {
+              __typename
+              ... on CheckRun {
+                databaseId name status conclusion detailsUrl startedAt completedAt
+              }
+              ... on StatusContext {
+                context state targetUrl createdAt
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# commit status 的 state -> (status, conclusion)，和 check run 的字段对齐
+STATUS_CONTEXT_STATES = {
+    "SUCCESS": ("completed", "success"),
+    "FAILURE": ("completed", "failure"),
+    "ERROR": ("completed", "failure"),
+    "PENDING": ("pending", None),
+    "EXPECTED": ("pending", None),
+}
+
+# ETag 缓存条目上限（按 URL）
+ETAG_CACHE_SIZE = 512
+
+
+class GitHubAPIError(RuntimeError):
+    """GitHub API 请求失败"""
+
+    def __init__(self, status: int, message: str, retry_after: float = 0.0):
+        super().__init__(f"GitHub API {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class GitHubClient:
+    """持久连接的 GitHub REST / GraphQL 客户端
+
+    所有请求复用同一个 keep-alive 连接（线程安全，串行发送）；
+    GET 响应按 URL 缓存 ETag，下次带 If-None-Match，304 时直接返回缓存的数据。
+    """
+
+    def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None, timeout: float = 30.0):
+        """初始化客户端
+
+        Args:
+            base_url: API 地址，默认取 GITHUB_API_URL 环境变量或 https://api.github.com
+            token: 访问 token，默认取 GH_TOKEN / GITHUB_TOKEN，都没有时用 `gh auth token`
+
+        Raises:
+            RuntimeError: 找不到可用的 token
+        """
+        base = (base_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL).rstrip("/")
+        parsed = urllib.parse.urlsplit(base)
+        self.scheme = parsed.scheme or "https"
+        self.host = parsed.netloc
+        self.prefix = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self.token = token or self._detect_token()
+        if not self.token:
+            raise RuntimeError("GitHub token not found (set GH_TOKEN or run `gh auth login`)")
+
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+        self._etags: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()  # url -> (etag, data)
+
+    @staticmethod
+    def _detect_token() -> Optional[str]:
+        """环境变量优先，其次复用 gh CLI 的登录态（只 fork 一次）"""
+        token = (os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN") or "").strip()
+        if token:
+            return token
+        try:
+            result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self.host, timeout=self.timeout)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_json(self, path: str, params: Optional[Dict[str, str]] = None) -> Tuple[Any, bool]:
+        """条件 GET
+
+        Args:
+            path: API 路径，如 /repos/owner/repo/pulls/1
+            params: 查询参数
+
+        Returns:
+            (数据, 是否有变化)；304 时返回缓存的数据和 False
+
+        Raises:
+            GitHubAPIError: 非 2xx/304 响应
+        """
+        url = self.prefix + path
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "pipeline-ci-watcher",
+        }
+        cached = self._etags.get(url)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        status, resp_headers, body = self._request("GET", url, headers)
+
+        if status == 304 and cached:
+            self._etags.move_to_end(url)
+            return cached[1], False
+        if status >= 400 or status < 200:
+            message = body[:300].decode("utf-8", errors="replace")
+            raise GitHubAPIError(status, message, self._retry_after(status, resp_headers))
+
+        data = json.loads(body) if body else None
+        etag = resp_headers.get("etag")
+        if etag:
+            self._etags[url] = (etag, data)
+            self._etags.move_to_end(url)
+            while len(self._etags) > ETAG_CACHE_SIZE:
+                self._etags.popitem(last=False)
+        return data, True
+
+    def graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GraphQL 查询
+
+        Args:
+            query: GraphQL 查询
+            variables: 查询变量
+
+        Returns:
+            响应的 data 和 errors（部分字段出错时 data 里对应的字段为 null）
+
+        Raises:
+            GitHubAPIError: 非 2xx 响应、被限流，或者整个查询失败（没有 data）
+        """
+        # GitHub Enterprise 的 REST 在 /api/v3，GraphQL 在 /api/graphql
+        prefix = self.prefix[: -len("/v3")] if self.prefix.endswith("/api/v3") else self.prefix
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+            "User-Agent": "pipeline-ci-watcher",
+        }
+        body = json.dumps({"query": query, "variables": variables or {}}).encode()
+
+        status, resp_headers, resp_body = self._request("POST", prefix + "/graphql", headers, body)
+
+        if status >= 400 or status < 200:
+            message = resp_body[:300].decode("utf-8", errors="replace")
+            raise GitHubAPIError(status, message, self._retry_after(status, resp_headers))
+
+        result = json.loads(resp_body) if resp_body else {}
+        errors = result.get("errors") or []
+        if any(e.get("type") == "RATE_LIMITED" for e in errors):
+            # GraphQL 限流也是 200，等待时间同样看 x-ratelimit-reset
+            raise GitHubAPIError(status, errors[0].get("message", ""), self._retry_after(429, resp_headers) or 60.0)
+        if result.get("data") is None:
+            message = "; ".join(e.get("message", "") for e in errors) or "empty response"
+            raise GitHubAPIError(status, message)
+        return result
+
+    def _request(
+        self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """在持久连接上发请求；连接被服务端关掉时重连重试一次"""
+        with self._lock:
+            for attempt in range(2):
+                conn = self._connect()
+                try:
+                    conn.request(method, url, body=body, headers=headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+                    if resp_headers.get("connection", "").lower() == "close":
+                        conn.close()
+                        self._conn = None
+                    return resp.status, resp_headers, body
+                except (http.client.HTTPException, ConnectionError, OSError):
+                    conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _retry_after(status: int, headers: Dict[str, str]) -> float:
+        """限流响应需要等待的秒数（非限流返回 0）"""
+        if status not in (403, 429):
+            return 0.0
+        if headers.get("retry-after", "").isdigit():
+            return float(headers["retry-after"])
+        if headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset", "").isdigit():
+            return max(1.0, float(headers["x-ratelimit-reset"]) - time.time())
+        return 0.0
+
+
+def rollup_runs(pull_request: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """把 PR head commit 的 statusCheckRollup 转成 check run 格式的列表
+
+    GraphQL 的枚举是大写，这里转成 REST check run 的小写 status/conclusion，
+    commit status（StatusContext）按 STATUS_CONTEXT_STATES 折算，summarize_check_runs 直接可用。
+    """
+    commits = ((pull_request or {}).get("commits") or {}).get("nodes") or [{}]
+    commit = (commits[-1] or {}).get("commit") or {}
+    rollup = commit.get("statusCheckRollup") or {}
+
+    runs = []
+    for node in (rollup.get("contexts") or {}).get("nodes") or []:
+        if node.get("__typename") == "CheckRun":
+            runs.append({
+                "id": node.get("databaseId") or 0,
+                "name": node.get("name", ""),
+                "status": (node.get("status") or "").lower(),
+                "conclusion": (node.get("conclusion") or "").lower() or None,
+                "created_at": node.get("startedAt") or "",
+                "updated_at": node.get("completedAt") or node.get("startedAt") or "",
+                "html_url": node.get("detailsUrl") or "",
+            })
+        elif node.get("__typename") == "StatusContext":
+            status, conclusion = STATUS_CONTEXT_STATES.get(node.get("state"), ("pending", None))
+            runs.append({
+                "id": 0,
+                "name": node.get("context", ""),
+                "status": status,
+                "conclusion": conclusion,
+                "created_at": node.get("createdAt") or "",
+                "updated_at": node.get("createdAt") or "",
+                "html_url": node.get("targetUrl") or "",
+            })
+    return runs
+
+
+@dataclass
+class _Watch:
+    """一个被监视的 PR"""
+
+    repo: str
+    pr_number: int
+    pr_url: str
+    deadline: float
+    timeout: float
+    max_interval: float
+    future: Future = field(default_factory=Future)
+    interval: float = 0.0
+    next_due: float = 0.0
+    signature: Tuple = ()
+    last_error: str = ""
+
+
+class CIWatcher:
+    """共享 CI 轮询服务
+
+    一个后台线程负责所有 PR：每轮按 repo 分组，repo 里有 PR 到期时
+    该 repo 所有被监视的 PR 共用一次 GraphQL 请求。
+    """
+
+    TERMINAL = (CIStatus.SUCCESS, CIStatus.FAILURE, CIStatus.ERROR)
+
+    def __init__(
+        self,
+        client: Optional[GitHubClient] = None,
+        min_interval: float = 10.0,
+        max_interval: float = 120.0,
+        backoff: float = 1.5,
+    ):
+        """初始化 watcher
+
+        Args:
+            client: GitHub 客户端，默认新建
+            min_interval: 每个 PR 最短轮询间隔（秒），状态有变化时回到这个值
+            max_interval: 每个 PR 最长轮询间隔（秒）
+            backoff: 状态没变化时间隔的放大倍数
+        """
+        self.client = client or GitHubClient()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+        self._watches: Dict[Tuple[str, int], _Watch] = {}
+        self._cond = threading.Condition()
+        self._paused_until = 0.0  # 被限流时整体暂停到这个时间
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def watch(
+        self,
+        repo: str,
+        pr_number: int,
+        timeout: float = 600,
+        pr_url: str = "",
+        max_interval: Optional[float] = None,
+    ) -> Future:
+        """开始监视一个 PR 的 CI，返回在 CI 结束（或超时）时完成的 Future
+
+        同一个 PR 重复 watch 时共用同一个 Future，截止时间取较晚的那个。
+
+        Args:
+            repo: 仓库 (owner/repo)
+            pr_number: PR number
+            timeout: 超时时间（秒），超时后 Future 的结果是 UNKNOWN
+            pr_url: PR URL（只用于结果 details）
+            max_interval: 这个 PR 的最长轮询间隔，默认用 watcher 的设置
+
+        Returns:
+            Future[CIResult]
+        """
+        now = time.time()
+        key = (repo, pr_number)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("CIWatcher stopped")
+            watch = self._watches.get(key)
+            if watch is None or watch.future.done():
+                watch = _Watch(
+                    repo=repo,
+                    pr_number=pr_number,
+                    pr_url=pr_url,
+                    deadline=now + timeout,
+                    timeout=timeout,
+                    max_interval=min(max_interval or self.max_interval, self.max_interval),
+                    interval=self.min_interval,
+                    next_due=now,
+                )
+                self._watches[key] = watch
+            else:
+                if now + timeout > watch.deadline:
+                    watch.deadline = now + timeout
+                    watch.timeout = timeout
+            self._ensure_thread()
+            self._cond.notify()
+            return watch.future
+
+    def stop(self):
+        """停止后台线程，未完成的 Future 全部取消"""
+        with self._cond:
+            self._stopped = True
+            watches, self._watches = list(self._watches.values()), {}
+            self._cond.notify()
+        for watch in watches:
+            watch.future.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.client.close()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="ci-watcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as e:
+            # 线程意外退出：等待中的 Future 以异常结束，不让调用方一直挂到超时
+            with self._cond:
+                watches, self._watches = list(self._watches.values()), {}
+            for watch in watches:
+                self._fail(watch, e)
+            raise
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                for key, watch in list(self._watches.items()):
+                    if watch.future.done():
+                        del self._watches[key]
+                    elif now >= watch.deadline:
+                        del self._watches[key]
+                        self._finish(watch, self._timed_out(watch))
+                if not self._watches:
+                    self._cond.wait()
+                    continue
+                wake_at = max(self._paused_until, min(w.next_due for w in self._watches.values()))
+                wake_at = min(wake_at, min(w.deadline for w in self._watches.values()))
+                if wake_at > now:
+                    self._cond.wait(timeout=wake_at - now)
+                    continue
+                by_repo: Dict[str, List[_Watch]] = {}
+                for watch in self._watches.values():
+                    by_repo.setdefault(watch.repo, []).append(watch)
+
+            for repo, watches in by_repo.items():
+                # 有一个 PR 到期就把这个 repo 的 PR 一起查：同一个请求，不多花配额
+                if not any(w.next_due <= now for w in watches):
+                    continue
+                try:
+                    self._poll_repo(repo, watches)
+                except Exception as e:
+                    # 处理响应时的意外错误（不是请求失败）：重试也不会好，直接结束这些 PR
+                    with self._cond:
+                        for watch in watches:
+                            self._watches.pop((watch.repo, watch.pr_number), None)
+                    for watch in watches:
+                        self._fail(watch, e)
+
+    def _poll_repo(self, repo: str, due: List[_Watch]):
+        """一次 GraphQL 请求更新同一 repo 下的 PR（每个 PR 一个别名）"""
+        owner, _, name = repo.partition("/")
+        aliases = "\n".join(
+            f"    pr{watch.pr_number}: pullRequest(number: {watch.pr_number}) {{ ...rollup }}"
+            for watch in due
+        )
+        try:
+            result = self.client.graphql(
+                ROLLUP_QUERY % (aliases, CHECKS_PAGE_SIZE), {"owner": owner, "name": name}
+            )
+        except Exception as e:
+            self._poll_failed(due, e)
+            return
+
+        repository = result["data"].get("repository")
+        if repository is None:
+            self._poll_failed(due, GitHubAPIError(404, self._graphql_error(result, "repository")))
+            return
+
+        for watch in due:
+            pull_request = repository.get(f"pr{watch.pr_number}")
+            if pull_request is None:
+                # PR 不存在或者没权限：只这一个按退避重试，直到超时
+                error = self._graphql_error(result, f"pr{watch.pr_number}")
+                self._poll_failed([watch], GitHubAPIError(404, error))
+                continue
+            self._update(watch, rollup_runs(pull_request))
+
+    @staticmethod
+    def _graphql_error(result: Dict[str, Any], field_name: str) -> str:
+        """GraphQL 响应里某个字段对应的错误信息"""
+        for error in result.get("errors") or []:
+            if field_name in (error.get("path") or []):
+                return error.get("message", "")
+        return f"{field_name} not found"
+
+    def _update(self, watch: _Watch, runs: List[Dict[str, Any]]):
+        """用最新的 run 列表更新一个 PR：结束则完成 Future，否则按是否有变化调整间隔"""
+        result = summarize_check_runs(runs)
+        result.details = {"pr_url": watch.pr_url, "pr_number": watch.pr_number}
+
+        if result.overall_status in self.TERMINAL:
+            with self._cond:
+                self._watches.pop((watch.repo, watch.pr_number), None)
+            self._finish(watch, result)
+            return
+
+        signature = tuple((r.get("id"), r.get("name"), r.get("status"), r.get("conclusion")) for r in runs)
+        if signature != watch.signature:
+            watch.signature = signature
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(watch.interval * self.backoff, watch.max_interval)
+        watch.last_error = ""
+        watch.next_due = time.time() + watch.interval
+
+    def _poll_failed(self, watches: List[_Watch], error: Exception):
+        """请求失败：限流时整体暂停，其他错误按退避重试，直到超时"""
+        retry_after = getattr(error, "retry_after", 0.0)
+        if retry_after:
+            with self._cond:
+                self._paused_until = max(self._paused_until, time.time() + retry_after)
+        for watch in watches:
+            watch.last_error = str(error)
+            watch.interval = min(watch.interval * self.backoff, watch.max_interval)
+            watch.next_due = time.time() + max(watch.interval, retry_after)
+
+    @staticmethod
+    def _finish(watch: _Watch, result: CIResult):
+        if not watch.future.done():
+            try:
+                watch.future.set_result(result)
+            except Exception:
+                # 调用方已经 cancel
+                pass
+
+    @staticmethod
+    def _fail(watch: _Watch, error: BaseException):
+        if not watch.future.done():
+            try:
+                watch.future.set_exception(error)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _timed_out(watch: _Watch) -> CIResult:
+        details = {"error": f"CI check timed out after {watch.timeout}s", "pr_url": watch.pr_url}
+        if watch.last_error:
+            details["last_error"] = watch.last_error
+        return CIResult(overall_status=CIStatus.UNKNOWN, details=details)
+
+
+_watcher: Optional[CIWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher() -> CIWatcher:
+    """进程内共享的 CIWatcher
+
+    Raises:
+        RuntimeError: 没有可用的 GitHub token
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = CIWatcher()
+        return _watcher
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 """Code Pipeline - 主编排器"""
 
-import time
 import tempfile
 import shutil
 from pathlib import Path
@@ -72,7 +71,7 @@ class CodePipeline:
         self.planner = Planner(llm_client)
         self.coder = Coder(llm_client, model=coder_model)
 
-    def run_cycle(self, worker_id: str) -> CycleResult:
+    def run_cycle(self, worker_id: str, wait: Optional[float] = None) -> CycleResult:
         """运行一个完整的 cycle:
         1. 认领任务（SCOUT 已在入队时完成）
         2. PLANNER 拆解
@@ -82,12 +81,13 @@ class CodePipeline:
 
         Args:
             worker_id: worker 标识
+            wait: 没有任务时等待新任务入队的秒数（None 表示立即返回 idle）
 
         Returns:
             result: Cycle 执行结果
         """
         # 1. 认领任务
-        jobs = self.queue.claim(worker_id, max_jobs=1)
+        jobs = self.queue.claim(worker_id, max_jobs=1, wait=wait)
 
         if not jobs:
             return CycleResult(
@@ -99,13 +99,14 @@ class CodePipeline:
 
         job = jobs[0]
         job_id = job['id']
+        token = job.get('lock_token')
         payload = yaml.safe_load(job['payload'])
 
         try:
             # 2. PLANNER 拆解
             result = self._run_planner(job_id, payload)
             if not result.success:
-                self.queue.release(job_id, 'failed', error=result.error)
+                self.queue.release(job_id, 'failed', error=result.error, token=token)
                 return result
 
             plan = result.data['plan']
@@ -114,7 +115,7 @@ class CodePipeline:
             # 3. CODER 执行
             result = self._run_coder(job_id, payload, plan, spec)
             if not result.success:
-                self.queue.release(job_id, 'failed', error=result.error)
+                self.queue.release(job_id, 'failed', error=result.error, token=token)
                 return result
 
             exec_result = result.data['exec_result']
@@ -122,7 +123,7 @@ class CodePipeline:
             # 4. 测试验证
             result = self._run_tests(job_id, payload, exec_result)
             if not result.success:
-                self.queue.release(job_id, 'needs_human', error=result.error)
+                self.queue.release(job_id, 'needs_human', error=result.error, token=token)
                 return result
 
             # 5. 任务完成
@@ -133,7 +134,8 @@ class CodePipeline:
                     'spec': spec,
                     'files_changed': exec_result.files_changed,
                     'test_passed': result.data['test_result'].success
-                }
+                },
+                token=token
             )
 
             return CycleResult(
@@ -149,7 +151,7 @@ class CodePipeline:
             )
 
         except Exception as e:
-            self.queue.release(job_id, 'failed', error=str(e))
+            self.queue.release(job_id, 'failed', error=str(e), token=token)
             return CycleResult(
                 success=False,
                 stage='unknown',
@@ -354,7 +356,7 @@ class CodePipeline:
         Args:
             worker_id: worker 标识
             max_jobs: 最多执行的任务数（None 表示无限）
-            sleep_interval: 无任务时的休眠时间（秒）
+            sleep_interval: 无任务时等待新任务的最长时间（秒），入队时立即唤醒
         """
         job_count = 0
 
@@ -364,12 +366,10 @@ class CodePipeline:
                     print(f"Reached max jobs limit: {max_jobs}")
                     break
 
-                result = self.run_cycle(worker_id)
+                # 无任务时在 claim 里长轮询等待入队
+                result = self.run_cycle(worker_id, wait=sleep_interval)
 
-                if result.stage == 'idle':
-                    # 无任务，休眠
-                    time.sleep(sleep_interval)
-                else:
+                if result.stage != 'idle':
                     job_count += 1
                     print(f"Cycle {job_count} completed: {result.message}")
 
@@ -1,58 +1,84 @@
 #!/usr/bin/env python3
 """Code Task Queue Manager"""
 
-import sqlite3
 import json
+import sqlite3
+import time
 import uuid
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
-from contextlib import contextmanager
 from typing import List, Dict, Optional
 
+from pipeline.sqlite_pool import get_pool
+
 DB_PATH = Path(__file__).parent / "pipeline.db"
 
 
-@contextmanager
 def get_db():
-    """Context manager for database connection"""
-    conn = sqlite3.connect(str(DB_PATH), timeout=30.0)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    """Transaction on this thread's pooled connection"""
+    return get_pool(DB_PATH).transaction()
+
+
+class _EnqueueSignal:
+    """同进程内的入队通知：claim(wait=...) 在此等待，enqueue 时唤醒"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.seq = 0
+
+    def notify(self):
+        with self.cond:
+            self.seq += 1
+            self.cond.notify_all()
+
+    def wait(self, seen: int, timeout: float):
+        with self.cond:
+            if self.seq == seen:
+                self.cond.wait(timeout)
+
+
+_signals: Dict[str, _EnqueueSignal] = {}
+_signals_lock = threading.Lock()
 
 
 class CodeQueue:
     """代码任务队列管理器"""
 
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, poll_interval: float = 1.0):
         """初始化 CodeQueue
 
         Args:
             db_path: 数据库路径，默认使用 pipeline.db
+            poll_interval: claim(wait=...) 的轮询间隔（秒），用于感知其他进程的入队
         """
         self.db_path = db_path or str(DB_PATH)
+        self.poll_interval = poll_interval
+        with _signals_lock:
+            self._signal = _signals.setdefault(self.db_path, _EnqueueSignal())
+        self._ensure_schema()
 
-    @contextmanager
-    def _get_db(self):
-        """Internal database context manager"""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+    def _ensure_schema(self):
+        """旧库补 lock_token 列（fencing token）和认领索引
+
+        每次打开都检查（都是 IF NOT EXISTS 级别的开销），不按进程缓存：
+        库文件被删掉重建后，claim_many 的 INDEXED BY 依赖的索引必须还在。
+        """
+        with self._get_db() as conn:
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(code_jobs)")}
+            if not columns:
+                return  # 表还没创建（init_db 会建好）
+            if "lock_token" not in columns:
+                conn.execute("ALTER TABLE code_jobs ADD COLUMN lock_token INTEGER DEFAULT 0")
+            conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_code_jobs_claim
+                   ON code_jobs(priority, created_at, lock_owner, lock_expires_at)
+                   WHERE state IN ('queued', 'running')"""
+            )
+
+    def _get_db(self, immediate: bool = False):
+        """Internal database context manager (pooled per-thread connection)"""
+        return get_pool(self.db_path).transaction(immediate=immediate)
 
     def enqueue(
         self,
@@ -97,66 +123,122 @@ class CodeQueue:
                     now,
                 ),
             )
+        self._signal.notify()
         return job_id
 
-    def claim(self, worker_id: str, max_jobs: int = 3, timeout_minutes: int = 30) -> List[dict]:
+    def claim(
+        self,
+        worker_id: str,
+        max_jobs: int = 3,
+        timeout_minutes: int = 30,
+        wait: Optional[float] = None,
+        source: Optional[str] = None,
+    ) -> List[dict]:
         """worker 认领任务（带锁）
 
         Args:
             worker_id: worker 标识
             max_jobs: 最多认领的任务数
             timeout_minutes: 锁超时时间（分钟）
+            wait: 没有可认领任务时最多等待的秒数（长轮询），None 表示立即返回。
+                同进程的 enqueue 会立即唤醒，其他进程的入队按 poll_interval 感知
+            source: 只认领这个来源的任务，None 表示不限
 
         Returns:
-            jobs: 认领的任务列表
+            jobs: 认领的任务列表（含 lock_token）
         """
+        deadline = time.monotonic() + wait if wait else None
+
+        while True:
+            seen = self._signal.seq
+            jobs = self.claim_many(worker_id, max_jobs, timeout_minutes, source=source)
+            if jobs or deadline is None:
+                return jobs
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            self._signal.wait(seen, min(remaining, self.poll_interval))
+
+    def claim_many(
+        self,
+        worker_id: str,
+        count: int,
+        timeout_minutes: int = 30,
+        source: Optional[str] = None,
+    ) -> List[dict]:
+        """原子批量认领：一条 UPDATE ... RETURNING 完成筛选、加锁和返回
+
+        可认领 = queued，或 running 但锁已过期。子查询按 idx_code_jobs_claim
+        （只覆盖可认领状态的部分索引）顺序扫描，取够 count 个即停；索引不存在
+        （CodeQueue 打开之后才建的表）时先补建再认领。BEGIN IMMEDIATE 先拿写锁，
+        并发 worker 串行执行认领语句，同一任务不会被两个 worker 拿到。
+        每次认领 lock_token 加一，作为 fencing token：锁过期被别人重新认领后，
+        旧 worker 带旧 token 的 release/renew_lock 会被拒绝。
+
+        Args:
+            worker_id: worker 标识
+            count: 最多认领的任务数
+            timeout_minutes: 锁超时时间（分钟）
+            source: 只认领这个来源的任务，None 表示不限
+
+        Returns:
+            jobs: 认领的任务列表，按 (priority, created_at) 排序
+        """
+        if count <= 0:
+            return []
+
         lock_expires = (datetime.utcnow() + timedelta(minutes=timeout_minutes)).isoformat()
         now = datetime.utcnow().isoformat()
-        jobs_claimed = []
-
-        with self._get_db() as conn:
-            # 查询可认领的任务（queued 或 lock 过期的 running 任务）
-            cursor = conn.execute(
-                """SELECT * FROM code_jobs
-                   WHERE state IN ('queued', 'running')
-                     AND (lock_owner IS NULL OR lock_expires_at < ?)
-                   ORDER BY priority ASC, created_at ASC
-                   LIMIT ?""",
-                (now, max_jobs),
-            )
 
-            rows = cursor.fetchall()
-            for row in rows:
-                job = dict(row)
-                job_id = job["id"]
-
-                # 更新任务状态为 running 并加锁
-                conn.execute(
-                    """UPDATE code_jobs
-                       SET state = 'running',
-                           lock_owner = ?,
-                           lock_expires_at = ?,
-                           started_at = COALESCE(started_at, ?),
-                           updated_at = ?
-                       WHERE id = ?""",
-                    (worker_id, lock_expires, now, now, job_id),
-                )
-
-                # 重新查询获取更新后的数据
-                updated = conn.execute(
-                    "SELECT * FROM code_jobs WHERE id = ?", (job_id,)
-                ).fetchone()
-                if updated:
-                    jobs_claimed.append(dict(updated))
-
-        return jobs_claimed
+        try:
+            rows = self._claim_rows(worker_id, count, lock_expires, now, source)
+        except sqlite3.OperationalError as e:
+            if "no such index" not in str(e):
+                raise
+            self._ensure_schema()
+            rows = self._claim_rows(worker_id, count, lock_expires, now, source)
+
+        jobs = [dict(r) for r in rows]
+        jobs.sort(key=lambda j: (j["priority"], j["created_at"]))
+        return jobs
+
+    def _claim_rows(
+        self,
+        worker_id: str,
+        count: int,
+        lock_expires: str,
+        now: str,
+        source: Optional[str],
+    ) -> list:
+        with self._get_db(immediate=True) as conn:
+            return conn.execute(
+                """UPDATE code_jobs
+                   SET state = 'running',
+                       lock_owner = ?,
+                       lock_expires_at = ?,
+                       lock_token = COALESCE(lock_token, 0) + 1,
+                       started_at = COALESCE(started_at, ?),
+                       updated_at = ?
+                   WHERE id IN (
+                       SELECT id FROM code_jobs INDEXED BY idx_code_jobs_claim
+                       WHERE state IN ('queued', 'running')
+                         AND (lock_owner IS NULL OR lock_expires_at < ?)
+                         AND (? IS NULL OR source = ?)
+                       ORDER BY priority ASC, created_at ASC
+                       LIMIT ?
+                   )
+                   RETURNING *""",
+                (worker_id, lock_expires, now, now, now, source, source, count),
+            ).fetchall()
 
     def release(
         self,
         job_id: str,
         state: str,
         error: str = None,
-        artifact_links: dict = None
+        artifact_links: dict = None,
+        token: int = None
     ) -> bool:
         """释放任务（完成/失败）
 
@@ -165,19 +247,22 @@ class CodeQueue:
             state: 最终状态 ('done', 'failed', 'needs_human', 'blocked')
             error: 错误信息（如果有）
             artifact_links: 更新的工件链接
+            token: 认领时拿到的 lock_token；给出时，锁已被别人重新认领则拒绝释放
 
         Returns:
             success: 是否成功更新
         """
         now = datetime.utcnow().isoformat()
 
-        with self._get_db() as conn:
+        with self._get_db(immediate=True) as conn:
             # 检查任务是否存在
             job = conn.execute(
                 "SELECT * FROM code_jobs WHERE id = ?", (job_id,)
             ).fetchone()
             if not job:
                 return False
+            if token is not None and job["lock_token"] != token:
+                return False
 
             job_dict = dict(job)
 
@@ -334,13 +419,16 @@ class CodeQueue:
             ).fetchall()
             return [dict(r) for r in rows]
 
-    def renew_lock(self, job_id: str, worker_id: str, timeout_minutes: int = 30) -> bool:
+    def renew_lock(
+        self, job_id: str, worker_id: str, timeout_minutes: int = 30, token: int = None
+    ) -> bool:
         """续期任务锁
 
         Args:
             job_id: 任务 ID
             worker_id: worker 标识
             timeout_minutes: 锁超时时间（分钟）
+            token: 认领时拿到的 lock_token；给出时还要求 token 一致
 
         Returns:
             success: 是否成功续期
@@ -353,8 +441,9 @@ class CodeQueue:
             cursor = conn.execute(
                 """UPDATE code_jobs
                    SET lock_expires_at = ?, updated_at = ?
-                   WHERE id = ? AND lock_owner = ?""",
-                (lock_expires, now, job_id, worker_id),
+                   WHERE id = ? AND lock_owner = ?
+                     AND (? IS NULL OR lock_token = ?)""",
+                (lock_expires, now, job_id, worker_id, token, token),
             )
             return cursor.rowcount > 0
 
@@ -381,7 +470,10 @@ class CodeQueue:
                      AND lock_expires_at < ?""",
                 (now, now),
             )
-            return cursor.rowcount
+            count = cursor.rowcount
+        if count:
+            self._signal.notify()
+        return count
 
     def reset_job(self, job_id: str, state: str = "queued") -> bool:
         """重置任务状态
@@ -409,4 +501,7 @@ class CodeQueue:
                    WHERE id = ?""",
                 (state, now, job_id),
             )
-            return cursor.rowcount > 0
+            reset = cursor.rowcount > 0
+        if reset and state == "queued":
+            self._signal.notify()
+        return reset
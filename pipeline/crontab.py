@@ -32,7 +32,8 @@ def get_scheduler_path() -> Path:
 def install_cron(
     night_batch_cron: Optional[str] = None,
     ci_scan_cron: Optional[str] = None,
-    log_path: Optional[str] = None
+    log_path: Optional[str] = None,
+    supervisor: bool = False
 ) -> bool:
     """安装 cron job
 
@@ -40,6 +41,9 @@ def install_cron(
         night_batch_cron: 夜间批量任务的 cron 表达式，默认 "0 1 * * *" (每天 1:00)
         ci_scan_cron: CI 扫描任务的 cron 表达式，默认 "*/15 * * * *" (每 15 分钟)
         log_path: 日志文件路径
+        supervisor: 改为安装常驻 supervisor（scheduler.py serve）的保活项，
+            不再由 cron 拉起批量任务和 CI 扫描（supervisor 自带不受夜间窗口限制的 CI 扫描通道）；
+            supervisor 已在运行时新进程拿不到文件锁会立即退出
 
     Returns:
         success: 是否成功安装
@@ -57,12 +61,19 @@ def install_cron(
         log_path = str(Path(__file__).parent / "night_shift.log")
 
     # 构建 cron 命令
-    cron_entries = [
-        # 夜间批量任务 (1:00 AM)
-        f"{night_batch_cron} cd {Path.cwd()} && {python_path} {scheduler_path} run_batch night_worker 3 >> {log_path} 2>&1 {CRON_COMMENT} night_batch",
-        # CI 失败扫描 (每 15 分钟)
-        f"{ci_scan_cron} cd {Path.cwd()} && {python_path} {scheduler_path} scan_ci ci_worker 2 >> {log_path} 2>&1 {CRON_COMMENT} ci_scan",
-    ]
+    if supervisor:
+        cron_entries = [
+            f"@reboot cd {Path.cwd()} && {python_path} {scheduler_path} serve night_supervisor >> {log_path} 2>&1 {CRON_COMMENT} supervisor",
+            # 保活：崩溃后 5 分钟内拉起
+            f"*/5 * * * * cd {Path.cwd()} && {python_path} {scheduler_path} serve night_supervisor >> {log_path} 2>&1 {CRON_COMMENT} supervisor",
+        ]
+    else:
+        cron_entries = [
+            # 夜间批量任务 (1:00 AM)
+            f"{night_batch_cron} cd {Path.cwd()} && {python_path} {scheduler_path} run_batch night_worker 3 >> {log_path} 2>&1 {CRON_COMMENT} night_batch",
+            # CI 失败扫描 (每 15 分钟)
+            f"{ci_scan_cron} cd {Path.cwd()} && {python_path} {scheduler_path} scan_ci ci_worker 2 >> {log_path} 2>&1 {CRON_COMMENT} ci_scan",
+        ]
 
     # 获取现有 cron
     try:
@@ -173,10 +184,17 @@ def list_cron() -> List[dict]:
     for line in existing_cron.split('\n'):
         if CRON_TAG in line:
             parts = line.split()
-            if len(parts) >= 6:
-                cron_expr = ' '.join(parts[:5])
-                command = ' '.join(parts[5:])
-                job_type = "ci_scan" if "ci_scan" in line else "night_batch"
+            # @reboot 之类的特殊表达式只占一个字段
+            n = 1 if parts and parts[0].startswith('@') else 5
+            if len(parts) > n:
+                cron_expr = ' '.join(parts[:n])
+                command = ' '.join(parts[n:])
+                if " serve " in line:
+                    job_type = "supervisor"
+                elif "ci_scan" in line:
+                    job_type = "ci_scan"
+                else:
+                    job_type = "night_batch"
                 cron_jobs.append({
                     'cron_expr': cron_expr,
                     'command': command,
@@ -197,8 +215,10 @@ def verify_cron() -> bool:
     if not cron_jobs:
         return False
 
-    # 检查是否有两种类型的 job
+    # 常驻 supervisor，或者两种批量 job 都在
     job_types = {job['type'] for job in cron_jobs}
+    if 'supervisor' in job_types:
+        return True
     return 'night_batch' in job_types and 'ci_scan' in job_types
 
 
@@ -230,6 +250,10 @@ def main():
     install_parser.add_argument('--night-cron', help='Night batch cron expression (default: "0 1 * * *")')
     install_parser.add_argument('--ci-cron', help='CI scan cron expression (default: "*/15 * * * *")')
     install_parser.add_argument('--log', help='Log file path')
+    install_parser.add_argument(
+        '--supervisor', action='store_true',
+        help='Keep a long-lived scheduler supervisor running instead of cron-spawned batches'
+    )
 
     # remove 命令
     subparsers.add_parser('remove', help='Remove cron jobs')
@@ -246,7 +270,8 @@ def main():
         success = install_cron(
             night_batch_cron=args.night_cron,
             ci_scan_cron=args.ci_cron,
-            log_path=args.log
+            log_path=args.log,
+            supervisor=args.supervisor
         )
         if success:
             print("Cron jobs installed successfully")
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """Pipeline 数据库管理"""
 
-import sqlite3
 import json
 from pathlib import Path
 from contextlib import contextmanager
 from datetime import datetime
 
+if __package__:
+    from pipeline.sqlite_pool import get_pool
+else:  # pipeline.py 以脚本运行时按顶层模块导入 db（pipeline 目录在 sys.path 上）
+    from sqlite_pool import get_pool
+
 DB_PATH = Path(__file__).parent / "pipeline.db"
 
 
@@ -45,6 +49,7 @@ def init_db():
                 state TEXT DEFAULT 'queued' CHECK(state IN ('queued','running','blocked','done','failed','needs_human')),
                 lock_owner TEXT,
                 lock_expires_at TEXT,
+                lock_token INTEGER DEFAULT 0,
                 workspace_path TEXT,
                 artifact_links JSON DEFAULT '{}',
                 payload JSON,
@@ -58,23 +63,28 @@ def init_db():
             );
             CREATE INDEX IF NOT EXISTS idx_code_jobs_state ON code_jobs(state);
             CREATE INDEX IF NOT EXISTS idx_code_jobs_lock ON code_jobs(lock_owner, lock_expires_at);
+            CREATE INDEX IF NOT EXISTS idx_code_jobs_claim
+                ON code_jobs(priority, created_at, lock_owner, lock_expires_at)
+                WHERE state IN ('queued', 'running');
         """)
 
 
-@contextmanager
 def get_db():
-    conn = sqlite3.connect(str(DB_PATH), timeout=30.0)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.row_factory = sqlite3.Row
-    try:
+    """当前线程的池化连接上的事务（嵌套在 batch() 里时并入外层事务）"""
+    return get_pool(DB_PATH).transaction()
+
+
+@contextmanager
+def batch():
+    """写合并：块内所有 helper 的写入作为一个事务提交
+
+    Example:
+        with batch():
+            save_layer_result(run_id, "L4", "FAIL", attempt=1, error=err)
+            save_layer_result(run_id, "L4", "RUNNING", attempt=2)
+    """
+    with get_pool(DB_PATH).transaction() as conn:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def create_run(project: str, config: dict = None) -> int:
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""测试影响分析
+
+根据工作区的 Python import 图，把改动的文件映射到受影响的测试模块；
+测试文件按 (测试文件哈希, 依赖闭包哈希, 测试目录下数据文件哈希) 缓存通过记录，
+依赖没变的测试直接跳过
+"""
+
+import ast
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from dataclasses import dataclass, field
+
+CACHE_PATH = Path.home() / ".cache" / "pipeline" / "test-results.json"
+
+# 扫描时跳过的目录
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".mypy_cache",
+             ".pytest_cache", ".ruff_cache", "dist", "build"}
+
+# 影响所有测试的 pytest 配置文件
+CONFIG_FILES = ("pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini", "setup.py",
+                "requirements.txt")
+
+# 不影响测试结果的改动
+DOC_EXTS = (".md", ".rst", ".txt", ".png", ".jpg", ".jpeg", ".gif", ".svg")
+
+
+def is_test_file(rel_path: str) -> bool:
+    """pytest 默认的测试文件命名"""
+    name = os.path.basename(rel_path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+@dataclass
+class TestSelection:
+    """测试选择结果"""
+    run: List[str] = field(default_factory=list)      # 需要执行的测试文件
+    cached: List[str] = field(default_factory=list)   # 依赖没变、命中缓存跳过的测试文件
+    keys: Dict[str, str] = field(default_factory=dict)  # 测试文件 -> 缓存 key
+    use_cache: bool = True  # 改动了 import 图看不到的文件（数据、配置）时不走缓存
+
+
+class ImportGraph:
+    """工作区 Python 文件的 import 图（只包含工作区内的模块）
+
+    missing: 已删除 / 改名前的 .py 路径，作为图里的虚拟节点 — 还在 import 旧模块的文件
+    仍然解析到它上面，删掉或改名一个模块时能找到原来的依赖方
+    """
+
+    def __init__(self, workspace: str, missing: Set[str] = frozenset()):
+        self.workspace = Path(workspace)
+        self.missing: Set[str] = set(missing)
+        self.files: Set[str] = set(self.missing)
+        self.data_files: Set[str] = set()  # 非 .py 文件（测试数据、fixture 等）
+        self.imports: Dict[str, Set[str]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._data_digests: Dict[str, str] = {}
+
+        for root, dirs, names in os.walk(self.workspace):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            rel_root = os.path.relpath(root, self.workspace)
+            for name in names:
+                rel_path = name if rel_root == "." else os.path.join(rel_root, name)
+                (self.files if name.endswith(".py") else self.data_files).add(rel_path)
+
+        self.roots = [""] + (["src"] if (self.workspace / "src").is_dir() else [])
+        for rel_path in self.files:
+            self.imports[rel_path] = self._parse_imports(rel_path)
+
+        self.dependents: Dict[str, Set[str]] = {f: set() for f in self.files}
+        for rel_path, deps in self.imports.items():
+            for dep in deps:
+                self.dependents[dep].add(rel_path)
+
+    @property
+    def test_files(self) -> List[str]:
+        return sorted(f for f in self.files if is_test_file(f) and f not in self.missing)
+
+    def _module_file(self, root: str, module: str) -> Optional[str]:
+        """root 下的 dotted 模块名 → 文件"""
+        base = os.path.join(root, *module.split("."))
+        for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+            candidate = os.path.normpath(candidate)
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def _resolve(self, module: str, roots: List[str]) -> Set[str]:
+        """解析模块及其父包的 __init__.py"""
+        found = set()
+        parts = module.split(".")
+        for root in roots:
+            target = self._module_file(root, module)
+            if target:
+                found.add(target)
+                for i in range(1, len(parts)):
+                    init = self._module_file(root, ".".join(parts[:i]))
+                    if init:
+                        found.add(init)
+                break
+        return found
+
+    def _parse_imports(self, rel_path: str) -> Set[str]:
+        try:
+            tree = ast.parse((self.workspace / rel_path).read_bytes())
+        except (SyntaxError, ValueError, OSError):
+            return set()
+
+        file_dir = os.path.dirname(rel_path)
+        # 同目录优先（pytest rootdir/prepend 导入方式），再到全局源码根
+        roots = [file_dir] + self.roots
+        deps = set()
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    deps |= self._resolve(alias.name, roots)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    # 相对导入：从当前包往上 level-1 层
+                    package = file_dir
+                    for _ in range(node.level - 1):
+                        package = os.path.dirname(package)
+                    base_roots = [package]
+                    module = node.module or ""
+                else:
+                    base_roots = roots
+                    module = node.module
+
+                for alias in node.names:
+                    # from pkg import name: name 可能是子模块
+                    name = f"{module}.{alias.name}" if module else alias.name
+                    sub = self._resolve(name, base_roots)
+                    deps |= sub if sub else (self._resolve(module, base_roots) if module else set())
+
+        deps.discard(rel_path)
+        return deps
+
+    def closure(self, rel_path: str) -> Set[str]:
+        """文件的传递依赖（含自身）"""
+        seen = {rel_path}
+        stack = [rel_path]
+        while stack:
+            for dep in self.imports.get(stack.pop(), ()):
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append(dep)
+        return seen
+
+    def affected(self, changed: Set[str]) -> Set[str]:
+        """依赖了改动文件的所有文件（含改动文件自身）"""
+        seen = {f for f in changed if f in self.files}
+        stack = list(seen)
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return seen
+
+    def file_hash(self, rel_path: str) -> str:
+        digest = self._hashes.get(rel_path)
+        if digest is None:
+            try:
+                digest = hashlib.sha1((self.workspace / rel_path).read_bytes()).hexdigest()
+            except OSError:
+                digest = ""
+            self._hashes[rel_path] = digest
+        return digest
+
+    def data_digest(self, directory: str) -> str:
+        """目录（递归）下所有非 .py 文件的哈希 — import 图看不到测试读的数据文件"""
+        digest = self._data_digests.get(directory)
+        if digest is None:
+            h = hashlib.sha1()
+            prefix = directory + os.sep if directory else ""
+            for rel_path in sorted(f for f in self.data_files if f.startswith(prefix)):
+                h.update(f"{rel_path}\0{self.file_hash(rel_path)}\0".encode())
+            digest = self._data_digests[directory] = h.hexdigest()
+        return digest
+
+
+class TestResultCache:
+    """通过的测试文件记录：缓存 key -> {passed, test}，跨工作区共享"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: Path = CACHE_PATH, max_entries: int = 20000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        try:
+            self.entries: Dict[str, dict] = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def put(self, key: str, record: dict):
+        self.entries[key] = record
+
+    def save(self):
+        """原子写回（合并其他进程同时写入的记录）"""
+        with self._lock:
+            try:
+                on_disk = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                on_disk = {}
+            on_disk.update(self.entries)
+            if len(on_disk) > self.max_entries:
+                on_disk = dict(list(on_disk.items())[-self.max_entries:])
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(on_disk))
+            os.replace(tmp, self.path)
+
+
+class TestImpactAnalyzer:
+    """改动文件 → 需要执行的测试文件"""
+
+    def __init__(self, workspace: str, cache: Optional[TestResultCache] = None):
+        self.workspace = Path(workspace)
+        self.graph = ImportGraph(workspace)
+        self.cache = cache if cache is not None else TestResultCache()
+
+    def select(self, changed_files: Optional[List[str]] = None) -> TestSelection:
+        """选择要执行的测试
+
+        Args:
+            changed_files: 改动的文件（相对路径，含已删除 / 改名前的路径）；None 表示未知，全部执行且不走缓存
+
+        Returns:
+            TestSelection: 要执行 / 命中缓存的测试文件
+        """
+        graph = self.graph
+        tests = graph.test_files
+        selection = TestSelection()
+
+        changed = set(changed_files) if changed_files is not None else set()
+        removed = {f for f in changed
+                   if f.endswith(".py") and not (self.workspace / f).is_file()}
+        if removed - graph.missing:
+            # 删除 / 改名的模块：重建带虚拟节点的图，按还在 import 它的文件找受影响的测试
+            graph = self.graph = ImportGraph(str(self.workspace), missing=removed)
+            tests = graph.test_files
+        opaque = [f for f in changed
+                  if not f.endswith(".py") and not f.lower().endswith(DOC_EXTS)]
+        if changed_files is None or opaque:
+            # 改动未知，或改了配置、数据文件（影响看不出来）：全部测试，不走缓存
+            selection.run = tests
+            selection.use_cache = False
+            selection.keys = {t: self._cache_key(t) for t in tests}
+            return selection
+
+        affected = graph.affected(changed)
+        # conftest.py 影响所在目录下的所有测试
+        conftest_dirs = [os.path.dirname(f) for f in changed
+                         if os.path.basename(f) == "conftest.py"]
+        impacted = {
+            t for t in tests
+            if t in affected
+            or any(d == "" or t.startswith(d + os.sep) for d in conftest_dirs)
+        }
+
+        for test in sorted(impacted):
+            key = self._cache_key(test)
+            selection.keys[test] = key
+            if self.cache.get(key):
+                selection.cached.append(test)
+            else:
+                selection.run.append(test)
+        return selection
+
+    def _cache_key(self, test: str) -> str:
+        """测试文件哈希 + 依赖闭包（含上层 conftest.py 和 pytest 配置）哈希 + 测试目录下数据文件哈希"""
+        graph = self.graph
+        deps = graph.closure(test)
+
+        directory = os.path.dirname(test)
+        while True:
+            conftest = os.path.join(directory, "conftest.py") if directory else "conftest.py"
+            if conftest in graph.files:
+                deps |= graph.closure(conftest)
+            if not directory:
+                break
+            directory = os.path.dirname(directory)
+
+        digest = hashlib.sha1()
+        digest.update(f"{test}\0{graph.file_hash(test)}\0".encode())
+        for dep in sorted(deps - {test}):
+            digest.update(f"{dep}\0{graph.file_hash(dep)}\0".encode())
+        digest.update(f"data\0{graph.data_digest(os.path.dirname(test))}\0".encode())
+        for config in CONFIG_FILES:
+            if (self.workspace / config).is_file():
+                digest.update(f"{config}\0{self._config_hash(config)}\0".encode())
+        return digest.hexdigest()
+
+    def _config_hash(self, name: str) -> str:
+        try:
+            return hashlib.sha1((self.workspace / name).read_bytes()).hexdigest()
+        except OSError:
+            return ""
+
+    def record(self, selection: TestSelection, failed_files: Set[str], counts: Dict[str, int]):
+        """记录本次通过的测试文件
+
+        Args:
+            selection: select() 的结果
+            failed_files: 失败 / 出错的测试文件
+            counts: 测试文件 -> 通过的用例数（未知时为 0）
+        """
+        if not selection.use_cache:
+            return
+        for test in selection.run:
+            if test not in failed_files:
+                self.cache.put(selection.keys[test], {"test": test, "passed": counts.get(test, 0)})
+        self.cache.save()
@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
-"""L4: 自测层 — API + 页面 + 端到端"""
+"""L4: 自测层 — API + 页面 + 端到端，并汇总 L4a–L4d 子层报告
+
+L4a–L4d 是 L3 之后并发执行的独立 DAG 节点，L4 等它们都结束后再跑，
+最后停掉被测服务（子层和 L4 通过 layers.services 共用同一组服务）。
+"""
 
 import json
-import time
 from pathlib import Path
 from layers.base import Layer, LayerResult
+from layers.services import ensure_services, stop_services
+
+L4_SUBLAYERS = ["L4a", "L4b", "L4c", "L4d"]
 
 
 class L4Test(Layer):
     name = "L4"
     max_retries = 1  # 测试不重试，失败交给 L5
-    required_prev = ["L3"]
+    required_prev = ["L3", *L4_SUBLAYERS]
 
     def execute(self, project_config, prev_results: dict) -> LayerResult:
         result = LayerResult(layer=self.name, status="RUNNING")
@@ -18,41 +24,12 @@ class L4Test(Layer):
 
         local = get_executor("local")
 
-        project_path = str(Path(project_config.path).expanduser())
         test_results = {"api": [], "pages": [], "flows": [], "bugs": []}
 
-        # === 启动服务 ===
-        be_port = None
-        fe_port = None
-
-        if project_config.backend:
-            be_path = str(Path(project_path) / project_config.backend.path)
-            be_port = project_config.backend.port
-            local.run(f"lsof -ti:{be_port} | xargs kill -9 2>/dev/null || true")
-            time.sleep(1)
-            # Use same cwd as L3 (project_path) for consistency
-            local.run(
-                f"nohup {project_config.backend.cmd} --port {be_port} > /tmp/pipeline-test-be-{project_config.name}.log 2>&1 &",
-                cwd=project_path,
-                timeout=5,
-            )
-            time.sleep(5)
-
-        if project_config.frontend and project_config.frontend.serve:
-            fe_path = (
-                str(Path(project_path) / project_config.frontend.path)
-                if project_config.frontend.path != "."
-                else project_path
-            )
-            fe_port = project_config.frontend.port
-            local.run(f"lsof -ti:{fe_port} | xargs kill -9 2>/dev/null || true")
-            time.sleep(1)
-            local.run(
-                f"nohup {project_config.frontend.serve} -l {fe_port} > /tmp/pipeline-test-fe-{project_config.name}.log 2>&1 &",
-                cwd=fe_path,
-                timeout=5,
-            )
-            time.sleep(3)
+        # === 启动服务（子层已启动的直接复用）===
+        urls = ensure_services(project_config)
+        be_port = project_config.backend.port if urls["backend"] else None
+        fe_port = project_config.frontend.port if urls["frontend"] else None
 
         try:
             # === A: API 测试 ===
@@ -177,10 +154,7 @@ class L4Test(Layer):
 
         finally:
             # === 清理 ===
-            if be_port:
-                local.run(f"lsof -ti:{be_port} | xargs kill -9 2>/dev/null || true")
-            if fe_port:
-                local.run(f"lsof -ti:{fe_port} | xargs kill -9 2>/dev/null || true")
+            stop_services(project_config)
 
         # === 汇总 ===
         api_pass = sum(1 for t in test_results["api"] if t["pass"])
@@ -210,6 +184,21 @@ class L4Test(Layer):
         # 保存报告
         report_dir = Path(__file__).parent.parent / "reports" / project_config.name
         report_dir.mkdir(parents=True, exist_ok=True)
+
+        # === 汇总子层 ===
+        # 子层只产出报告，这里按 qa_standards 给出各自结论（记录在报告里，不改变 L4 判定）
+        ran = [
+            sub
+            for sub in L4_SUBLAYERS
+            if sub in prev_results and not prev_results[sub].report.get("skipped")
+        ]
+        if ran:
+            from qa_standards import check_all
+
+            qa = check_all(project=project_config.name, reports_dir=str(report_dir))
+            qa["sub_results"] = {k: v for k, v in qa["sub_results"].items() if k in ran}
+            qa["overall_pass"] = all(r["pass"] for r in qa["sub_results"].values())
+            report["qa"] = qa
         (report_dir / "L4-test-report.json").write_text(
             json.dumps(report, indent=2, ensure_ascii=False)
         )
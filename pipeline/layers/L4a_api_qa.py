@@ -6,6 +6,8 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from layers.base import QASubLayer
+
 BYZANTINE_SCENARIOS = {
     "empty_body": {"method": "POST", "data": ""},
     "oversized_payload": {"method": "POST", "data_size": 1048576},  # 1MB of 'A'
@@ -181,6 +183,21 @@ def run_all(
     return report
 
 
+class L4aApiQA(QASubLayer):
+    name = "L4a"
+
+    def run(
+        self, project_config, prev_results: dict, *, urls: dict, output_dir: str
+    ) -> dict:
+        if not urls.get("backend"):
+            return {"skipped": True, "reason": "no backend"}
+        l1 = prev_results.get("L1")
+        endpoints = l1.report.get("endpoints", []) if l1 and l1.report else []
+        return run_all(
+            base_url=urls["backend"], output_dir=output_dir, endpoints=endpoints
+        )
+
+
 if __name__ == "__main__":
     import argparse
 
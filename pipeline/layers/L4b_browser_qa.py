@@ -1,33 +1,60 @@
 #!/usr/bin/env python3
-"""L4b: 浏览器 QA — Playwright 页面+E2E+响应式"""
+"""L4b: 浏览器 QA — Playwright 页面+E2E+响应式
 
-import json, subprocess, sys, platform
+页面检查走常驻浏览器池（layers/browser_pool.py）：所有 URL × viewport 一次性提交，
+每个组合一次页面加载拿到状态、JS 错误、溢出指标和截图，desktop 顺带保存 HTML 给 L4c 复用。
+浏览器池不可用时降级为 curl。
+"""
+
+import hashlib, json, re, subprocess, sys, platform
 from pathlib import Path
 from typing import Optional, List
+from urllib.parse import urlsplit
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from layers.base import QASubLayer
+from layers.browser_pool import BrowserPool, BrowserPoolError, playwright_available
+
 VIEWPORTS = [
     {"name": "desktop", "width": 1920, "height": 1080},
     {"name": "mobile", "width": 375, "height": 812},
 ]
+HTML_VIEWPORT = "desktop"  # 保存这个 viewport 的 HTML
 
 
-def playwright_available() -> bool:
-    """检查 playwright 是否可用"""
-    try:
-        r = subprocess.run(
-            ["python3", "-m", "playwright", "--version"], capture_output=True, timeout=5
-        )
-        return r.returncode == 0
-    except:
-        return False
+def page_slug(url: str) -> str:
+    """URL 路径转成文件名（带路径的短 hash，"/a-b" 和 "/a/b" 不会撞名）"""
+    parts = urlsplit(url)
+    path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "index"
+    return f"{slug}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+
+
+def capture_request(
+    *, url: str, viewport: dict, screenshot_dir: Path, html: bool = False
+) -> dict:
+    """组装一个浏览器池 capture 请求"""
+    return {
+        "url": url,
+        "viewport": viewport,
+        "screenshot_path": str(
+            screenshot_dir / f"{page_slug(url)}-{viewport['name']}.png"
+        ),
+        "html": html,
+    }
 
 
-def check_page(*, url: str, viewport: dict, screenshot_dir: Path) -> dict:
-    """用 Playwright 检查单页"""
-    # 简化的 Playwright 检查
-    # 实际实现需要完整的 Playwright 脚本
+def check_page(
+    *, url: str, viewport: dict, screenshot_dir: Path, pool: BrowserPool = None
+) -> dict:
+    """检查单页（有浏览器池时用 Chromium，否则 curl）"""
+    if pool is not None:
+        request = capture_request(
+            url=url, viewport=viewport, screenshot_dir=screenshot_dir
+        )
+        return pool.capture_many([request])[0]
+
     try:
         # 用 curl 降级检查
         result = subprocess.run(
@@ -66,8 +93,17 @@ def check_page(*, url: str, viewport: dict, screenshot_dir: Path) -> dict:
         }
 
 
-def check_responsive(*, url: str, screenshot_dir: Path) -> list:
-    """对同一 URL 执行两个 viewport 的检查"""
+def check_responsive(
+    *, url: str, screenshot_dir: Path, pool: BrowserPool = None
+) -> list:
+    """对同一 URL 执行两个 viewport 的检查（有浏览器池时并发）"""
+    if pool is not None:
+        requests = [
+            capture_request(url=url, viewport=vp, screenshot_dir=screenshot_dir)
+            for vp in VIEWPORTS
+        ]
+        return pool.capture_many(requests)
+
     results = []
     for vp in VIEWPORTS:
         r = check_page(url=url, viewport=vp, screenshot_dir=screenshot_dir)
@@ -75,6 +111,36 @@ def check_responsive(*, url: str, screenshot_dir: Path) -> list:
     return results
 
 
+def check_pages(
+    *, urls: list, screenshot_dir: Path, html_dir: Path, pool: BrowserPool
+) -> list:
+    """所有 URL × viewport 一次性交给浏览器池，HTML 落盘后从结果里去掉"""
+    requests = [
+        capture_request(
+            url=url,
+            viewport=vp,
+            screenshot_dir=screenshot_dir,
+            html=vp["name"] == HTML_VIEWPORT,
+        )
+        for url in urls
+        for vp in VIEWPORTS
+    ]
+    results = pool.capture_many(requests)
+
+    html_dir.mkdir(parents=True, exist_ok=True)
+    for request, r in zip(requests, results):
+        r.setdefault("url", request["url"])
+        r.setdefault("viewport", request["viewport"]["name"])
+        r.setdefault("loaded", False)
+        r.setdefault("js_errors", 0)
+        html = r.pop("html", None)
+        if html is not None:
+            html_path = html_dir / f"{page_slug(request['url'])}.html"
+            html_path.write_text(html)
+            r["html_path"] = str(html_path)
+    return results
+
+
 def run_e2e_flow(*, flow: dict, base_url: str) -> dict:
     """执行 E2E 用户流程"""
     flow_name = flow.get("name", "unknown")
@@ -127,19 +193,31 @@ def run_all(
         )
         return report
 
-    page_results = []
-    total_js_errors = 0
-
+    full_urls = []
     for url_path in test_urls:
-        full_url = (
+        full_urls.append(
             f"{base_url}{url_path}"
             if url_path.startswith("/")
             else f"{base_url}/{url_path}"
         )
-        responsive = check_responsive(url=full_url, screenshot_dir=screenshot_dir)
-        for r in responsive:
-            total_js_errors += r.get("js_errors", 0)
-            page_results.append(r)
+
+    page_results = []
+    try:
+        with BrowserPool.connect() as pool:
+            page_results = check_pages(
+                urls=full_urls,
+                screenshot_dir=screenshot_dir,
+                html_dir=Path(output_dir) / "pages",
+                pool=pool,
+            )
+    except BrowserPoolError as e:
+        print(f"browser pool unavailable ({e}), using curl fallback", file=sys.stderr)
+        for full_url in full_urls:
+            page_results.extend(
+                check_responsive(url=full_url, screenshot_dir=screenshot_dir)
+            )
+
+    total_js_errors = sum(r.get("js_errors", 0) for r in page_results)
 
     e2e_results = []
     e2e_all_pass = True
@@ -171,6 +249,20 @@ def run_all(
     return report
 
 
+class L4bBrowserQA(QASubLayer):
+    name = "L4b"
+
+    def run(self, project_config, prev_results: dict, *, urls: dict, output_dir: str) -> dict:
+        if not urls.get("frontend"):
+            return {"skipped": True, "reason": "no served frontend"}
+        return run_all(
+            base_url=urls["frontend"],
+            test_urls=project_config.test_urls,
+            test_flows=[f for f in project_config.test_flows if isinstance(f, dict)],
+            output_dir=output_dir,
+        )
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
-"""L4c: UI 质量评审 — LLM 评分 + 溢出检测"""
+"""L4c: UI 质量评审 — LLM 评分 + 溢出检测
+
+优先复用 L4b 已经抓到的 HTML 和溢出指标；L4b 没有的页面交给浏览器池一次加载补齐，
+浏览器池不可用时降级为 curl。各页面的 mm 评分并发执行。
+"""
 
 import json, subprocess, sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from layers.base import QASubLayer
+from layers.browser_pool import BrowserPool, BrowserPoolError, playwright_available
+from layers.L4b_browser_qa import VIEWPORTS, HTML_VIEWPORT
+
 MM_CLI = Path.home() / "Downloads" / "dispatch" / "mm"
+HTML_LIMIT = 5000
+MM_CONCURRENCY = 4
 
 
 def call_mm_review(*, html_snippet: str, page_url: str) -> dict:
@@ -80,48 +91,103 @@ def get_page_html(*, url: str) -> str:
         r = subprocess.run(
             ["curl", "-sf", url], capture_output=True, text=True, timeout=10
         )
-        return r.stdout[:5000] if r.returncode == 0 else ""
+        return r.stdout[:HTML_LIMIT] if r.returncode == 0 else ""
     except:
         return ""
 
 
+def pages_from_l4b(l4b: dict) -> dict:
+    """从 L4b 报告提取 {url: {"html", "has_overflow"}}，没抓到的字段为 None"""
+    pages = {}
+    for detail in l4b.get("page_details", []):
+        url = detail.get("url", "")
+        if not url:
+            continue
+        page = pages.setdefault(url, {"html": None, "has_overflow": None})
+        html_path = detail.get("html_path")
+        if html_path and Path(html_path).exists():
+            page["html"] = Path(html_path).read_text()[:HTML_LIMIT]
+        overflow = detail.get("overflow")
+        if overflow is not None:
+            page["has_overflow"] = bool(page["has_overflow"]) or overflow.get(
+                "has_overflow", False
+            )
+    return pages
+
+
+def fill_from_browser(pages: dict) -> None:
+    """L4b 没给 HTML / 溢出的页面用浏览器池补齐（每个 viewport 一次加载）"""
+    missing = [
+        url
+        for url, page in pages.items()
+        if page["html"] is None or page["has_overflow"] is None
+    ]
+    if not missing or not playwright_available():
+        return
+    requests = [
+        {
+            "url": url,
+            "viewport": vp,
+            "html": vp["name"] == HTML_VIEWPORT,
+            "html_limit": HTML_LIMIT,
+        }
+        for url in missing
+        for vp in VIEWPORTS
+    ]
+    try:
+        with BrowserPool.connect() as pool:
+            results = pool.capture_many(requests)
+    except BrowserPoolError as e:
+        print(f"browser pool unavailable ({e}), using curl fallback", file=sys.stderr)
+        return
+
+    for request, r in zip(requests, results):
+        page = pages[request["url"]]
+        if r.get("html") and page["html"] is None:
+            page["html"] = r["html"]
+        if "overflow" in r:
+            page["has_overflow"] = (
+                bool(page["has_overflow"]) or r["overflow"]["has_overflow"]
+            )
+
+
+def review_page(url: str, page: dict) -> dict:
+    """单页评分（浏览器没抓到的部分用 curl 补）"""
+    html = page["html"] if page["html"] is not None else get_page_html(url=url)
+    if html:
+        score = call_mm_review(html_snippet=html, page_url=url)
+    else:
+        score = {
+            "visual": 0,
+            "layout": 0,
+            "readability": 0,
+            "professional": 0,
+            "total_score": 0,
+            "issues": ["page unreachable"],
+        }
+
+    has_overflow = page["has_overflow"]
+    if has_overflow is None:
+        has_overflow = detect_overflow(page_url=url).get("has_overflow", False)
+
+    return {**score, "url": url, "has_overflow": has_overflow}
+
+
 def run_all(*, l4b_report_path: str = None, base_url: str, output_dir: str) -> dict:
-    """主入口: 读 L4b 报告获取页面列表，逐个评分"""
-    pages = []
+    """主入口: 读 L4b 报告获取页面列表，并发评分"""
+    pages = {}
 
     if l4b_report_path and Path(l4b_report_path).exists():
         l4b = json.loads(Path(l4b_report_path).read_text())
-        # 从 L4b 报告提取唯一 URL 列表
-        seen_urls = set()
-        for detail in l4b.get("page_details", []):
-            url = detail.get("url", "")
-            if url and url not in seen_urls:
-                seen_urls.add(url)
-                pages.append(url)
+        pages = pages_from_l4b(l4b)
 
     if not pages and base_url:
-        pages = [base_url]  # 至少检查首页
-
-    results = []
-    for url in pages:
-        html = get_page_html(url=url)
-        if html:
-            score = call_mm_review(html_snippet=html, page_url=url)
-        else:
-            score = {
-                "visual": 0,
-                "layout": 0,
-                "readability": 0,
-                "professional": 0,
-                "total_score": 0,
-                "issues": ["page unreachable"],
-            }
+        pages = {base_url: {"html": None, "has_overflow": None}}  # 至少检查首页
 
-        overflow = detect_overflow(page_url=url)
+    fill_from_browser(pages)
 
-        results.append(
-            {**score, "url": url, "has_overflow": overflow.get("has_overflow", False)}
-        )
+    with ThreadPoolExecutor(max_workers=MM_CONCURRENCY) as executor:
+        results = list(executor.map(review_page, pages.keys(), pages.values()))
 
     report = {"pages": results}
     Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -131,6 +197,26 @@ def run_all(*, l4b_report_path: str = None, base_url: str, output_dir: str) -> d
     return report
 
 
+class L4cUIReview(QASubLayer):
+    name = "L4c"
+    required_prev = ["L3", "L4b"]  # 复用 L4b 抓到的 HTML 和溢出指标
+
+    def run(
+        self, project_config, prev_results: dict, *, urls: dict, output_dir: str
+    ) -> dict:
+        if not urls.get("frontend"):
+            return {"skipped": True, "reason": "no served frontend"}
+        l4b = prev_results.get("L4b")
+        l4b_report = Path(output_dir) / "L4b-browser-report.json"
+        return run_all(
+            l4b_report_path=(
+                str(l4b_report) if l4b and not l4b.report.get("skipped") else None
+            ),
+            base_url=urls["frontend"],
+            output_dir=output_dir,
+        )
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -7,6 +7,8 @@ from typing import Optional, List
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from layers.base import QASubLayer
+
 
 def run_backend_tests(*, project_dir: str) -> dict:
     """执行后端测试"""
@@ -268,6 +270,28 @@ def run_all(
     return report
 
 
+class L4dRegression(QASubLayer):
+    name = "L4d"
+
+    def run(
+        self, project_config, prev_results: dict, *, urls: dict, output_dir: str
+    ) -> dict:
+        frontend = urls.get("frontend")
+        return run_all(
+            project_dir=str(Path(project_config.path).expanduser()),
+            backend_path=(
+                project_config.backend.path if project_config.backend else None
+            ),
+            frontend_path=(
+                project_config.frontend.path if project_config.frontend else None
+            ),
+            test_urls=(
+                [f"{frontend}{u}" for u in project_config.test_urls] if frontend else []
+            ),
+            output_dir=output_dir,
+        )
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -51,3 +51,37 @@ class Layer(ABC):
 
     def validate(self, result: LayerResult) -> bool:
         return result.status == "PASS"
+
+
+class QASubLayer(Layer):
+    """L4 的 QA 子层（L4a–L4d）：L3 之后并发执行，只产出报告，判定交给 L4 汇总
+
+    执行出错也记为 PASS（错误写在报告里），一个 QA 工具出问题不会直接打断整条 pipeline。
+    """
+
+    max_retries = 1
+    required_prev = ["L3"]
+
+    def execute(self, project_config, prev_results: dict) -> LayerResult:
+        from pathlib import Path
+        from layers.services import ensure_services
+
+        result = LayerResult(layer=self.name, status="RUNNING")
+        report_dir = Path(__file__).parent.parent / "reports" / project_config.name
+        report_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            urls = ensure_services(project_config)
+            report = self.run(
+                project_config, prev_results, urls=urls, output_dir=str(report_dir)
+            )
+        except Exception as e:
+            report = {"error": f"{type(e).__name__}: {e}"}
+        result.finish("PASS", report=report)
+        return result
+
+    @abstractmethod
+    def run(
+        self, project_config, prev_results: dict, *, urls: dict, output_dir: str
+    ) -> dict:
+        """跑子层检查并写报告文件，返回报告；不适用时返回 {"skipped": True, "reason": ...}"""
+        pass
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""浏览器 worker 池 — 一个常驻 Chromium，多 context 并发，Unix socket 上的 JSON-lines RPC
+
+L4b / L4c 以前每个 URL、每个 viewport 都起一个 curl / playwright 子进程。这里改为：
+- `python3 layers/browser_pool.py serve` 常驻进程持有一个 Chromium，每个请求开一个独立 context
+  （对应一个 viewport），最多 contexts 个同时跑；空闲 idle_timeout 秒后自动退出
+- 一次页面加载同时拿到状态码、加载耗时、JS 错误、HTML、溢出指标和截图
+- BrowserPool 是同步客户端：服务没在跑就拉起来（并发的 L4b/L4c 用 socket 旁边的文件锁串行化拉起，
+  只会起一个服务）；capture_many 把一批请求一次性发出去，按 id 收结果
+
+协议：每行一个 JSON。请求 {"id", "method", "params"}，响应 {"id", "result"} 或 {"id", "error"}。
+"""
+
+import argparse, asyncio, fcntl, json, os, socket, subprocess, sys, time
+import importlib.util
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_SOCKET = Path("/tmp") / f"pipeline-browser-{os.getuid()}.sock"
+DEFAULT_CONTEXTS = 8
+IDLE_TIMEOUT = 600  # 秒
+NAV_TIMEOUT_MS = 30000
+START_TIMEOUT = 60  # 等服务启动（含 Chromium 启动）的秒数
+LOG_PATH = Path("/tmp") / f"pipeline-browser-{os.getuid()}.log"
+
+# 页面水平溢出：文档比视口宽，并列出超出视口的元素（最多 20 个）
+OVERFLOW_JS = """
+() => {
+  const doc = document.documentElement;
+  const width = doc.clientWidth;
+  const offenders = [];
+  for (const el of document.body ? document.body.querySelectorAll('*') : []) {
+    const r = el.getBoundingClientRect();
+    if (r.width && (r.right > width + 1 || r.left < -1)) {
+      let name = el.tagName.toLowerCase();
+      if (el.id) name += '#' + el.id;
+      if (typeof el.className === 'string' && el.className.trim())
+        name += '.' + el.className.trim().split(/\\s+/).join('.');
+      offenders.push(name.slice(0, 120));
+      if (offenders.length >= 20) break;
+    }
+  }
+  return {
+    has_overflow: doc.scrollWidth > width,
+    scroll_width: doc.scrollWidth,
+    client_width: width,
+    offenders,
+  };
+}
+"""
+
+
+class BrowserPoolError(RuntimeError):
+    """浏览器池不可用（playwright 未安装、Chromium 启动失败、连接断开）"""
+
+
+@contextmanager
+def _spawn_lock(socket_path: Path):
+    """同一个 socket 的拉起串行化：拿到锁的进程起服务并等它可连接，其他进程等锁后直接连"""
+    with open(f"{socket_path}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=None)
+def playwright_available() -> bool:
+    """playwright 包是否已安装（进程内查找，不再起子进程；结果缓存）"""
+    return importlib.util.find_spec("playwright") is not None
+
+
+# ── 服务端 ────────────────────────────────────────────────────────────────
+
+
+class BrowserServer:
+    """持有一个 Chromium 的 RPC 服务"""
+
+    def __init__(self, socket_path: Path, contexts: int, idle_timeout: float):
+        self.socket_path = Path(socket_path)
+        self.contexts = contexts
+        self.idle_timeout = idle_timeout
+        self.browser = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._last_used = time.monotonic()
+
+    async def run(self):
+        from playwright.async_api import async_playwright
+
+        if self.socket_path.exists():
+            # 只清理连不上的残留 socket，不抢正在服务的那个
+            sock = BrowserPool._try_connect(self.socket_path)
+            if sock is not None:
+                sock.close()
+                print(
+                    f"browser pool already serving on {self.socket_path}",
+                    file=sys.stderr,
+                )
+                return
+            self.socket_path.unlink()
+
+        self._sem = asyncio.Semaphore(self.contexts)
+        async with async_playwright() as pw:
+            self.browser = await pw.chromium.launch()
+            server = await asyncio.start_unix_server(
+                self._handle, path=str(self.socket_path)
+            )
+            inode = self.socket_path.stat().st_ino
+            try:
+                while (
+                    self._active
+                    or time.monotonic() - self._last_used < self.idle_timeout
+                ):
+                    await asyncio.sleep(min(5.0, self.idle_timeout))
+            finally:
+                server.close()
+                # 退出期间可能已经有新服务绑定了同一路径：只删自己的 socket
+                try:
+                    if self.socket_path.stat().st_ino == inode:
+                        self.socket_path.unlink()
+                except FileNotFoundError:
+                    pass
+                await self.browser.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """一个连接上的请求并发处理，响应按完成顺序写回"""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request: dict):
+            self._active += 1
+            try:
+                try:
+                    result = await self._dispatch(
+                        request.get("method"), request.get("params") or {}
+                    )
+                    response = {"id": request.get("id"), "result": result}
+                except Exception as e:
+                    response = {
+                        "id": request.get("id"),
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+                async with write_lock:
+                    writer.write(
+                        (json.dumps(response, ensure_ascii=False) + "\n").encode()
+                    )
+                    await writer.drain()
+            finally:
+                self._active -= 1
+                self._last_used = time.monotonic()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._last_used = time.monotonic()
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, params: dict):
+        if method == "ping":
+            return {"pid": os.getpid(), "contexts": self.contexts}
+        if method == "capture":
+            return await self.capture(**params)
+        raise ValueError(f"unknown method: {method}")
+
+    async def capture(
+        self,
+        *,
+        url: str,
+        viewport: dict,
+        screenshot_path: Optional[str] = None,
+        html: bool = False,
+        html_limit: int = 0,
+        timeout_ms: int = NAV_TIMEOUT_MS,
+    ) -> dict:
+        """一次页面加载：状态码、耗时、JS 错误、溢出指标，可选 HTML 和整页截图"""
+        async with self._sem:
+            context = await self.browser.new_context(
+                viewport={"width": viewport["width"], "height": viewport["height"]}
+            )
+            try:
+                page = await context.new_page()
+                js_errors: List[str] = []
+                page.on("pageerror", lambda e: js_errors.append(str(e)))
+                page.on(
+                    "console", lambda m: m.type == "error" and js_errors.append(m.text)
+                )
+
+                started = time.monotonic()
+                try:
+                    response = await page.goto(
+                        url, wait_until="load", timeout=timeout_ms
+                    )
+                except Exception as e:
+                    return {
+                        "url": url,
+                        "viewport": viewport["name"],
+                        "loaded": False,
+                        "status": 0,
+                        "load_time": round(time.monotonic() - started, 3),
+                        "js_errors": len(js_errors),
+                        "js_error_messages": js_errors[:20],
+                        "error": str(e),
+                    }
+                load_time = round(time.monotonic() - started, 3)
+                status = response.status if response else 0
+
+                result = {
+                    "url": url,
+                    "viewport": viewport["name"],
+                    "loaded": 200 <= status < 400,
+                    "status": status,
+                    "load_time": load_time,
+                    "js_errors": len(js_errors),
+                    "js_error_messages": js_errors[:20],
+                    "overflow": await page.evaluate(OVERFLOW_JS),
+                    "screenshot_path": None,
+                }
+                if html:
+                    content = await page.content()
+                    result["html"] = content[:html_limit] if html_limit else content
+                if screenshot_path:
+                    Path(screenshot_path).parent.mkdir(parents=True, exist_ok=True)
+                    await page.screenshot(path=screenshot_path, full_page=True)
+                    result["screenshot_path"] = screenshot_path
+                return result
+            finally:
+                await context.close()
+
+
+# ── 客户端 ────────────────────────────────────────────────────────────────
+
+
+class BrowserPool:
+    """浏览器池的同步客户端（一个连接上流水线发送请求）"""
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        self._next_id = 0
+
+    @classmethod
+    def connect(
+        cls,
+        socket_path: Path = DEFAULT_SOCKET,
+        *,
+        spawn: bool = True,
+        contexts: int = DEFAULT_CONTEXTS,
+        idle_timeout: float = IDLE_TIMEOUT,
+        start_timeout: float = START_TIMEOUT,
+    ) -> "BrowserPool":
+        """连接浏览器池，服务没在跑时拉起一个
+
+        Raises:
+            BrowserPoolError: playwright 不可用或服务启动失败
+        """
+        sock = cls._try_connect(socket_path)
+        if sock is not None:
+            return cls(sock)
+        if not spawn or not playwright_available():
+            raise BrowserPoolError(
+                "browser pool not running and playwright not available"
+            )
+
+        with _spawn_lock(socket_path):
+            # 等锁期间别的进程可能已经拉起来了
+            sock = cls._try_connect(socket_path)
+            if sock is not None:
+                return cls(sock)
+            return cls(cls._spawn(socket_path, contexts, idle_timeout, start_timeout))
+
+    @staticmethod
+    def _spawn(
+        socket_path: Path, contexts: int, idle_timeout: float, start_timeout: float
+    ) -> socket.socket:
+        """起服务进程，返回连上它的 socket"""
+        with open(LOG_PATH, "ab") as log:
+            proc = subprocess.Popen(
+                [
+                    sys.executable,
+                    str(Path(__file__).resolve()),
+                    "serve",
+                    "--socket",
+                    str(socket_path),
+                    "--contexts",
+                    str(contexts),
+                    "--idle-timeout",
+                    str(idle_timeout),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+
+        deadline = time.monotonic() + start_timeout
+        while time.monotonic() < deadline:
+            sock = BrowserPool._try_connect(socket_path)
+            if sock is not None:
+                return sock
+            if proc.poll() is not None:
+                raise BrowserPoolError(
+                    f"browser pool exited with {proc.returncode}, see {LOG_PATH}"
+                )
+            time.sleep(0.1)
+        proc.kill()
+        raise BrowserPoolError(f"browser pool did not start within {start_timeout}s")
+
+    @staticmethod
+    def _try_connect(socket_path: Path) -> Optional[socket.socket]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(socket_path))
+            return sock
+        except OSError:
+            sock.close()
+            return None
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call_many(self, method: str, params_list: List[dict]) -> List[dict]:
+        """一次性发出一批请求，按请求顺序返回结果（出错的项为 {"error": ...}）
+
+        Raises:
+            BrowserPoolError: 连接断开或读写失败
+        """
+        try:
+            return self._call_many(method, params_list)
+        except OSError as e:
+            raise BrowserPoolError(f"browser pool connection failed: {e}") from e
+
+    def _call_many(self, method: str, params_list: List[dict]) -> List[dict]:
+        ids = []
+        for params in params_list:
+            self._next_id += 1
+            ids.append(self._next_id)
+            line = json.dumps({"id": self._next_id, "method": method, "params": params})
+            self._file.write(line.encode() + b"\n")
+        self._file.flush()
+
+        pending = set(ids)
+        results = {}
+        while pending:
+            line = self._file.readline()
+            if not line:
+                raise BrowserPoolError("browser pool connection closed")
+            response = json.loads(line)
+            if response.get("id") in pending:
+                pending.discard(response["id"])
+                results[response["id"]] = (
+                    response["result"]
+                    if "result" in response
+                    else {"error": response.get("error")}
+                )
+        return [results[i] for i in ids]
+
+    def ping(self) -> dict:
+        return self.call_many("ping", [{}])[0]
+
+    def capture_many(self, requests: List[dict]) -> List[dict]:
+        """并发抓取多个 (url, viewport)，参数同 BrowserServer.capture"""
+        return self.call_many("capture", requests)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Browser worker pool")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve", help="run the pool server")
+    serve.add_argument("--socket", default=str(DEFAULT_SOCKET))
+    serve.add_argument("--contexts", type=int, default=DEFAULT_CONTEXTS)
+    serve.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    sub.add_parser("ping", help="check whether the pool is running")
+    args = p.parse_args()
+
+    if args.cmd == "serve":
+        server = BrowserServer(Path(args.socket), args.contexts, args.idle_timeout)
+        asyncio.run(server.run())
+    else:
+        sock = BrowserPool._try_connect(DEFAULT_SOCKET)
+        if sock is None:
+            print("browser pool not running")
+            sys.exit(1)
+        with BrowserPool(sock) as pool:
+            print(json.dumps(pool.ping()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""L4 各子层共用的被测服务 — 没在跑就启动，已在跑就复用
+
+L4a–L4d 在不同 worker 进程里并发执行，都要访问同一个后端/前端。
+ensure_services 用每个项目一把文件锁串行化启动，端口已在监听就直接复用；
+PipelineRun 在每轮子层并发之前调一次 stop_services，保证复用的是这一轮新起的实例
+（而不是上次运行或 L5 修复前留下的）。stop_services 在 L4 汇总结束时也会调用。
+"""
+
+import fcntl
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+START_WAIT = 20  # 等端口就绪的秒数
+
+
+def port_open(port: int, host: str = "127.0.0.1") -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.5)
+        return s.connect_ex((host, port)) == 0
+
+
+def wait_port(port: int, timeout: float = START_WAIT, listening: bool = True) -> bool:
+    """等端口开始监听（listening=False 时等它不再监听）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if port_open(port) == listening:
+            return True
+        time.sleep(0.25)
+    return False
+
+
+@contextmanager
+def _project_lock(project_name: str):
+    lock_path = Path("/tmp") / f"pipeline-services-{project_name}.lock"
+    with open(lock_path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def frontend_dir(project_config) -> str:
+    project_path = str(Path(project_config.path).expanduser())
+    fe = project_config.frontend
+    return str(Path(project_path) / fe.path) if fe.path != "." else project_path
+
+
+def ensure_services(project_config) -> dict:
+    """确保后端/前端在监听，返回 {"backend": url|None, "frontend": url|None}"""
+    from executors import get_executor
+
+    local = get_executor("local")
+    project_path = str(Path(project_config.path).expanduser())
+    urls = {"backend": None, "frontend": None}
+
+    with _project_lock(project_config.name):
+        be = project_config.backend
+        if be:
+            if not port_open(be.port):
+                local.run(
+                    f"nohup {be.cmd} --port {be.port} > /tmp/pipeline-test-be-{project_config.name}.log 2>&1 &",
+                    cwd=project_path,
+                    timeout=5,
+                )
+                wait_port(be.port)
+            urls["backend"] = f"http://localhost:{be.port}"
+
+        fe = project_config.frontend
+        if fe and fe.serve:
+            if not port_open(fe.port):
+                local.run(
+                    f"nohup {fe.serve} -l {fe.port} > /tmp/pipeline-test-fe-{project_config.name}.log 2>&1 &",
+                    cwd=frontend_dir(project_config),
+                    timeout=5,
+                )
+                wait_port(fe.port)
+            urls["frontend"] = f"http://localhost:{fe.port}"
+
+    return urls
+
+
+def stop_services(project_config) -> None:
+    """停掉被测服务，等端口释放后返回（之后的 ensure_services 一定会重新启动）"""
+    from executors import get_executor
+
+    local = get_executor("local")
+    be, fe = project_config.backend, project_config.frontend
+    ports = [be.port if be else None, fe.port if fe and fe.serve else None]
+    with _project_lock(project_config.name):
+        for port in ports:
+            if port:
+                local.run(f"lsof -ti:{port} | xargs kill -9 2>/dev/null || true")
+                wait_port(port, listening=False)
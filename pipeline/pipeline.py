@@ -2,7 +2,7 @@
 """
 Pipeline Infra CLI — 六层自动化生产流程
 Usage:
-  python3 pipeline.py run <project> [--layer L1] [--from L3]
+  python3 pipeline.py run <project> [<project> ...] [--layer L1] [--from L3] [--jobs N]
   python3 pipeline.py status [<project>]
   python3 pipeline.py report <project> <layer>
   python3 pipeline.py retry <project>
@@ -11,7 +11,9 @@ Usage:
 
 import argparse
 import json
+import os
 import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
 
@@ -26,12 +28,17 @@ from db import (
     get_latest_run,
     save_layer_result,
     get_layer_results,
+    batch,
 )
 from config import get_project, list_projects as list_project_names, load_projects
 
 # Layer 导入 — 延迟加载避免循环
-LAYER_ORDER = ["L1", "L2", "L3", "L4", "L5", "L6"]
+LAYER_ORDER = ["L1", "L2", "L3", "L4a", "L4b", "L4c", "L4d", "L4", "L5", "L6"]
+# L4 的 QA 子层：L3 之后并发执行，L4 汇总它们的报告
+L4_SUBLAYERS = ["L4a", "L4b", "L4c", "L4d"]
 MAX_L4_L5_CYCLES = 3
+# 同时执行的 layer attempt 上限（所有项目共享）
+MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", "4"))
 
 
 def log(msg):
@@ -44,6 +51,10 @@ def get_layer_instance(layer_name: str):
         "L1": ("layers.L1_analyze", "L1Analyze"),
         "L2": ("layers.L2_implement", "L2Implement"),
         "L3": ("layers.L3_build", "L3Build"),
+        "L4a": ("layers.L4a_api_qa", "L4aApiQA"),
+        "L4b": ("layers.L4b_browser_qa", "L4bBrowserQA"),
+        "L4c": ("layers.L4c_ui_review", "L4cUIReview"),
+        "L4d": ("layers.L4d_regression", "L4dRegression"),
         "L4": ("layers.L4_test", "L4Test"),
         "L5": ("layers.L5_fix", "L5Fix"),
         "L6": ("layers.L6_deploy", "L6Deploy"),
@@ -55,150 +66,295 @@ def get_layer_instance(layer_name: str):
     return getattr(mod, cls_name)()
 
 
-def run_layer(layer_name, project_config, run_id, prev_results):
-    """执行单层，处理重试"""
+def execute_layer(layer_name, project_config, prev_results):
+    """在 worker 进程里执行一次 layer attempt（异常转成 FAIL 结果）"""
+    from layers.base import LayerResult
+
     layer = get_layer_instance(layer_name)
+    try:
+        result = layer.execute(project_config, prev_results)
+    except Exception as e:
+        result = LayerResult(layer=layer_name, status="FAIL", error=str(e))
+        result.finish("FAIL", error=str(e))
+
+    if result.finished_at is None:
+        result.finish(result.status)
+    return result
 
-    # 前置检查
-    ok, reason = layer.check_preconditions(prev_results)
-    if not ok:
-        log(f"  {layer_name} 前置条件未满足: {reason}")
-        return None
 
-    for attempt in range(1, layer.max_retries + 1):
-        log(f"  {layer_name} attempt {attempt}/{layer.max_retries}")
-        save_layer_result(run_id, layer_name, "RUNNING", attempt=attempt)
+class PipelineRun:
+    """单个项目的一次 pipeline 运行 — 按 required_prev 组成 DAG，就绪的层并发执行
+
+    - 所有依赖（本次运行范围内的）都 PASS 的层进入就绪，提交到共享进程池
+    - 每个 attempt 的结果完成即写库，失败的 attempt 在池里重试
+    - L5 是 L4 的修复钩子：L4 FAIL → L5 → L4（连同范围内的子层）重测，最多 MAX_L4_L5_CYCLES 轮
+    - 每轮 L4 子层并发之前先停掉端口上的被测服务，子层共用这一轮重新启动的实例
+    - 任一层最终失败后不再调度新层，等运行中的层结束后标记 FAILED
+    """
+
+    def __init__(self, project_name, project_config, layers, pool, prefix=""):
+        self.project_name = project_name
+        self.pc = project_config
+        self.layers = layers
+        self.pool = pool
+        self.prefix = prefix
+
+        self.instances = {name: get_layer_instance(name) for name in layers}
+        # L4 在范围内时 L5 只作为修复钩子，不参与 DAG 调度
+        self.repair = "L4" in layers
+        self.pending = [n for n in layers if not (self.repair and n == "L5")]
+        self.prev_results = {}
+        self.running = {}  # future -> (layer_name, attempt)
+        self.l4_l5_cycles = 0
+        self.failure = None
+        self.failed_layer = None
+        self.run_id = None
+        self.services_fresh = False  # 本轮 L4 子层的被测服务是否已重启
+
+    def log(self, msg):
+        body = msg.lstrip("\n")
+        log(f"{msg[:len(msg) - len(body)]}{self.prefix}{body}")
+
+    def ready_layers(self):
+        ready = []
+        for name in self.pending:
+            deps = [d for d in self.instances[name].required_prev if d in self.instances]
+            if self.repair:
+                deps = [d for d in deps if d != "L5"]
+            if all(
+                d in self.prev_results and self.prev_results[d].status == "PASS"
+                for d in deps
+            ):
+                ready.append(name)
+        return ready
+
+    def start(self):
+        """创建 run 记录并提交第一批就绪的层"""
+        self.run_id = create_run(
+            self.project_name,
+            config=self.pc.__dict__ if hasattr(self.pc, "__dict__") else {},
+        )
+        self.schedule()
+
+    def schedule(self):
+        if self.failure:
+            return
+        for name in self.ready_layers():
+            self.pending.remove(name)
+            self.launch(name)
+
+    def launch(self, name):
+        layer = self.instances.get(name) or get_layer_instance(name)
+        self.instances.setdefault(name, layer)
+
+        self.log(f"\n--- {name} ---")
+
+        # 前置检查
+        ok, reason = layer.check_preconditions(self.prev_results)
+        if not ok:
+            self.log(f"  {name} 前置条件未满足: {reason}")
+            self.fail(f"Pipeline FAILED at {name} (precondition)", name)
+            return
+
+        if name in L4_SUBLAYERS and not self.services_fresh:
+            self.restart_services()
+
+        with batch():
+            update_run(self.run_id, current_layer=name)
+            save_layer_result(self.run_id, name, "RUNNING", attempt=1)
+        self.submit(name, 1)
+
+    def restart_services(self):
+        """停掉端口上的旧服务（上次运行留下的、L3 健康检查起的、L5 修复前的代码），
+        由第一个子层的 ensure_services 启动新实例，其余子层复用"""
+        from layers.services import stop_services
 
+        self.log("  重启 L4 被测服务")
         try:
-            result = layer.execute(project_config, prev_results)
+            stop_services(self.pc)
         except Exception as e:
-            result = __import__("layers.base", fromlist=["LayerResult"]).LayerResult(
-                layer=layer_name, status="FAIL", error=str(e)
-            )
+            self.log(f"  停止被测服务失败: {e}")
+        self.services_fresh = True
+
+    def submit(self, name, attempt):
+        layer = self.instances[name]
+        self.log(f"  {name} attempt {attempt}/{layer.max_retries}")
+        future = self.pool.submit(execute_layer, name, self.pc, dict(self.prev_results))
+        self.running[future] = (name, attempt)
+
+    def on_done(self, future):
+        """一个 attempt 完成：写库、重试或推进 DAG"""
+        name, attempt = self.running.pop(future)
+        layer = self.instances[name]
+        try:
+            result = future.result()
+        except Exception as e:
+            # 进程池本身出错（worker 崩溃、结果无法序列化等）
+            from layers.base import LayerResult
+
+            result = LayerResult(layer=name, status="FAIL", error=str(e))
             result.finish("FAIL", error=str(e))
 
-        if result.finished_at is None:
-            result.finish(result.status)
+        passed = layer.validate(result)
+        retry = not passed and attempt < layer.max_retries and not self.failure
+
+        # 本次结果和下一次 attempt 的 RUNNING 标记合并为一个事务
+        with batch():
+            save_layer_result(
+                self.run_id,
+                name,
+                result.status,
+                attempt=attempt,
+                report=result.report,
+                error=result.error,
+            )
+            if retry:
+                save_layer_result(self.run_id, name, "RUNNING", attempt=attempt + 1)
 
-        save_layer_result(
-            run_id,
-            layer_name,
-            result.status,
-            attempt=attempt,
-            report=result.report,
-            error=result.error,
-        )
+        if passed:
+            self.log(f"  {name} PASS")
+        else:
+            self.log(f"  {name} FAIL (attempt {attempt}): {result.error or 'validation failed'}")
+            if retry:
+                self.submit(name, attempt + 1)
+                return
+            self.log(f"  {name} FAILED after {layer.max_retries} attempts")
+
+        self.advance(name, result)
+        self.schedule()
+
+    def advance(self, name, result):
+        """处理一个层的最终结果"""
+        if self.failure:
+            return
+
+        if result.status == "PASS":
+            self.prev_results[name] = result
+            if name == "L4" and "L5" in self.layers:
+                self.log("  L4 PASS, 跳过 L5")
+                self.l4_l5_cycles = 0
+            elif name == "L5" and self.repair:
+                # 修复成功，回到 L4 重测（子层的报告也要基于修复后的代码重出）
+                self.services_fresh = False
+                for sub in L4_SUBLAYERS:
+                    if sub in self.instances:
+                        self.prev_results.pop(sub, None)
+                        self.pending.append(sub)
+                self.pending.append("L4")
+            return
 
-        if layer.validate(result):
-            log(f"  {layer_name} PASS")
-            return result
+        if name == "L4" and self.l4_l5_cycles < MAX_L4_L5_CYCLES:
+            # L4 fail → 进 L5 修复 → 回 L4
+            self.l4_l5_cycles += 1
+            self.log(f"  L4→L5 修复循环 {self.l4_l5_cycles}/{MAX_L4_L5_CYCLES}")
+            self.prev_results[name] = result
+            self.launch("L5")
+        elif name == "L5" and self.repair:
+            self.fail("Pipeline FAILED: L5 修复失败", name)
         else:
-            log(
-                f"  {layer_name} FAIL (attempt {attempt}): {result.error or 'validation failed'}"
+            self.fail(f"Pipeline FAILED at {name}", name)
+
+    def fail(self, message, layer_name):
+        if self.failure:
+            return
+        self.failure = message
+        self.failed_layer = layer_name
+        self.log(message)
+
+    @property
+    def finished(self):
+        return not self.running
+
+    def finish(self):
+        """写最终状态和总报告，返回是否成功"""
+        if self.failure:
+            # current_layer 记录失败的层，retry 从这里继续
+            update_run(
+                self.run_id,
+                status="FAILED",
+                current_layer=self.failed_layer,
+                finished_at=datetime.utcnow().isoformat(),
             )
+            return False
 
-    log(f"  {layer_name} FAILED after {layer.max_retries} attempts")
-    return result
+        update_run(
+            self.run_id,
+            status="DONE",
+            current_layer="DONE",
+            finished_at=datetime.utcnow().isoformat(),
+        )
+        self.log(f"\n=== Pipeline DONE: {self.project_name} (run {self.run_id}) ===")
+
+        # 保存总报告
+        report_dir = Path(__file__).parent / "reports" / self.project_name
+        report_dir.mkdir(parents=True, exist_ok=True)
+        summary = {
+            "run_id": self.run_id,
+            "project": self.project_name,
+            "layers": {
+                k: {"status": v.status, "report": v.report}
+                for k, v in self.prev_results.items()
+            },
+        }
+        (report_dir / f"run-{self.run_id}-summary.json").write_text(
+            json.dumps(summary, indent=2)
+        )
+        self.log(f"报告: {report_dir}/run-{self.run_id}-summary.json")
+        return True
+
+
+def drive(runs):
+    """所有项目的 attempt 共用一个池，谁先完成先处理谁，直到都没有运行中的层"""
+    while True:
+        owners = {f: run for run in runs for f in run.running}
+        if not owners:
+            break
+        done, _ = wait(owners, return_when=FIRST_COMPLETED)
+        for future in done:
+            owners[future].on_done(future)
 
 
 def cmd_run(args):
-    """执行 pipeline"""
-    project_name = args.project
-    pc = get_project(project_name)
-    if not pc:
-        log(f"项目 {project_name} 不存在。可用: {list_project_names()}")
-        sys.exit(1)
+    """执行 pipeline（可同时跑多个项目，共享 --jobs 个 worker 进程）"""
+    projects = []
+    for project_name in args.projects:
+        pc = get_project(project_name)
+        if not pc:
+            log(f"项目 {project_name} 不存在。可用: {list_project_names()}")
+            sys.exit(1)
+        projects.append((project_name, pc))
 
     # 确定执行范围
     if args.layer:
         layers = [args.layer]
     elif getattr(args, "from_layer", None):
-        start_idx = LAYER_ORDER.index(args.from_layer)
+        # --from L4 连同它的子层一起重跑
+        from_layer = L4_SUBLAYERS[0] if args.from_layer == "L4" else args.from_layer
+        start_idx = LAYER_ORDER.index(from_layer)
         layers = LAYER_ORDER[start_idx:]
     else:
         layers = LAYER_ORDER[:]
 
-    log(f"=== Pipeline: {project_name} | Layers: {' → '.join(layers)} ===")
-
-    run_id = create_run(
-        project_name, config=pc.__dict__ if hasattr(pc, "__dict__") else {}
-    )
-    prev_results = {}
-
-    i = 0
-    l4_l5_cycles = 0
-    while i < len(layers):
-        layer_name = layers[i]
-        update_run(run_id, current_layer=layer_name)
-        log(f"\n--- {layer_name} ---")
-
-        result = run_layer(layer_name, pc, run_id, prev_results)
+    jobs = getattr(args, "jobs", None) or MAX_WORKERS
+    multi = len(projects) > 1
+    ok = True
 
-        if result is None:
-            update_run(
-                run_id, status="FAILED", finished_at=datetime.utcnow().isoformat()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        runs = []
+        for project_name, pc in projects:
+            log(f"=== Pipeline: {project_name} | Layers: {' → '.join(layers)} ===")
+            run = PipelineRun(
+                project_name, pc, layers, pool, prefix=f"[{project_name}] " if multi else ""
             )
-            log(f"Pipeline FAILED at {layer_name} (precondition)")
-            sys.exit(1)
+            run.start()
+            runs.append(run)
+        drive(runs)
 
-        if result.status == "PASS":
-            prev_results[layer_name] = result
-            # L4 pass → 跳过 L5，直接 L6
-            if layer_name == "L4" and i + 1 < len(layers) and layers[i + 1] == "L5":
-                log("  L4 PASS, 跳过 L5")
-                i += 2  # 跳 L5
-                l4_l5_cycles = 0
-            else:
-                i += 1
-        elif result.status == "FAIL":
-            # L4 fail → 进 L5 修复 → 回 L4
-            if layer_name == "L4" and l4_l5_cycles < MAX_L4_L5_CYCLES:
-                l4_l5_cycles += 1
-                log(f"  L4→L5 修复循环 {l4_l5_cycles}/{MAX_L4_L5_CYCLES}")
-                prev_results[layer_name] = result
-                # 执行 L5
-                l5_result = run_layer("L5", pc, run_id, prev_results)
-                if l5_result and l5_result.status == "PASS":
-                    prev_results["L5"] = l5_result
-                    # 回到 L4 重测（不递增 i）
-                    continue
-                else:
-                    update_run(
-                        run_id,
-                        status="FAILED",
-                        finished_at=datetime.utcnow().isoformat(),
-                    )
-                    log("Pipeline FAILED: L5 修复失败")
-                    sys.exit(1)
-            else:
-                update_run(
-                    run_id, status="FAILED", finished_at=datetime.utcnow().isoformat()
-                )
-                log(f"Pipeline FAILED at {layer_name}")
-                sys.exit(1)
-
-    update_run(
-        run_id,
-        status="DONE",
-        current_layer="DONE",
-        finished_at=datetime.utcnow().isoformat(),
-    )
-    log(f"\n=== Pipeline DONE: {project_name} (run {run_id}) ===")
-
-    # 保存总报告
-    report_dir = Path(__file__).parent / "reports" / project_name
-    report_dir.mkdir(parents=True, exist_ok=True)
-    summary = {
-        "run_id": run_id,
-        "project": project_name,
-        "layers": {
-            k: {"status": v.status, "report": v.report} for k, v in prev_results.items()
-        },
-    }
-    (report_dir / f"run-{run_id}-summary.json").write_text(
-        json.dumps(summary, indent=2)
-    )
-    log(f"报告: {report_dir}/run-{run_id}-summary.json")
+    for run in runs:
+        ok = run.finish() and ok
+
+    if not ok:
+        sys.exit(1)
 
 
 def cmd_status(args):
@@ -263,6 +419,7 @@ def cmd_retry(args):
     failed_layer = run["current_layer"]
     log(f"Retrying {args.project} from {failed_layer}")
     # 模拟 --from 参数
+    args.projects = [args.project]
     args.from_layer = failed_layer
     args.layer = None
     cmd_run(args)
@@ -282,9 +439,12 @@ def main():
     sub = parser.add_subparsers(dest="command")
 
     p_run = sub.add_parser("run")
-    p_run.add_argument("project")
+    p_run.add_argument("projects", nargs="+", metavar="project")
     p_run.add_argument("--layer", choices=LAYER_ORDER)
     p_run.add_argument("--from", dest="from_layer", choices=LAYER_ORDER)
+    p_run.add_argument(
+        "--jobs", type=int, help=f"并发 worker 进程数 (默认 {MAX_WORKERS})"
+    )
 
     p_status = sub.add_parser("status")
     p_status.add_argument("project", nargs="?")
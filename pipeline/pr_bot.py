@@ -16,6 +16,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any, Literal
 from dataclasses import dataclass, field
 from enum import Enum
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 
 class CIStatus(str, Enum):
@@ -70,12 +71,88 @@ class RerunResult:
     details: Dict[str, Any] = field(default_factory=dict)
 
 
+def summarize_check_runs(runs: List[Dict[str, Any]]) -> CIResult:
+    """把 check run 列表汇总成 CIResult
+
+    gh api 的 check run 和 GitHub Actions 的 workflow run 字段一致
+    （id, name, status, conclusion, created_at, updated_at, html_url），两者都能用。
+
+    Args:
+        runs: check run / workflow run 列表
+
+    Returns:
+        CIResult: 汇总结果（details 为空，由调用方填）
+    """
+    status_map = {
+        "queued": CIStatus.PENDING,
+        "requested": CIStatus.PENDING,
+        "waiting": CIStatus.PENDING,
+        "pending": CIStatus.PENDING,
+        "in_progress": CIStatus.RUNNING,
+        "completed": CIStatus.SUCCESS
+    }
+
+    workflows = []
+    checks_passed = 0
+    checks_failed = 0
+    checks_pending = 0
+
+    for data in runs:
+        status = status_map.get(data.get("status"), CIStatus.UNKNOWN)
+        conclusion = data.get("conclusion") or ""
+
+        # 如果已完成，检查 conclusion
+        if status == CIStatus.SUCCESS:
+            if conclusion in ["success", "neutral", "skipped"]:
+                checks_passed += 1
+            elif conclusion in ["failure", "timed_out", "cancelled"]:
+                status = CIStatus.FAILURE
+                checks_failed += 1
+            else:
+                checks_pending += 1
+        elif status == CIStatus.PENDING:
+            checks_pending += 1
+        elif status == CIStatus.RUNNING:
+            checks_pending += 1
+
+        workflows.append(WorkflowRun(
+            id=data.get("id", 0),
+            name=data.get("name", ""),
+            status=status,
+            conclusion=conclusion if status == CIStatus.FAILURE else None,
+            created_at=data.get("created_at", ""),
+            updated_at=data.get("updated_at", ""),
+            html_url=data.get("html_url", "")
+        ))
+
+    # 确定总体状态
+    if checks_failed > 0:
+        overall_status = CIStatus.FAILURE
+    elif checks_pending > 0:
+        overall_status = CIStatus.PENDING
+    elif checks_passed > 0:
+        overall_status = CIStatus.SUCCESS
+    else:
+        overall_status = CIStatus.UNKNOWN
+
+    return CIResult(
+        overall_status=overall_status,
+        workflows=workflows,
+        checks_passed=checks_passed,
+        checks_failed=checks_failed,
+        checks_pending=checks_pending
+    )
+
+
 class PRBot:
     """自动 PR 管理
 
     支持通过 GitHub CLI 进行 PR 创建、CI 检查和 rerun
     """
 
+    # 等 CIWatcher 结果时在 CI 超时之外多等的秒数
+    CI_WATCH_MARGIN = 30
+
     # 高风险文件关键词
     HIGH_RISK_KEYWORDS = [
         "auth", "authentication", "login", "password", "credential",
@@ -316,76 +393,19 @@ class PRBot:
 
             output = self._run_gh(args)
 
-            # 解析检查结果
-            workflows = []
-            checks_passed = 0
-            checks_failed = 0
-            checks_pending = 0
-
+            runs = []
             for line in output.split('\n'):
                 if not line.strip():
                     continue
 
                 try:
-                    data = json.loads(line)
-
-                    status_map = {
-                        "queued": CIStatus.PENDING,
-                        "in_progress": CIStatus.RUNNING,
-                        "completed": CIStatus.SUCCESS
-                    }
-
-                    status = status_map.get(data.get("status"), CIStatus.UNKNOWN)
-
-                    # 如果已完成，检查 conclusion
-                    if status == CIStatus.SUCCESS:
-                        conclusion = data.get("conclusion", "")
-                        if conclusion == "success":
-                            checks_passed += 1
-                        elif conclusion in ["failure", "timed_out", "cancelled"]:
-                            status = CIStatus.FAILURE
-                            checks_failed += 1
-                            conclusion = conclusion
-                        else:
-                            checks_pending += 1
-                    elif status == CIStatus.PENDING:
-                        checks_pending += 1
-                    elif status == CIStatus.RUNNING:
-                        checks_pending += 1
-
-                    workflow = WorkflowRun(
-                        id=data.get("id", 0),
-                        name=data.get("name", ""),
-                        status=status,
-                        conclusion=conclusion if status == CIStatus.FAILURE else None,
-                        created_at=data.get("created_at", ""),
-                        updated_at=data.get("updated_at", ""),
-                        html_url=data.get("html_url", "")
-                    )
-
-                    workflows.append(workflow)
-
+                    runs.append(json.loads(line))
                 except json.JSONDecodeError:
                     continue
 
-            # 确定总体状态
-            if checks_failed > 0:
-                overall_status = CIStatus.FAILURE
-            elif checks_pending > 0:
-                overall_status = CIStatus.PENDING
-            elif checks_passed > 0:
-                overall_status = CIStatus.SUCCESS
-            else:
-                overall_status = CIStatus.UNKNOWN
-
-            return CIResult(
-                overall_status=overall_status,
-                workflows=workflows,
-                checks_passed=checks_passed,
-                checks_failed=checks_failed,
-                checks_pending=checks_pending,
-                details={"pr_url": pr_url, "pr_number": pr_number}
-            )
+            result = summarize_check_runs(runs)
+            result.details = {"pr_url": pr_url, "pr_number": pr_number}
+            return result
 
         except Exception as e:
             return CIResult(
@@ -416,15 +436,48 @@ class PRBot:
     ) -> CIResult:
         """等待 CI 完成
 
+        优先交给进程内共享的 CIWatcher（一个后台线程按 repo 批量轮询所有 PR，带自适应退避）；
+        拿不到 GitHub token 或 watcher 出错时退回逐个 gh api 轮询。
+
         Args:
             pr_url: PR URL
             timeout: 超时时间（秒）
-            poll_interval: 轮询间隔（秒）
+            poll_interval: 最长轮询间隔（秒）
 
         Returns:
             CIResult: 最终 CI 结果
         """
         start_time = time.time()
+        pr_number = self._extract_pr_number(pr_url)
+        if pr_number and self.repo:
+            try:
+                if __package__:
+                    from pipeline.ci_watcher import get_watcher
+                else:
+                    from ci_watcher import get_watcher
+                watcher = get_watcher()
+            except (ImportError, RuntimeError) as e:
+                print(f"Warning: CI watcher unavailable ({e}); polling {pr_url} with gh api")
+                watcher = None
+
+            if watcher is not None:
+                future = watcher.watch(
+                    self.repo, pr_number,
+                    timeout=timeout,
+                    pr_url=pr_url,
+                    max_interval=poll_interval
+                )
+                try:
+                    # watcher 自己会在 timeout 时给出 UNKNOWN；多等一点余量，防止后台线程卡住时永远阻塞
+                    return future.result(timeout=timeout + self.CI_WATCH_MARGIN)
+                except FutureTimeoutError:
+                    future.cancel()
+                    return CIResult(
+                        overall_status=CIStatus.UNKNOWN,
+                        details={"error": f"CI check timed out after {timeout}s", "pr_url": pr_url}
+                    )
+                except Exception as e:
+                    print(f"Warning: CI watcher failed for {pr_url}: {e}; falling back to polling")
 
         while time.time() - start_time < timeout:
             result = self.check_ci_status(pr_url)
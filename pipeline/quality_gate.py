@@ -2,15 +2,45 @@
 """Code Pipeline 质量门禁
 
 支持 lint + unit tests + 覆盖率检查，支持 code 和 content 两种 profile
+工具链按工作区探测一次并缓存；lint、测试、模式扫描并发执行，
+lint 和模式扫描只看相对基线分支改动过的文件
 """
 
+import os
+import shutil
 import subprocess
 import json
 import re
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, field
 
+if __package__:
+    from pipeline.impact_analysis import TestImpactAnalyzer
+else:  # 以脚本运行或 pipeline 目录在 sys.path 上时按顶层模块导入
+    from impact_analysis import TestImpactAnalyzer
+
+
+# 影响工具链探测的配置文件（mtime 变化时重新探测）
+TOOLCHAIN_MARKERS = (
+    "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "pytest.ini",
+    "tox.ini", ".flake8", "ruff.toml", ".ruff.toml", "package.json",
+)
+
+# 扫描时跳过的目录
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".mypy_cache",
+             ".pytest_cache", ".ruff_cache", "dist", "build"}
+
+PYTHON_EXTS = (".py",)
+JS_EXTS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs")
+
+# 受影响的测试文件达到这个数量时用 pytest-xdist 分片到多核
+XDIST_MIN_FILES = 8
+
 
 @dataclass
 class LintResult:
@@ -33,6 +63,7 @@ class TestResult:
     duration: float = 0.0
     output: str = ""
     failed_tests: List[str] = field(default_factory=list)
+    cached: int = 0  # 依赖没变、命中缓存跳过的测试文件数
 
 
 @dataclass
@@ -45,6 +76,15 @@ class CoverageResult:
     files: Dict[str, Dict[str, float]] = field(default_factory=dict)
 
 
+@dataclass
+class Toolchain:
+    """工作区可用的工具（None 表示没有）"""
+    linter: Optional[str] = None          # ruff / pylint / flake8 / eslint
+    test_framework: Optional[str] = None  # pytest / unittest / jest / vitest
+    coverage_tool: Optional[str] = None   # coverage / pytest-cov / c8 / istanbul
+    pytest_xdist: bool = False            # pytest 装了 xdist 插件，可以 -n auto
+
+
 @dataclass
 class GateResult:
     """质量门禁综合结果"""
@@ -74,7 +114,8 @@ class GateResult:
                 'passed': self.tests.passed if self.tests else 0,
                 'failed': self.tests.failed if self.tests else 0,
                 'skipped': self.tests.skipped if self.tests else 0,
-                'duration': self.tests.duration if self.tests else 0.0
+                'duration': self.tests.duration if self.tests else 0.0,
+                'cached': self.tests.cached if self.tests else 0
             },
             'coverage': {
                 'success': self.coverage.success if self.coverage else False,
@@ -114,6 +155,13 @@ class CodeQualityGate:
         "risk_files": []
     }
 
+    # 基线分支候选（按顺序尝试）
+    BASE_REFS = ("origin/main", "origin/master", "main", "master")
+
+    # 工具链探测缓存: workspace -> (marker 签名, Toolchain)
+    _toolchain_cache: Dict[str, Tuple[tuple, Toolchain]] = {}
+    _toolchain_lock = threading.Lock()
+
     def __init__(self):
         """初始化质量门禁"""
         self._profiles = {
@@ -121,12 +169,18 @@ class CodeQualityGate:
             "content": self.PROFILE_CONTENT
         }
 
-    def check(self, workspace: str, profile: str = "code") -> GateResult:
+    def check(self, workspace: str, profile: str = "code", base_ref: Optional[str] = None,
+              incremental: bool = True) -> GateResult:
         """执行质量检查
 
+        lint、测试（+覆盖率）、禁止模式/风险文件扫描三条线并发执行，
+        结果仍按 lint → 测试 → 覆盖率的顺序判定。
+
         Args:
             workspace: 工作区路径
             profile: profile 类型 ('code' 或 'content')
+            base_ref: 基线分支，默认依次尝试 BASE_REFS
+            incremental: 只对相对基线改动过的文件做 lint 和模式扫描（找不到基线时退回全量）
 
         Returns:
             GateResult: 质量检查结果
@@ -143,52 +197,57 @@ class CodeQualityGate:
         # 获取 profile 配置
         profile_config = self._profiles.get(profile, self.PROFILE_CODE)
 
-        # 运行检查
-        lint_result = None
-        test_result = None
-        coverage_result = None
+        files = self.changed_files(workspace, base_ref) if incremental else None
+        details = {
+            "toolchain": self.detect_toolchain(workspace).__dict__,
+            "changed_files": len(files) if files is not None else None,
+        }
+
+        run_lint = "lint" in profile_config["must_pass"]
+        run_tests = profile_config["require_test"] or "unit_tests" in profile_config["must_pass"]
+
+        # 三条线并发：lint | 测试 → 覆盖率 | 模式扫描
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            lint_future = pool.submit(self.run_lint, workspace, files) if run_lint else None
+            test_future = pool.submit(self._run_test_lane, workspace, files, run_tests,
+                                      profile_config["min_coverage"])
+            scan_future = pool.submit(self._scan_files, workspace, files,
+                                      profile_config["forbidden_patterns"],
+                                      profile_config["risk_files"])
+
+            lint_result = lint_future.result() if lint_future else None
+            test_result, coverage_result = test_future.result()
+            forbidden_patterns, risk_files = scan_future.result()
 
         # Lint 检查
-        if "lint" in profile_config["must_pass"]:
-            lint_result = self.run_lint(workspace)
-            if not lint_result.success:
-                return GateResult(
-                    passed=False,
-                    profile=profile,
-                    lint=lint_result,
-                    details={"reason": "lint check failed"}
-                )
+        if lint_result and not lint_result.success:
+            return GateResult(
+                passed=False,
+                profile=profile,
+                lint=lint_result,
+                details={**details, "reason": "lint check failed"}
+            )
 
         # 单元测试
-        if profile_config["require_test"] or "unit_tests" in profile_config["must_pass"]:
-            test_result = self.run_tests(workspace)
-            if not test_result.success:
-                return GateResult(
-                    passed=False,
-                    profile=profile,
-                    lint=lint_result,
-                    tests=test_result,
-                    details={"reason": "unit tests failed"}
-                )
+        if test_result and not test_result.success:
+            return GateResult(
+                passed=False,
+                profile=profile,
+                lint=lint_result,
+                tests=test_result,
+                details={**details, "reason": "unit tests failed"}
+            )
 
         # 覆盖率检查
-        if profile_config["min_coverage"] > 0:
-            coverage_result = self.check_coverage(workspace)
-            if not coverage_result.success:
-                return GateResult(
-                    passed=False,
-                    profile=profile,
-                    lint=lint_result,
-                    tests=test_result,
-                    coverage=coverage_result,
-                    details={"reason": f"coverage below {profile_config['min_coverage']}%"}
-                )
-
-        # 检查禁止模式
-        forbidden_patterns = self._check_forbidden_patterns(workspace, profile_config["forbidden_patterns"])
-
-        # 检查风险文件
-        risk_files = self._check_risk_files(workspace, profile_config["risk_files"])
+        if coverage_result and not coverage_result.success:
+            return GateResult(
+                passed=False,
+                profile=profile,
+                lint=lint_result,
+                tests=test_result,
+                coverage=coverage_result,
+                details={**details, "reason": f"coverage below {profile_config['min_coverage']}%"}
+            )
 
         # 所有检查通过
         return GateResult(
@@ -199,107 +258,256 @@ class CodeQualityGate:
             coverage=coverage_result,
             forbidden_patterns=forbidden_patterns,
             risk_files=risk_files,
-            details={"reason": "all checks passed"}
+            details={**details, "reason": "all checks passed"}
+        )
+
+    def _run_test_lane(self, workspace: str, files: Optional[List[str]], run_tests: bool,
+                       min_coverage: float) -> Tuple[Optional[TestResult], Optional[CoverageResult]]:
+        """测试线：先跑测试，通过后再查覆盖率（两者共用工作区里的缓存文件，不能并发）"""
+        test_result = self.run_tests(workspace, files) if run_tests else None
+        if test_result and not test_result.success:
+            return test_result, None
+
+        coverage_result = self.check_coverage(workspace) if min_coverage > 0 else None
+        return test_result, coverage_result
+
+    def detect_toolchain(self, workspace: str) -> Toolchain:
+        """探测工作区的 linter / 测试框架 / 覆盖率工具
+
+        结果按工作区缓存，配置文件（TOOLCHAIN_MARKERS）变化时重新探测。
+
+        Args:
+            workspace: 工作区路径
+
+        Returns:
+            Toolchain: 可用工具
+        """
+        workspace_path = Path(workspace).resolve()
+        signature = []
+        for marker in TOOLCHAIN_MARKERS:
+            try:
+                signature.append((marker, (workspace_path / marker).stat().st_mtime_ns))
+            except OSError:
+                continue
+        signature = tuple(signature)
+
+        key = str(workspace_path)
+        with self._toolchain_lock:
+            cached = self._toolchain_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        toolchain = self._probe_toolchain(workspace_path)
+        with self._toolchain_lock:
+            self._toolchain_cache[key] = (signature, toolchain)
+        return toolchain
+
+    def _probe_toolchain(self, workspace_path: Path) -> Toolchain:
+        """实际探测（只看 PATH 和项目文件，不试跑工具）"""
+        toolchain = Toolchain()
+
+        is_python = (
+            any((workspace_path / m).exists() for m in
+                ("pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "pytest.ini", "tox.ini"))
+            or any(workspace_path.glob("*.py"))
+            or (workspace_path / "tests").is_dir()
         )
+        package_json = ""
+        try:
+            package_json = (workspace_path / "package.json").read_text()
+        except OSError:
+            pass
+        node_bin = workspace_path / "node_modules" / ".bin"
+
+        if is_python:
+            toolchain.linter = next(
+                (name for name in ("ruff", "pylint", "flake8") if shutil.which(name)), None
+            )
+            toolchain.test_framework = "pytest" if shutil.which("pytest") else "unittest"
+            if toolchain.test_framework == "pytest":
+                toolchain.pytest_xdist = self._has_xdist(workspace_path)
+            if shutil.which("coverage"):
+                toolchain.coverage_tool = "coverage"
+            elif shutil.which("pytest"):
+                toolchain.coverage_tool = "pytest-cov"
+
+        if package_json:
+            if not toolchain.linter and ((node_bin / "eslint").exists() or "eslint" in package_json):
+                toolchain.linter = "eslint"
+            if not toolchain.test_framework:
+                if "jest" in package_json:
+                    toolchain.test_framework = "jest"
+                elif "vitest" in package_json:
+                    toolchain.test_framework = "vitest"
+            if not toolchain.coverage_tool:
+                if (node_bin / "c8").exists():
+                    toolchain.coverage_tool = "c8"
+                elif (node_bin / "nyc").exists():
+                    toolchain.coverage_tool = "istanbul"
+
+        return toolchain
+
+    def _has_xdist(self, workspace_path: Path) -> bool:
+        """pytest --version --version 会列出已注册的插件"""
+        try:
+            result = subprocess.run(["pytest", "--version", "--version"], capture_output=True,
+                                    text=True, timeout=30, cwd=workspace_path)
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return False
+        return "xdist" in (result.stdout + result.stderr)
+
+    def changed_files(self, workspace: str, base_ref: Optional[str] = None) -> Optional[List[str]]:
+        """相对基线分支改动过的文件（含未提交和未跟踪的文件）
+
+        删除的文件和改名前的旧路径也包含在内：测试影响分析靠它们找到原来的依赖方，
+        lint 只检查还存在的文件。
+
+        Args:
+            workspace: 工作区路径
+            base_ref: 基线分支，默认依次尝试 BASE_REFS
+
+        Returns:
+            List[str]: 相对工作区的路径；不是 git 仓库或找不到基线时返回 None（表示全量检查）
+        """
+        def git(*args) -> Optional[str]:
+            try:
+                result = subprocess.run(["git", *args], capture_output=True, text=True,
+                                        timeout=30, cwd=workspace)
+            except (subprocess.TimeoutExpired, FileNotFoundError):
+                return None
+            return result.stdout if result.returncode == 0 else None
 
-    def run_lint(self, workspace: str) -> LintResult:
+        for ref in ([base_ref] if base_ref else self.BASE_REFS):
+            merge_base = git("merge-base", "HEAD", ref)
+            if not merge_base:
+                continue
+
+            # name-status: "M\tpath"、"D\tpath"、"R100\told\tnew"，改名两边的路径都算改动
+            diff = git("diff", "--name-status", "-M", "--relative", merge_base.strip())
+            untracked = git("ls-files", "--others", "--exclude-standard")
+            if diff is None or untracked is None:
+                return None
+
+            names = {path for line in diff.splitlines() for path in line.split("\t")[1:]}
+            names |= {line for line in untracked.splitlines() if line}
+            workspace_path = Path(workspace)
+            return sorted(n for n in names
+                          if n and ((workspace_path / n).is_file() or not (workspace_path / n).exists()))
+
+        return None
+
+    def run_lint(self, workspace: str, files: Optional[List[str]] = None) -> LintResult:
         """运行 lint 检查
 
-        支持多种 linter：
+        支持多种 linter（按 detect_toolchain 的结果只跑一个）：
+        - ruff (Python, 快速)
         - pylint (Python)
         - flake8 (Python)
         - eslint (JavaScript/TypeScript)
-        - ruff (Python, 快速)
 
         Args:
             workspace: 工作区路径
+            files: 只检查这些文件（相对路径）；None 表示整个工作区
 
         Returns:
             LintResult: Lint 检查结果
         """
         workspace_path = Path(workspace)
+        linter_name = self.detect_toolchain(workspace).linter
 
-        # 尝试不同的 linter
-        linter_commands = [
-            # ruff - 最快
-            (["ruff", "check", "--output-format=json", str(workspace_path)], "ruff"),
-            # pylint
-            (["pylint", "--output-format=json", str(workspace_path)], "pylint"),
-            # flake8
-            (["flake8", str(workspace_path)], "flake8"),
-            # eslint
-            (["npx", "eslint", "--format=json", str(workspace_path)], "eslint")
-        ]
-
-        for cmd, linter_name in linter_commands:
-            try:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
+        if not linter_name:
+            return LintResult(
+                success=True,  # 没有可用的 linter，不算失败
+                output="No linter available",
+                errors=[]
+            )
 
-                if result.returncode == 0 or linter_name == "flake8":
-                    # 成功或 flake8（返回非0表示发现问题）
-                    output = result.stdout or result.stderr
+        targets = [str(workspace_path)]
+        if files is not None:
+            exts = JS_EXTS if linter_name == "eslint" else PYTHON_EXTS
+            targets = [f for f in files if f.endswith(exts) and (workspace_path / f).is_file()]
+            if not targets:
+                return LintResult(success=True, output="No changed files to lint")
+
+        linter_commands = {
+            "ruff": ["ruff", "check", "--output-format=json"],
+            "pylint": ["pylint", "--output-format=json"],
+            "flake8": ["flake8"],
+            "eslint": ["npx", "--no-install", "eslint", "--format=json"],
+        }
 
-                    # 解析输出
-                    errors = self._parse_lint_output(output, linter_name)
+        try:
+            result = subprocess.run(
+                linter_commands[linter_name] + targets,
+                capture_output=True,
+                text=True,
+                timeout=60,
+                cwd=workspace_path
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+            return LintResult(success=True, output=f"{linter_name} unavailable: {e}")
 
-                    return LintResult(
-                        success=result.returncode == 0 or linter_name == "flake8",
-                        passed=len([e for e in errors if e.get("type") == "info"]) or 0,
-                        failed=len([e for e in errors if e.get("type") in ["error", "E"]]),
-                        warnings=len([e for e in errors if e.get("type") in ["warning", "W"]]),
-                        output=output[:1000],  # 限制输出长度
-                        errors=[f"{e.get('file', '')}:{e.get('line', '')}: {e.get('message', '')}" for e in errors[:10]]
-                    )
+        output = result.stdout or result.stderr
 
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                # 超时或命令不存在，尝试下一个 linter
-                continue
+        # 解析输出
+        errors = self._parse_lint_output(output, linter_name)
 
-        # 所有 linter 都失败
         return LintResult(
-            success=True,  # 没有可用的 linter，不算失败
-            output="No linter available",
-            errors=[]
+            # flake8 返回非 0 表示发现问题，不算失败
+            success=result.returncode == 0 or linter_name == "flake8",
+            passed=len([e for e in errors if e.get("type") == "info"]) or 0,
+            failed=len([e for e in errors if e.get("type") in ["error", "E"]]),
+            warnings=len([e for e in errors if e.get("type") in ["warning", "W"]]),
+            output=output[:1000],  # 限制输出长度
+            errors=[f"{e.get('file', '')}:{e.get('line', '')}: {e.get('message', '')}" for e in errors[:10]]
         )
 
-    def run_tests(self, workspace: str) -> TestResult:
+    def run_tests(self, workspace: str, files: Optional[List[str]] = None) -> TestResult:
         """运行单元测试
 
-        支持多种测试框架：
-        - pytest (Python)
+        支持多种测试框架（按 detect_toolchain 的结果只跑一个）：
+        - pytest (Python): 只跑受改动影响、且依赖闭包没有通过记录的测试文件
         - unittest (Python)
-        - jest (JavaScript/TypeScript)
-        - vitest (JavaScript/TypeScript)
+        - jest (JavaScript/TypeScript): --findRelatedTests
+        - vitest (JavaScript/TypeScript): vitest related
 
         Args:
             workspace: 工作区路径
+            files: 改动的文件（相对路径）；None 表示未知（全部测试都跑，不走缓存）
 
         Returns:
             TestResult: 测试执行结果
         """
         workspace_path = Path(workspace)
+        toolchain = self.detect_toolchain(workspace)
+        framework = toolchain.test_framework
+
+        if framework == "pytest":
+            analyzer = TestImpactAnalyzer(workspace)
+            if analyzer.graph.test_files:
+                return self._run_pytest_impacted(workspace, files, analyzer, toolchain.pytest_xdist)
+
+        test_commands = {
+            "pytest": ["pytest", "--tb=no", "-q", str(workspace_path)],
+            "unittest": ["python", "-m", "unittest", "discover", "-s", str(workspace_path)],
+            "jest": ["npx", "jest", "--json", "--outputFile=/tmp/jest-result.json"],
+            "vitest": ["npx", "vitest", "run", "--json", "--reporter=json"],
+        }
 
-        # 尝试不同的测试框架
-        test_commands = [
-            # pytest
-            (["pytest", "--tb=no", "-q", str(workspace_path)], "pytest"),
-            # unittest
-            (["python", "-m", "unittest", "discover", "-s", str(workspace_path)], "unittest"),
-            # jest
-            (["npx", "jest", "--json", "--outputFile=/tmp/jest-result.json"], "jest"),
-            # vitest
-            (["npx", "vitest", "run", "--json", "--reporter=json"], "vitest")
-        ]
-
-        for cmd, framework in test_commands:
+        # JS 改动全是现存的源码文件时，只跑相关测试（改了 package.json、删除 / 改名了文件则全量）
+        if files is not None and framework in ("jest", "vitest") and all(
+                f.endswith(JS_EXTS) and (workspace_path / f).is_file() for f in files):
+            if not files:
+                return TestResult(success=True, output="No changed files to test")
+            if framework == "jest":
+                test_commands["jest"] += ["--findRelatedTests", *files]
+            else:
+                test_commands["vitest"] = ["npx", "vitest", "related", "--run", "--reporter=json", *files]
+
+        if framework:
             try:
                 result = subprocess.run(
-                    cmd,
+                    test_commands[framework],
                     capture_output=True,
                     text=True,
                     timeout=120,
@@ -308,30 +516,93 @@ class CodeQualityGate:
 
                 output = result.stdout + result.stderr
 
-                # 检查是否是配置错误或安装问题（不应该是测试失败）
-                if "config file" in output.lower() or "no config" in output.lower() or "npm warn" in output.lower() or "throw new" in output:
-                    # 配置文件缺失或安装问题，尝试下一个框架
-                    continue
-
-                # 解析结果
-                test_result = self._parse_test_output(output, framework, result.returncode)
-
-                return test_result
+                # 配置错误或安装问题不算测试失败
+                if not ("config file" in output.lower() or "no config" in output.lower() or "npm warn" in output.lower() or "throw new" in output):
+                    return self._parse_test_output(output, framework, result.returncode)
 
             except (subprocess.TimeoutExpired, FileNotFoundError):
-                # 超时或命令不存在，尝试下一个框架
-                continue
+                pass
 
-        # 所有测试框架都失败
+        # 没有可用的测试框架
         return TestResult(
             success=True,  # 没有可用的测试框架，不算失败
             output="No test framework available"
         )
 
+    def _run_pytest_impacted(self, workspace: str, files: Optional[List[str]],
+                             analyzer: TestImpactAnalyzer, xdist: bool) -> TestResult:
+        """按测试影响分析跑 pytest，通过的测试文件写入缓存"""
+        selection = analyzer.select(files)
+        cached_passed = sum(analyzer.cache.get(selection.keys[t]).get("passed", 0)
+                            for t in selection.cached)
+
+        if not selection.run:
+            return TestResult(
+                success=True,
+                passed=cached_passed,
+                output=f"No affected tests to run ({len(selection.cached)} cached)",
+                cached=len(selection.cached)
+            )
+
+        with tempfile.TemporaryDirectory(prefix="gate-") as tmp:
+            junit_path = Path(tmp) / "junit.xml"
+            cmd = ["pytest", "--tb=no", "-q", f"--junitxml={junit_path}", *selection.run]
+            if xdist and len(selection.run) >= XDIST_MIN_FILES:
+                cmd += ["-n", "auto"]
+
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=120,
+                                        cwd=workspace)
+            except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+                return TestResult(success=False, output=f"pytest did not finish: {e}")
+
+            output = result.stdout + result.stderr
+            test_result = self._parse_test_output(output, "pytest", result.returncode)
+
+            # 0 = 全部通过, 1 = 有失败；其他（中断、用法错误）不记录
+            if result.returncode in (0, 1):
+                failed_files, counts = self._parse_junit(junit_path, selection.run)
+                analyzer.record(selection, failed_files, counts)
+
+        test_result.passed += cached_passed
+        test_result.cached = len(selection.cached)
+        return test_result
+
+    def _parse_junit(self, junit_path: Path, test_files: List[str]) -> Tuple[Set[str], Dict[str, int]]:
+        """从 junit xml 统计每个测试文件的通过数和失败的文件"""
+        # classname 形如 tests.test_calc 或 tests.test_calc.TestClass
+        dotted = {f[:-3].replace(os.sep, "."): f for f in test_files}
+        failed_files: Set[str] = set()
+        counts: Dict[str, int] = {}
+
+        try:
+            root = ET.parse(junit_path).getroot()
+        except (ET.ParseError, OSError):
+            # 拿不到明细，保守地当作全部失败（不写缓存）
+            return set(test_files), counts
+
+        for case in root.iter("testcase"):
+            classname = case.get("classname", "")
+            test_file = next((f for name, f in dotted.items()
+                              if classname == name or classname.startswith(name + ".")), None)
+            if test_file is None:
+                continue
+            if case.find("failure") is not None or case.find("error") is not None:
+                failed_files.add(test_file)
+            elif case.find("skipped") is None:
+                counts[test_file] = counts.get(test_file, 0) + 1
+
+        # 收集阶段出错的文件没有 testcase 对应，只有 classname 为空的 error
+        if any(case.get("classname", "") == "" and case.find("error") is not None
+               for case in root.iter("testcase")):
+            failed_files.update(f for f in test_files if f not in counts)
+
+        return failed_files, counts
+
     def check_coverage(self, workspace: str) -> CoverageResult:
         """检查代码覆盖率
 
-        支持多种覆盖率工具：
+        支持多种覆盖率工具（按 detect_toolchain 的结果只跑一个）：
         - coverage.py (Python)
         - pytest-cov (Python)
         - c8 (JavaScript/TypeScript)
@@ -344,23 +615,19 @@ class CodeQualityGate:
             CoverageResult: 覆盖率检查结果
         """
         workspace_path = Path(workspace)
+        tool = self.detect_toolchain(workspace).coverage_tool
+
+        coverage_commands = {
+            "coverage": ["coverage", "report", "--json"],
+            "pytest-cov": ["pytest", "--cov", "--cov-report=json", str(workspace_path)],
+            "c8": ["npx", "c8", "report", "--reporter=json"],
+            "istanbul": ["npx", "nyc", "report", "--reporter=json"],
+        }
 
-        # 尝试不同的覆盖率工具
-        coverage_commands = [
-            # coverage.py
-            (["coverage", "report", "--json"], "coverage"),
-            # pytest-cov
-            (["pytest", "--cov", "--cov-report=json", str(workspace_path)], "pytest-cov"),
-            # c8
-            (["npx", "c8", "report", "--reporter=json"], "c8"),
-            # istanbul
-            (["npx", "nyc", "report", "--reporter=json"], "istanbul")
-        ]
-
-        for cmd, tool in coverage_commands:
+        if tool:
             try:
                 result = subprocess.run(
-                    cmd,
+                    coverage_commands[tool],
                     capture_output=True,
                     text=True,
                     timeout=60,
@@ -370,15 +637,12 @@ class CodeQualityGate:
                 output = result.stdout or result.stderr
 
                 # 解析结果
-                coverage_result = self._parse_coverage_output(output, tool)
-
-                return coverage_result
+                return self._parse_coverage_output(output, tool)
 
             except (subprocess.TimeoutExpired, FileNotFoundError):
-                # 超时或命令不存在，尝试下一个工具
-                continue
+                pass
 
-        # 所有覆盖率工具都失败
+        # 没有可用的覆盖率工具
         return CoverageResult(
             success=True,  # 没有可用的覆盖率工具，不算失败
             coverage_percent=0.0,
@@ -386,63 +650,55 @@ class CodeQualityGate:
             lines_total=0
         )
 
-    def _check_forbidden_patterns(self, workspace: str, patterns: List[str]) -> List[str]:
-        """检查禁止的模式
+    def _iter_workspace_files(self, workspace_path: Path):
+        """遍历工作区文件（相对路径），跳过 VCS / 依赖 / 缓存目录"""
+        for root, dirs, names in os.walk(workspace_path):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            rel_root = os.path.relpath(root, workspace_path)
+            for name in names:
+                yield name if rel_root == "." else os.path.join(rel_root, name)
+
+    def _scan_files(self, workspace: str, files: Optional[List[str]], patterns: List[str],
+                    risk_keywords: List[str]) -> Tuple[List[str], List[str]]:
+        """一次遍历同时检查禁止模式（Python 文件内容）和风险文件（文件名）
 
         Args:
             workspace: 工作区路径
+            files: 只扫描这些文件（相对路径）；None 表示整个工作区
             patterns: 禁止的模式列表
+            risk_keywords: 风险关键词列表
 
         Returns:
-            List[str]: 匹配的文件和位置
+            (matches, risk_files): 匹配的文件和位置、风险文件路径
         """
-        if not patterns:
-            return []
+        if not patterns and not risk_keywords:
+            return [], []
 
         workspace_path = Path(workspace)
         matches = []
+        risk_files = []
 
-        # 遍历所有 Python 文件
-        for py_file in workspace_path.rglob("*.py"):
+        for rel_path in (files if files is not None else self._iter_workspace_files(workspace_path)):
+            # 检查文件名是否包含风险关键词
+            file_name = os.path.basename(rel_path).lower()
+            if any(keyword in file_name for keyword in risk_keywords):
+                risk_files.append(rel_path)
+
+            if not patterns or not rel_path.endswith(".py"):
+                continue
             try:
-                content = py_file.read_text()
-                for pattern in patterns:
-                    if pattern in content:
-                        # 找到匹配的行
-                        for i, line in enumerate(content.split('\n'), 1):
-                            if pattern in line:
-                                matches.append(f"{py_file.relative_to(workspace_path)}:{i}: contains '{pattern}'")
+                content = (workspace_path / rel_path).read_text()
             except Exception:
                 continue
+            if not any(pattern in content for pattern in patterns):
+                continue
+            # 找到匹配的行
+            for i, line in enumerate(content.split('\n'), 1):
+                for pattern in patterns:
+                    if pattern in line:
+                        matches.append(f"{rel_path}:{i}: contains '{pattern}'")
 
-        return matches
-
-    def _check_risk_files(self, workspace: str, risk_keywords: List[str]) -> List[str]:
-        """检查风险文件
-
-        Args:
-            workspace: 工作区路径
-            risk_keywords: 风险关键词列表
-
-        Returns:
-            List[str]: 风险文件路径
-        """
-        if not risk_keywords:
-            return []
-
-        workspace_path = Path(workspace)
-        risk_files = []
-
-        # 检查文件名是否包含风险关键词
-        for file_path in workspace_path.rglob("*"):
-            if file_path.is_file():
-                file_name = file_path.name.lower()
-                for keyword in risk_keywords:
-                    if keyword in file_name:
-                        risk_files.append(str(file_path.relative_to(workspace_path)))
-                        break
-
-        return risk_files
+        return matches, risk_files
 
     def _parse_lint_output(self, output: str, linter: str) -> List[Dict]:
         """解析 linter 输出
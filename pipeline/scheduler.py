@@ -1,17 +1,27 @@
 #!/usr/bin/env python3
-"""Night Shift Scheduler - 夜间自动调度器"""
+"""Night Shift Scheduler - 夜间自动调度器
 
-import sqlite3
+两种运行方式：
+- run_batch / scan_ci：单次批量（cron 每次拉起一个新进程）
+- serve：常驻 supervisor，内部时间轮驱动认领、对账和清理，任务在有界线程池里并发执行
+"""
+
+import os
 import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from contextlib import contextmanager
-from typing import List, Dict, Optional
+from typing import Callable, Deque, List, Dict, Optional, Tuple
 
 from pipeline.code_queue import CodeQueue
+from pipeline.sqlite_pool import get_pool
 
 DB_PATH = Path(__file__).parent / "pipeline.db"
 CRON_LOG_PATH = Path(__file__).parent / "night_shift.log"
+SUPERVISOR_LOCK_PATH = Path(__file__).parent / "night_shift.lock"
 
 
 # 高风险文件模式（自动标记为 needs_human）
@@ -29,21 +39,9 @@ HIGH_RISK_PATTERNS = [
 ]
 
 
-@contextmanager
 def get_db():
-    """Context manager for database connection"""
-    conn = sqlite3.connect(str(DB_PATH), timeout=30.0)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    """Transaction on this thread's pooled connection"""
+    return get_pool(DB_PATH).transaction()
 
 
 def init_scheduler_tables():
@@ -77,6 +75,242 @@ def init_scheduler_tables():
         """)
 
 
+def log(msg: str):
+    """带时间戳输出（cron / supervisor 的 stdout 重定向到 night_shift.log）"""
+    print(f"[{datetime.utcnow().isoformat(timespec='seconds')}] {msg}", flush=True)
+
+
+class FuseCounters:
+    """保险丝计数（内存）
+
+    今天创建的 PR 及其状态保存在内存里，record_pr / update_pr_status 同步更新，
+    check_fuse 和 get_stats 不再每次查库。定期（以及跨天时）用一条查询和 DB 重新对账，
+    其他进程写入的 PR 也会被算进来。
+    """
+
+    OPEN_STATUSES = ("pending", "in_progress")
+
+    def __init__(self, reconcile_interval: float = 60.0):
+        """初始化保险丝计数
+
+        Args:
+            reconcile_interval: 距上次对账超过这个秒数时，下次读取前先对账
+        """
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._day: Optional[str] = None
+        self._reconciled_at = 0.0
+        self._prs: Dict[str, Tuple[str, str]] = (
+            {}
+        )  # pr_url -> (repo, status)，只含今天的
+
+    @staticmethod
+    def _today_start() -> str:
+        now = datetime.utcnow()
+        return now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+    def reconcile(self):
+        """从 DB 重新加载今天的 PR"""
+        today_start = self._today_start()
+        with get_db() as conn:
+            rows = conn.execute(
+                """SELECT pr_url, repo, status
+                   FROM nightly_prs
+                   WHERE created_at >= ?""",
+                (today_start,),
+            ).fetchall()
+        with self._lock:
+            self._prs = {r["pr_url"]: (r["repo"], r["status"]) for r in rows}
+            self._day = today_start
+            self._reconciled_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """跨天或超过对账间隔时重新对账"""
+        if (
+            self._day != self._today_start()
+            or time.monotonic() - self._reconciled_at >= self.reconcile_interval
+        ):
+            self.reconcile()
+
+    def record(self, pr_url: str, repo: str):
+        """新 PR（状态 pending）"""
+        with self._lock:
+            self._prs.setdefault(pr_url, (repo, "pending"))
+
+    def set_status(self, pr_url: str, status: str):
+        with self._lock:
+            if pr_url in self._prs:
+                self._prs[pr_url] = (self._prs[pr_url][0], status)
+
+    def prs_tonight(self) -> int:
+        with self._lock:
+            return len(self._prs)
+
+    def open_count(self, repo: str) -> int:
+        """repo 今天还没结束的 PR 数"""
+        with self._lock:
+            return sum(
+                1
+                for r, status in self._prs.values()
+                if r == repo and status in self.OPEN_STATUSES
+            )
+
+    def has_capacity(self, max_prs: int, max_per_repo: int) -> bool:
+        """今晚 PR 总数未到上限，且没有 repo 的未结束 PR 数到上限"""
+        with self._lock:
+            if len(self._prs) >= max_prs:
+                return False
+            open_by_repo: Dict[str, int] = {}
+            for repo, status in self._prs.values():
+                if status in self.OPEN_STATUSES:
+                    open_by_repo[repo] = open_by_repo.get(repo, 0) + 1
+        return all(cnt < max_per_repo for cnt in open_by_repo.values())
+
+    def summary(self) -> Dict[str, int]:
+        """今天 PR 的状态统计（get_stats 用）"""
+        with self._lock:
+            statuses = [status for _, status in self._prs.values()]
+        return {
+            "total": len(statuses),
+            "completed": statuses.count("completed"),
+            "failed": statuses.count("failed"),
+            "pending": sum(1 for s in statuses if s in self.OPEN_STATUSES),
+        }
+
+
+class RepoSlots:
+    """每个 repo 同时在跑的任务数上限"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._running: Dict[str, int] = {}
+        self._cond = threading.Condition()
+
+    def try_acquire(self, repo: Optional[str], reserved: int = 0) -> bool:
+        """非阻塞占一个槽
+
+        Args:
+            repo: 仓库，None 不限制
+            reserved: 额外占用的名额（如该 repo 已开着的 PR 数）
+        """
+        if repo is None:
+            return True
+        with self._cond:
+            if self._running.get(repo, 0) + reserved >= self.limit:
+                return False
+            self._running[repo] = self._running.get(repo, 0) + 1
+            return True
+
+    def acquire(self, repo: Optional[str]):
+        """阻塞直到 repo 有空槽"""
+        if repo is None:
+            return
+        with self._cond:
+            while self._running.get(repo, 0) >= self.limit:
+                self._cond.wait()
+            self._running[repo] = self._running.get(repo, 0) + 1
+
+    def release(self, repo: Optional[str]):
+        if repo is None:
+            return
+        with self._cond:
+            self._running[repo] -= 1
+            if not self._running[repo]:
+                del self._running[repo]
+            self._cond.notify_all()
+
+
+class _Timer:
+    """时间轮里的一个定时任务"""
+
+    __slots__ = ("due", "callback", "interval", "cancelled")
+
+    def __init__(self, callback: Callable[[], None], interval: Optional[float]):
+        self.due = 0  # 到期 tick
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+
+class TimerWheel:
+    """哈希时间轮
+
+    定时任务按到期 tick 放进 slots[tick % len(slots)]，每个 tick 只检查当前槽，
+    插入和到期都是 O(1)（与定时任务总数无关）。周期任务触发后按 interval 重新入轮。
+    不自带线程，由调用方循环调用 advance()。
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        """初始化时间轮
+
+        Args:
+            tick: 时间粒度（秒）
+            slots: 槽数
+        """
+        self.tick = tick
+        self.slots: List[List[_Timer]] = [[] for _ in range(slots)]
+        self._start = time.monotonic()
+        self._tick_no = 0
+
+    def schedule(
+        self,
+        delay: float,
+        callback: Callable[[], None],
+        interval: Optional[float] = None,
+    ) -> _Timer:
+        """delay 秒后执行 callback；给出 interval 时之后每 interval 秒执行一次
+
+        Returns:
+            timer: 传给 cancel() 用的句柄
+        """
+        timer = _Timer(callback, interval)
+        self._insert(timer, delay)
+        return timer
+
+    def cancel(self, timer: _Timer):
+        timer.cancelled = True
+
+    def _insert(self, timer: _Timer, delay: float):
+        timer.due = self._tick_no + max(1, int(-(-delay // self.tick)))
+        self.slots[timer.due % len(self.slots)].append(timer)
+
+    def next_deadline(self) -> float:
+        """下一个 tick 的 monotonic 时间"""
+        return self._start + (self._tick_no + 1) * self.tick
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """推进到 now，执行所有到期的定时任务
+
+        Returns:
+            fired: 执行的任务数
+        """
+        now = time.monotonic() if now is None else now
+        due_tick = int((now - self._start) / self.tick)
+        fired = 0
+        while self._tick_no < due_tick:
+            self._tick_no += 1
+            index = self._tick_no % len(self.slots)
+            slot = self.slots[index]
+            if not slot:
+                continue
+            due = [t for t in slot if t.due <= self._tick_no]
+            if not due:
+                continue
+            self.slots[index] = [t for t in slot if t.due > self._tick_no]
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                fired += 1
+                try:
+                    timer.callback()
+                except Exception as e:
+                    name = getattr(timer.callback, "__name__", timer.callback)
+                    log(f"timer {name} failed: {e}")
+                if timer.interval and not timer.cancelled:
+                    self._insert(timer, timer.interval)
+        return fired
+
+
 class BatchResult:
     """批量执行结果"""
 
@@ -131,14 +365,24 @@ class NightShiftScheduler:
     NIGHT_END = "23:59"
     CI_SCAN_INTERVAL = 900  # 15 分钟
 
-    def __init__(self, queue: Optional[CodeQueue] = None):
+    def __init__(
+        self, queue: Optional[CodeQueue] = None, workers: Optional[int] = None
+    ):
         """初始化 NightShiftScheduler
 
         Args:
             queue: CodeQueue 实例，默认创建新实例
+            workers: 并发执行任务的线程数，默认 CPU 核数
         """
         init_scheduler_tables()
         self.queue = queue or CodeQueue()
+        self.workers = workers or os.cpu_count() or 4
+        self.fuse = FuseCounters()
+
+    def in_window(self) -> bool:
+        """当前是否在夜间窗口内"""
+        current_time = datetime.utcnow().strftime("%H:%M")
+        return self.NIGHT_START <= current_time < self.NIGHT_END
 
     def should_run(self) -> bool:
         """判断是否应该运行
@@ -146,16 +390,8 @@ class NightShiftScheduler:
         Returns:
             should_run: 是否应该运行
         """
-        now = datetime.utcnow()
-        current_time = now.strftime("%H:%M")
-
-        # 检查是否在夜间窗口
-        is_night_time = self.NIGHT_START <= current_time < self.NIGHT_END
-
-        # 检查保险丝
-        has_capacity = self.check_fuse()
-
-        return is_night_time and has_capacity
+        # 检查是否在夜间窗口 + 保险丝
+        return self.in_window() and self.check_fuse()
 
     def should_scan_ci(self, last_scan_time: Optional[str] = None) -> bool:
         """判断是否应该扫描 CI 失败
@@ -179,40 +415,15 @@ class NightShiftScheduler:
     def check_fuse(self) -> bool:
         """检查保险丝状态
 
+        今晚 PR 总数和每个仓库未结束的 PR 数，读内存计数（必要时先和 DB 对账）
+
         Returns:
             has_capacity: 是否有容量运行
         """
-        now = datetime.utcnow()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-
-        with get_db() as conn:
-            # 检查今晚创建的 PR 数量
-            row = conn.execute(
-                """SELECT COUNT(*) as cnt
-                   FROM nightly_prs
-                   WHERE created_at >= ?""",
-                (today_start,),
-            ).fetchone()
-
-            prs_tonight = row["cnt"] if row else 0
-
-            if prs_tonight >= self.MAX_PRS_PER_NIGHT:
-                return False
-
-            # 检查每个仓库的并发数
-            repo_rows = conn.execute(
-                """SELECT repo, COUNT(*) as cnt
-                   FROM nightly_prs
-                   WHERE created_at >= ? AND status IN ('pending', 'in_progress')
-                   GROUP BY repo""",
-                (today_start,),
-            ).fetchall()
-
-            for repo_row in repo_rows:
-                if repo_row["cnt"] >= self.MAX_CONCURRENT_PER_REPO:
-                    return False
-
-        return True
+        self.fuse.ensure_fresh()
+        return self.fuse.has_capacity(
+            self.MAX_PRS_PER_NIGHT, self.MAX_CONCURRENT_PER_REPO
+        )
 
     def scan_backlog(self) -> List[dict]:
         """扫描待处理任务
@@ -320,37 +531,10 @@ class NightShiftScheduler:
             )
             result.jobs_claimed = len(claimed_jobs)
 
-            # 处理每个任务
-            for job in claimed_jobs:
-                job_id = job["id"]
-                repo = self._extract_repo_from_job(job)
-
-                # 检查是否为高风险任务
-                payload = json.loads(job.get("payload", "{}"))
-                files_to_modify = payload.get("files", [])
-                is_high_risk = any(self.is_high_risk_file(f) for f in files_to_modify)
-
-                try:
-                    if is_high_risk:
-                        # 高风险任务直接标记为 needs_human
-                        self.queue.release(
-                            job_id, "needs_human", error="High risk file detected"
-                        )
-                        result.jobs_failed += 1
-                    else:
-                        # 正常处理任务
-                        # 这里应该调用 code_pipeline 来实际执行
-                        # 目前简化为标记为完成
-                        self.queue.release(job_id, "done")
-                        result.jobs_completed += 1
-
-                        # 记录 PR
-                        if repo:
-                            self.record_pr(f"pr://{repo}/{job_id}", repo, job_id)
-
-                except Exception as e:
-                    self.queue.release(job_id, "failed", error=str(e))
-                    result.jobs_failed += 1
+            # 并发处理（每个 repo 同时最多 MAX_CONCURRENT_PER_REPO 个）
+            result.jobs_completed, result.jobs_failed = self.run_jobs(
+                claimed_jobs, "night_batch"
+            )
 
             result.finish()
             self._record_run_complete(run_id, result)
@@ -391,25 +575,10 @@ class NightShiftScheduler:
             )
             result.jobs_claimed = len(claimed_jobs)
 
-            # 处理每个任务
-            for job in claimed_jobs:
-                job_id = job["id"]
-                repo = self._extract_repo_from_job(job)
-
-                try:
-                    # 处理 CI 失败任务
-                    # 这里应该调用 code_pipeline 来实际执行
-                    # 目前简化为标记为完成
-                    self.queue.release(job_id, "done")
-                    result.jobs_completed += 1
-
-                    # 记录 PR
-                    if repo:
-                        self.record_pr(f"pr://{repo}/{job_id}", repo, job_id)
-
-                except Exception as e:
-                    self.queue.release(job_id, "failed", error=str(e))
-                    result.jobs_failed += 1
+            # 并发处理（每个 repo 同时最多 MAX_CONCURRENT_PER_REPO 个）
+            result.jobs_completed, result.jobs_failed = self.run_jobs(
+                claimed_jobs, "ci_scan"
+            )
 
             result.finish()
             self._record_run_complete(run_id, result)
@@ -420,6 +589,76 @@ class NightShiftScheduler:
 
         return result
 
+    def process_job(self, job: dict, run_type: str) -> bool:
+        """处理一个已认领的任务（释放时带 lock_token，锁被别人重新认领则不再写结果）
+
+        Args:
+            job: claim 返回的任务
+            run_type: 'night_batch' 或 'ci_scan'（night_batch 会先检查高风险文件）
+
+        Returns:
+            completed: 是否完成
+        """
+        job_id = job["id"]
+        token = job.get("lock_token")
+        repo = self._extract_repo_from_job(job)
+
+        try:
+            if run_type == "night_batch":
+                # 检查是否为高风险任务
+                payload = json.loads(job.get("payload") or "{}")
+                files_to_modify = payload.get("files", [])
+                if any(self.is_high_risk_file(f) for f in files_to_modify):
+                    # 高风险任务直接标记为 needs_human
+                    self.queue.release(
+                        job_id,
+                        "needs_human",
+                        error="High risk file detected",
+                        token=token,
+                    )
+                    return False
+
+            # 这里应该调用 code_pipeline 来实际执行
+            # 目前简化为标记为完成
+            if not self.queue.release(job_id, "done", token=token):
+                return False
+
+            # 记录 PR
+            if repo:
+                self.record_pr(f"pr://{repo}/{job_id}", repo, job_id)
+            return True
+
+        except Exception as e:
+            self.queue.release(job_id, "failed", error=str(e), token=token)
+            return False
+
+    def run_jobs(self, jobs: List[dict], run_type: str) -> Tuple[int, int]:
+        """在线程池里并发处理一批已认领的任务，同一 repo 同时最多 MAX_CONCURRENT_PER_REPO 个
+
+        Args:
+            jobs: 已认领的任务
+            run_type: 运行类型
+
+        Returns:
+            (完成数, 失败数)
+        """
+        if not jobs:
+            return 0, 0
+        slots = RepoSlots(self.MAX_CONCURRENT_PER_REPO)
+
+        def run_one(job: dict) -> bool:
+            repo = self._extract_repo_from_job(job)
+            slots.acquire(repo)
+            try:
+                return self.process_job(job, run_type)
+            finally:
+                slots.release(repo)
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+            outcomes = list(pool.map(run_one, jobs))
+        completed = sum(outcomes)
+        return completed, len(outcomes) - completed
+
     def record_pr(self, pr_url: str, repo: str, job_id: Optional[str] = None):
         """记录 PR（更新保险丝）
 
@@ -432,11 +671,13 @@ class NightShiftScheduler:
 
         with get_db() as conn:
             # 使用 INSERT OR IGNORE 避免重复
-            conn.execute(
+            cur = conn.execute(
                 """INSERT OR IGNORE INTO nightly_prs (pr_url, repo, created_at, job_id)
                    VALUES (?, ?, ?, ?)""",
                 (pr_url, repo, now, job_id),
             )
+        if cur.rowcount:
+            self.fuse.record(pr_url, repo)
 
     def update_pr_status(self, pr_url: str, status: str):
         """更新 PR 状态
@@ -452,6 +693,7 @@ class NightShiftScheduler:
                    WHERE pr_url = ?""",
                 (status, pr_url),
             )
+        self.fuse.set_status(pr_url, status)
 
     def _record_run_start(self, worker_id: str, run_type: str) -> int:
         """记录运行开始
@@ -504,23 +746,13 @@ class NightShiftScheduler:
             stats: 统计信息字典
         """
         now = datetime.utcnow()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
         night_start = now.replace(hour=1, minute=0, second=0, microsecond=0).isoformat()
 
-        with get_db() as conn:
-            # 今晚的 PR 统计
-            pr_row = conn.execute(
-                """SELECT COUNT(*) as total,
-                          SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
-                          SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed,
-                          SUM(CASE WHEN status IN ('pending', 'in_progress') THEN 1 ELSE 0 END) as pending
-                   FROM nightly_prs
-                   WHERE created_at >= ?""",
-                (today_start,),
-            ).fetchone()
-
-            pr_stats = dict(pr_row) if pr_row else {}
+        # 保险丝状态 + 今晚的 PR 统计（内存计数）
+        has_capacity = self.check_fuse()
+        pr_stats = self.fuse.summary()
 
+        with get_db() as conn:
             # 今晚的运行统计
             run_rows = conn.execute(
                 """SELECT run_type, COUNT(*) as cnt,
@@ -542,9 +774,6 @@ class NightShiftScheduler:
                     "failed": row["failed"] or 0,
                 }
 
-            # 保险丝状态
-            has_capacity = self.check_fuse()
-
             # 队列统计
             queue_stats = self.queue.get_stats()
 
@@ -604,6 +833,301 @@ class NightShiftScheduler:
             )
 
 
+class NightShiftSupervisor:
+    """常驻调度进程
+
+    替代 cron 每 15 分钟拉起一个新进程跑一批：一个主循环 + 时间轮，
+    - 定期（以及有任务结束时）按空闲 worker 数认领任务，放进有界线程池并发执行
+    - 同一 repo 在跑的任务 + 未结束的 PR 不超过 MAX_CONCURRENT_PER_REPO，超出的任务先挂起（续锁），有槽再启动；
+      挂起的任务不占 worker，挂起总数最多 workers 个，再多的放回队列
+    - 今晚剩余的 PR 名额扣掉在跑/挂起的任务，避免并发超出 MAX_PRS_PER_NIGHT
+    - 保险丝计数定期与 DB 对账，过期锁和旧记录定期清理
+    - 每 CI_SCAN_INTERVAL 把这段时间的认领/完成/失败数写一条 scheduler_runs
+    - CI 扫描通道：每 CI_SCAN_INTERVAL 认领 failing_ci 任务，不受夜间窗口限制（替代 scan_ci cron）
+    """
+
+    DISPATCH_INTERVAL = 5  # 秒；其他进程入队靠这个间隔感知
+    CI_SCAN_MAX_JOBS = 2  # 每次 CI 扫描最多认领的任务数（同 scan_ci ci_worker 2）
+    FUSE_RECONCILE_INTERVAL = 60
+    LOCK_RENEW_INTERVAL = 600
+    CLEANUP_INTERVAL = 6 * 3600
+
+    def __init__(
+        self,
+        scheduler: Optional[NightShiftScheduler] = None,
+        worker_id: str = "night_supervisor",
+        workers: Optional[int] = None,
+        timeout_minutes: int = 30,
+    ):
+        """初始化 supervisor
+
+        Args:
+            scheduler: NightShiftScheduler 实例，默认创建新实例
+            worker_id: 认领任务用的 worker 标识
+            workers: 线程池大小，默认用 scheduler.workers（CPU 核数）
+            timeout_minutes: 任务锁超时（分钟），在跑和挂起的任务会定期续锁
+        """
+        self.scheduler = scheduler or NightShiftScheduler(workers=workers)
+        self.worker_id = worker_id
+        self.workers = workers or self.scheduler.workers
+        self.timeout_minutes = timeout_minutes
+
+        self.wheel = TimerWheel(tick=1.0)
+        self.slots = RepoSlots(self.scheduler.MAX_CONCURRENT_PER_REPO)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, dict] = {}  # job_id -> job
+        self._deferred: Dict[str, Deque[dict]] = {}  # repo -> 等槽的已认领任务
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._period = BatchResult(worker_id, "night_batch")
+
+    def stop(self):
+        """请求停止（可以在信号处理函数里调用）"""
+        self._stopping.set()
+        self._wake.set()
+
+    def serve_forever(self):
+        """主循环，直到 stop()；退出前等在跑的任务结束，挂起的任务放回队列"""
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="night-shift"
+        )
+        self.scheduler.fuse.reconcile()
+
+        self.wheel.schedule(0, self.dispatch, interval=self.DISPATCH_INTERVAL)
+        self.wheel.schedule(
+            self.FUSE_RECONCILE_INTERVAL,
+            self.scheduler.fuse.reconcile,
+            interval=self.FUSE_RECONCILE_INTERVAL,
+        )
+        self.wheel.schedule(
+            self.LOCK_RENEW_INTERVAL,
+            self._renew_locks,
+            interval=self.LOCK_RENEW_INTERVAL,
+        )
+        self.wheel.schedule(
+            self.scheduler.CI_SCAN_INTERVAL,
+            self._flush_period,
+            interval=self.scheduler.CI_SCAN_INTERVAL,
+        )
+        self.wheel.schedule(
+            0, self.scan_ci, interval=self.scheduler.CI_SCAN_INTERVAL
+        )
+        self.wheel.schedule(0, self._cleanup, interval=self.CLEANUP_INTERVAL)
+        log(f"supervisor {self.worker_id} started: workers={self.workers}")
+
+        try:
+            while not self._stopping.is_set():
+                woke = self._wake.wait(
+                    timeout=max(0.0, self.wheel.next_deadline() - time.monotonic())
+                )
+                self._wake.clear()
+                if self._stopping.is_set():
+                    break
+                self.wheel.advance()
+                if woke:
+                    # 有任务结束：补位
+                    self.dispatch()
+        finally:
+            self._shutdown()
+
+    def dispatch(self):
+        """启动有槽的挂起任务，再按空闲 worker 数和保险丝余量认领新任务"""
+        if self._stopping.is_set():
+            return
+        sched = self.scheduler
+        sched.fuse.ensure_fresh()
+        self._start_deferred()
+
+        if not sched.in_window():
+            return
+
+        with self._lock:
+            running = len(self._in_flight)
+            deferred = sum(len(q) for q in self._deferred.values())
+        # 在跑和挂起的任务完成后都可能产生 PR，先从今晚的名额里扣掉
+        remaining = sched.MAX_PRS_PER_NIGHT - sched.fuse.prs_tonight() - running - deferred
+        # 挂起的任务不占 worker：某个 repo 满槽时，空闲 worker 照样认领其他 repo 的任务
+        count = min(self.workers - running, remaining)
+        if count <= 0:
+            return
+
+        jobs = sched.queue.claim(
+            self.worker_id, max_jobs=count, timeout_minutes=self.timeout_minutes
+        )
+        self._period.jobs_claimed += len(jobs)
+        for job in jobs:
+            repo = sched._extract_repo_from_job(job)
+            if self.slots.try_acquire(repo, reserved=self._open_prs(repo)):
+                self._submit(job, repo)
+                continue
+            with self._lock:
+                deferred = sum(len(q) for q in self._deferred.values())
+                if deferred < self.workers:
+                    self._deferred.setdefault(repo, deque()).append(job)
+                    continue
+            # 挂起的任务已经够多：放回队列，不再占着锁
+            sched.queue.release(job["id"], "queued", token=job.get("lock_token"))
+
+    def scan_ci(self):
+        """CI 扫描通道：夜间窗口外也认领 failing_ci 任务
+
+        窗口内 dispatch() 已经在认领所有来源的任务，这里只处理窗口外。
+        占用空闲 worker，repo 没有槽的任务直接放回队列，不挂起。
+        """
+        if self._stopping.is_set():
+            return
+        sched = self.scheduler
+        if sched.in_window():
+            return
+
+        with self._lock:
+            running = len(self._in_flight)
+        count = min(self.workers - running, self.CI_SCAN_MAX_JOBS)
+        if count <= 0:
+            return
+
+        jobs = sched.queue.claim(
+            self.worker_id,
+            max_jobs=count,
+            timeout_minutes=self.timeout_minutes,
+            source="failing_ci",
+        )
+        self._period.jobs_claimed += len(jobs)
+        for job in jobs:
+            repo = sched._extract_repo_from_job(job)
+            if self.slots.try_acquire(repo, reserved=self._open_prs(repo)):
+                self._submit(job, repo, "ci_scan")
+            else:
+                sched.queue.release(job["id"], "queued", token=job.get("lock_token"))
+
+    def _open_prs(self, repo: Optional[str]) -> int:
+        return self.scheduler.fuse.open_count(repo) if repo else 0
+
+    def _start_deferred(self):
+        with self._lock:
+            repos = list(self._deferred)
+        for repo in repos:
+            while True:
+                with self._lock:
+                    queue = self._deferred.get(repo)
+                    if not queue:
+                        self._deferred.pop(repo, None)
+                        break
+                    if len(self._in_flight) >= self.workers:
+                        return
+                if not self.slots.try_acquire(repo, reserved=self._open_prs(repo)):
+                    break
+                with self._lock:
+                    job = queue.popleft()
+                self._submit(job, repo)
+
+    def _submit(self, job: dict, repo: Optional[str], run_type: str = "night_batch"):
+        with self._lock:
+            self._in_flight[job["id"]] = job
+        self._pool.submit(self._run_job, job, repo, run_type)
+
+    def _run_job(self, job: dict, repo: Optional[str], run_type: str):
+        completed = False
+        try:
+            completed = self.scheduler.process_job(job, run_type)
+        except Exception as e:
+            log(f"job {job['id']} crashed: {e}")
+        finally:
+            self.slots.release(repo)
+            with self._lock:
+                self._in_flight.pop(job["id"], None)
+                if completed:
+                    self._period.jobs_completed += 1
+                else:
+                    self._period.jobs_failed += 1
+            self._wake.set()
+
+    def _renew_locks(self):
+        """在跑和挂起的任务续锁；续不上（被别人重新认领）的挂起任务直接丢掉"""
+        queue = self.scheduler.queue
+        with self._lock:
+            running = list(self._in_flight.values())
+            deferred = [(repo, job) for repo, q in self._deferred.items() for job in q]
+        for job in running:
+            queue.renew_lock(
+                job["id"],
+                self.worker_id,
+                self.timeout_minutes,
+                token=job.get("lock_token"),
+            )
+        for repo, job in deferred:
+            if not queue.renew_lock(
+                job["id"],
+                self.worker_id,
+                self.timeout_minutes,
+                token=job.get("lock_token"),
+            ):
+                with self._lock:
+                    q = self._deferred.get(repo)
+                    if q and job in q:
+                        q.remove(job)
+
+    def _flush_period(self):
+        """把这段时间的统计写成一条 scheduler_runs（没有活动则不写）"""
+        with self._lock:
+            period, self._period = self._period, BatchResult(
+                self.worker_id, "night_batch"
+            )
+        if not (period.jobs_claimed or period.jobs_completed or period.jobs_failed):
+            return
+        period.finish()
+        run_id = self.scheduler._record_run_start(self.worker_id, "night_batch")
+        self.scheduler._record_run_complete(run_id, period)
+        log(
+            f"period: claimed={period.jobs_claimed} completed={period.jobs_completed} "
+            f"failed={period.jobs_failed}"
+        )
+
+    def _cleanup(self):
+        self.scheduler.queue.cleanup_expired_locks()
+        self.scheduler.cleanup_old_records()
+
+    def _shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        with self._lock:
+            deferred = [job for q in self._deferred.values() for job in q]
+            self._deferred.clear()
+        for job in deferred:
+            self.scheduler.queue.release(
+                job["id"], "queued", token=job.get("lock_token")
+            )
+        self._flush_period()
+        log(f"supervisor {self.worker_id} stopped")
+
+
+def serve(worker_id: str = "night_supervisor", workers: Optional[int] = None) -> bool:
+    """以常驻进程运行 supervisor（同一台机器只允许一个，靠文件锁保证）
+
+    Returns:
+        started: False 表示已经有 supervisor 在运行
+    """
+    import fcntl
+    import signal
+
+    lock_file = open(SUPERVISOR_LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+
+    supervisor = NightShiftSupervisor(worker_id=worker_id, workers=workers)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: supervisor.stop())
+    try:
+        supervisor.serve_forever()
+    finally:
+        lock_file.close()
+    return True
+
+
 def main():
     """主函数 - 用于测试"""
     import sys
@@ -632,6 +1156,12 @@ def main():
             result = scheduler.run_ci_scan(worker_id, max_jobs)
             print(json.dumps(result.to_dict(), indent=2))
 
+        elif cmd == "serve":
+            worker_id = sys.argv[2] if len(sys.argv) > 2 else "night_supervisor"
+            workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            if not serve(worker_id, workers):
+                print("Supervisor already running")
+
         elif cmd == "scan_backlog":
             backlog = scheduler.scan_backlog()
             print(f"Found {len(backlog)} jobs in backlog")
@@ -2,12 +2,20 @@
 import os
 import re
 import sys
+import json
+import fcntl
+import hashlib
 import subprocess
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional
 
 MM_CLI = Path.home() / "Downloads" / "dispatch" / "mm"
+SPEC_CACHE_PATH = Path.home() / ".cache" / "pipeline" / "spec-results.json"
+
+# 未命中缓存的 spec 超过这个数量才用进程池（进程启动有成本）
+PARALLEL_MIN_SPECS = 32
 
 RULES = {
     "FM_TASK_ID": {"weight": 5, "check": "task_id 存在且格式正确 (S01-xxx)"},
@@ -136,13 +144,31 @@ def check_modifies_paths(modifies: List[str]) -> Tuple[bool, str]:
 
 
 def check_no_conflict(spec_path: str, modifies: List[str], all_specs: Dict[str, List[str]]) -> bool:
-    spec_dir = str(Path(spec_path).parent)
-    for other_spec, other_modifies in all_specs.items():
-        if str(Path(other_spec).parent) == spec_dir and other_spec != spec_path:
-            for mod in modifies:
-                if mod in other_modifies:
-                    return False
-    return True
+    return SpecIndex(all_specs).has_no_conflict(spec_path, modifies)
+
+
+class SpecIndex:
+    """spec 索引: (目录, 改动路径) -> 改动它的 spec 集合，冲突检查 O(len(modifies))"""
+
+    def __init__(self, all_specs: Optional[Dict[str, List[str]]] = None):
+        self.modifies: Dict[str, List[str]] = {}
+        self.by_path: Dict[Tuple[str, str], Set[str]] = {}
+        for spec_path, modifies in (all_specs or {}).items():
+            self.add(spec_path, modifies)
+
+    def add(self, spec_path: str, modifies: List[str]):
+        spec_dir = str(Path(spec_path).parent)
+        self.modifies[spec_path] = modifies
+        for mod in modifies:
+            self.by_path.setdefault((spec_dir, mod), set()).add(spec_path)
+
+    def has_no_conflict(self, spec_path: str, modifies: List[str]) -> bool:
+        spec_dir = str(Path(spec_path).parent)
+        for mod in modifies:
+            owners = self.by_path.get((spec_dir, mod), ())
+            if any(owner != spec_path for owner in owners):
+                return False
+        return True
 
 
 def check_goal_length(content: str) -> int:
@@ -230,87 +256,226 @@ def check_pydantic_case(content: str) -> bool:
     return any(p in body.lower() for p in case_patterns)
 
 
-def validate_spec(spec_path: str, all_specs: Optional[Dict[str, List[str]]] = None) -> ValidationReport:
-    report = ValidationReport(spec_path)
-    
-    try:
-        with open(spec_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        print(f"Error reading {spec_path}: {e}")
-        return report
-    
-    fm = parse_front_matter(content)
-    modifies = get_modifies_list(fm)
-    
-    if all_specs is None:
-        all_specs = {spec_path: modifies}
+def evaluate_content(content: str, fm: Dict, modifies: List[str]) -> Dict[str, Tuple[bool, str]]:
+    """只依赖 spec 自身内容的规则（除 FM_NO_CONFLICT 外的全部），结果可以按内容缓存"""
+    results = {}
     
     task_id = fm.get('task_id', '')
-    report.add_result("FM_TASK_ID", check_task_id_format(task_id), "格式应为 S01-xxx" if not check_task_id_format(task_id) else "")
-    report.add_result("FM_PROJECT", 'project' in fm, "缺少 project 字段")
+    results["FM_TASK_ID"] = (check_task_id_format(task_id), "格式应为 S01-xxx" if not check_task_id_format(task_id) else "")
+    results["FM_PROJECT"] = ('project' in fm, "缺少 project 字段")
     
     priority = fm.get('priority', '')
     priority_valid = priority in ['0', '1', '2', '3']
-    report.add_result("FM_PRIORITY", priority_valid, f"priority 应为 0-3" if not priority_valid else "")
+    results["FM_PRIORITY"] = (priority_valid, f"priority 应为 0-3" if not priority_valid else "")
     
     depends = fm.get('depends_on', '')
-    report.add_result("FM_DEPENDS", depends.startswith('['), "depends_on 应为 list")
+    results["FM_DEPENDS"] = (depends.startswith('['), "depends_on 应为 list")
     
-    modifies_valid, modifies_msg = check_modifies_paths(modifies)
-    report.add_result("FM_MODIFIES", modifies_valid, modifies_msg)
+    results["FM_MODIFIES"] = check_modifies_paths(modifies)
     
     executor = fm.get('executor', '')
-    report.add_result("FM_EXECUTOR", executor in ['glm', 'codex', 'glm4'], f"executor 应为 glm/codex" if executor else "")
-    
-    report.add_result("FM_NO_CONFLICT", check_no_conflict(spec_path, modifies, all_specs), "有文件冲突")
+    results["FM_EXECUTOR"] = (executor in ['glm', 'codex', 'glm4'], f"executor 应为 glm/codex" if executor else "")
     
     goal_len = check_goal_length(content)
-    report.add_result("BODY_GOAL", goal_len > 20, f"目标内容 {goal_len} 字 < 20" if goal_len <= 20 else "")
+    results["BODY_GOAL"] = (goal_len > 20, f"目标内容 {goal_len} 字 < 20" if goal_len <= 20 else "")
     
-    report.add_result("BODY_CONSTRAINT", check_has_section(content, "约束"), "缺少 ## 约束 段")
-    report.add_result("BODY_CHANGES", check_has_section(content, "具体改动") or check_code_examples(content), "缺少代码示例")
+    results["BODY_CONSTRAINT"] = (check_has_section(content, "约束"), "缺少 ## 约束 段")
+    results["BODY_CHANGES"] = (check_has_section(content, "具体改动") or check_code_examples(content), "缺少代码示例")
     
     checkbox_count = count_checkboxes(content)
-    report.add_result("BODY_ACCEPT", checkbox_count >= 2, f"验收标准 {checkbox_count} 个 < 2" if checkbox_count < 2 else "")
+    results["BODY_ACCEPT"] = (checkbox_count >= 2, f"验收标准 {checkbox_count} 个 < 2" if checkbox_count < 2 else "")
     
-    report.add_result("BODY_DONOT", check_has_section(content, "不要做"), "缺少 ## 不要做 段")
+    results["BODY_DONOT"] = (check_has_section(content, "不要做"), "缺少 ## 不要做 段")
     
-    report.add_result("CODE_EXAMPLE", check_code_examples(content), "缺少代码块")
-    report.add_result("CODE_KWARGS", check_kwargs_usage(content), "函数定义应用 kwargs")
+    results["CODE_EXAMPLE"] = (check_code_examples(content), "缺少代码块")
+    results["CODE_KWARGS"] = (check_kwargs_usage(content), "函数定义应用 kwargs")
     
-    no_secrets, secret_msg = check_no_secrets(content)
-    report.add_result("CODE_NO_SECRET", no_secrets, secret_msg)
+    results["CODE_NO_SECRET"] = check_no_secrets(content)
     
-    report.add_result("CODE_ENV_VAR", check_env_var_usage(content), "应使用 os.environ")
+    results["CODE_ENV_VAR"] = (check_env_var_usage(content), "应使用 os.environ")
     
-    report.add_result("SEC_NO_ENV", check_no_env_commit(content), "spec 中不应出现 .env")
-    report.add_result("SEC_VALIDATE", check_validation_command(content), "缺少验证命令")
-    report.add_result("SEC_BYZANTINE", check_byzantine(content), "API spec 缺少异常场景测试")
-    report.add_result("SEC_UI_GUARD", check_ui_guard(content, fm), "缺少 UI/CSS 保护约束")
-    report.add_result("SEC_PYDANTIC", check_pydantic_case(content), "Pydantic 缺少大小写约束")
+    results["SEC_NO_ENV"] = (check_no_env_commit(content), "spec 中不应出现 .env")
+    results["SEC_VALIDATE"] = (check_validation_command(content), "缺少验证命令")
+    results["SEC_BYZANTINE"] = (check_byzantine(content), "API spec 缺少异常场景测试")
+    results["SEC_UI_GUARD"] = (check_ui_guard(content, fm), "缺少 UI/CSS 保护约束")
+    results["SEC_PYDANTIC"] = (check_pydantic_case(content), "Pydantic 缺少大小写约束")
     
+    return results
+
+
+def build_report(spec_path: str, results: Dict[str, Tuple[bool, str]], no_conflict: bool) -> ValidationReport:
+    """按 RULES 顺序组装报告"""
+    report = ValidationReport(spec_path)
+    for rule in RULES:
+        if rule == "FM_NO_CONFLICT":
+            report.add_result(rule, no_conflict, "有文件冲突")
+        else:
+            passed, detail = results[rule]
+            report.add_result(rule, passed, detail)
     return report
 
 
-def validate_all(specs_dir: str) -> List[ValidationReport]:
+def validate_spec(spec_path: str, all_specs: Optional[Dict[str, List[str]]] = None,
+                  index: Optional[SpecIndex] = None) -> ValidationReport:
+    try:
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error reading {spec_path}: {e}")
+        return ValidationReport(spec_path)
+    
+    fm = parse_front_matter(content)
+    modifies = get_modifies_list(fm)
+    
+    if index is None:
+        index = SpecIndex(all_specs if all_specs is not None else {spec_path: modifies})
+    
+    results = evaluate_content(content, fm, modifies)
+    return build_report(spec_path, results, index.has_no_conflict(spec_path, modifies))
+
+
+def _engine_digest() -> str:
+    """RULES 和本模块源码（检查逻辑、正则）的摘要：任一改动都让旧缓存整体失效"""
+    digest = hashlib.sha1(json.dumps(RULES, sort_keys=True, ensure_ascii=False).encode())
+    try:
+        digest.update(Path(__file__).read_bytes())
+    except OSError:
+        pass
+    return digest.hexdigest()
+
+
+def _load_spec_cache() -> Dict[str, dict]:
+    try:
+        data = json.loads(SPEC_CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("engine") != _engine_digest():
+        return {}
+    return data.get("specs", {})
+
+
+def _save_spec_cache(updated: Dict[str, dict], removed: Iterable[str] = ()):
+    """把本次算出的条目合并进磁盘上的缓存
+
+    同时跑的多个 validate_all 各自只写自己更新/删除的条目：持文件锁重新读盘、合并，
+    写临时文件后原子 rename。removed 里的 key 从合并结果里删掉，不会被别的进程读到的旧快照带回来。
+    """
+    try:
+        SPEC_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(SPEC_CACHE_PATH.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            cache = _load_spec_cache()
+            cache.update(updated)
+            for key in removed:
+                cache.pop(key, None)
+            tmp = SPEC_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"engine": _engine_digest(), "specs": cache}, ensure_ascii=False))
+            os.replace(tmp, SPEC_CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: spec cache not saved: {e}")
+
+
+def _check_spec_file(spec_path: str, cached_hash: Optional[str] = None) -> Optional[dict]:
+    """读取并检查一个 spec（进程池 worker）；内容哈希没变时不重新跑规则"""
+    try:
+        with open(spec_path, 'rb') as f:
+            raw = f.read()
+        content = raw.decode('utf-8')
+    except Exception as e:
+        print(f"Error reading {spec_path}: {e}")
+        return None
+    
+    digest = hashlib.sha1(raw).hexdigest()
+    if digest == cached_hash:
+        return {"hash": digest, "unchanged": True}
+    
+    fm = parse_front_matter(content)
+    modifies = get_modifies_list(fm)
+    return {
+        "hash": digest,
+        "modifies": modifies,
+        "results": evaluate_content(content, fm, modifies),
+    }
+
+
+def validate_all(specs_dir: str, use_cache: bool = True, workers: Optional[int] = None) -> List[ValidationReport]:
+    """校验目录下所有 spec
+
+    front matter 和规则结果每个文件只算一次：按 (mtime, size) 命中缓存直接复用，
+    mtime 变了但内容哈希没变也复用；其余文件在进程池里并行检查。
+    RULES 或检查逻辑改了缓存整体作废，目录里已删除的 spec 从缓存中移除；
+    写回时只合并本次更新/删除的条目（见 _save_spec_cache），并发运行互不覆盖。
+    冲突检查走 SpecIndex 的倒排表。
+    """
     specs_dir_path = Path(specs_dir)
-    spec_files = list(specs_dir_path.glob("*.md"))
+    spec_files = [str(p) for p in specs_dir_path.glob("*.md")]
     
-    all_specs = {}
+    cache = _load_spec_cache() if use_cache else {}
+    entries: Dict[str, Optional[dict]] = {}
+    updated: Dict[str, dict] = {}
+    misses = []
     for spec_file in spec_files:
-        with open(spec_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        fm = parse_front_matter(content)
-        modifies = get_modifies_list(fm)
-        all_specs[str(spec_file)] = modifies
+        key = str(Path(spec_file).resolve())
+        try:
+            st = os.stat(spec_file)
+        except OSError:
+            entries[spec_file] = None
+            continue
+        cached = cache.get(key)
+        if cached and cached.get("mtime") == st.st_mtime_ns and cached.get("size") == st.st_size:
+            entries[spec_file] = cached
+        else:
+            misses.append((spec_file, key, st, cached))
+    
+    if misses:
+        paths = [m[0] for m in misses]
+        hashes = [m[3].get("hash") if m[3] else None for m in misses]
+        if len(misses) >= PARALLEL_MIN_SPECS and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                checked = list(pool.map(_check_spec_file, paths, hashes,
+                                        chunksize=max(1, len(paths) // ((os.cpu_count() or 1) * 4))))
+        else:
+            checked = [_check_spec_file(p, h) for p, h in zip(paths, hashes)]
+        
+        for (spec_file, key, st, cached), result in zip(misses, checked):
+            if result is None:
+                entries[spec_file] = None
+                continue
+            if result.get("unchanged"):
+                entry = dict(cached)
+            else:
+                entry = {
+                    "hash": result["hash"],
+                    "modifies": result["modifies"],
+                    "results": {rule: list(value) for rule, value in result["results"].items()},
+                }
+            entry["mtime"] = st.st_mtime_ns
+            entry["size"] = st.st_size
+            updated[key] = entry
+            entries[spec_file] = entry
+    
+    index = SpecIndex({f: e["modifies"] for f, e in entries.items() if e})
     
     reports = []
     for spec_file in spec_files:
-        report = validate_spec(str(spec_file), all_specs)
+        entry = entries.get(spec_file)
+        if entry is None:
+            report = ValidationReport(spec_file)
+        else:
+            results = {rule: tuple(value) for rule, value in entry["results"].items()}
+            report = build_report(spec_file, results,
+                                  index.has_no_conflict(spec_file, entry["modifies"]))
         reports.append(report)
         print(report.format_output())
     
+    # 移除本目录下已删除的 spec
+    root = specs_dir_path.resolve()
+    live = {str(Path(f).resolve()) for f in spec_files}
+    stale = [k for k in cache if Path(k).parent == root and k not in live]
+    
+    if use_cache and (updated or stale):
+        _save_spec_cache(updated, stale)
+    
     return reports
 
 
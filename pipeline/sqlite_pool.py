@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""SQLite 连接池 - 每个线程复用一个连接，pragma 只设置一次"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict
+
+# 连接级 pragma（每个连接打开时执行一次）
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # WAL 下 NORMAL 足够安全，提交不再每次 fsync
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA mmap_size=268435456",  # 256MB
+    "PRAGMA cache_size=-16000",  # 约 16MB page cache
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionPool:
+    """线程本地连接池
+
+    每个线程第一次使用时打开连接并设置 pragma，之后一直复用；
+    连接开启了 statement cache，重复的 SQL 不再重新 prepare。
+    transaction() 可以嵌套：最外层 BEGIN/COMMIT，内层用 SAVEPOINT，
+    所以在 batch 里调用的各个 helper 会合并成一个事务提交。
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30.0, cached_statements: int = 256):
+        """初始化连接池
+
+        Args:
+            db_path: 数据库路径
+            timeout: 等待写锁的超时（秒）
+            cached_statements: 每个连接缓存的 prepared statement 数量
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: Dict[int, sqlite3.Connection] = {}  # thread ident -> 连接
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """当前线程的连接（fork 后的子进程重新打开）"""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,  # 事务由 transaction() 显式控制
+            check_same_thread=False,  # 只在清理和 close_all 时跨线程关闭
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+
+        local.conn = conn
+        local.pid = os.getpid()
+        local.depth = 0
+        with self._lock:
+            self._prune_dead_threads()
+            self._connections[threading.get_ident()] = conn
+        return conn
+
+    def _prune_dead_threads(self):
+        """关闭已退出线程留下的连接"""
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._connections if i not in alive]:
+            try:
+                self._connections.pop(ident).close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """事务上下文，可嵌套
+
+        Args:
+            immediate: 最外层用 BEGIN IMMEDIATE（先拿写锁，避免读后写升级时 busy）
+        """
+        conn = self.connection()
+        local = self._local
+        depth = local.depth
+
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+        local.depth = depth + 1
+
+        try:
+            yield conn
+        except BaseException:
+            local.depth = depth
+            if depth == 0:
+                if conn.in_transaction:
+                    conn.rollback()
+            elif conn.in_transaction:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+            raise
+        else:
+            local.depth = depth
+            if depth == 0:
+                # executescript 会先隐式提交，这里可能已经没有活动事务
+                if conn.in_transaction:
+                    conn.commit()
+            elif conn.in_transaction:
+                conn.execute(f"RELEASE sp_{depth}")
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        conn.close()
+
+    def close_all(self):
+        """关闭所有线程的连接（进程退出前调用）"""
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for conn in connections.values():
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path) -> ConnectionPool:
+    """按数据库路径获取共享连接池"""
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key)
+        return pool
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""浏览器池测试（本地静态站点，需要 playwright + Chromium）"""
+
+import socket
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from layers import browser_pool
+from layers.browser_pool import BrowserPool, BrowserPoolError
+from layers.L4b_browser_qa import check_pages, page_slug
+
+PAGES = {
+    "index.html": "<html><body><h1>ok</h1></body></html>",
+    "wide.html": '<html><body><div id="wide" style="width:1000px">wide</div></body></html>',
+    "broken.html": "<html><body><script>undefinedFn()</script></body></html>",
+}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def test_capture_pages():
+    """一个 Chromium 并发抓所有 URL × viewport：截图、HTML、溢出、JS 错误"""
+    pytest.importorskip("playwright")
+    with tempfile.TemporaryDirectory() as tmp:
+        site = Path(tmp) / "site"
+        site.mkdir()
+        for name, html in PAGES.items():
+            (site / name).write_text(html)
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(QuietHandler, directory=str(site))
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        try:
+            with BrowserPool.connect(
+                Path(tmp) / "pool.sock", contexts=4, idle_timeout=5
+            ) as pool:
+                results = check_pages(
+                    urls=[f"{base}/{name}" for name in PAGES],
+                    screenshot_dir=Path(tmp) / "screenshots",
+                    html_dir=Path(tmp) / "pages",
+                    pool=pool,
+                )
+        finally:
+            server.shutdown()
+
+        by_key = {(r["url"].rsplit("/", 1)[1], r["viewport"]): r for r in results}
+        assert len(results) == 6
+        assert all(r["loaded"] for r in results)
+        assert all(Path(r["screenshot_path"]).exists() for r in results)
+        assert (
+            "<h1>ok</h1>"
+            in Path(by_key["index.html", "desktop"]["html_path"]).read_text()
+        )
+        assert by_key["wide.html", "mobile"]["overflow"]["has_overflow"]
+        assert "div#wide" in by_key["wide.html", "mobile"]["overflow"]["offenders"]
+        assert not by_key["wide.html", "desktop"]["overflow"]["has_overflow"]
+        assert by_key["broken.html", "desktop"]["js_errors"] >= 1
+        print("PASS: capture pages")
+
+
+def test_concurrent_connect_spawns_once():
+    """多个进程/线程同时连接没在跑的池，只拉起一个服务"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "pool.sock"
+        spawned = []
+        listeners = []
+
+        def fake_spawn(socket_path, contexts, idle_timeout, start_timeout):
+            spawned.append(socket_path)
+            time.sleep(0.2)  # 服务启动需要时间，期间其他连接在等锁
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(str(socket_path))
+            server.listen(16)
+            listeners.append(server)
+            return BrowserPool._try_connect(socket_path)
+
+        real_spawn, real_available = (
+            BrowserPool._spawn,
+            browser_pool.playwright_available,
+        )
+        BrowserPool._spawn = staticmethod(fake_spawn)
+        browser_pool.playwright_available = lambda: True
+        pools = []
+        try:
+            threads = [
+                threading.Thread(target=lambda: pools.append(BrowserPool.connect(path)))
+                for _ in range(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            BrowserPool._spawn = staticmethod(real_spawn)
+            browser_pool.playwright_available = real_available
+            for pool in pools:
+                pool.close()
+            for server in listeners:
+                server.close()
+
+        assert len(pools) == 4
+        assert spawned == [path]
+        print("PASS: concurrent connect spawns once")
+
+
+def test_connection_errors_are_pool_errors():
+    """连接断开时 call_many 抛 BrowserPoolError，而不是裸的 OSError"""
+    client, server = socket.socketpair()
+    server.close()
+    pool = BrowserPool(client)
+    try:
+        with pytest.raises(BrowserPoolError):
+            pool.capture_many([{"url": "http://x"}] * 64)
+    finally:
+        try:
+            pool.close()
+        except OSError:
+            pass
+    print("PASS: connection errors are pool errors")
+
+
+def test_page_slug_is_unique():
+    """路径里的 / 和 - 都会变成 -，靠 hash 区分"""
+    assert page_slug("http://h/a-b") != page_slug("http://h/a/b")
+    assert page_slug("http://h/a?x=1") != page_slug("http://h/a?x=2")
+    assert page_slug("http://h/").startswith("index-")
+    assert page_slug("http://h/a/b") == page_slug("http://other/a/b")
+    print("PASS: page slug is unique")
+
+
+if __name__ == "__main__":
+    test_capture_pages()
+    test_concurrent_connect_spawns_once()
+    test_connection_errors_are_pool_errors()
+    test_page_slug_is_unique()
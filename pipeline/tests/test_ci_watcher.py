@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""CIWatcher 测试（本地假 GitHub GraphQL API）"""
+
+import re
+import sys
+import json
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PIPELINE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PIPELINE_DIR))
+
+from ci_watcher import CIWatcher, GitHubClient
+from pr_bot import CIStatus
+
+ALIAS_RE = re.compile(r"(pr\d+): pullRequest\(number: (\d+)\)")
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """只实现 CIWatcher 用到的接口：POST /graphql 的 statusCheckRollup 查询"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeGitHubHandler)
+        self.repo = "o/r"
+        self.pulls = {}  # PR number -> statusCheckRollup 的 contexts
+        self.requests = []  # (path, 查询的 PR number 列表)
+
+    def set_checks(self, pr, contexts):
+        self.pulls[pr] = contexts
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        if self.path != "/graphql":
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        variables = request["variables"]
+        aliases = ALIAS_RE.findall(request["query"])
+        server.requests.append((self.path, sorted(int(n) for _, n in aliases)))
+
+        errors = []
+        if f"{variables['owner']}/{variables['name']}" != server.repo:
+            data = {"repository": None}
+            errors.append({"type": "NOT_FOUND", "path": ["repository"], "message": "no repo"})
+        else:
+            repository = {}
+            for alias, number in aliases:
+                contexts = server.pulls.get(int(number))
+                if contexts is None:
+                    repository[alias] = None
+                    errors.append({
+                        "type": "NOT_FOUND",
+                        "path": ["repository", alias],
+                        "message": f"Could not resolve to a PullRequest with the number of {number}.",
+                    })
+                    continue
+                commit = {"oid": f"sha{number}", "statusCheckRollup": {"contexts": {"nodes": contexts}}}
+                repository[alias] = {"commits": {"nodes": [{"commit": commit}]}}
+            data = {"repository": repository}
+
+        payload = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def check(id, name, status, conclusion=None):
+    """GraphQL CheckRun 节点（Actions 和第三方 CI 一样）"""
+    return {
+        "__typename": "CheckRun",
+        "databaseId": id,
+        "name": name,
+        "status": status.upper(),
+        "conclusion": conclusion.upper() if conclusion else None,
+        "detailsUrl": f"https://ci.example.com/{id}",
+        "startedAt": f"2026-01-01T00:00:{id % 60:02d}Z",
+        "completedAt": None,
+    }
+
+
+def status_context(name, state):
+    """GraphQL StatusContext 节点（commit status API 上报的检查）"""
+    return {
+        "__typename": "StatusContext",
+        "context": name,
+        "state": state.upper(),
+        "targetUrl": f"https://status.example.com/{name}",
+        "createdAt": "2026-01-01T00:00:00Z",
+    }
+
+
+def start_fake():
+    server = FakeGitHub()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = GitHubClient(base_url=f"http://127.0.0.1:{server.server_port}", token="t")
+    watcher = CIWatcher(client, min_interval=0.05, max_interval=0.2, backoff=2)
+    return server, watcher
+
+
+def test_shared_poll():
+    """同一 repo 的多个 PR 共用一次 GraphQL 请求，每个 PR 一个别名"""
+    server, watcher = start_fake()
+    try:
+        server.set_checks(1, [check(1, "ci", "in_progress")])
+        server.set_checks(2, [check(2, "ci", "queued"), check(3, "lint", "completed", "success")])
+        f1 = watcher.watch("o/r", 1, timeout=10)
+        f2 = watcher.watch("o/r", 2, timeout=10)
+        assert watcher.watch("o/r", 1, timeout=10) is f1
+
+        while sum(1 for _, prs in server.requests if prs == [1, 2]) < 3:
+            threading.Event().wait(0.02)
+        server.set_checks(1, [check(1, "ci", "completed", "failure")])
+        server.set_checks(2, [check(2, "ci", "completed", "success"), check(3, "lint", "completed", "success")])
+
+        r1 = f1.result(timeout=5)
+        r2 = f2.result(timeout=5)
+        assert r1.overall_status == CIStatus.FAILURE
+        assert r1.checks_failed == 1
+        assert r2.overall_status == CIStatus.SUCCESS
+        assert r2.checks_passed == 2
+
+        # 只有 GraphQL 请求，每次最多带上所有到期的 PR
+        assert {path for path, _ in server.requests} == {"/graphql"}
+        assert all(prs and set(prs) <= {1, 2} for _, prs in server.requests)
+        print(f"PASS: shared poll — {len(server.requests)} requests")
+    finally:
+        watcher.stop()
+        server.shutdown()
+
+
+def test_missing_pr_and_timeout():
+    """找不到的 PR 不影响同一请求里的其他 PR；一直没结束的 PR 超时返回 UNKNOWN"""
+    server, watcher = start_fake()
+    try:
+        server.set_checks(7, [check(2, "ci", "completed", "success")])
+        server.set_checks(8, [check(3, "ci", "in_progress")])
+        done = watcher.watch("o/r", 7, timeout=10)
+        stuck = watcher.watch("o/r", 8, timeout=0.5, pr_url="https://github.com/o/r/pull/8")
+        missing = watcher.watch("o/r", 9, timeout=0.5)
+
+        result = done.result(timeout=5)
+        assert result.overall_status == CIStatus.SUCCESS
+        assert [w.id for w in result.workflows] == [2]
+
+        result = stuck.result(timeout=5)
+        assert result.overall_status == CIStatus.UNKNOWN
+        assert "timed out" in result.details["error"]
+
+        result = missing.result(timeout=5)
+        assert result.overall_status == CIStatus.UNKNOWN
+        assert "Could not resolve" in result.details["last_error"]
+        print("PASS: missing PR + timeout")
+    finally:
+        watcher.stop()
+        server.shutdown()
+
+
+def test_third_party_checks():
+    """第三方 check run 和 commit status 都计入：Actions 通过但第三方失败时算 FAILURE"""
+    server, watcher = start_fake()
+    try:
+        server.set_checks(3, [
+            check(100, "build", "completed", "success"),
+            check(101, "external", "in_progress"),
+            status_context("ci/legacy", "pending"),
+        ])
+        future = watcher.watch("o/r", 3, timeout=10)
+
+        while len(server.requests) < 2:
+            threading.Event().wait(0.02)
+        assert not future.done()
+        server.set_checks(3, [
+            check(100, "build", "completed", "success"),
+            check(101, "external", "completed", "success"),
+            status_context("ci/legacy", "failure"),
+        ])
+
+        result = future.result(timeout=5)
+        assert result.overall_status == CIStatus.FAILURE
+        assert result.checks_passed == 2 and result.checks_failed == 1
+        assert [w.name for w in result.workflows] == ["build", "external", "ci/legacy"]
+        print("PASS: third-party checks")
+    finally:
+        watcher.stop()
+        server.shutdown()
+
+
+def test_unexpected_error_fails_future():
+    """处理响应时的意外错误让 Future 以异常结束，而不是挂到超时"""
+    server, watcher = start_fake()
+    try:
+        server.set_checks(4, [check(1, "ci", "in_progress")])
+
+        def broken(watch, runs):
+            raise KeyError("boom")
+
+        watcher._update = broken
+        future = watcher.watch("o/r", 4, timeout=30)
+        try:
+            future.result(timeout=5)
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("expected KeyError")
+
+        # 后台线程还活着，后续 PR 照常处理
+        del watcher._update
+        server.set_checks(5, [check(2, "ci", "completed", "success")])
+        assert watcher.watch("o/r", 5, timeout=10).result(timeout=5).overall_status == CIStatus.SUCCESS
+        print("PASS: unexpected error fails future")
+    finally:
+        watcher.stop()
+        server.shutdown()
+
+
+def test_package_import():
+    """按包导入时 ci_watcher 和 pr_bot 共用同一个 pipeline.pr_bot（同一个 CIStatus）"""
+    root = str(PIPELINE_DIR.parent)
+    saved_path = sys.path[:]
+    sys.path[:] = [root] + [p for p in saved_path if Path(p or ".").resolve() != PIPELINE_DIR]
+    try:
+        from pipeline import ci_watcher, pr_bot
+    finally:
+        sys.path[:] = saved_path
+    assert ci_watcher.CIStatus is pr_bot.CIStatus
+    assert ci_watcher.__name__ == "pipeline.ci_watcher"
+    print("PASS: package import")
+
+
+if __name__ == "__main__":
+    test_shared_poll()
+    test_missing_pr_and_timeout()
+    test_third_party_checks()
+    test_unexpected_error_fails_future()
+    test_package_import()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""CodeQueue 测试：原子认领和 lock_token fencing"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+# pipeline/pipeline.py 会遮住 pipeline 包：导入时把 pipeline 目录临时移出 sys.path
+_saved_path = sys.path[:]
+sys.path[:] = [str(ROOT)] + [
+    p for p in _saved_path if Path(p or ".").resolve() != ROOT / "pipeline"
+]
+from pipeline import db
+from pipeline.code_queue import CodeQueue
+
+sys.path[:] = _saved_path
+
+
+def make_queue(tmp: str) -> CodeQueue:
+    db.DB_PATH = Path(tmp) / "pipeline.db"
+    db.init_db()
+    return CodeQueue(db_path=str(db.DB_PATH))
+
+
+def test_concurrent_claims_are_exclusive():
+    """多个 worker 并发认领，每个任务只被认领一次"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        job_ids = {
+            queue.enqueue("code", "manual", {"n": i}, priority=1 + i % 3)
+            for i in range(60)
+        }
+
+        claimed = {}
+        lock = threading.Lock()
+
+        def worker(name):
+            while True:
+                jobs = queue.claim_many(name, 4)
+                if not jobs:
+                    return
+                with lock:
+                    for job in jobs:
+                        claimed.setdefault(job["id"], []).append(name)
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert set(claimed) == job_ids
+        assert all(len(owners) == 1 for owners in claimed.values())
+        assert queue.get_stats()["by_state"] == {"running": 60}
+        print("PASS: concurrent claims are exclusive")
+
+
+def test_claim_order_and_lock_token_fencing():
+    """按优先级认领；锁过期被重新认领后，旧 token 的续期和释放被拒绝"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        low = queue.enqueue("code", "manual", {}, priority=3)
+        high = queue.enqueue("code", "manual", {}, priority=1)
+
+        (first,) = queue.claim("a", max_jobs=1)
+        assert first["id"] == high
+        assert queue.claim("b", max_jobs=1)[0]["id"] == low
+        assert queue.claim("c", max_jobs=1) == []
+
+        # a 的锁过期，c 重新认领，token 加一
+        with db.get_db() as conn:
+            conn.execute(
+                "UPDATE code_jobs SET lock_expires_at = '2000-01-01' WHERE id = ?",
+                (high,),
+            )
+        (again,) = queue.claim("c", max_jobs=1)
+        assert again["id"] == high
+        assert again["lock_token"] == first["lock_token"] + 1
+
+        assert not queue.renew_lock(high, "a", token=first["lock_token"])
+        assert not queue.release(high, "done", token=first["lock_token"])
+        assert queue.get_job(high)["state"] == "running"
+
+        assert queue.renew_lock(high, "c", token=again["lock_token"])
+        assert queue.release(high, "done", token=again["lock_token"])
+        assert queue.get_job(high)["state"] == "done"
+        print("PASS: claim order + lock_token fencing")
+
+
+def test_claim_wait_wakes_on_enqueue():
+    """长轮询认领在同进程入队时立即返回"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        queue.poll_interval = 10  # 只能靠入队通知唤醒
+        timer = threading.Timer(0.2, queue.enqueue, args=("code", "manual", {}))
+        timer.start()
+        jobs = queue.claim("a", max_jobs=1, wait=5)
+        timer.join()
+        assert len(jobs) == 1
+        print("PASS: claim(wait=...) wakes on enqueue")
+
+
+def test_claim_without_claim_index():
+    """表在 CodeQueue 打开之后才建、且没有认领索引时，claim 先补建索引"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "pipeline.db"
+        queue = CodeQueue(db_path=str(db.DB_PATH))
+        db.init_db()
+        with db.get_db() as conn:
+            conn.execute("DROP INDEX idx_code_jobs_claim")
+        job_id = queue.enqueue("code", "manual", {})
+
+        (job,) = queue.claim("a", max_jobs=1)
+        assert job["id"] == job_id
+        with db.get_db() as conn:
+            assert conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'idx_code_jobs_claim'"
+            ).fetchone()
+        print("PASS: claim without claim index")
+
+
+if __name__ == "__main__":
+    test_concurrent_claims_are_exclusive()
+    test_claim_order_and_lock_token_fencing()
+    test_claim_wait_wakes_on_enqueue()
+    test_claim_without_claim_index()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""PipelineRun DAG 调度测试：独立的层并发执行，依赖按 required_prev 排序"""
+
+import importlib.util
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PIPELINE_DIR = Path(__file__).resolve().parent.parent
+
+# 按脚本方式加载 pipeline.py（它会把 pipeline 目录放到 sys.path 上）
+_saved_path = sys.path[:]
+_spec = importlib.util.spec_from_file_location(
+    "pipeline_cli", PIPELINE_DIR / "pipeline.py"
+)
+cli = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(cli)
+import db
+from layers import services
+from layers.base import LayerResult
+
+sys.path[:] = _saved_path
+
+STEP = 0.3  # 每个 fake attempt 的耗时
+
+
+class FakeProject:
+    name = "dag-test"
+
+
+def run_pipeline(tmp, layers, fail_once=(), restarts=None):
+    """用线程池跑一次 DAG，layer 执行换成 sleep，返回 {layer: [(start, end), ...]}
+
+    restarts 收集每次重启被测服务的时间
+    """
+    db.DB_PATH = Path(tmp) / "pipeline.db"
+    db.init_db()
+
+    restarts = [] if restarts is None else restarts
+    spans = {}
+    failed = set()
+    lock = threading.Lock()
+
+    def fake_execute(layer_name, project_config, prev_results):
+        start = time.monotonic()
+        time.sleep(STEP)
+        with lock:
+            spans.setdefault(layer_name, []).append((start, time.monotonic()))
+            status = "PASS"
+            if layer_name in fail_once and layer_name not in failed:
+                failed.add(layer_name)
+                status = "FAIL"
+        result = LayerResult(layer=layer_name, status=status)
+        result.finish(status)
+        return result
+
+    real_execute, real_stop = cli.execute_layer, services.stop_services
+    cli.execute_layer = fake_execute
+    services.stop_services = lambda pc: restarts.append(time.monotonic())
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            run = cli.PipelineRun("dag-test", FakeProject(), layers, pool)
+            run.start()
+            cli.drive([run])
+    finally:
+        cli.execute_layer, services.stop_services = real_execute, real_stop
+    assert not run.failure, run.failure
+    return spans
+
+
+def overlaps(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def test_independent_layers_overlap():
+    """L4a/L4b/L4d 都只依赖 L3，并发执行；L4c 等 L4b，L4 等所有子层"""
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.monotonic()
+        restarts = []
+        spans = run_pipeline(
+            tmp, cli.LAYER_ORDER[: cli.LAYER_ORDER.index("L4") + 1], restarts=restarts
+        )
+        elapsed = time.monotonic() - t0
+
+        (l3,) = spans["L3"]
+        (l4a,), (l4b,), (l4c,), (l4d,) = (spans[s] for s in cli.L4_SUBLAYERS)
+        (l4,) = spans["L4"]
+
+        assert overlaps(l4a, l4b) and overlaps(l4a, l4d) and overlaps(l4b, l4d)
+        assert all(s[0] >= l3[1] for s in (l4a, l4b, l4d))
+        assert l4c[0] >= l4b[1]
+        assert l4[0] >= max(s[1] for s in (l4a, l4b, l4c, l4d))
+        # 子层并发之前重启一次被测服务
+        assert len(restarts) == 1
+        assert l3[1] <= restarts[0] <= min(s[0] for s in (l4a, l4b, l4d))
+        # 串行要 8 步，DAG 是 L1 → L2 → L3 → L4b → L4c → L4 六步
+        assert elapsed < 7.5 * STEP, elapsed
+        print(f"PASS: independent layers overlap ({elapsed:.2f}s)")
+
+
+def test_repair_cycle_reruns_sublayers():
+    """L4 FAIL → L5 修复 → 子层和 L4 一起重跑（被测服务按修复后的代码重启）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        restarts = []
+        spans = run_pipeline(
+            tmp, cli.LAYER_ORDER[:-1], fail_once=("L4",), restarts=restarts
+        )
+        assert len(spans["L5"]) == 1
+        assert len(spans["L4"]) == 2
+        l5 = spans["L5"][0]
+        for sub in cli.L4_SUBLAYERS:
+            assert len(spans[sub]) == 2, sub
+            assert spans[sub][1][0] >= l5[1]
+        assert len(restarts) == 2 and restarts[1] >= l5[1]
+        print("PASS: repair cycle reruns sublayers")
+
+
+if __name__ == "__main__":
+    test_independent_layers_overlap()
+    test_repair_cycle_reruns_sublayers()
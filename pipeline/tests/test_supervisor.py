@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""NightShiftSupervisor 测试：认领、每 repo 并发上限和挂起任务"""
+
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+# pipeline/pipeline.py 会遮住 pipeline 包：导入时把 pipeline 目录临时移出 sys.path
+_saved_path = sys.path[:]
+sys.path[:] = [str(ROOT)] + [
+    p for p in _saved_path if Path(p or ".").resolve() != ROOT / "pipeline"
+]
+from pipeline import db, scheduler
+from pipeline.code_queue import CodeQueue
+
+sys.path[:] = _saved_path
+
+
+class Harness:
+    """临时 DB 上的 supervisor；任务在 finish(job_id) 之前一直占着 worker"""
+
+    def __init__(self, tmp: str, workers: int, per_repo: int):
+        db.DB_PATH = scheduler.DB_PATH = Path(tmp) / "pipeline.db"
+        db.init_db()
+        self.queue = CodeQueue(db_path=str(db.DB_PATH))
+
+        sched = scheduler.NightShiftScheduler(queue=self.queue, workers=workers)
+        sched.MAX_CONCURRENT_PER_REPO = per_repo
+        sched.NIGHT_START, sched.NIGHT_END = "00:00", "24:00"
+        sched.process_job = self._process
+        self.sup = scheduler.NightShiftSupervisor(sched, workers=workers)
+        self.sup._pool = ThreadPoolExecutor(max_workers=workers)
+
+        self.gates = {}
+        self.run_types = {}
+        self._lock = threading.Lock()
+
+    def _process(self, job, run_type):
+        with self._lock:
+            self.run_types[job["id"]] = run_type
+            gate = self.gates.setdefault(job["id"], threading.Event())
+        gate.wait(timeout=10)
+        return self.queue.release(job["id"], "done", token=job.get("lock_token"))
+
+    def enqueue(self, repo: str, priority: int, source: str = "manual") -> str:
+        return self.queue.enqueue("code", source, {"repo": repo}, priority=priority)
+
+    def finish(self, job_id: str):
+        with self._lock:
+            self.gates.setdefault(job_id, threading.Event()).set()
+        while job_id in self.sup._in_flight:
+            threading.Event().wait(0.01)
+
+    def running(self) -> set:
+        return set(self.sup._in_flight)
+
+    def deferred(self) -> dict:
+        return {repo: [j["id"] for j in q] for repo, q in self.sup._deferred.items()}
+
+    def close(self):
+        for gate in self.gates.values():
+            gate.set()
+        self.sup._pool.shutdown(wait=True)
+
+
+def test_deferred_jobs_do_not_hold_workers():
+    """repo 满槽时超出的任务挂起，空闲 worker 继续认领其他 repo 的任务；有槽后挂起的任务启动"""
+    with tempfile.TemporaryDirectory() as tmp:
+        h = Harness(tmp, workers=4, per_repo=2)
+        try:
+            a1, a2, a3 = (h.enqueue("o/a", priority=1) for _ in range(3))
+            b1, b2 = (h.enqueue("o/b", priority=2) for _ in range(2))
+
+            h.sup.dispatch()
+            assert h.running() == {a1, a2, b1}
+            assert h.deferred() == {"o/a": [a3]}
+
+            # 挂起的 a3 不占 worker：第 4 个 worker 认领 b2
+            h.sup.dispatch()
+            assert h.running() == {a1, a2, b1, b2}
+
+            h.finish(a1)
+            h.sup.dispatch()
+            assert h.running() == {a2, b1, b2, a3}
+            assert h.deferred() == {}
+            print("PASS: deferred jobs do not hold workers")
+        finally:
+            h.close()
+
+
+def test_deferred_backlog_is_bounded():
+    """挂起的任务最多 workers 个，超出的放回队列；在跑的任务数不超过 workers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        h = Harness(tmp, workers=2, per_repo=1)
+        try:
+            a1, a2, a3, a4 = (h.enqueue("o/a", priority=1) for _ in range(4))
+
+            h.sup.dispatch()
+            assert h.running() == {a1}
+            assert h.deferred() == {"o/a": [a2]}
+
+            h.sup.dispatch()
+            assert h.deferred() == {"o/a": [a2, a3]}
+
+            h.sup.dispatch()
+            assert h.deferred() == {"o/a": [a2, a3]}
+            job = h.queue.get_job(a4)
+            assert job["state"] == "queued" and job["lock_owner"] is None
+
+            # a1 结束：a2 启动，空出的挂起名额重新认领 a4
+            h.finish(a1)
+            h.sup.dispatch()
+            assert h.running() == {a2}
+            assert h.deferred() == {"o/a": [a3, a4]}
+            print("PASS: deferred backlog is bounded")
+        finally:
+            h.close()
+
+
+def test_ci_scan_outside_night_window():
+    """窗口外 dispatch 不认领；CI 扫描通道只认领 failing_ci 任务"""
+    with tempfile.TemporaryDirectory() as tmp:
+        h = Harness(tmp, workers=4, per_repo=2)
+        h.sup.scheduler.NIGHT_START = h.sup.scheduler.NIGHT_END = "00:00"
+        try:
+            m1 = h.enqueue("o/a", priority=1)
+            c1, c2, c3 = (h.enqueue("o/b", priority=2, source="failing_ci") for _ in range(3))
+
+            h.sup.dispatch()
+            assert h.running() == set()
+
+            h.sup.scan_ci()
+            assert h.running() == {c1, c2}
+            assert h.queue.get_job(m1)["state"] == "queued"
+            assert h.queue.get_job(c3)["state"] == "queued"
+
+            h.finish(c1)
+            assert h.run_types[c1] == "ci_scan"
+            print("PASS: ci scan outside night window")
+        finally:
+            h.close()
+
+
+if __name__ == "__main__":
+    test_deferred_jobs_do_not_hold_workers()
+    test_deferred_backlog_is_bounded()
+    test_ci_scan_outside_night_window()